@@ -12,6 +12,8 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -43,6 +45,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.instrumentacion.InstrumentacionMiddleware',  # Primero, para medir la petición completa (Server-Timing, /metrics)
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -51,18 +54,30 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.replicas.ReplicasMiddleware',  # Lecturas de reportes y listados en réplicas (si hay)
 ]
 CORS_ALLOW_ALL_ORIGINS = True  # Permitir conexiones desde cualquier frontend
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',  # 🔹 Asegurar JWT
+        'core.autenticacion.JWTCacheadoAuthentication',  # 🔹 JWT, con el usuario cacheado (sin consulta por petición)
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',  # 🔹 Restringir acceso solo a autenticados
     ],
+    # 🔹 Paginación por páginas para tablas chicas; las tablas grandes usan cursor (core.pagination.PaginacionKeyset)
+    'DEFAULT_PAGINATION_CLASS': 'core.pagination.PaginacionPorPaginas',
+    'PAGE_SIZE': 50,
+    # 🔹 JSON con orjson (si está instalado); la API navegable sigue disponible
+    'DEFAULT_RENDERER_CLASSES': [
+        'core.renderers.JSONRapidoRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
 }
 
+# Cantidad máxima de puntos GPS por petición a /api/ubicaciones/lote/
+UBICACIONES_LOTE_MAXIMO = 10000
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -104,9 +119,84 @@ DATABASES = {
         'PASSWORD': os.getenv('DB_PASSWORD', 'postgres'),
         'HOST': os.getenv('DB_HOST', 'localhost'),  # Nombre del servicio en Docker
         'PORT': '5432',
+        # Bajo ASGI (uvicorn) el código síncrono de cada petición corre en un hilo distinto y
+        # Django no reutiliza las conexiones persistentes entre hilos: con CONN_MAX_AGE > 0 se
+        # acumularía una conexión abierta por hilo. Por eso 0 por defecto (una conexión por
+        # petición); para reutilizarlas, poner pgbouncer (modo transacción) delante de
+        # PostgreSQL. DB_CONN_MAX_AGE > 0 solo conviene con servidores WSGI de hilos fijos.
+        'CONN_MAX_AGE': int(os.getenv('DB_CONN_MAX_AGE', '0')),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Réplicas de lectura (core.replicas): DB_REPLICA_HOSTS="replica1,replica2" crea los alias
+# replica_1, replica_2, ... con las mismas credenciales. Para probar en local alcanza con
+# DB_REPLICA_HOSTS=localhost: un segundo alias sobre la misma base.
+DATABASE_REPLICAS = []
+for _numero, _host in enumerate(filter(None, os.getenv('DB_REPLICA_HOSTS', '').split(',')), start=1):
+    DATABASE_REPLICAS.append(f'replica_{_numero}')
+    DATABASES[f'replica_{_numero}'] = {
+        **DATABASES['default'],
+        'HOST': _host.strip(),
+        'TEST': {'MIRROR': 'default'},  # En los tests las réplicas apuntan a la base de prueba
+    }
+
+DATABASE_ROUTERS = ['core.replicas.RouterReplicas']
+
+# Segundos tras una escritura en que las lecturas de ese modelo siguen yendo a la base principal
+# (margen para que las réplicas se pongan al día, ver core.versiones.escritos_recientemente)
+REPLICAS_MARGEN_SEGUNDOS = 5
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# En producción con varios procesos usar Redis (REDIS_URL) para que la invalidación
+# por versión de escritura (core.versiones) sea compartida entre todos los workers:
+# con una caché local cada worker tendría sus propios contadores y una escritura no
+# invalidaría el dashboard, los ETag ni los usuarios cacheados de los demás.
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+elif not DEBUG:
+    raise ImproperlyConfigured("Sin DEBUG se requiere REDIS_URL: la caché local no se comparte entre workers")
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+# Tiempo máximo que se conserva el dashboard de métricas cacheado (se invalida antes si hay escrituras)
+METRICAS_CACHE_SEGUNDOS = 60 * 60 * 24
+
+# Feed de cambios: días que se conservan antes de `purgar_cambios`
+CAMBIOS_RETENCION_DIAS = 30
+
+# Segundos que se reutiliza el usuario autenticado por JWT sin releerlo (se descarta antes si se guarda)
+AUTH_USUARIO_CACHE_SEGUNDOS = 60
+
+# Días de historial GPS que quedan en la tabla `Ubicacion`; lo anterior lo empaqueta `archivar_ubicaciones`
+UBICACIONES_ARCHIVO_DIAS = 90
+
+# Ventana de `/api/ubicaciones/recorrido/`: horas que se muestran si no se indica `desde`
+# y máximo de días que se pueden pedir de una vez (más allá se responde 400)
+RECORRIDO_HORAS_POR_DEFECTO = 24
+RECORRIDO_MAXIMO_DIAS = 31
+
+# Backend de difusión de posiciones en vivo (`/api/ubicaciones/en_vivo/`). El local reparte
+# en memoria dentro de un proceso: con varios workers (WEB_CONCURRENCY > 1, ver Dockerfile)
+# un cliente conectado a uno no recibe lo que se ingesta en otro, así que se necesita un
+# backend compartido entre procesos (p. ej. sobre Redis pub/sub) con la interfaz de HubLocal
+DIFUSION_BACKEND = 'core.difusion.HubLocal'
+
+if int(os.getenv('WEB_CONCURRENCY', '1')) > 1 and DIFUSION_BACKEND == 'core.difusion.HubLocal':
+    raise ImproperlyConfigured("Con varios workers DIFUSION_BACKEND debe ser compartido entre procesos, no HubLocal")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
@@ -148,4 +238,12 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-CORS_ALLOW_ALL_ORIGINS = True
\ No newline at end of file
+CORS_ALLOW_ALL_ORIGINS = True
+
+# Instrumentación por petición (core.instrumentacion): fracción de peticiones medidas (0 a 1),
+# umbral a partir del cual se registra una petición lenta y acceso a /metrics, que fuera de
+# DEBUG está cerrado salvo con el token (Bearer), para staff o si se publica explícitamente
+INSTRUMENTACION_MUESTREO = float(os.getenv('INSTRUMENTACION_MUESTREO', '1.0'))
+INSTRUMENTACION_LENTA_SEGUNDOS = float(os.getenv('INSTRUMENTACION_LENTA_SEGUNDOS', '1.0'))
+INSTRUMENTACION_TOKEN = os.getenv('INSTRUMENTACION_TOKEN', '')
+INSTRUMENTACION_METRICAS_PUBLICAS = os.getenv('INSTRUMENTACION_METRICAS_PUBLICAS', '') == '1'
@@ -2,6 +2,7 @@ from django.contrib import admin
 from django.urls import path, include
 from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 from core.views import home  # Importamos la vista para la raíz
+from core.instrumentacion import metricas
 
 urlpatterns = [
     # Panel de administración de Django
@@ -14,6 +15,9 @@ urlpatterns = [
     path('api/token/', TokenObtainPairView.as_view(), name='token_obtain_pair'),
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
 
+    # Métricas de rendimiento para Prometheus
+    path('metrics', metricas, name='metrics'),
+
     # Ruta raíz con mensaje de bienvenida
     path('', home, name='home'),
 ]
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import signals  # noqa: F401  (registra los receptores de señales)
+        from . import instrumentacion  # noqa: F401  (mide las consultas SQL de cada conexión nueva)
@@ -0,0 +1,198 @@
+import zlib
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from .filtros import inicio_del_dia
+from .models import Camion, SegmentoUbicacion, Ubicacion, UltimaUbicacion
+
+# Versión del formato de `SegmentoUbicacion.datos` (primer byte)
+FORMATO = b"\x01"
+
+# Resolución con que se guardan latitud y longitud: 1e-7 grados (~1 cm, muy por debajo del error de un GPS)
+ESCALA_COORDENADAS = 10_000_000
+
+# Días de un camión que se archivan por transacción
+DIAS_POR_LOTE = 7
+
+# Ids por `DELETE` en las bases sin arreglos como parámetro (SQLite admite pocos parámetros por consulta)
+BORRADO_POR_CONSULTA = 500
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSEGUNDO = timedelta(microseconds=1)
+
+
+def _microsegundos(momento):
+    return (momento - _EPOCH) // _MICROSEGUNDO
+
+
+def empaquetar(latitudes, longitudes, microsegundos):
+    """
+    Empaqueta un recorrido ordenado por tiempo en bytes.
+
+    Las coordenadas (en enteros de 1e-7 grados) y los timestamps (microsegundos desde
+    epoch) se guardan como diferencias con el punto anterior, que entre lecturas
+    consecutivas de un GPS son números chicos. Los bytes de las diferencias se
+    reordenan por significancia (todos los bytes bajos juntos, luego los siguientes, ...)
+    para que zlib comprima las largas corridas de ceros de los bytes altos.
+    """
+    columnas = np.stack([
+        np.rint(np.asarray(latitudes) * ESCALA_COORDENADAS).astype(np.int64),
+        np.rint(np.asarray(longitudes) * ESCALA_COORDENADAS).astype(np.int64),
+        np.asarray(microsegundos, dtype=np.int64),
+    ])
+    diferencias = np.diff(columnas, axis=1, prepend=0).astype("<i8")
+    cantidad = columnas.shape[1]
+    bytes_ordenados = diferencias.view(np.uint8).reshape(3, cantidad, 8).transpose(0, 2, 1).tobytes()
+    return FORMATO + zlib.compress(bytes_ordenados, 6)
+
+
+def desempaquetar(datos, cantidad):
+    """Inverso de `empaquetar`: devuelve `(latitudes, longitudes, microsegundos)`"""
+    datos = bytes(datos)
+    if datos[:1] != FORMATO:
+        raise ValueError(f"Formato de segmento desconocido: {datos[:1]!r}")
+    crudos = np.frombuffer(zlib.decompress(datos[1:]), dtype=np.uint8)
+    diferencias = crudos.reshape(3, 8, cantidad).transpose(0, 2, 1).copy().view("<i8").reshape(3, cantidad)
+    columnas = np.cumsum(diferencias, axis=1)
+    return columnas[0] / ESCALA_COORDENADAS, columnas[1] / ESCALA_COORDENADAS, columnas[2]
+
+
+def cargar(camion_ids=None, inicio=None, fin=None):
+    """
+    Puntos archivados de `camion_ids` (o de toda la flota) entre `inicio` y `fin`.
+
+    Devuelve `(camiones, latitudes, longitudes, timestamps)` como `core.viajes.cargar_flota`:
+    ordenados por camión y tiempo, con los timestamps en segundos desde epoch.
+    """
+    segmentos = SegmentoUbicacion.objects.all()
+    if camion_ids is not None:
+        segmentos = segmentos.filter(camion_id__in=camion_ids)
+    if inicio is not None:
+        segmentos = segmentos.filter(fecha__gte=timezone.localdate(inicio), fin__gte=inicio)
+    if fin is not None:
+        segmentos = segmentos.filter(fecha__lte=timezone.localdate(fin), inicio__lt=fin)
+
+    partes = []
+    for camion_id, cantidad, datos in segmentos.order_by("camion_id", "fecha").values_list("camion_id", "cantidad", "datos"):
+        latitudes, longitudes, microsegundos = desempaquetar(datos, cantidad)
+        partes.append((np.full(cantidad, camion_id, dtype=np.int64), latitudes, longitudes, microsegundos / 1e6))
+    if not partes:
+        return tuple(np.empty(0, dtype=tipo) for tipo in (np.int64, np.float64, np.float64, np.float64))
+
+    camiones, latitudes, longitudes, timestamps = (np.concatenate(columna) for columna in zip(*partes))
+    dentro = np.ones(len(timestamps), dtype=bool)
+    if inicio is not None:
+        dentro &= timestamps >= inicio.timestamp()
+    if fin is not None:
+        dentro &= timestamps < fin.timestamp()
+    return camiones[dentro], latitudes[dentro], longitudes[dentro], timestamps[dentro]
+
+
+def combinar(archivados, actuales):
+    """Une los arreglos del archivo con los de la tabla `Ubicacion`, ordenados por camión y tiempo"""
+    if len(archivados[0]) == 0:
+        return actuales
+    camiones, latitudes, longitudes, timestamps = (np.concatenate(par) for par in zip(archivados, actuales))
+    orden = np.lexsort((timestamps, camiones))
+    return camiones[orden], latitudes[orden], longitudes[orden], timestamps[orden]
+
+
+def archivar(limite, camion_ids=None):
+    """
+    Mueve al archivo los puntos de `Ubicacion` anteriores a `limite` (comienzo de un día local).
+
+    Cada camión se procesa de a `DIAS_POR_LOTE` días, cada lote en su transacción: se
+    arma un `SegmentoUbicacion` por día (uniéndolo al que ya existiera si llegaron
+    puntos atrasados) y se borran las filas. La última posición de cada camión
+    (`UltimaUbicacion.ubicacion`) queda en la tabla. Devuelve `(segmentos, puntos)`.
+    """
+    conservar = UltimaUbicacion.objects.filter(camion_id=OuterRef("pk")).values("ubicacion_id")
+    camiones = Camion.objects.order_by("pk")
+    if camion_ids is not None:
+        camiones = camiones.filter(pk__in=camion_ids)
+    camiones = camiones.annotate(conservar=Subquery(conservar)).values_list("pk", "conservar")
+
+    segmentos = puntos = 0
+    for camion_id, conservar_id in camiones:
+        viejos = Ubicacion.objects.filter(camion_id=camion_id, timestamp__lt=limite).exclude(pk=conservar_id)
+        while True:
+            primero = viejos.order_by("timestamp").values_list("timestamp", flat=True).first()
+            if primero is None:
+                break
+            primer_dia = timezone.localdate(primero)
+            fin = min(inicio_del_dia(primer_dia + timedelta(days=DIAS_POR_LOTE)), limite)
+            lote = Ubicacion.objects.filter(camion_id=camion_id, timestamp__gte=inicio_del_dia(primer_dia), timestamp__lt=fin)
+            creados, archivados = _archivar_lote(lote, camion_id, primer_dia)
+            segmentos += creados
+            puntos += archivados
+            viejos = viejos.filter(timestamp__gte=fin)  # Avanza aunque el lote haya quedado vacío
+    return segmentos, puntos
+
+
+def _archivar_lote(ubicaciones, camion_id, primer_dia):
+    with transaction.atomic():
+        # La fila de `UltimaUbicacion` bloqueada fija la posición que se conserva (una edición o un
+        # borrado pudo cambiarla desde que se eligió el lote): así ningún punto empaquetado queda
+        # referenciado y no hace falta el SET_NULL que haría `delete()`
+        conservar = UltimaUbicacion.objects.select_for_update().filter(camion_id=camion_id).values_list("ubicacion_id", flat=True).first()
+        filas = list(ubicaciones.exclude(pk=conservar).order_by("timestamp", "id").values_list("id", "latitud", "longitud", "timestamp"))
+        if not filas:
+            return 0, 0
+        cantidad = len(filas)
+        latitudes = np.fromiter((fila[1] for fila in filas), dtype=np.float64, count=cantidad)
+        longitudes = np.fromiter((fila[2] for fila in filas), dtype=np.float64, count=cantidad)
+        microsegundos = np.fromiter((_microsegundos(fila[3]) for fila in filas), dtype=np.int64, count=cantidad)
+
+        # Corte de cada día local dentro del lote
+        dias = [primer_dia + timedelta(days=i) for i in range(DIAS_POR_LOTE + 1)]
+        cortes = np.searchsorted(microsegundos, [_microsegundos(inicio_del_dia(dia)) for dia in dias])
+
+        existentes = {
+            segmento.fecha: segmento
+            for segmento in SegmentoUbicacion.objects.select_for_update().filter(camion_id=camion_id, fecha__in=dias)
+        }
+        nuevos = []
+        for dia, desde, hasta in zip(dias, cortes[:-1], cortes[1:]):
+            if desde == hasta:
+                continue
+            columnas = (latitudes[desde:hasta], longitudes[desde:hasta], microsegundos[desde:hasta])
+            if dia in existentes:
+                anterior = existentes[dia]
+                columnas = tuple(np.concatenate(par) for par in zip(desempaquetar(anterior.datos, anterior.cantidad), columnas))
+                orden = np.argsort(columnas[2], kind="stable")
+                columnas = tuple(columna[orden] for columna in columnas)
+            nuevos.append(SegmentoUbicacion(
+                camion_id=camion_id,
+                fecha=dia,
+                inicio=_EPOCH + timedelta(microseconds=int(columnas[2][0])),
+                fin=_EPOCH + timedelta(microseconds=int(columnas[2][-1])),
+                cantidad=len(columnas[2]),
+                datos=empaquetar(*columnas),
+            ))
+
+        SegmentoUbicacion.objects.filter(pk__in=[segmento.pk for segmento in existentes.values()]).delete()
+        SegmentoUbicacion.objects.bulk_create(nuevos)
+        # Exactamente las filas empaquetadas, en la misma transacción que los segmentos
+        _borrar_ubicaciones([fila[0] for fila in filas])
+    return len(nuevos), cantidad
+
+
+def _borrar_ubicaciones(ids):
+    """
+    Borra las filas `ids` de `Ubicacion` sin cargarlas ni enviar señales por cada una.
+
+    En PostgreSQL es un solo `DELETE ... WHERE id = ANY(%s)` con el arreglo como único
+    parámetro; en otras bases se borra de a `BORRADO_POR_CONSULTA` ids.
+    """
+    tabla = connection.ops.quote_name(Ubicacion._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"DELETE FROM {tabla} WHERE id = ANY(%s)", [ids])
+            return
+        for inicio in range(0, len(ids), BORRADO_POR_CONSULTA):
+            parte = ids[inicio:inicio + BORRADO_POR_CONSULTA]
+            cursor.execute(f"DELETE FROM {tabla} WHERE id IN ({', '.join(['%s'] * len(parte))})", parte)
@@ -0,0 +1,62 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.translation import gettext_lazy as _
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+
+# Lo único que se guarda del usuario: ni la contraseña ni `last_login` pasan por la caché
+CAMPOS_CACHEADOS = ("id", "username", "is_active", "is_staff", "is_superuser")
+
+
+def clave_usuario(user_id):
+    return f"auth:identidad:{user_id}"
+
+
+def invalidar_usuario(usuario):
+    """Descarta la copia cacheada de `usuario` (se llama al guardarlo o eliminarlo, ver `core.signals`)"""
+    cache.delete(clave_usuario(getattr(usuario, api_settings.USER_ID_FIELD)))
+
+
+class JWTCacheadoAuthentication(JWTAuthentication):
+    """
+    `JWTAuthentication` que no consulta la tabla de usuarios en cada petición.
+
+    Se guardan en la caché por `AUTH_USUARIO_CACHE_SEGUNDOS` los `CAMPOS_CACHEADOS` y
+    la marca con que SimpleJWT revoca los tokens al cambiar la contraseña (un hash del
+    hash, nunca el hash mismo). Se descartan cuando el usuario se guarda o se elimina,
+    así que desactivarlo o cambiarle la contraseña rige desde la petición siguiente; los
+    cambios hechos sin señales (`queryset.update()`) se ven cuando vence la copia.
+
+    El usuario que se arma desde la caché tiene diferidos los demás campos: las vistas
+    que los usan (el perfil) deben leerlo completo de la base.
+    """
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+        clave = clave_usuario(user_id)
+        cacheado = cache.get(clave)
+        if cacheado is None:
+            user = super().get_user(validated_token)  # Consulta la base y hace todas las validaciones
+            campos = {campo: getattr(user, campo) for campo in CAMPOS_CACHEADOS}
+            revocacion = get_md5_hash_password(user.password) if api_settings.CHECK_REVOKE_TOKEN else None
+            cache.set(clave, (campos, revocacion), getattr(settings, "AUTH_USUARIO_CACHE_SEGUNDOS", 60))
+            return user
+
+        campos, revocacion = cacheado
+        # `from_db` espera los valores en el orden de los campos del modelo
+        nombres = [campo.attname for campo in self.user_model._meta.concrete_fields if campo.attname in campos]
+        user = self.user_model.from_db(DEFAULT_DB_ALIAS, nombres, [campos[nombre] for nombre in nombres])
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN and validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != revocacion:
+            raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
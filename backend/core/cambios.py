@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connections, router
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.utils import timezone
+
+from .models import Cambio
+
+
+class CursorVencido(Exception):
+    """El cursor apunta a cambios ya purgados: el cliente debe volver a descargar el listado"""
+
+
+def _transaccion_actual(conexion):
+    # En PostgreSQL cada cambio guarda el id de su transacción, que se asigna al escribir.
+    # En SQLite las transacciones de escritura son de a una, así que el id alcanza para ordenar.
+    return RawSQL("txid_current()", ()) if conexion.vendor == "postgresql" else 0
+
+
+def registrar(modelo, operacion, pks):
+    """Agrega al feed un cambio por cada pk, con un solo INSERT"""
+    etiqueta = modelo._meta.label_lower
+    ahora = timezone.now()
+    transaccion = _transaccion_actual(connections[router.db_for_write(Cambio)])
+    Cambio.objects.bulk_create([
+        Cambio(modelo=etiqueta, objeto_id=pk, operacion=operacion, fecha=ahora, transaccion=transaccion)
+        for pk in pks if pk is not None
+    ])
+
+
+def _horizonte(conexion):
+    """Id de la transacción más vieja todavía en curso, o `None` si el motor escribe de a una transacción"""
+    if conexion.vendor != "postgresql":
+        return None
+    with conexion.cursor() as cursor:
+        cursor.execute("SELECT txid_snapshot_xmin(txid_current_snapshot())")
+        return cursor.fetchone()[0]
+
+
+def _publicables():
+    """
+    Cambios cuya transacción y todas las anteriores ya terminaron.
+
+    El feed se ordena por `(transaccion, id)` y solo se publican los cambios de
+    transacciones anteriores a la más vieja todavía en curso (`_horizonte`): ninguna
+    transacción en curso ni futura puede agregar cambios a ese prefijo, así que un cursor
+    nunca saltea los de una transacción larga que se confirma después que otras.
+    """
+    cambios = Cambio.objects.all()
+    horizonte = _horizonte(connections[cambios.db])
+    return cambios if horizonte is None else cambios.filter(transaccion__lt=horizonte)
+
+
+def formatear_cursor(posicion):
+    """`(transaccion, id)` como texto para la respuesta (`"0"` es el inicio del feed)"""
+    transaccion, id_ = posicion
+    return f"{transaccion}.{id_}" if transaccion else str(id_)
+
+
+def leer_cursor(texto):
+    """
+    Convierte el parámetro `desde` en `(transaccion, id)`; `ValueError` si es inválido.
+
+    Acepta también un id solo, el formato de los cursores previos a ordenar por transacción.
+    """
+    transaccion, _, id_ = texto.rpartition(".")
+    posicion = (int(transaccion) if transaccion else 0, int(id_))
+    if min(posicion) < 0:
+        raise ValueError(texto)
+    return posicion
+
+
+def cursor_actual():
+    """Última posición publicada: el cursor desde el que empieza a seguir un cliente nuevo"""
+    ultima = _publicables().order_by("-transaccion", "-id").values_list("transaccion", "id").first()
+    return ultima or (0, 0)
+
+
+def leer(modelo, desde, limite):
+    """
+    Cambios de `modelo` posteriores a la posición `desde` (`(transaccion, id)`), resumidos por objeto.
+
+    Usa el índice `(modelo, transaccion, id)` y solo lee cambios publicables (ver `_publicables`).
+
+    Devuelve `(operaciones, cursor, hay_mas)`: `operaciones` es `{objeto_id: operacion}`
+    con la última operación de cada objeto, en el orden en que ocurrieron.
+    """
+    transaccion, id_ = desde
+    primero = Cambio.objects.order_by("id").values_list("id", flat=True).first()
+    if primero is not None and id_ < primero - 1:
+        raise CursorVencido(desde)
+
+    filas = list(
+        _publicables().filter(modelo=modelo._meta.label_lower)
+        .filter(Q(transaccion__gt=transaccion) | Q(transaccion=transaccion, id__gt=id_))
+        .order_by("transaccion", "id").values_list("transaccion", "id", "objeto_id", "operacion")[:limite + 1]
+    )
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    operaciones = {}
+    for _, _, objeto_id, operacion in filas:
+        operaciones.pop(objeto_id, None)  # Reinsertar deja al objeto en la posición de su último cambio
+        operaciones[objeto_id] = operacion
+    cursor = filas[-1][:2] if filas else desde
+    return operaciones, cursor, hay_mas
+
+
+def purgar(dias=None):
+    """Elimina los cambios más viejos que la retención; devuelve cuántos se borraron"""
+    dias = settings.CAMBIOS_RETENCION_DIAS if dias is None else dias
+    eliminados, _ = Cambio.objects.filter(fecha__lt=timezone.now() - timedelta(days=dias)).delete()
+    return eliminados
@@ -0,0 +1,59 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
+from django.utils.http import http_date
+
+from .versiones import versiones
+
+
+def modelos_involucrados(modelo, rutas):
+    """`modelo` más los modelos alcanzados por las rutas de `select_related` (`"pedido__cliente"`)"""
+    modelos = [modelo]
+    for ruta in rutas:
+        actual = modelo
+        for parte in ruta.split("__"):
+            actual = actual._meta.get_field(parte).related_model
+            if actual not in modelos:
+                modelos.append(actual)
+    return modelos
+
+
+def calcular_etag(request, *partes):
+    """ETag débil a partir de `partes`, la URL completa y el formato de la respuesta"""
+    formato = getattr(getattr(request, "accepted_renderer", None), "format", "")
+    texto = "|".join(str(parte) for parte in (request.get_full_path(), formato, *partes))
+    return f'W/"{hashlib.blake2b(texto.encode(), digest_size=16).hexdigest()}"'
+
+
+def etag_de_versiones(request, modelos):
+    """
+    ETag de un listado a partir de la versión de escritura de los modelos que muestra.
+
+    Las versiones viven en la caché (ver `core.versiones`), así que validar no cuesta
+    ninguna consulta; cualquier alta, cambio o baja confirmada en esos modelos lo cambia.
+    """
+    return calcular_etag(request, *versiones(*modelos))
+
+
+def _segundos(fecha):
+    # Last-Modified tiene resolución de segundos
+    return int(fecha.timestamp()) if fecha is not None else None
+
+
+def respuesta_no_modificada(request, etag=None, ultima_modificacion=None):
+    """La respuesta 304 (o 412) que corresponde a los encabezados condicionales, o `None`"""
+    respuesta = get_conditional_response(request, etag=etag, last_modified=_segundos(ultima_modificacion))
+    if respuesta is not None:
+        agregar_validadores(respuesta, etag, ultima_modificacion)
+    return respuesta
+
+
+def agregar_validadores(respuesta, etag=None, ultima_modificacion=None):
+    """Agrega ETag / Last-Modified y obliga al navegador a revalidar antes de reutilizar la copia"""
+    if etag is not None:
+        respuesta["ETag"] = etag
+    if ultima_modificacion is not None:
+        respuesta["Last-Modified"] = http_date(_segundos(ultima_modificacion))
+    patch_cache_control(respuesta, private=True, no_cache=True)
+    patch_vary_headers(respuesta, ("Accept", "Authorization"))
+    return respuesta
@@ -0,0 +1,120 @@
+import asyncio
+import threading
+from functools import lru_cache
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+from .renderers import JSONRapidoRenderer
+
+# Mensajes pendientes por suscriptor; si un cliente lento llena la cola se descartan los más viejos
+MAXIMO_PENDIENTES = 1000
+
+CANAL_FLOTA = "flota"
+
+
+def canal_camion(camion_id):
+    return f"camion:{camion_id}"
+
+
+class Suscripcion:
+    """Cola de mensajes de un cliente conectado, atada al event loop en el que se creó"""
+
+    def __init__(self, hub, canales):
+        self.hub = hub
+        self.canales = tuple(canales)
+        self.loop = asyncio.get_running_loop()
+        self.cola = asyncio.Queue(maxsize=MAXIMO_PENDIENTES)
+
+    def entregar(self, mensaje):
+        # Siempre desde el hilo del event loop (ver `HubLocal.publicar`)
+        if self.cola.full():
+            self.cola.get_nowait()
+        self.cola.put_nowait(mensaje)
+
+    async def recibir(self, timeout=None):
+        """Próximo mensaje, o `None` si pasan `timeout` segundos sin novedades"""
+        try:
+            return await asyncio.wait_for(self.cola.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def cerrar(self):
+        self.hub.desuscribir(self)
+
+
+class HubLocal:
+    """
+    Difusión en memoria entre las peticiones de un mismo proceso.
+
+    `publicar` puede llamarse desde cualquier hilo (las vistas síncronas corren fuera
+    del event loop): el mensaje se entrega a cada suscriptor con `call_soon_threadsafe`.
+    Con varios procesos (workers) cada uno solo ve lo que se ingesta en él; para eso
+    se configura otro backend en `DIFUSION_BACKEND` con la misma interfaz.
+    """
+
+    def __init__(self):
+        self._canales = {}
+        self._lock = threading.Lock()
+
+    def suscribir(self, canales):
+        """Crea una suscripción a `canales`; debe llamarse dentro del event loop del cliente"""
+        suscripcion = Suscripcion(self, canales)
+        with self._lock:
+            for canal in suscripcion.canales:
+                self._canales.setdefault(canal, set()).add(suscripcion)
+        return suscripcion
+
+    def desuscribir(self, suscripcion):
+        with self._lock:
+            for canal in suscripcion.canales:
+                suscriptores = self._canales.get(canal)
+                if suscriptores is not None:
+                    suscriptores.discard(suscripcion)
+                    if not suscriptores:
+                        del self._canales[canal]
+
+    def publicar(self, canal, mensaje):
+        with self._lock:
+            suscriptores = list(self._canales.get(canal, ()))
+        for suscripcion in suscriptores:
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion.entregar, mensaje)
+            except RuntimeError:
+                self.desuscribir(suscripcion)  # Event loop cerrado: el cliente ya no existe
+
+    def cantidad_suscriptores(self, canal):
+        with self._lock:
+            return len(self._canales.get(canal, ()))
+
+
+@lru_cache(maxsize=None)
+def hub():
+    """Backend de difusión configurado en `DIFUSION_BACKEND` (uno por proceso)"""
+    return import_string(getattr(settings, "DIFUSION_BACKEND", "core.difusion.HubLocal"))()
+
+
+def evento_sse(evento, datos, identificador=None):
+    """Mensaje Server-Sent Events ya codificado, para armarlo una vez y enviarlo a todos"""
+    cabecera = f"id: {identificador}\n" if identificador is not None else ""
+    return f"{cabecera}event: {evento}\ndata: ".encode() + JSONRapidoRenderer().render(datos) + b"\n\n"
+
+
+def publicar_ubicaciones(ubicaciones):
+    """
+    Difunde posiciones recién ingestadas al canal de cada camión y al de la flota.
+
+    Recibe una ubicación por camión (la más reciente del lote, ver
+    `core.ingesta.actualizar_ultimas_ubicaciones`): el mapa dibuja posiciones, no el historial.
+    """
+    destino = hub()
+    for ubicacion in ubicaciones:
+        mensaje = evento_sse("ubicacion", {
+            "id": ubicacion.pk,
+            "camion_id": ubicacion.camion_id,
+            "latitud": ubicacion.latitud,
+            "longitud": ubicacion.longitud,
+            "timestamp": ubicacion.timestamp,
+        }, identificador=ubicacion.pk)
+        destino.publicar(canal_camion(ubicacion.camion_id), mensaje)
+        destino.publicar(CANAL_FLOTA, mensaje)
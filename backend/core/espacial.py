@@ -0,0 +1,154 @@
+import math
+import operator
+from functools import reduce
+
+from django.db.models import Q
+
+# Bits por eje de la grilla: 2^20 columnas de longitud y filas de latitud (celdas de ~20 m)
+BITS = 20
+_LADO = 1 << BITS
+
+# Máximo de celdas con que se cubre un rectángulo (cada una es un rango del índice)
+MAXIMO_CELDAS = 32
+
+RADIO_TIERRA_KM = 6371.0088
+
+# Radio inicial de la búsqueda de los más cercanos; se duplica hasta juntar `k` camiones
+RADIO_INICIAL_KM = 5.0
+
+
+def _separar_bits(valor):
+    """Intercala ceros entre los bits de `valor` (…b2 b1 b0 -> …0 b2 0 b1 0 b0)"""
+    valor &= 0xFFFFF
+    valor = (valor | (valor << 16)) & 0x0000FFFF0000FFFF
+    valor = (valor | (valor << 8)) & 0x00FF00FF00FF00FF
+    valor = (valor | (valor << 4)) & 0x0F0F0F0F0F0F0F0F
+    valor = (valor | (valor << 2)) & 0x3333333333333333
+    valor = (valor | (valor << 1)) & 0x5555555555555555
+    return valor
+
+
+def _morton(columna, fila):
+    return _separar_bits(columna) | (_separar_bits(fila) << 1)
+
+
+def _columna(longitud):
+    return min(max(int((longitud + 180.0) / 360.0 * _LADO), 0), _LADO - 1)
+
+
+def _fila(latitud):
+    return min(max(int((latitud + 90.0) / 180.0 * _LADO), 0), _LADO - 1)
+
+
+def celda(latitud, longitud):
+    """
+    Código de celda (orden Z / Morton) de una posición.
+
+    Las celdas cercanas en el mapa tienen códigos cercanos, así que un rectángulo se
+    cubre con pocos rangos `celda BETWEEN a AND b` que un índice B-tree común resuelve
+    sin PostGIS, y el costo depende de cuántos puntos hay en la zona, no de la flota.
+    """
+    return _morton(_columna(longitud), _fila(latitud))
+
+
+def _rangos(columna_0, fila_0, columna_1, fila_1):
+    """Rangos de códigos que cubren las celdas entre dos esquinas (inclusive), a lo sumo `MAXIMO_CELDAS`"""
+    nivel = BITS
+    while nivel > 0:
+        corrimiento = BITS - nivel
+        ancho = (columna_1 >> corrimiento) - (columna_0 >> corrimiento) + 1
+        alto = (fila_1 >> corrimiento) - (fila_0 >> corrimiento) + 1
+        if ancho * alto <= MAXIMO_CELDAS:
+            break
+        nivel -= 1
+    corrimiento = BITS - nivel
+
+    inicios = sorted(
+        _morton(columna, fila) << (2 * corrimiento)
+        for columna in range(columna_0 >> corrimiento, (columna_1 >> corrimiento) + 1)
+        for fila in range(fila_0 >> corrimiento, (fila_1 >> corrimiento) + 1)
+    )
+    tamano = 1 << (2 * corrimiento)
+    rangos = []
+    for inicio in inicios:
+        if rangos and rangos[-1][1] + 1 == inicio:
+            rangos[-1][1] = inicio + tamano - 1  # Celdas contiguas en el orden Z: un solo rango
+        else:
+            rangos.append([inicio, inicio + tamano - 1])
+    return rangos
+
+
+def _cajas(sur, oeste, norte, este):
+    # Un rectángulo que cruza el antimeridiano (oeste > este) se parte en dos
+    if oeste <= este:
+        return [(sur, oeste, norte, este)]
+    return [(sur, oeste, norte, 180.0), (sur, -180.0, norte, este)]
+
+
+def filtro_rectangulo(sur, oeste, norte, este):
+    """`Q` para posiciones dentro del rectángulo: rangos de celda (índice) más el filtro exacto"""
+    filtros = []
+    for caja_sur, caja_oeste, caja_norte, caja_este in _cajas(sur, oeste, norte, este):
+        rangos = _rangos(_columna(caja_oeste), _fila(caja_sur), _columna(caja_este), _fila(caja_norte))
+        celdas = reduce(operator.or_, (Q(celda__range=(inicio, fin)) for inicio, fin in rangos))
+        filtros.append(celdas & Q(latitud__range=(caja_sur, caja_norte), longitud__range=(caja_oeste, caja_este)))
+    return reduce(operator.or_, filtros)
+
+
+def distancia_km(latitud_1, longitud_1, latitud_2, longitud_2):
+    """Distancia sobre la superficie terrestre (haversine)"""
+    fi_1, fi_2 = math.radians(latitud_1), math.radians(latitud_2)
+    d_fi = fi_2 - fi_1
+    d_lambda = math.radians(longitud_2 - longitud_1)
+    a = math.sin(d_fi / 2) ** 2 + math.cos(fi_1) * math.cos(fi_2) * math.sin(d_lambda / 2) ** 2
+    return 2 * RADIO_TIERRA_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def rectangulo_alrededor(latitud, longitud, radio_km):
+    """Rectángulo `(sur, oeste, norte, este)` que contiene el círculo de `radio_km` alrededor del punto"""
+    delta_latitud = math.degrees(radio_km / RADIO_TIERRA_KM)
+    sur, norte = max(latitud - delta_latitud, -90.0), min(latitud + delta_latitud, 90.0)
+    coseno = math.cos(math.radians(max(abs(sur), abs(norte))))
+    if coseno <= 0 or radio_km / (RADIO_TIERRA_KM * coseno) >= math.pi:
+        return sur, -180.0, norte, 180.0  # Cerca de un polo: todas las longitudes
+    delta_longitud = math.degrees(radio_km / (RADIO_TIERRA_KM * coseno))
+    oeste, este = longitud - delta_longitud, longitud + delta_longitud
+    if oeste < -180.0:
+        oeste += 360.0
+    if este > 180.0:
+        este -= 360.0
+    return sur, oeste, norte, este
+
+
+def _con_distancia(filas, latitud, longitud, radio_km):
+    resultado = []
+    for fila in filas:
+        distancia = distancia_km(latitud, longitud, fila["latitud"], fila["longitud"])
+        if radio_km is None or distancia <= radio_km:
+            resultado.append({**fila, "distancia_km": round(distancia, 3)})
+    resultado.sort(key=lambda fila: fila["distancia_km"])
+    return resultado
+
+
+def mas_cercanos(queryset, latitud, longitud, k, radio_km=None):
+    """
+    Los `k` elementos de `queryset` más cercanos al punto (dicts de `values()` con `distancia_km`).
+
+    Con `radio_km` busca una sola vez dentro de ese radio. Sin él empieza por
+    `RADIO_INICIAL_KM` y duplica el radio hasta encontrar `k` dentro del círculo, así
+    que cada búsqueda lee los puntos de una zona proporcional a la respuesta.
+    `queryset` debe ser un `values()` que incluya `latitud` y `longitud`.
+    """
+    if radio_km is not None:
+        filas = queryset.filter(filtro_rectangulo(*rectangulo_alrededor(latitud, longitud, radio_km)))
+        return _con_distancia(filas, latitud, longitud, radio_km)[:k]
+
+    radio = RADIO_INICIAL_KM
+    media_vuelta = math.pi * RADIO_TIERRA_KM
+    while radio < media_vuelta:
+        filas = queryset.filter(filtro_rectangulo(*rectangulo_alrededor(latitud, longitud, radio)))
+        cercanos = _con_distancia(filas, latitud, longitud, radio)
+        if len(cercanos) >= k:
+            return cercanos[:k]
+        radio *= 2
+    return _con_distancia(queryset, latitud, longitud, None)[:k]
@@ -0,0 +1,102 @@
+import csv
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from asgiref.sync import sync_to_async
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+
+try:
+    from openpyxl import Workbook
+except ImportError:  # openpyxl es opcional: sin él solo se exporta CSV
+    Workbook = None
+
+# Filas que se piden a la base en cada ida y vuelta (cursor del lado del servidor en PostgreSQL)
+FILAS_POR_LOTE = 2000
+
+FORMATOS = ("csv", "xlsx")
+
+
+class _Eco:
+    """Objeto tipo archivo que devuelve lo escrito, para que `csv.writer` genere líneas sueltas"""
+
+    def write(self, valor):
+        return valor
+
+
+def _filas(queryset, columnas):
+    campos = [campo for _, campo in columnas]
+    return queryset.values_list(*campos).iterator(chunk_size=FILAS_POR_LOTE)
+
+
+def respuesta_csv(queryset, columnas, nombre, asincrono=False):
+    """
+    Exporta un queryset como CSV sin armar el archivo en memoria.
+
+    Las filas se leen con `values_list().iterator()` y se escriben en la respuesta de a
+    `FILAS_POR_LOTE`, así que la memoria no depende de la cantidad de filas. Con
+    `asincrono` (petición ASGI) el contenido es un iterador asíncrono que lee cada lote
+    con `sync_to_async`: a un iterador síncrono Django lo consumiría entero con
+    `sync_to_async(list)` antes de enviar el primer byte.
+    """
+    escritor = csv.writer(_Eco())
+    # BOM para que Excel detecte UTF-8
+    encabezados = "\ufeff" + escritor.writerow([encabezado for encabezado, _ in columnas])
+    filas = _filas(queryset, columnas)
+
+    def siguiente_lote():
+        return "".join(escritor.writerow(fila) for fila in islice(filas, FILAS_POR_LOTE))
+
+    def generar():
+        yield encabezados
+        while lote := siguiente_lote():
+            yield lote
+
+    async def generar_async():
+        yield encabezados
+        # Siempre en el mismo hilo: el cursor del iterador pertenece a esa conexión
+        leer = sync_to_async(siguiente_lote, thread_sensitive=True)
+        while lote := await leer():
+            yield lote
+
+    respuesta = StreamingHttpResponse(generar_async() if asincrono else generar(), content_type="text/csv; charset=utf-8")
+    respuesta["Content-Disposition"] = f'attachment; filename="{nombre}.csv"'
+    return respuesta
+
+
+def _celda(valor):
+    # Excel no admite fechas con zona horaria
+    if isinstance(valor, datetime) and timezone.is_aware(valor):
+        return timezone.make_naive(valor)
+    return valor
+
+
+def respuesta_xlsx(queryset, columnas, nombre):
+    """
+    Exporta un queryset como XLSX.
+
+    Usa el modo `write_only` de openpyxl, que vuelca cada fila a un archivo temporal
+    en disco en lugar de mantener la hoja en memoria. No es streaming: el libro se
+    termina de escribir en disco antes de responder (el formato es un zip con el índice
+    al final) y recién entonces se envía el archivo con `FileResponse`.
+    """
+    libro = Workbook(write_only=True)
+    hoja = libro.create_sheet(title=nombre[:31])
+    hoja.append([encabezado for encabezado, _ in columnas])
+    for fila in _filas(queryset, columnas):
+        hoja.append([_celda(valor) for valor in fila])
+
+    archivo = tempfile.TemporaryFile()
+    libro.save(archivo)
+    archivo.seek(0)
+    return FileResponse(
+        archivo,
+        as_attachment=True,
+        filename=f"{nombre}.xlsx",
+        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    )
+
+
+def xlsx_disponible():
+    return Workbook is not None
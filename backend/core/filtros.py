@@ -0,0 +1,41 @@
+from datetime import date, datetime
+
+from django.utils import timezone
+
+
+def rango_mes(mes):
+    """
+    Convierte "YYYY-MM" en el rango semiabierto `[inicio, fin)` de ese mes.
+
+    Lanza `ValueError` si el texto no tiene ese formato o el mes no existe.
+    """
+    año, numero = map(int, mes.split("-"))
+    inicio = date(año, numero, 1)
+    fin = date(año + 1, 1, 1) if numero == 12 else date(año, numero + 1, 1)
+    return inicio, fin
+
+
+def filtro_mes(campo, mes):
+    """
+    Filtro por mes que puede usar un índice sobre `campo`.
+
+    `fecha__year=...` / `fecha__month=...` se traducen en `EXTRACT(...)` y obligan a
+    recorrer la tabla; este helper genera `campo >= inicio AND campo < fin`.
+    Uso: `GastoCamion.objects.filter(**filtro_mes("fecha", "2025-03"))`.
+    """
+    inicio, fin = rango_mes(mes)
+    return {f"{campo}__gte": inicio, f"{campo}__lt": fin}
+
+
+def filtro_mes_con_hora(campo, mes):
+    """Igual que `filtro_mes` pero con límites datetime, para campos DateTimeField"""
+    inicio, fin = rango_mes(mes)
+    return {
+        f"{campo}__gte": timezone.make_aware(datetime.combine(inicio, datetime.min.time())),
+        f"{campo}__lt": timezone.make_aware(datetime.combine(fin, datetime.min.time())),
+    }
+
+
+def inicio_del_dia(dia):
+    """Comienzo (datetime con zona) del día local `dia`"""
+    return timezone.make_aware(datetime.combine(dia, datetime.min.time()))
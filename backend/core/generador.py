@@ -0,0 +1,359 @@
+import io
+import random
+import secrets
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+
+import numpy as np
+from django.db import connection, transaction
+from django.db.models import OuterRef, Subquery
+from django.utils import timezone
+
+from . import espacial, resumenes
+from .models import (
+    Camion, Cliente, Conductor, Factura, GastoCamion, Pedido, SueldoEmpleado, Ubicacion, UltimaUbicacion,
+)
+from .signals import MODELOS_VERSIONADOS
+from .versiones import incrementar_version
+
+# Cantidades de cada perfil (`generar_datos --perfil`); "grande" es la escala de producción esperada
+PERFILES = {
+    "chico": {"camiones": 50, "conductores": 100, "clientes": 200, "pedidos": 10_000, "ubicaciones": 500_000},
+    "mediano": {"camiones": 500, "conductores": 1_000, "clientes": 2_000, "pedidos": 100_000, "ubicaciones": 10_000_000},
+    "grande": {"camiones": 5_000, "conductores": 10_000, "clientes": 20_000, "pedidos": 1_000_000, "ubicaciones": 100_000_000},
+}
+
+NOMBRES = ["Juan", "María", "Carlos", "Ana", "Luis", "Laura", "Jorge", "Sofía", "Diego", "Lucía", "Pablo", "Valeria"]
+APELLIDOS = ["González", "Rodríguez", "Gómez", "Fernández", "López", "Díaz", "Martínez", "Pérez", "Romero", "Sosa"]
+MARCAS = [("Scania", "R450"), ("Volvo", "FH16"), ("Mercedes-Benz", "Actros"), ("Iveco", "Stralis"), ("Ford", "Cargo 1723")]
+CIUDADES = [
+    # (nombre, latitud, longitud): bases de los camiones y origen/destino de los viajes
+    ("Buenos Aires", -34.60, -58.38), ("Córdoba", -31.42, -64.18), ("Rosario", -32.95, -60.65),
+    ("Mendoza", -32.89, -68.83), ("Tucumán", -26.81, -65.22), ("Mar del Plata", -38.00, -57.56),
+    ("Salta", -24.78, -65.41), ("Neuquén", -38.95, -68.06), ("Bahía Blanca", -38.72, -62.27),
+    ("Santa Fe", -31.63, -60.70),
+]
+SERVICIOS = ["Flete completo", "Carga parcial", "Distribución urbana", "Refrigerado", "Carga peligrosa"]
+# (tipo, peso relativo, monto mínimo, monto máximo)
+GASTOS = [
+    ("combustible", 60, 150, 1200), ("reparacion", 10, 300, 8000), ("filtros", 10, 50, 400),
+    ("seguro", 5, 500, 2500), ("otros", 15, 20, 600),
+]
+METODOS_PAGO = [codigo for codigo, _ in SueldoEmpleado.METODO_PAGO]
+
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def _monto(rng, minimo, maximo):
+    return Decimal(rng.randint(minimo * 100, maximo * 100)) / 100
+
+
+@contextmanager
+def _fecha_manual(modelo, campo):
+    """Desactiva `auto_now_add` de `campo` para poder repartir las altas en el historial"""
+    field = modelo._meta.get_field(campo)
+    field.auto_now_add = False
+    try:
+        yield
+    finally:
+        field.auto_now_add = True
+
+
+class Generador:
+    """
+    Crea una flota sintética con historial: conductores, camiones, clientes, pedidos con
+    su factura, gastos, sueldos y recorridos GPS, repartidos en los últimos `dias` días.
+
+    Todo se inserta de a `lote` filas con `bulk_create`, cada lote en su transacción; las
+    ubicaciones, que son la tabla más grande por lejos, se cargan con `COPY` en PostgreSQL.
+    Las inserciones masivas no envían señales, así que al final se reconstruyen los
+    resúmenes mensuales, la última ubicación de cada camión y las versiones de los
+    modelos. El feed de cambios (`Cambio`) no registra estas altas.
+
+    Con la misma `semilla` se generan los mismos datos (salvo el sufijo de las placas,
+    licencias y emails, que evita choques al generar varias veces sobre la misma base).
+    """
+
+    def __init__(self, dias=365, lote=10_000, semilla=None, informar=None):
+        self.dias = dias
+        self.lote = lote
+        self.rng = random.Random(semilla)
+        self.np_rng = np.random.default_rng(semilla)
+        self.sufijo = secrets.token_hex(3)
+        self.fin = timezone.now()
+        self.inicio = self.fin - timedelta(days=dias)
+        self.informar = informar or (lambda mensaje: None)
+        self.conductor_ids = []
+        self.camion_ids = []
+        self.cliente_ids = []
+        self.conductor_de = {}  # camion_id -> conductor_id
+
+    def generar(self, camiones, conductores, clientes, pedidos, facturas, gastos, ubicaciones):
+        """Genera todo en orden de dependencias; devuelve `{modelo: filas creadas}`"""
+        creadas = {}
+        creadas["Conductor"] = self._medir("Conductor", lambda: self.conductores(conductores))
+        creadas["Camion"] = self._medir("Camion", lambda: self.camiones(camiones))
+        creadas["Cliente"] = self._medir("Cliente", lambda: self.clientes(clientes))
+        creadas["Pedido"], creadas["Factura"] = self._medir("Pedido/Factura", lambda: self.pedidos(pedidos, facturas))
+        creadas["GastoCamion"] = self._medir("GastoCamion", lambda: self.gastos(gastos))
+        creadas["SueldoEmpleado"] = self._medir("SueldoEmpleado", self.sueldos)
+        creadas["Ubicacion"] = self._medir("Ubicacion", lambda: self.ubicaciones(ubicaciones))
+        self._medir("Resúmenes y versiones", self.finalizar)
+        return creadas
+
+    def _medir(self, nombre, funcion):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        self.informar(f"{nombre}: {resultado} en {time.perf_counter() - inicio:.1f} s")
+        return resultado
+
+    def _en_lotes(self, modelo, objetos):
+        """Inserta `objetos` (un iterable perezoso) de a `lote`; devuelve las instancias de cada lote"""
+        pendientes = []
+        for objeto in objetos:
+            pendientes.append(objeto)
+            if len(pendientes) == self.lote:
+                yield self._insertar(modelo, pendientes)
+                pendientes = []
+        if pendientes:
+            yield self._insertar(modelo, pendientes)
+
+    def _insertar(self, modelo, objetos):
+        with transaction.atomic():
+            return modelo.objects.bulk_create(objetos)
+
+    def _momento(self, fraccion):
+        """Momento del período para `fraccion` entre 0 (inicio) y 1 (ahora)"""
+        return self.inicio + (self.fin - self.inicio) * fraccion
+
+    def conductores(self, cantidad):
+        rng = self.rng
+        objetos = (
+            Conductor(
+                nombre=rng.choice(NOMBRES), apellido=rng.choice(APELLIDOS), licencia=f"LIC-{self.sufijo}-{i}",
+                telefono=f"+54 9 11 {rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+                email=f"conductor{i}.{self.sufijo}@example.com",
+            )
+            for i in range(cantidad)
+        )
+        for creados in self._en_lotes(Conductor, objetos):
+            self.conductor_ids += [conductor.pk for conductor in creados]
+        return len(self.conductor_ids)
+
+    def camiones(self, cantidad):
+        rng = self.rng
+
+        def objetos():
+            for i in range(cantidad):
+                marca, modelo = rng.choice(MARCAS)
+                # Casi todos con conductor asignado, cada conductor con a lo sumo un camión
+                conductor_id = self.conductor_ids[i] if i < len(self.conductor_ids) and rng.random() < 0.95 else None
+                yield Camion(
+                    marca=marca, modelo=modelo, placa=f"{self.sufijo}-{i:07d}", capacidad=rng.choice([10, 20, 28, 30, 45]),
+                    año=rng.randint(2005, 2025), conductor_id=conductor_id,
+                )
+
+        for creados in self._en_lotes(Camion, objetos()):
+            for camion in creados:
+                self.camion_ids.append(camion.pk)
+                self.conductor_de[camion.pk] = camion.conductor_id
+        return len(self.camion_ids)
+
+    def clientes(self, cantidad):
+        rng = self.rng
+        objetos = (
+            Cliente(
+                nombre=f"{rng.choice(NOMBRES)} {rng.choice(APELLIDOS)}", empresa=f"Empresa {i}",
+                email=f"cliente{i}.{self.sufijo}@example.com", direccion=f"{rng.choice(CIUDADES)[0]}, calle {i}",
+            )
+            for i in range(cantidad)
+        )
+        for creados in self._en_lotes(Cliente, objetos):
+            self.cliente_ids += [cliente.pk for cliente in creados]
+        return len(self.cliente_ids)
+
+    def pedidos(self, cantidad, facturas):
+        """
+        Pedidos en orden cronológico (los ids crecen con la fecha, como en producción).
+
+        Los de más de una semana están casi todos completados; cada pedido completado
+        tiene su factura hasta llegar a `facturas`.
+        """
+        rng = self.rng
+        hace_una_semana = self.fin - timedelta(days=7)
+        hoy = timezone.localdate(self.fin)
+
+        def objetos():
+            for i in range(cantidad):
+                creacion = self._momento((i + rng.random()) / cantidad)
+                camion_id = rng.choice(self.camion_ids)
+                if creacion < hace_una_semana:
+                    estado = "completado" if rng.random() < 0.95 else "cancelado"
+                else:
+                    estado = rng.choice(["pendiente", "en_proceso", "completado"])
+                entrega = min(timezone.localdate(creacion) + timedelta(days=rng.randint(0, 5)), hoy)
+                yield Pedido(
+                    cliente_id=rng.choice(self.cliente_ids), camion_id=camion_id, conductor_id=self.conductor_de[camion_id],
+                    descripcion=f"Carga de {rng.randint(1, 30)} t", estado=estado, fecha_creacion=creacion,
+                    fecha_entrega=entrega if estado == "completado" else None,
+                )
+
+        creados = facturados = 0
+        with _fecha_manual(Pedido, "fecha_creacion"):
+            for lote in self._en_lotes(Pedido, objetos()):
+                creados += len(lote)
+                completados = [pedido for pedido in lote if pedido.estado == "completado"][:facturas - facturados]
+                if completados:
+                    self._insertar(Factura, [self._factura(pedido) for pedido in completados])
+                    facturados += len(completados)
+        return creados, facturados
+
+    def _factura(self, pedido):
+        rng = self.rng
+        origen, destino = rng.sample(CIUDADES, 2)
+        return Factura(
+            cliente_id=pedido.cliente_id, pedido_id=pedido.pk, fecha=pedido.fecha_entrega, servicio=rng.choice(SERVICIOS),
+            origen=origen[0], destino=destino[0], horas_espera=round(rng.uniform(0, 6), 1),
+            precio_hora=_monto(rng, 20, 60), peajes=_monto(rng, 0, 200), importe_lista=_monto(rng, 300, 5000),
+        )
+
+    def gastos(self, cantidad):
+        rng = self.rng
+        tipos = [tipo for tipo, *_ in GASTOS]
+        pesos = [peso for _, peso, *_ in GASTOS]
+        rangos = {tipo: (minimo, maximo) for tipo, _, minimo, maximo in GASTOS}
+
+        def objetos():
+            for i in range(cantidad):
+                tipo = rng.choices(tipos, pesos)[0]
+                yield GastoCamion(
+                    camion_id=rng.choice(self.camion_ids), tipo_gasto=tipo, monto=_monto(rng, *rangos[tipo]),
+                    fecha=timezone.localdate(self._momento((i + rng.random()) / cantidad)),
+                )
+
+        return sum(len(lote) for lote in self._en_lotes(GastoCamion, objetos()))
+
+    def sueldos(self):
+        """Un sueldo por conductor y mes del período, pagado el día 5 del mes siguiente"""
+        rng = self.rng
+        meses = []
+        mes = timezone.localdate(self.inicio).replace(day=1)
+        while mes <= timezone.localdate(self.fin):
+            meses.append(mes)
+            mes = (mes + timedelta(days=32)).replace(day=1)
+
+        def objetos():
+            for mes in meses:
+                pago = (mes + timedelta(days=32)).replace(day=5)
+                for conductor_id in self.conductor_ids:
+                    sueldo = SueldoEmpleado(
+                        empleado_id=conductor_id, periodo_sueldo=f"{mes:%Y-%m}", salario_base=_monto(rng, 1500, 4000),
+                        bonos=_monto(rng, 0, 500), deducciones=_monto(rng, 0, 300), horas_extras=_monto(rng, 0, 400),
+                        adelanto=Decimal("0.00") if rng.random() < 0.8 else _monto(rng, 100, 500),
+                        fecha_pago=pago, metodo_pago=rng.choice(METODOS_PAGO),
+                    )
+                    sueldo.calcular_campos_derivados()  # bulk_create no pasa por save()
+                    yield sueldo
+
+        return sum(len(lote) for lote in self._en_lotes(SueldoEmpleado, objetos()))
+
+    def _recorrido(self, cantidad):
+        """
+        Recorrido suave alrededor de una ciudad base: suma de senoides con fases al azar
+        (±2 grados, unos 200 km) más el ruido del GPS, con un punto cada `periodo / cantidad`.
+        """
+        rng = self.np_rng
+        _, latitud, longitud = CIUDADES[rng.integers(len(CIUDADES))]
+        t = np.linspace(0, 1, cantidad, endpoint=False) + rng.random(cantidad) / cantidad
+        latitudes = np.full(cantidad, latitud)
+        longitudes = np.full(cantidad, longitud)
+        for frecuencia in (self.dias / 7, self.dias / 2, self.dias * 2):
+            fase = rng.random(2) * 2 * np.pi
+            latitudes = latitudes + 0.7 * np.sin(2 * np.pi * frecuencia * t + fase[0])
+            longitudes = longitudes + 0.7 * np.cos(2 * np.pi * frecuencia * t + fase[1])
+        latitudes += rng.normal(0, 0.0001, cantidad)
+        longitudes += rng.normal(0, 0.0001, cantidad)
+        inicio = int(self.inicio.timestamp() * 1_000_000)
+        microsegundos = inicio + (t * (self.fin - self.inicio) / timedelta(microseconds=1)).astype(np.int64)
+        return latitudes, longitudes, microsegundos
+
+    def ubicaciones(self, cantidad):
+        """Reparte `cantidad` puntos entre los camiones y mantiene `UltimaUbicacion`"""
+        por_camion, resto = divmod(cantidad, len(self.camion_ids))
+        ultimas = {}
+        pendientes = []
+        pendientes_filas = insertadas = proximo_informe = 0
+        for orden, camion_id in enumerate(self.camion_ids):
+            puntos = por_camion + (1 if orden < resto else 0)
+            if puntos == 0:
+                continue
+            latitudes, longitudes, microsegundos = self._recorrido(puntos)
+            ultimas[camion_id] = (latitudes[-1], longitudes[-1], int(microsegundos[-1]))
+            pendientes.append((camion_id, latitudes, longitudes, microsegundos))
+            pendientes_filas += puntos
+            if pendientes_filas >= self.lote:
+                insertadas += self._insertar_ubicaciones(pendientes)
+                pendientes, pendientes_filas = [], 0
+                if insertadas >= proximo_informe:
+                    self.informar(f"  Ubicacion: {insertadas:,}/{cantidad:,}")
+                    proximo_informe += max(cantidad // 10, 1)
+        if pendientes:
+            insertadas += self._insertar_ubicaciones(pendientes)
+        self._ultimas_ubicaciones(ultimas)
+        return insertadas
+
+    def _insertar_ubicaciones(self, recorridos):
+        if connection.vendor == "postgresql":
+            return self._copiar_ubicaciones(recorridos)
+        objetos = [
+            Ubicacion(camion_id=camion_id, latitud=latitud, longitud=longitud, timestamp=_momento_utc(microsegundo))
+            for camion_id, latitudes, longitudes, microsegundos in recorridos
+            for latitud, longitud, microsegundo in zip(latitudes.tolist(), longitudes.tolist(), microsegundos.tolist())
+        ]
+        with transaction.atomic():
+            Ubicacion.objects.bulk_create(objetos, batch_size=5000)
+        return len(objetos)
+
+    def _copiar_ubicaciones(self, recorridos):
+        # COPY es varias veces más rápido que INSERT para decenas de millones de filas
+        buffer = io.StringIO()
+        filas = 0
+        for camion_id, latitudes, longitudes, microsegundos in recorridos:
+            momentos = np.datetime_as_string(microsegundos.astype("datetime64[us]"), unit="us")
+            buffer.writelines(
+                f"{camion_id}\t{latitud:.7f}\t{longitud:.7f}\t{momento}+00\n"
+                for latitud, longitud, momento in zip(latitudes.tolist(), longitudes.tolist(), momentos.tolist())
+            )
+            filas += len(latitudes)
+        buffer.seek(0)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {Ubicacion._meta.db_table} (camion_id, latitud, longitud, timestamp) FROM STDIN", buffer
+            )
+        return filas
+
+    def _ultimas_ubicaciones(self, ultimas):
+        recientes = Ubicacion.objects.filter(camion_id=OuterRef("pk")).order_by("-timestamp", "-id").values("id")[:1]
+        ids = dict(Camion.objects.filter(pk__in=ultimas).annotate(ultima=Subquery(recientes)).values_list("pk", "ultima"))
+        objetos = [
+            UltimaUbicacion(
+                camion_id=camion_id, ubicacion_id=ids[camion_id], latitud=latitud, longitud=longitud,
+                timestamp=_momento_utc(microsegundo), celda=espacial.celda(latitud, longitud),
+            )
+            for camion_id, (latitud, longitud, microsegundo) in ultimas.items()
+        ]
+        with transaction.atomic():
+            UltimaUbicacion.objects.bulk_create(objetos, batch_size=5000)
+
+    def finalizar(self):
+        """Lo que harían las señales: resúmenes mensuales y versiones (invalida cachés y ETag)"""
+        filas = sum(resumenes.reconstruir(modelo) for modelo in resumenes.RESUMENES)
+        for modelo in MODELOS_VERSIONADOS:
+            incrementar_version(modelo)
+        return f"{filas} filas de resumen"
+
+
+def _momento_utc(microsegundos):
+    return _EPOCH + timedelta(microseconds=int(microsegundos))
@@ -0,0 +1,91 @@
+import numpy as np
+
+from . import archivo
+from .models import Ubicacion
+
+# Tamaño en píxeles de un tile del mapa (Leaflet / OpenStreetMap)
+PIXELES_TILE = 256
+
+# Niveles de zoom que ofrecen los mapas de tiles
+ZOOM_MINIMO = 0
+ZOOM_MAXIMO = 22
+
+
+def cargar_puntos(camion_id, desde=None, hasta=None):
+    """
+    Carga el recorrido de un camión como arreglos NumPy ordenados por tiempo.
+
+    Devuelve `(latitudes, longitudes, timestamps)`, con los timestamps en segundos
+    desde epoch. Solo lee las tres columnas necesarias, sin instanciar modelos, y
+    suma los puntos ya archivados (ver `core.archivo`).
+    """
+    puntos = Ubicacion.objects.filter(camion_id=camion_id)
+    if desde:
+        puntos = puntos.filter(timestamp__gte=desde)
+    if hasta:
+        puntos = puntos.filter(timestamp__lt=hasta)
+    filas = list(puntos.order_by("timestamp", "id").values_list("latitud", "longitud", "timestamp"))
+
+    cantidad = len(filas)
+    latitudes = np.fromiter((fila[0] for fila in filas), dtype=np.float64, count=cantidad)
+    longitudes = np.fromiter((fila[1] for fila in filas), dtype=np.float64, count=cantidad)
+    timestamps = np.fromiter((fila[2].timestamp() for fila in filas), dtype=np.float64, count=cantidad)
+    camiones = np.full(cantidad, int(camion_id), dtype=np.int64)
+
+    archivados = archivo.cargar([camion_id], desde, hasta)
+    _, latitudes, longitudes, timestamps = archivo.combinar(archivados, (camiones, latitudes, longitudes, timestamps))
+    return latitudes, longitudes, timestamps
+
+
+def tolerancia_para_zoom(zoom, pixeles=1.0):
+    """Grados que ocupa `pixeles` en pantalla a un nivel de zoom dado (proyección web mercator)"""
+    if not ZOOM_MINIMO <= zoom <= ZOOM_MAXIMO:
+        raise ValueError(f"zoom fuera de rango ({ZOOM_MINIMO} a {ZOOM_MAXIMO}): {zoom}")
+    return pixeles * 360.0 / (PIXELES_TILE * 2 ** zoom)
+
+
+def douglas_peucker(latitudes, longitudes, tolerancia):
+    """
+    Simplifica una polilínea con el algoritmo de Douglas-Peucker.
+
+    Devuelve los índices de los puntos que se conservan. Cada tramo se evalúa con
+    una sola operación vectorizada sobre todos sus puntos intermedios; la pila
+    reemplaza la recursión para soportar recorridos de cientos de miles de puntos.
+    La longitud se escala por el coseno de la latitud media para medir distancias
+    en grados comparables en ambos ejes.
+    """
+    cantidad = len(latitudes)
+    if cantidad < 3 or tolerancia <= 0:
+        return np.arange(cantidad)
+
+    escala = np.cos(np.radians(np.mean(latitudes)))
+    x = longitudes * escala
+    y = latitudes
+
+    conservar = np.zeros(cantidad, dtype=bool)
+    conservar[0] = conservar[-1] = True
+    pila = [(0, cantidad - 1)]
+
+    while pila:
+        inicio, fin = pila.pop()
+        if fin - inicio < 2:
+            continue
+
+        dx = x[fin] - x[inicio]
+        dy = y[fin] - y[inicio]
+        px = x[inicio + 1:fin] - x[inicio]
+        py = y[inicio + 1:fin] - y[inicio]
+        largo = np.hypot(dx, dy)
+        if largo == 0:
+            distancias = np.hypot(px, py)
+        else:
+            distancias = np.abs(dx * py - dy * px) / largo
+
+        mayor = int(np.argmax(distancias))
+        if distancias[mayor] > tolerancia:
+            indice = inicio + 1 + mayor
+            conservar[indice] = True
+            pila.append((inicio, indice))
+            pila.append((indice, fin))
+
+    return np.flatnonzero(conservar)
@@ -0,0 +1,136 @@
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from . import difusion, espacial
+from .models import Camion, Ubicacion, UltimaUbicacion
+from .serializers import UbicacionLoteSerializer
+
+# Tamaño de cada INSERT múltiple al guardar un lote de ubicaciones
+TAMANO_INSERT = 1000
+
+
+def maximo_por_lote():
+    """Cantidad máxima de puntos aceptados en una sola petición de lote"""
+    return getattr(settings, "UBICACIONES_LOTE_MAXIMO", 10000)
+
+
+def ingestar_ubicaciones(puntos):
+    """
+    Valida y guarda un lote de puntos GPS.
+
+    Los ids de camión se validan con una sola consulta por conjunto y los puntos
+    válidos se insertan con `bulk_create`. Devuelve `(creadas, errores)`, donde
+    `errores` es una lista de `{"indice": i, "errores": {...}}` por cada punto rechazado.
+    """
+    validador = UbicacionLoteSerializer()
+    ahora = timezone.now()
+    validos = []
+    errores = []
+
+    for indice, punto in enumerate(puntos):
+        try:
+            datos = validador.run_validation(punto)
+        except serializers.ValidationError as exc:
+            errores.append({"indice": indice, "errores": exc.detail})
+            continue
+        validos.append((indice, datos))
+
+    ids = {datos["camion_id"] for _, datos in validos}
+    existentes = set(Camion.objects.filter(pk__in=ids).values_list("pk", flat=True)) if ids else set()
+
+    ubicaciones = []
+    for indice, datos in validos:
+        if datos["camion_id"] not in existentes:
+            errores.append({
+                "indice": indice,
+                "errores": {"camion_id": [f"El camión {datos['camion_id']} no existe."]},
+            })
+            continue
+        ubicaciones.append(Ubicacion(
+            camion_id=datos["camion_id"],
+            latitud=datos["latitud"],
+            longitud=datos["longitud"],
+            timestamp=datos.get("timestamp") or ahora,
+        ))
+
+    with transaction.atomic():
+        creadas = Ubicacion.objects.bulk_create(ubicaciones, batch_size=TAMANO_INSERT)
+        actualizar_ultimas_ubicaciones(creadas)
+
+    errores.sort(key=lambda error: error["indice"])
+    return creadas, errores
+
+
+def _es_mas_reciente(ubicacion, ultima):
+    return (ubicacion.timestamp, ubicacion.pk or 0) > (ultima.timestamp, ultima.ubicacion_id or 0)
+
+
+def actualizar_ultimas_ubicaciones(ubicaciones):
+    """
+    Mantiene la tabla `UltimaUbicacion` a partir de ubicaciones recién guardadas.
+
+    Usa un número fijo de consultas por lote, sin importar cuántos camiones incluya:
+    inserta las filas que faltan ignorando conflictos y luego bloquea y actualiza
+    solo las que quedaron con un punto más antiguo que el recibido. Al confirmarse la
+    transacción, el punto más reciente de cada camión se difunde a los mapas conectados.
+
+    Las filas se insertan y bloquean siempre en orden de `camion_id`: dos lotes
+    concurrentes con camiones en común esperan uno al otro en lugar de bloquearse mutuamente.
+    """
+    recientes = {}
+    for ubicacion in ubicaciones:
+        actual = recientes.get(ubicacion.camion_id)
+        if actual is None or (ubicacion.timestamp, ubicacion.pk or 0) > (actual.timestamp, actual.pk or 0):
+            recientes[ubicacion.camion_id] = ubicacion
+    if not recientes:
+        return
+
+    transaction.on_commit(lambda: difusion.publicar_ubicaciones(recientes.values()))
+    with transaction.atomic():
+        UltimaUbicacion.objects.bulk_create([
+            UltimaUbicacion(
+                camion_id=camion_id, ubicacion_id=ubicacion.pk, latitud=ubicacion.latitud,
+                longitud=ubicacion.longitud, timestamp=ubicacion.timestamp,
+                celda=espacial.celda(ubicacion.latitud, ubicacion.longitud),
+            )
+            for camion_id, ubicacion in sorted(recientes.items())
+        ], ignore_conflicts=True)
+
+        cambios = []
+        for ultima in UltimaUbicacion.objects.select_for_update().filter(camion_id__in=recientes).order_by("camion_id"):
+            ubicacion = recientes[ultima.camion_id]
+            if _es_mas_reciente(ubicacion, ultima):
+                ultima.ubicacion_id = ubicacion.pk
+                ultima.latitud = ubicacion.latitud
+                ultima.longitud = ubicacion.longitud
+                ultima.timestamp = ubicacion.timestamp
+                ultima.celda = espacial.celda(ubicacion.latitud, ubicacion.longitud)
+                cambios.append(ultima)
+        if cambios:
+            UltimaUbicacion.objects.bulk_update(cambios, ["ubicacion", "latitud", "longitud", "timestamp", "celda"])
+
+
+def recalcular_ultima_ubicacion(camion_id):
+    """
+    Recalcula la última ubicación de un camión desde el historial (tras editar o borrar puntos).
+
+    Bloquea primero la fila de `UltimaUbicacion`, como la ingesta, así un lote concurrente
+    no la pisa con un punto que ya no es el último. Al confirmarse la transacción, la
+    posición resultante se difunde a los mapas conectados.
+    """
+    with transaction.atomic():
+        UltimaUbicacion.objects.select_for_update().filter(camion_id=camion_id).first()
+        ubicacion = Ubicacion.objects.filter(camion_id=camion_id).order_by("-timestamp", "-id").first()
+        if ubicacion is None:
+            UltimaUbicacion.objects.filter(camion_id=camion_id).delete()
+            return
+        UltimaUbicacion.objects.update_or_create(camion_id=camion_id, defaults={
+            "ubicacion_id": ubicacion.pk,
+            "latitud": ubicacion.latitud,
+            "longitud": ubicacion.longitud,
+            "timestamp": ubicacion.timestamp,
+            "celda": espacial.celda(ubicacion.latitud, ubicacion.longitud),
+        })
+        transaction.on_commit(lambda: difusion.publicar_ubicaciones([ubicacion]))
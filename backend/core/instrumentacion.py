@@ -0,0 +1,211 @@
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+from django.http import HttpResponse
+from django.utils.crypto import constant_time_compare
+
+logger = logging.getLogger(__name__)
+
+# Límites (le) de cada histograma
+SEGUNDOS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONSULTAS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+BYTES = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+
+class Medicion:
+    """Lo que se va midiendo durante una petición (mutable: lo comparten los hilos de `sync_to_async`)"""
+
+    def __init__(self):
+        self.inicio = time.perf_counter()
+        self.consultas = 0
+        self.segundos_db = 0.0
+        self.segundos = {}  # Etapas medidas con `medir` (p. ej. "serializacion")
+
+
+_actual = ContextVar("medicion", default=None)
+
+
+@contextmanager
+def medir(etapa):
+    """Suma a la etapa `etapa` de la petición medida el tiempo del bloque (sin costo si no se mide)"""
+    medicion = _actual.get()
+    if medicion is None:
+        yield
+        return
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        medicion.segundos[etapa] = medicion.segundos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+def _medir_consulta(execute, sql, params, many, context):
+    medicion = _actual.get()
+    if medicion is None:
+        return execute(sql, params, many, context)
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        medicion.consultas += 1
+        medicion.segundos_db += time.perf_counter() - inicio
+
+
+@receiver(connection_created)
+def instalar_medicion_sql(sender, connection, **kwargs):
+    # Una vez por conexión (persistente); fuera de una petición medida solo cuesta leer la ContextVar
+    if _medir_consulta not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_medir_consulta)
+
+
+class Histograma:
+    def __init__(self, nombre, ayuda, limites):
+        self.nombre = nombre
+        self.ayuda = ayuda
+        self.limites = limites
+        self.series = {}  # etiquetas -> [conteo por límite..., +Inf, suma]
+
+    def observar(self, etiquetas, valor):
+        serie = self.series.get(etiquetas)
+        if serie is None:
+            serie = self.series[etiquetas] = [0] * (len(self.limites) + 1) + [0.0]
+        for i, limite in enumerate(self.limites):
+            if valor <= limite:
+                serie[i] += 1
+                break
+        else:
+            serie[len(self.limites)] += 1
+        serie[-1] += valor
+
+    def exponer(self):
+        lineas = [f"# HELP {self.nombre} {self.ayuda}", f"# TYPE {self.nombre} histogram"]
+        for etiquetas, serie in sorted(self.series.items()):
+            base = ",".join(f'{clave}="{valor}"' for clave, valor in etiquetas)
+            acumulado = 0
+            for limite, cantidad in zip((*self.limites, "+Inf"), serie[:-1]):
+                acumulado += cantidad
+                lineas.append(f'{self.nombre}_bucket{{{base},le="{limite}"}} {acumulado}')
+            lineas.append(f"{self.nombre}_sum{{{base}}} {serie[-1]}")
+            lineas.append(f"{self.nombre}_count{{{base}}} {acumulado}")
+        return lineas
+
+
+class Registro:
+    """
+    Histogramas por endpoint, en memoria del proceso.
+
+    Con varios workers cada uno expone sus propios números (Prometheus los suma por
+    instancia); `observar` toma un lock muy corto, así que no compite bajo carga.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.duracion = Histograma("http_peticion_segundos", "Duración total de la petición", SEGUNDOS)
+        self.db = Histograma("http_peticion_db_segundos", "Tiempo en consultas SQL", SEGUNDOS)
+        self.consultas = Histograma("http_peticion_db_consultas", "Consultas SQL por petición", CONSULTAS)
+        self.serializacion = Histograma("http_peticion_serializacion_segundos", "Tiempo de serialización y render", SEGUNDOS)
+        self.tamano = Histograma("http_respuesta_bytes", "Tamaño del cuerpo de la respuesta", BYTES)
+
+    def observar(self, endpoint, metodo, estado, medicion, duracion, tamano):
+        etiquetas = (("endpoint", endpoint), ("metodo", metodo), ("estado", f"{estado // 100}xx"))
+        with self._lock:
+            self.duracion.observar(etiquetas, duracion)
+            self.db.observar(etiquetas, medicion.segundos_db)
+            self.consultas.observar(etiquetas, medicion.consultas)
+            self.serializacion.observar(etiquetas, medicion.segundos.get("serializacion", 0.0))
+            if tamano is not None:
+                self.tamano.observar(etiquetas, tamano)
+
+    def exponer(self):
+        with self._lock:
+            lineas = []
+            for histograma in (self.duracion, self.db, self.consultas, self.serializacion, self.tamano):
+                lineas += histograma.exponer()
+        return "\n".join(lineas) + "\n"
+
+
+registro = Registro()
+
+
+def _endpoint(request):
+    # Nombre de la ruta (p. ej. "camion-list"), no la URL: así `/camiones/1/` y `/camiones/2/` son la misma serie
+    resolucion = getattr(request, "resolver_match", None)
+    return resolucion.view_name if resolucion is not None else "sin_ruta"
+
+
+def _server_timing(medicion, duracion):
+    partes = [f'db;dur={medicion.segundos_db * 1000:.1f};desc="{medicion.consultas} consultas"']
+    partes += [f"{etapa};dur={segundos * 1000:.1f}" for etapa, segundos in medicion.segundos.items()]
+    partes.append(f"total;dur={duracion * 1000:.1f}")
+    return ", ".join(partes)
+
+
+class InstrumentacionMiddleware:
+    """
+    Mide consultas SQL, tiempo de base de datos, serialización y tamaño de cada petición.
+
+    Se mide una fracción `INSTRUMENTACION_MUESTREO` de las peticiones (1 = todas,
+    0 = ninguna); las no muestreadas no pagan nada más que un `random()`. Las medidas
+    van al encabezado `Server-Timing` (visible en las herramientas del navegador) y a
+    los histogramas de `/metrics`. Las que superan `INSTRUMENTACION_LENTA_SEGUNDOS`
+    se registran además en el log `core.instrumentacion`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        muestreo = getattr(settings, "INSTRUMENTACION_MUESTREO", 1.0)
+        if muestreo <= 0 or (muestreo < 1 and random.random() >= muestreo):
+            return self.get_response(request)
+
+        medicion = Medicion()
+        token = _actual.set(medicion)
+        try:
+            respuesta = self.get_response(request)
+            # El render de las respuestas de DRF ocurre dentro de get_response (ver core.renderers)
+        finally:
+            _actual.reset(token)
+        duracion = time.perf_counter() - medicion.inicio
+
+        tamano = None if respuesta.streaming else len(respuesta.content)
+        endpoint = _endpoint(request)
+        registro.observar(endpoint, request.method, respuesta.status_code, medicion, duracion, tamano)
+        respuesta["Server-Timing"] = _server_timing(medicion, duracion)
+
+        if duracion >= getattr(settings, "INSTRUMENTACION_LENTA_SEGUNDOS", 1.0):
+            logger.warning(
+                "Petición lenta %s %s (%s): %.0f ms, %d consultas en %.0f ms, serialización %.0f ms, %s bytes",
+                request.method, request.get_full_path(), endpoint, duracion * 1000, medicion.consultas,
+                medicion.segundos_db * 1000, medicion.segundos.get("serializacion", 0.0) * 1000, tamano,
+            )
+        return respuesta
+
+
+def metricas(request):
+    """
+    Histogramas en formato de texto de Prometheus.
+
+    Cerrado por defecto (las rutas y los volúmenes de tráfico no son públicos): se sirve
+    con `INSTRUMENTACION_TOKEN` como Bearer, a un usuario staff con sesión iniciada, o a
+    cualquiera con DEBUG o `INSTRUMENTACION_METRICAS_PUBLICAS` (p. ej. si el puerto solo
+    es accesible desde la red interna).
+    """
+    token = getattr(settings, "INSTRUMENTACION_TOKEN", "")
+    usuario = getattr(request, "user", None)
+    permitido = (
+        (token and constant_time_compare(request.headers.get("Authorization", ""), f"Bearer {token}"))
+        or (usuario is not None and usuario.is_staff)
+        or settings.DEBUG
+        or getattr(settings, "INSTRUMENTACION_METRICAS_PUBLICAS", False)
+    )
+    if not permitido:
+        return HttpResponse(status=403 if usuario is not None and usuario.is_authenticated else 401)
+    return HttpResponse(registro.exponer(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,172 @@
+import decimal
+from datetime import timezone as dt_timezone
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist
+from django.utils import timezone
+from django.utils.encoding import is_protected_type
+from rest_framework import ISO_8601, serializers
+from rest_framework.settings import api_settings
+
+# Campos cuyo valor crudo de la base ya es su representación JSON
+_SIN_CONVERSION = (
+    serializers.CharField, serializers.ChoiceField, serializers.IntegerField,
+    serializers.FloatField, serializers.BooleanField,
+)
+
+# Campos que no se pueden leer de una columna (calculados en Python o relaciones múltiples)
+_NO_SOPORTADOS = (
+    serializers.SerializerMethodField, serializers.ManyRelatedField, serializers.HiddenField,
+    serializers.ListSerializer, serializers.ReadOnlyField,
+)
+
+
+def _valor_model_field(valor, zona):
+    # Igual que `ModelField.to_representation`: los tipos "protegidos" pasan tal cual
+    return valor if is_protected_type(valor) else str(valor)
+
+
+def _conversion_generica(campo):
+    return lambda valor, zona: campo.to_representation(valor)
+
+
+def _conversion_fecha_hora(campo):
+    """`DateTimeField.to_representation` en ISO 8601, con la zona horaria resuelta una vez por listado"""
+    formato = getattr(campo, "format", api_settings.DATETIME_FORMAT)
+    if formato is None or formato.lower() != ISO_8601 or hasattr(campo, "timezone"):
+        return _conversion_generica(campo)
+
+    def convertir(valor, zona):
+        if zona is not None:
+            valor = valor.astimezone(zona) if timezone.is_aware(valor) else timezone.make_aware(valor, zona)
+        elif timezone.is_aware(valor):
+            valor = timezone.make_naive(valor, dt_timezone.utc)
+        texto = valor.isoformat()
+        return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+    return convertir
+
+
+def _conversion_fecha(campo):
+    formato = getattr(campo, "format", api_settings.DATE_FORMAT)
+    if formato is None or formato.lower() != ISO_8601:
+        return _conversion_generica(campo)
+    return lambda valor, zona: valor.isoformat()
+
+
+def _conversion_decimal(campo):
+    """`DecimalField.to_representation` con el redondeo precalculado"""
+    coerce = getattr(campo, "coerce_to_string", api_settings.COERCE_DECIMAL_TO_STRING)
+    if not coerce or campo.localize or campo.normalize_output or campo.decimal_places is None:
+        return _conversion_generica(campo)
+    exponente = decimal.Decimal(".1") ** campo.decimal_places
+    contexto = decimal.getcontext().copy()
+    if campo.max_digits is not None:
+        contexto.prec = campo.max_digits
+
+    def convertir(valor, zona):
+        if not isinstance(valor, decimal.Decimal):
+            return campo.to_representation(valor)
+        return f"{valor.quantize(exponente, rounding=campo.rounding, context=contexto):f}"
+    return convertir
+
+
+def _conversion(campo):
+    if isinstance(campo, _SIN_CONVERSION):
+        return None
+    if isinstance(campo, serializers.ModelField):
+        return _valor_model_field
+    if isinstance(campo, serializers.DateTimeField):
+        return _conversion_fecha_hora(campo)
+    if isinstance(campo, serializers.DateField):
+        return _conversion_fecha(campo)
+    if isinstance(campo, serializers.DecimalField):
+        return _conversion_decimal(campo)
+    return _conversion_generica(campo)
+
+
+class ExtractorFilas:
+    """
+    Convierte filas de `values()` en la misma salida que el serializador, sin instanciar modelos.
+
+    Se compila una vez por serializador y combinación de `fields`/`expand` (ver
+    `extractor_para`): cada campo queda como `(nombre, columna, conversión)` y las
+    relaciones expandidas como extractores anidados que leen columnas `relacion__campo`.
+    """
+
+    def __init__(self, campos, anidados, columna_nula=None):
+        self.campos = campos
+        self.anidados = anidados
+        self.columna_nula = columna_nula
+        self.columnas = [columna for _, columna, _ in campos]
+        for _, extractor in anidados:
+            self.columnas += [extractor.columna_nula, *extractor.columnas]
+
+    def convertir(self, fila, zona):
+        if self.columna_nula is not None and fila[self.columna_nula] is None:
+            return None  # Relación vacía (FK nula)
+        salida = {}
+        for nombre, columna, conversion in self.campos:
+            valor = fila[columna]
+            salida[nombre] = valor if conversion is None or valor is None else conversion(valor, zona)
+        for nombre, extractor in self.anidados:
+            salida[nombre] = extractor.convertir(fila, zona)
+        return salida
+
+    def filas(self, filas):
+        # Zona horaria de salida, como `DateTimeField.default_timezone()` pero una vez por listado
+        zona = timezone.get_current_timezone() if settings.USE_TZ else None
+        return [self.convertir(fila, zona) for fila in filas]
+
+
+def _compilar(serializer, prefijo=""):
+    modelo = serializer.Meta.model
+    campos, anidados = [], []
+    for nombre, campo in serializer.fields.items():
+        if campo.write_only:
+            continue
+        if isinstance(campo, _NO_SOPORTADOS) or campo.source == "*" or "." in campo.source:
+            return None
+
+        if isinstance(campo, serializers.ModelSerializer):
+            relacion = modelo._meta.get_field(campo.source)
+            interno = _compilar(campo, f"{prefijo}{campo.source}__")
+            if interno is None:
+                return None
+            interno.columna_nula = f"{prefijo}{campo.source}__{relacion.related_model._meta.pk.name}"
+            anidados.append((nombre, interno))
+            continue
+
+        try:
+            campo_modelo = modelo._meta.get_field(campo.source)
+        except FieldDoesNotExist:
+            return None
+        if isinstance(campo, serializers.PrimaryKeyRelatedField):
+            if campo.pk_field is not None or not (campo_modelo.many_to_one or campo_modelo.one_to_one):
+                return None
+            campos.append((nombre, f"{prefijo}{campo_modelo.attname}", None))
+        elif isinstance(campo, serializers.RelatedField) or campo_modelo.is_relation:
+            return None
+        else:
+            campos.append((nombre, f"{prefijo}{campo_modelo.name}", _conversion(campo)))
+    return ExtractorFilas(campos, anidados)
+
+
+@lru_cache(maxsize=256)
+def _extractor(serializer_class, fields, expand):
+    serializer = serializer_class(
+        fields=list(fields) if fields is not None else None, expand=list(expand)
+    )
+    return _compilar(serializer)
+
+
+def extractor_para(serializer_class, fields=None, expand=()):
+    """
+    Extractor compilado (y cacheado) para un `CamposDinamicosSerializer`, o `None`.
+
+    Devuelve `None` si el serializador tiene campos que no salen directo de una
+    columna (p. ej. `SerializerMethodField`); en ese caso se usa el serializador normal.
+    """
+    if not hasattr(serializer_class, "relaciones_expandidas"):
+        return None
+    return _extractor(serializer_class, tuple(fields) if fields is not None else None, tuple(expand or ()))
@@ -0,0 +1,362 @@
+import copy
+import csv
+import io
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+from rest_framework.validators import UniqueValidator
+
+from .serializers import RelacionPrecargadaField
+from .signals import cambios_en_lote, en_lote, registrar_anulaciones
+
+# Filas que se validan e insertan juntas (una consulta de relaciones y un INSERT múltiple por lote)
+FILAS_POR_LOTE = 1000
+
+# Cantidad máxima de errores por fila que se devuelven en la respuesta
+MAXIMO_ERRORES = 200
+
+
+def _relaciones_precargadas(serializer):
+    """Campos `RelacionPrecargadaField` escribibles del serializador: `{nombre: campo}`"""
+    return {
+        nombre: campo for nombre, campo in serializer.fields.items()
+        if isinstance(campo, RelacionPrecargadaField) and not campo.read_only
+    }
+
+
+def precargar(relaciones, filas, precargados):
+    """
+    Completa `precargados` con los objetos relacionados que usan las filas y aún no están.
+
+    Hace una sola consulta `in_bulk` por modelo relacionado; los ids inválidos se
+    ignoran aquí y los reporta la validación de cada fila.
+    """
+    for nombre, campo in relaciones.items():
+        modelo = campo.queryset.model
+        conocidos = precargados.setdefault(modelo, {})
+        ids = set()
+        for fila in filas:
+            try:
+                ids.add(int(fila[nombre]))
+            except (KeyError, TypeError, ValueError):
+                continue
+        faltantes = ids - conocidos.keys()
+        if faltantes:
+            conocidos.update(campo.queryset.in_bulk(faltantes))
+
+
+def separar_validadores_unicos(validador):
+    """
+    Quita los `UniqueValidator` de los campos de `validador` para validarlos por conjunto.
+
+    Cada `UniqueValidator` hace una consulta por objeto validado; en los lotes se
+    reemplaza por `errores_unicos`, que hace una sola por campo. Devuelve
+    `{campo: (source, mensaje)}` con los campos afectados.
+    """
+    unicos = {}
+    for nombre, campo in validador.fields.items():
+        if campo.read_only:
+            continue
+        restantes = [v for v in campo.validators if not isinstance(v, UniqueValidator)]
+        if len(restantes) != len(campo.validators):
+            mensaje = next(v.message for v in campo.validators if isinstance(v, UniqueValidator))
+            campo.validators = restantes
+            unicos[nombre] = (campo.source, mensaje)
+    return unicos
+
+
+def errores_unicos(modelo, unicos, items, vistos=None):
+    """
+    Valida los campos únicos de un conjunto de objetos con una consulta `__in` por campo.
+
+    `items` son tuplas `(posicion, pk, datos)`: `pk` es el del objeto que se modifica
+    (`None` al crear) y `datos` lo validado. Un valor es inválido si se repite dentro
+    del conjunto (`vistos` permite arrastrar los valores entre conjuntos sucesivos) o si
+    ya lo tiene otro objeto, aunque ese objeto lo cambie en el mismo conjunto: la
+    restricción se verifica fila por fila y el `UPDATE` fallaría según el orden.
+    Devuelve `{posicion: {campo: [mensaje]}}`.
+    """
+    vistos = {} if vistos is None else vistos
+    errores = {}
+    for nombre, (source, mensaje) in unicos.items():
+        con_valor = [(posicion, pk, datos[source]) for posicion, pk, datos in items if datos.get(source) is not None]
+        if not con_valor:
+            continue
+        usados = vistos.setdefault(nombre, set())
+        for posicion, _, valor in con_valor:
+            if valor in usados:
+                errores.setdefault(posicion, {})[nombre] = [f"El valor {valor} está repetido en el lote."]
+            usados.add(valor)
+
+        duenos = dict(modelo.objects.filter(**{f"{source}__in": {valor for _, _, valor in con_valor}}).values_list(source, "pk"))
+        for posicion, pk, valor in con_valor:
+            dueno = duenos.get(valor)
+            if dueno is None or dueno == pk or nombre in errores.get(posicion, {}):
+                continue
+            errores.setdefault(posicion, {})[nombre] = [mensaje]
+    return errores
+
+
+def _nuevo(modelo, datos):
+    objeto = modelo(**datos)
+    if hasattr(objeto, "calcular_campos_derivados"):
+        # bulk_create no llama a save(): los campos calculados se completan aquí
+        objeto.calcular_campos_derivados()
+    return objeto
+
+
+def _limpiar(fila):
+    # Las celdas vacías se omiten para que se apliquen los valores por defecto del modelo
+    return {
+        clave.strip(): valor.strip() for clave, valor in fila.items()
+        if clave and isinstance(valor, str) and valor.strip()
+    }
+
+
+def importar_csv(archivo, serializer_class, separador=","):
+    """
+    Importa un CSV con las reglas de validación de `serializer_class`.
+
+    El archivo se lee como flujo y se procesa de a `FILAS_POR_LOTE` filas: por cada
+    lote se precargan las relaciones, se valida fila por fila sin tocar la base (los
+    campos únicos, con una consulta por campo y lote; ver `errores_unicos`) y las
+    filas válidas se insertan con `bulk_create`. La importación es todo o nada: si
+    alguna fila tiene errores se deshace completa.
+
+    Devuelve `(creadas, errores, cantidad_errores)`: `errores` es una lista de
+    `{"linea": n, "errores": {...}}` con a lo sumo `MAXIMO_ERRORES` elementos.
+    """
+    modelo = serializer_class.Meta.model
+    precargados = {}
+    validador = serializer_class(context={"precargados": precargados})
+    relaciones = _relaciones_precargadas(validador)
+    unicos = separar_validadores_unicos(validador)
+    vistos = {}
+
+    lector = csv.DictReader(io.TextIOWrapper(archivo, encoding="utf-8-sig", newline=""), delimiter=separador)
+    creadas = 0
+    errores = []
+    cantidad_errores = 0
+
+    def procesar(lote):
+        nonlocal creadas, cantidad_errores
+        precargar(relaciones, [fila for _, fila in lote], precargados)
+        fallidas = {}
+        validas = []
+        for linea, fila in lote:
+            try:
+                validas.append((linea, None, validador.run_validation(fila)))
+            except serializers.ValidationError as exc:
+                fallidas[linea] = exc.detail
+        fallidas.update(errores_unicos(modelo, unicos, validas, vistos))
+        for linea in sorted(fallidas):
+            cantidad_errores += 1
+            if len(errores) < MAXIMO_ERRORES:
+                errores.append({"linea": linea, "errores": fallidas[linea]})
+        objetos = [_nuevo(modelo, datos) for linea, _, datos in validas if linea not in fallidas]
+        if objetos and not cantidad_errores:
+            modelo.objects.bulk_create(objetos)
+            cambios_en_lote.send(sender=modelo, creados=objetos)
+            creadas += len(objetos)
+
+    with transaction.atomic():
+        lote = []
+        for fila in lector:
+            lote.append((lector.line_num, _limpiar(fila)))
+            if len(lote) >= FILAS_POR_LOTE:
+                procesar(lote)
+                lote = []
+        if lote:
+            procesar(lote)
+        if cantidad_errores:
+            transaction.set_rollback(True)
+            creadas = 0
+
+    return creadas, errores, cantidad_errores
+
+
+def _error(indice, detalle):
+    return {"indice": indice, "errores": detalle}
+
+
+def _ids(valores):
+    """Convierte los ids recibidos a enteros: devuelve `(ids, errores)` alineados por posición"""
+    ids, errores = [], []
+    vistos = set()
+    for indice, valor in enumerate(valores):
+        try:
+            pk = int(valor)
+        except (TypeError, ValueError):
+            errores.append(_error(indice, {"id": ["Se requiere un id numérico."]}))
+            continue
+        if pk in vistos:
+            errores.append(_error(indice, {"id": [f"El id {pk} está repetido en el lote."]}))
+            continue
+        vistos.add(pk)
+        ids.append((indice, pk))
+    return ids, errores
+
+
+def _buscar(queryset, ids, errores):
+    """Trae con una sola consulta los objetos de `ids` y registra como error los que no existen"""
+    existentes = queryset.in_bulk([pk for _, pk in ids])
+    encontrados = []
+    for indice, pk in ids:
+        if pk in existentes:
+            encontrados.append((indice, existentes[pk]))
+        else:
+            errores.append(_error(indice, {"id": [f"No existe un objeto con id {pk}."]}))
+    errores.sort(key=lambda error: error["indice"])
+    return encontrados
+
+
+def crear_en_lote(serializer_class, items, contexto=None):
+    """
+    Valida y crea una lista de objetos en una sola transacción.
+
+    Las relaciones se resuelven con una consulta por modelo relacionado y los objetos
+    se insertan con `bulk_create`. Si algún elemento es inválido no se crea ninguno.
+    Devuelve `(creados, errores)`; `errores` es una lista de `{"indice": i, "errores": {...}}`.
+    """
+    modelo = serializer_class.Meta.model
+    precargados = {}
+    validador = serializer_class(context={**(contexto or {}), "precargados": precargados})
+    precargar(_relaciones_precargadas(validador), [item for item in items if isinstance(item, dict)], precargados)
+    unicos = separar_validadores_unicos(validador)
+
+    validos, fallidos = [], {}
+    for indice, item in enumerate(items):
+        try:
+            validos.append((indice, None, validador.run_validation(item)))
+        except serializers.ValidationError as exc:
+            fallidos[indice] = exc.detail
+    fallidos.update(errores_unicos(modelo, unicos, validos))
+    if fallidos:
+        return [], [_error(indice, fallidos[indice]) for indice in sorted(fallidos)]
+
+    objetos = [_nuevo(modelo, datos) for _, _, datos in validos]
+
+    with transaction.atomic():
+        modelo.objects.bulk_create(objetos)
+        cambios_en_lote.send(sender=modelo, creados=objetos)
+    return objetos, []
+
+
+def actualizar_en_lote(queryset, serializer_class, items, contexto=None):
+    """
+    Aplica actualizaciones parciales distintas a varios objetos: `[{"id": 1, "estado": ...}, ...]`.
+
+    Los objetos se traen con una consulta, cada cambio se valida como un PATCH sobre
+    su objeto y todo se guarda con un único `bulk_update`. Todo o nada, como `crear_en_lote`.
+    Devuelve `(actualizados, errores)`.
+    """
+    items = [item if isinstance(item, dict) else {} for item in items]
+    ids, errores = _ids(item.get("id") for item in items)
+    encontrados = _buscar(queryset, ids, errores)
+
+    precargados = {}
+    validador = serializer_class(context={**(contexto or {}), "precargados": precargados}, partial=True)
+    precargar(_relaciones_precargadas(validador), items, precargados)
+    unicos = separar_validadores_unicos(validador)
+
+    cambios, validos = [], []
+    for indice, objeto in encontrados:
+        validador.instance = objeto
+        try:
+            datos = validador.run_validation({k: v for k, v in items[indice].items() if k != "id"})
+        except serializers.ValidationError as exc:
+            errores.append(_error(indice, exc.detail))
+            continue
+        cambios.append((objeto, datos))
+        validos.append((indice, objeto.pk, datos))
+    errores.extend(_error(indice, detalle) for indice, detalle in errores_unicos(queryset.model, unicos, validos).items())
+    if errores:
+        return [], sorted(errores, key=lambda error: error["indice"])
+
+    return _guardar_cambios(queryset.model, cambios, uniforme=False), []
+
+
+def actualizar_uniforme(queryset, serializer_class, ids, cambios, contexto=None):
+    """
+    Aplica el mismo cambio parcial a varios objetos: `{"ids": [...], "cambios": {...}}`.
+
+    El cambio se valida una sola vez y se guarda con un único `UPDATE ... WHERE id IN (...)`
+    (`queryset.update`), salvo que el modelo tenga campos derivados que recalcular.
+    Devuelve `(actualizados, errores)`.
+    """
+    ids, errores = _ids(ids)
+    encontrados = _buscar(queryset, ids, errores)
+    if errores:
+        return [], errores
+
+    precargados = {}
+    validador = serializer_class(context={**(contexto or {}), "precargados": precargados}, partial=True)
+    precargar(_relaciones_precargadas(validador), [cambios] if isinstance(cambios, dict) else [], precargados)
+    unicos = separar_validadores_unicos(validador)
+    try:
+        datos = validador.run_validation(cambios)
+    except serializers.ValidationError as exc:
+        return [], [{"errores": exc.detail}]  # Error del cambio común, no de un objeto en particular
+
+    # Un valor único repetido en varios objetos falla en todos salvo el primero
+    fallidos = errores_unicos(queryset.model, unicos, [(indice, objeto.pk, datos) for indice, objeto in encontrados])
+    if fallidos:
+        return [], [_error(indice, fallidos[indice]) for indice in sorted(fallidos)]
+
+    return _guardar_cambios(queryset.model, [(objeto, datos) for _, objeto in encontrados], uniforme=True), []
+
+
+def _guardar_cambios(modelo, cambios, uniforme):
+    """Asigna los datos validados a cada objeto y los guarda con una sola consulta de escritura"""
+    campos = set()
+    pares = []
+    for objeto, datos in cambios:
+        anterior = copy.copy(objeto)
+        for campo, valor in datos.items():
+            setattr(objeto, campo, valor)
+        if hasattr(objeto, "calcular_campos_derivados"):
+            objeto.calcular_campos_derivados()
+        campos.update(datos)
+        pares.append((anterior, objeto))
+
+    objetos = [objeto for objeto, _ in cambios]
+    if not objetos or not campos:
+        return objetos
+
+    derivados = getattr(modelo, "CAMPOS_DERIVADOS", ())
+    # bulk_update y update() no completan los campos `auto_now` (p. ej. `fecha_actualizacion`)
+    ahora = timezone.now()
+    automaticos = {campo.name: ahora for campo in modelo._meta.concrete_fields if getattr(campo, "auto_now", False)}
+    for objeto in objetos:
+        for campo, valor in automaticos.items():
+            setattr(objeto, campo, valor)
+
+    with transaction.atomic():
+        if uniforme and not derivados:
+            modelo.objects.filter(pk__in=[objeto.pk for objeto in objetos]).update(**cambios[0][1], **automaticos)
+        else:
+            modelo.objects.bulk_update(objetos, [*campos, *derivados, *automaticos])
+        cambios_en_lote.send(sender=modelo, actualizados=pares)
+    return objetos
+
+
+def eliminar_en_lote(queryset, ids):
+    """
+    Elimina varios objetos con un solo `DELETE ... WHERE id IN (...)`.
+
+    Los resúmenes y versiones se actualizan una vez para todo el lote (ver `en_lote`).
+    Si algún id no existe no se elimina ninguno. Devuelve `(eliminados, errores)`.
+    """
+    ids, errores = _ids(ids)
+    encontrados = _buscar(queryset, ids, errores)
+    if errores:
+        return [], errores
+
+    modelo = queryset.model
+    objetos = [objeto for _, objeto in encontrados]
+    with transaction.atomic(), en_lote(modelo):
+        registrar_anulaciones(modelo, [objeto.pk for objeto in objetos])
+        modelo.objects.filter(pk__in=[objeto.pk for objeto in objetos]).delete()
+        cambios_en_lote.send(sender=modelo, eliminados=objetos)
+    return objetos, []
@@ -0,0 +1,35 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import archivo
+from core.filtros import inicio_del_dia
+
+
+class Command(BaseCommand):
+    help = (
+        "Empaqueta las ubicaciones GPS más viejas que la retención en segmentos por camión y día "
+        "(SegmentoUbicacion) y las borra de la tabla de ubicaciones. Pensado para correr diariamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=settings.UBICACIONES_ARCHIVO_DIAS,
+            help="Días de historial que quedan en la tabla de ubicaciones",
+        )
+        parser.add_argument("--camion", type=int, action="append", dest="camiones", help="Solo estos camiones (repetible)")
+
+    def handle(self, *args, **options):
+        if options["dias"] < 1:
+            raise CommandError("--dias debe ser al menos 1")
+        limite = inicio_del_dia(timezone.localdate() - timedelta(days=options["dias"]))
+
+        inicio = time.perf_counter()
+        segmentos, puntos = archivo.archivar(limite, options["camiones"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{puntos} ubicaciones anteriores a {limite:%Y-%m-%d} archivadas en {segmentos} segmentos "
+            f"en {time.perf_counter() - inicio:.2f} s"
+        ))
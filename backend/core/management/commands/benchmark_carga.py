@@ -0,0 +1,294 @@
+import http.client
+import json
+import math
+import random
+import re
+import subprocess
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from urllib.parse import urlsplit
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from rest_framework_simplejwt.tokens import AccessToken
+
+from core.models import Camion, Cliente
+
+# (nombre, método, ruta): las rutas se completan con ids al azar de la base en cada petición
+ESCENARIOS = [
+    ("camiones", "GET", "/api/camiones/"),
+    ("pedidos", "GET", "/api/pedidos/"),
+    ("facturas", "GET", "/api/facturas/"),
+    ("gastos", "GET", "/api/gastos/?camion_id={camion}"),
+    ("ubicaciones", "GET", "/api/ubicaciones/?camion_id={camion}"),
+    ("ubicacion_actual", "GET", "/api/ubicaciones/ubicacion_actual/?camion_id={camion}"),
+    ("flota", "GET", "/api/ubicaciones/flota/"),
+    ("metricas_dashboard", "GET", "/api/metricas/dashboard/"),
+    ("metricas_resumen", "GET", "/api/metricas/resumen_general/"),
+    ("rentabilidad", "GET", "/api/metricas/rentabilidad_camiones/?desde={hace_tres_meses}&hasta={este_mes}"),
+    ("exportar_facturas", "GET", "/api/facturas/exportar/?formato=csv&cliente_id={cliente}"),
+    ("exportar_gastos", "GET", "/api/gastos/exportar/?formato=csv&camion_id={camion}"),
+    ("ingesta", "POST", "/api/ubicaciones/lote/"),
+]
+
+_SERVER_TIMING_DB = re.compile(r'db;dur=([\d.]+);desc="(\d+) consultas"')
+
+
+def percentil(ordenados, p):
+    """Percentil `p` (0-100) de una lista ordenada, interpolando entre los dos valores vecinos"""
+    if not ordenados:
+        return None
+    posicion = (len(ordenados) - 1) * p / 100
+    abajo, arriba = math.floor(posicion), math.ceil(posicion)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def resumir(muestras, segundos):
+    """Estadísticas de un escenario a partir de `(latencia_s, estado, bytes, db_ms, consultas)` por petición"""
+    latencias = sorted(muestra[0] * 1000 for muestra in muestras)
+    estados = {}
+    for muestra in muestras:
+        estados[str(muestra[1])] = estados.get(str(muestra[1]), 0) + 1
+    db = sorted(muestra[3] for muestra in muestras if muestra[3] is not None)
+    consultas = sorted(muestra[4] for muestra in muestras if muestra[4] is not None)
+    return {
+        "peticiones": len(muestras),
+        "errores": sum(1 for muestra in muestras if not 200 <= muestra[1] < 400),
+        "estados": estados,
+        "rps": round(len(muestras) / segundos, 2) if segundos else None,
+        "latencia_ms": {
+            "p50": _redondear(percentil(latencias, 50)),
+            "p95": _redondear(percentil(latencias, 95)),
+            "p99": _redondear(percentil(latencias, 99)),
+            "max": _redondear(latencias[-1] if latencias else None),
+            "media": _redondear(sum(latencias) / len(latencias) if latencias else None),
+        },
+        "bytes_promedio": round(sum(muestra[2] for muestra in muestras) / len(muestras)) if muestras else None,
+        # Del encabezado Server-Timing (ver core.instrumentacion), si el servidor lo envía
+        "db_ms_p50": _redondear(percentil(db, 50)),
+        "consultas_p50": percentil(consultas, 50),
+    }
+
+
+def _redondear(valor):
+    return None if valor is None else round(valor, 2)
+
+
+def comparar(anterior, actual, tolerancia):
+    """
+    Compara dos corridas escenario por escenario.
+
+    Devuelve `(filas, regresiones)`: una fila `(nombre, p95 antes, p95 ahora, rps antes,
+    rps ahora)` por escenario presente en ambas, y los nombres de los escenarios cuyo p95
+    subió o cuyo throughput bajó más que `tolerancia` (0.1 = 10 %).
+    """
+    filas, regresiones = [], []
+    for nombre, ahora in actual["escenarios"].items():
+        antes = anterior.get("escenarios", {}).get(nombre)
+        if antes is None or not antes.get("peticiones") or not ahora["peticiones"]:
+            continue
+        p95_antes, p95_ahora = antes["latencia_ms"]["p95"], ahora["latencia_ms"]["p95"]
+        filas.append((nombre, p95_antes, p95_ahora, antes["rps"], ahora["rps"]))
+        if p95_ahora > p95_antes * (1 + tolerancia) or ahora["rps"] < antes["rps"] * (1 - tolerancia):
+            regresiones.append(nombre)
+    return filas, regresiones
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga contra un servidor local (runserver, uvicorn o gunicorn) que usa esta misma base: "
+        "manda peticiones concurrentes a los endpoints principales e informa latencias p50/p95/p99 y "
+        "throughput por escenario. Guarda el resultado en JSON para comparar corridas (--comparar). "
+        "El escenario 'ingesta' escribe ubicaciones de verdad en la base."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base del servidor")
+        parser.add_argument(
+            "--escenario", action="append", dest="escenarios", choices=[nombre for nombre, *_ in ESCENARIOS],
+            help="Solo estos escenarios (repetible; por defecto todos)",
+        )
+        parser.add_argument("--concurrencia", type=int, default=8, help="Clientes simultáneos")
+        parser.add_argument("--duracion", type=float, default=15, help="Segundos medidos por escenario")
+        parser.add_argument("--calentamiento", type=float, default=2, help="Segundos previos que no se cuentan")
+        parser.add_argument("--peticiones", type=int, help="Peticiones por escenario en lugar de --duracion")
+        parser.add_argument("--puntos-lote", type=int, default=100, help="Puntos por petición de ingesta")
+        parser.add_argument("--usuario", default="benchmark", help="Usuario para el token JWT (se crea si no existe)")
+        parser.add_argument("--token", help="Token JWT de acceso ya emitido (en lugar de --usuario)")
+        parser.add_argument("--salida", help="Archivo JSON de resultados (por defecto benchmark-carga-<fecha>.json)")
+        parser.add_argument("--comparar", help="JSON de una corrida anterior para detectar regresiones")
+        parser.add_argument(
+            "--tolerancia", type=float, default=0.10,
+            help="Cambio relativo de p95 o throughput que se considera regresión (0.10 = 10 %%)",
+        )
+
+    def handle(self, *args, **options):
+        if options["concurrencia"] < 1:
+            raise CommandError("--concurrencia debe ser al menos 1")
+        url = urlsplit(options["url"])
+        if url.scheme not in ("http", "https") or not url.hostname:
+            raise CommandError(f"URL inválida: {options['url']}")
+
+        camiones = list(Camion.objects.order_by("pk").values_list("pk", flat=True)[:10_000])
+        clientes = list(Cliente.objects.order_by("pk").values_list("pk", flat=True)[:10_000])
+        if not camiones or not clientes:
+            raise CommandError("La base no tiene camiones o clientes: generá datos con generar_datos")
+        hoy = timezone.localdate()
+        valores = {
+            "camiones": camiones,
+            "clientes": clientes,
+            "este_mes": f"{hoy:%Y-%m}",
+            "hace_tres_meses": f"{(hoy.replace(day=1) - timedelta(days=62)):%Y-%m}",
+        }
+        token = options["token"] or self._token(options["usuario"])
+
+        nombres = options["escenarios"] or [nombre for nombre, *_ in ESCENARIOS]
+        resultado = {
+            "fecha": timezone.now().isoformat(),
+            "commit": _commit(),
+            "url": options["url"],
+            "concurrencia": options["concurrencia"],
+            "duracion": options["duracion"],
+            "peticiones": options["peticiones"],
+            "escenarios": {},
+        }
+        self.stdout.write(
+            f"{'Escenario':<22}{'Pet.':>8}{'Err.':>6}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'DB ms':>9}"
+        )
+        for nombre, metodo, ruta in ESCENARIOS:
+            if nombre not in nombres:
+                continue
+            muestras, segundos = self._correr(url, token, metodo, ruta, valores, options)
+            estadisticas = resultado["escenarios"][nombre] = resumir(muestras, segundos)
+            latencia = estadisticas["latencia_ms"]
+            self.stdout.write(
+                f"{nombre:<22}{estadisticas['peticiones']:>8}{estadisticas['errores']:>6}"
+                f"{_texto(latencia['p50']):>10}{_texto(latencia['p95']):>10}{_texto(latencia['p99']):>10}"
+                f"{_texto(estadisticas['rps']):>10}{_texto(estadisticas['db_ms_p50']):>9}"
+            )
+
+        salida = options["salida"] or f"benchmark-carga-{timezone.now():%Y%m%d-%H%M%S}.json"
+        with open(salida, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo, indent=2, ensure_ascii=False)
+        self.stdout.write(self.style.SUCCESS(f"Resultados guardados en {salida}"))
+
+        if options["comparar"]:
+            self._comparar(options["comparar"], resultado, options["tolerancia"])
+
+    def _token(self, username):
+        usuario, creado = User.objects.get_or_create(username=username)
+        if creado:
+            usuario.set_unusable_password()
+            usuario.save(update_fields=["password"])
+        return str(AccessToken.for_user(usuario))
+
+    def _correr(self, url, token, metodo, ruta, valores, options):
+        """Corre un escenario con `concurrencia` clientes; devuelve las muestras medidas y los segundos medidos"""
+        concurrencia = options["concurrencia"]
+        if options["peticiones"] is not None:
+            # Repartidas entre los clientes, sin calentamiento ni límite de tiempo
+            cuotas = [options["peticiones"] // concurrencia + (1 if i < options["peticiones"] % concurrencia else 0)
+                      for i in range(concurrencia)]
+            inicio_medicion = time.perf_counter()
+            fin = None
+        else:
+            cuotas = [None] * concurrencia
+            inicio_medicion = time.perf_counter() + options["calentamiento"]
+            fin = inicio_medicion + options["duracion"]
+
+        with ThreadPoolExecutor(max_workers=concurrencia) as executor:
+            tareas = [
+                executor.submit(self._cliente, url, token, metodo, ruta, valores, options["puntos_lote"],
+                                cuota, inicio_medicion, fin)
+                for cuota in cuotas
+            ]
+            muestras = [muestra for tarea in tareas for muestra in tarea.result()]
+        segundos = time.perf_counter() - inicio_medicion if fin is None else options["duracion"]
+        return muestras, segundos
+
+    def _cliente(self, url, token, metodo, ruta, valores, puntos_lote, cuota, inicio_medicion, fin):
+        """Un cliente: una conexión keep-alive y peticiones en serie hasta agotar su cuota o el tiempo"""
+        rng = random.Random()
+        clase = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        conexion = clase(url.hostname, url.port, timeout=60)
+        muestras = []
+        try:
+            while True:
+                if cuota is not None and len(muestras) >= cuota:
+                    break
+                if fin is not None and time.perf_counter() >= fin:
+                    break
+                destino = url.path.rstrip("/") + ruta.format(
+                    camion=rng.choice(valores["camiones"]), cliente=rng.choice(valores["clientes"]),
+                    este_mes=valores["este_mes"], hace_tres_meses=valores["hace_tres_meses"],
+                )
+                cuerpo = _lote_ubicaciones(rng, valores["camiones"], puntos_lote) if metodo == "POST" else None
+                muestra = _pedir(conexion, metodo, destino, token, cuerpo)
+                if fin is None or muestra[5] >= inicio_medicion:
+                    muestras.append(muestra[:5])
+        finally:
+            conexion.close()
+        return muestras
+
+    def _comparar(self, ruta, resultado, tolerancia):
+        with open(ruta, encoding="utf-8") as archivo:
+            anterior = json.load(archivo)
+        filas, regresiones = comparar(anterior, resultado, tolerancia)
+        self.stdout.write(f"Comparación con {ruta} ({anterior.get('commit') or 'sin commit'}, {anterior.get('fecha')}):")
+        self.stdout.write(f"{'Escenario':<22}{'p95 antes':>11}{'p95 ahora':>11}{'req/s antes':>13}{'req/s ahora':>13}")
+        for nombre, p95_antes, p95_ahora, rps_antes, rps_ahora in filas:
+            marca = "  <- regresión" if nombre in regresiones else ""
+            self.stdout.write(f"{nombre:<22}{p95_antes:>11.1f}{p95_ahora:>11.1f}{rps_antes:>13.1f}{rps_ahora:>13.1f}{marca}")
+        if regresiones:
+            raise CommandError(f"Regresiones de más de {tolerancia:.0%}: {', '.join(regresiones)}")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones"))
+
+
+def _pedir(conexion, metodo, destino, token, cuerpo):
+    """Hace una petición; devuelve `(latencia_s, estado, bytes, db_ms, consultas, momento de inicio)`"""
+    encabezados = {"Authorization": f"Bearer {token}", "Accept": "application/json"}
+    if cuerpo is not None:
+        encabezados["Content-Type"] = "application/json"
+    inicio = time.perf_counter()
+    try:
+        conexion.request(metodo, destino, body=cuerpo, headers=encabezados)
+        respuesta = conexion.getresponse()
+        contenido = respuesta.read()  # Completo: las exportaciones se envían en streaming
+    except (OSError, http.client.HTTPException):
+        conexion.close()  # Se reconecta en la próxima petición
+        return time.perf_counter() - inicio, 0, 0, None, None, inicio
+    latencia = time.perf_counter() - inicio
+    db = _SERVER_TIMING_DB.search(respuesta.getheader("Server-Timing") or "")
+    return (
+        latencia, respuesta.status, len(contenido),
+        float(db.group(1)) if db else None, int(db.group(2)) if db else None, inicio,
+    )
+
+
+def _lote_ubicaciones(rng, camiones, cantidad):
+    ahora = timezone.now()
+    return json.dumps([
+        {
+            "camion_id": rng.choice(camiones),
+            "latitud": rng.uniform(-55, -22),
+            "longitud": rng.uniform(-73, -53),
+            "timestamp": (ahora - timedelta(seconds=i)).isoformat(),
+        }
+        for i in range(cantidad)
+    ])
+
+
+def _texto(valor):
+    return "-" if valor is None else f"{valor:.1f}"
+
+
+def _commit():
+    """Commit actual del repositorio, para saber qué versión se midió (None si no hay git)"""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return None
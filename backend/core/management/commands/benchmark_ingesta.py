@@ -0,0 +1,74 @@
+import random
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from core.models import Camion, Ubicacion
+from core.views import UbicacionViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara puntos/segundo entre POST /api/ubicaciones/ (uno por petición) y "
+        "POST /api/ubicaciones/lote/. Todo se ejecuta en una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--puntos", type=int, default=2000, help="Puntos a ingresar con cada método")
+        parser.add_argument("--camiones", type=int, default=50, help="Camiones de prueba a crear")
+        parser.add_argument("--lote", type=int, default=1000, help="Puntos por petición de lote")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            usuario = User.objects.create_user(username=f"benchmark-{time.time_ns()}")
+            camiones = Camion.objects.bulk_create([
+                Camion(marca="Bench", modelo="GPS", placa=f"BENCH-{i}-{time.time_ns()}", capacidad=10, año=2020)
+                for i in range(options["camiones"])
+            ])
+            ids = [camion.pk for camion in camiones]
+            puntos = [self._punto(random.choice(ids)) for _ in range(options["puntos"])]
+
+            por_fila = self._medir_por_fila(usuario, puntos)
+            por_lote = self._medir_por_lote(usuario, puntos, options["lote"])
+
+            self.stdout.write(f"Puntos por método: {len(puntos)}")
+            self.stdout.write(f"POST /api/ubicaciones/       : {por_fila:,.0f} puntos/s")
+            self.stdout.write(f"POST /api/ubicaciones/lote/  : {por_lote:,.0f} puntos/s")
+            self.stdout.write(self.style.SUCCESS(f"Aceleración: x{por_lote / por_fila:.1f}"))
+
+            transaction.set_rollback(True)
+
+    def _punto(self, camion_id):
+        return {
+            "camion_id": camion_id,
+            "latitud": random.uniform(-55, -22),
+            "longitud": random.uniform(-73, -53),
+        }
+
+    def _medir_por_fila(self, usuario, puntos):
+        factory = APIRequestFactory()
+        vista = UbicacionViewSet.as_view({"post": "create"})
+        inicio = time.perf_counter()
+        for punto in puntos:
+            request = factory.post("/api/ubicaciones/", punto, format="json")
+            force_authenticate(request, user=usuario)
+            respuesta = vista(request)
+            assert respuesta.status_code == 201, respuesta.data
+        return len(puntos) / (time.perf_counter() - inicio)
+
+    def _medir_por_lote(self, usuario, puntos, tamano):
+        factory = APIRequestFactory()
+        vista = UbicacionViewSet.as_view({"post": "lote"})
+        antes = Ubicacion.objects.count()
+        inicio = time.perf_counter()
+        for desde in range(0, len(puntos), tamano):
+            request = factory.post("/api/ubicaciones/lote/", puntos[desde:desde + tamano], format="json")
+            force_authenticate(request, user=usuario)
+            respuesta = vista(request)
+            assert respuesta.status_code == 201, respuesta.data
+        transcurrido = time.perf_counter() - inicio
+        assert Ubicacion.objects.count() - antes == len(puntos)
+        return len(puntos) / transcurrido
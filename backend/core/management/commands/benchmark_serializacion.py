@@ -0,0 +1,99 @@
+import random
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+
+from core.lectura import extractor_para
+from core.models import Camion, Conductor, Cliente, Pedido, GastoCamion, Ubicacion
+from core.renderers import JSONRapidoRenderer
+from core.serializers import GastoCamionSerializer, PedidoSerializer, UbicacionSerializer
+
+# (nombre, serializador, expand) de cada caso medido
+CASOS = [
+    ("ubicaciones", UbicacionSerializer, []),
+    ("ubicaciones?expand=camion", UbicacionSerializer, ["camion"]),
+    ("gastos", GastoCamionSerializer, []),
+    ("gastos?expand=camion.conductor", GastoCamionSerializer, ["camion.conductor"]),
+    ("pedidos", PedidoSerializer, []),
+    ("pedidos?expand=cliente,camion,conductor", PedidoSerializer, ["cliente", "camion", "conductor"]),
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara filas/segundo al listar con ModelSerializer + JSONRenderer contra values() + "
+        "extractor precompilado + orjson. Todo se ejecuta en una transacción que se revierte al final."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=20000, help="Filas de cada tabla a crear y listar")
+        parser.add_argument("--repeticiones", type=int, default=3, help="Se informa la mejor de N mediciones")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            self._crear_datos(options["filas"])
+            self.stdout.write(f"{'Caso':<45}{'Serializador':>15}{'Rápido':>15}{'Aceleración':>14}")
+            for nombre, serializer_class, expand in CASOS:
+                modelo = serializer_class.Meta.model
+                queryset = modelo.objects.select_related(*serializer_class.relaciones_expandidas(expand)).order_by("-id")
+
+                normal, salida_normal = self._medir(options["repeticiones"], lambda: JSONRenderer().render(
+                    serializer_class(queryset, many=True, expand=expand).data
+                ))
+                extractor = extractor_para(serializer_class, None, expand)
+                rapido, salida_rapida = self._medir(options["repeticiones"], lambda: JSONRapidoRenderer().render(
+                    extractor.filas(queryset.values(*extractor.columnas))
+                ))
+                if salida_normal != salida_rapida:
+                    self.stderr.write(self.style.ERROR(f"{nombre}: la salida rápida difiere de la del serializador"))
+
+                filas = modelo.objects.count()
+                self.stdout.write(
+                    f"{nombre:<45}{filas / normal:>11,.0f} f/s{filas / rapido:>11,.0f} f/s{normal / rapido:>13.1f}x"
+                )
+            transaction.set_rollback(True)
+
+    def _medir(self, repeticiones, funcion):
+        mejor, salida = None, None
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            salida = funcion()
+            transcurrido = time.perf_counter() - inicio
+            mejor = transcurrido if mejor is None else min(mejor, transcurrido)
+        return mejor, salida
+
+    def _crear_datos(self, filas):
+        sufijo = time.time_ns()
+        conductores = Conductor.objects.bulk_create([
+            Conductor(nombre=f"Bench {i}", apellido="Serializacion", licencia=f"BENCH-{sufijo}-{i}")
+            for i in range(20)
+        ])
+        camiones = Camion.objects.bulk_create([
+            Camion(marca="Bench", modelo="JSON", placa=f"BENCH-{sufijo}-{i}", capacidad=10, año=2020,
+                   conductor=conductores[i % len(conductores)])
+            for i in range(50)
+        ])
+        clientes = Cliente.objects.bulk_create([
+            Cliente(nombre=f"Cliente {i}", email=f"bench-{sufijo}-{i}@test.com") for i in range(20)
+        ])
+        ahora = timezone.now()
+        Ubicacion.objects.bulk_create([
+            Ubicacion(camion=random.choice(camiones), latitud=random.uniform(-55, -22),
+                      longitud=random.uniform(-73, -53), timestamp=ahora - timedelta(seconds=i))
+            for i in range(filas)
+        ], batch_size=2000)
+        GastoCamion.objects.bulk_create([
+            GastoCamion(camion=random.choice(camiones), tipo_gasto="combustible",
+                        monto=Decimal(random.randint(100, 99999)) / 100, fecha=date(2025, 1, 1) + timedelta(days=i % 365))
+            for i in range(filas)
+        ], batch_size=2000)
+        Pedido.objects.bulk_create([
+            Pedido(cliente=random.choice(clientes), camion=random.choice(camiones),
+                   conductor=random.choice(conductores), descripcion=f"Carga {i}")
+            for i in range(filas)
+        ], batch_size=2000)
@@ -0,0 +1,32 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import viajes
+
+
+class Command(BaseCommand):
+    help = (
+        "Calcula los kilómetros, viajes y velocidades por camión y día a partir de las ubicaciones "
+        "GPS (por defecto ayer y hoy). Pensado para correr periódicamente."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--desde", type=date.fromisoformat, help="Primer día (YYYY-MM-DD)")
+        parser.add_argument("--hasta", type=date.fromisoformat, help="Último día, inclusive (YYYY-MM-DD)")
+        parser.add_argument("--camion", type=int, action="append", dest="camiones", help="Solo estos camiones (repetible)")
+
+    def handle(self, *args, **options):
+        hoy = timezone.localdate()
+        desde = options["desde"] or hoy - timedelta(days=1)
+        hasta = options["hasta"] or hoy
+        if desde > hasta:
+            raise CommandError("--desde debe ser anterior o igual a --hasta")
+
+        inicio = time.perf_counter()
+        filas = viajes.recalcular(desde, hasta, options["camiones"])
+        self.stdout.write(self.style.SUCCESS(
+            f"{len(filas)} días-camión calculados ({desde} a {hasta}) en {time.perf_counter() - inicio:.2f} s"
+        ))
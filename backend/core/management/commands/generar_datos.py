@@ -0,0 +1,51 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.generador import PERFILES, Generador
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera una flota sintética con historial (conductores, camiones, clientes, pedidos, facturas, "
+        "gastos, sueldos y ubicaciones GPS) para pruebas de carga. Las cantidades salen del perfil y "
+        "se pueden cambiar una por una. Los datos se agregan a los existentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--perfil", choices=sorted(PERFILES), default="chico", help="Escala de los datos")
+        for nombre in ("camiones", "conductores", "clientes", "pedidos", "ubicaciones"):
+            parser.add_argument(f"--{nombre}", type=int, help=f"Cantidad de {nombre} (reemplaza la del perfil)")
+        parser.add_argument("--facturas", type=int, help="Máximo de facturas, una por pedido completado (por defecto, una por cada uno)")
+        parser.add_argument("--gastos", type=int, help="Cantidad de gastos (por defecto, uno por camión y semana)")
+        parser.add_argument("--dias", type=int, default=365, help="Días de historial hasta hoy")
+        parser.add_argument("--lote", type=int, default=10_000, help="Filas por inserción masiva (y por transacción)")
+        parser.add_argument("--semilla", type=int, help="Semilla para generar siempre los mismos datos")
+
+    def handle(self, *args, **options):
+        cantidades = dict(PERFILES[options["perfil"]])
+        for nombre in cantidades:
+            if options[nombre] is not None:
+                cantidades[nombre] = options[nombre]
+        cantidades["facturas"] = options["facturas"] if options["facturas"] is not None else cantidades["pedidos"]
+        cantidades["gastos"] = (
+            options["gastos"] if options["gastos"] is not None else cantidades["camiones"] * options["dias"] // 7
+        )
+        if options["dias"] < 1 or options["lote"] < 1:
+            raise CommandError("--dias y --lote deben ser al menos 1")
+        if min(cantidades.values()) < 0:
+            raise CommandError("Las cantidades no pueden ser negativas")
+        if cantidades["camiones"] == 0 and (cantidades["pedidos"] or cantidades["gastos"] or cantidades["ubicaciones"]):
+            raise CommandError("Los pedidos, gastos y ubicaciones necesitan al menos un camión")
+        if cantidades["clientes"] == 0 and cantidades["pedidos"]:
+            raise CommandError("Los pedidos necesitan al menos un cliente")
+
+        generador = Generador(
+            dias=options["dias"], lote=options["lote"], semilla=options["semilla"], informar=self.stdout.write,
+        )
+        inicio = time.perf_counter()
+        creadas = generador.generar(**cantidades)
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(creadas.values()):,} filas generadas en {time.perf_counter() - inicio:.1f} s. "
+            "Para las distancias por camión y el archivo GPS corré calcular_distancias y archivar_ubicaciones."
+        ))
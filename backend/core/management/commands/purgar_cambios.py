@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core import cambios
+
+
+class Command(BaseCommand):
+    help = (
+        "Elimina del feed de cambios los registros más viejos que la retención. Los clientes con un "
+        "cursor anterior reciben 410 y deben volver a descargar el listado completo."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--dias", type=int, default=settings.CAMBIOS_RETENCION_DIAS, help="Días de cambios que se conservan"
+        )
+
+    def handle(self, *args, **options):
+        eliminados = cambios.purgar(options["dias"])
+        self.stdout.write(self.style.SUCCESS(f"{eliminados} cambios eliminados"))
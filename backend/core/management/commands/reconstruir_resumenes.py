@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core import resumenes
+
+
+class Command(BaseCommand):
+    help = "Recalcula desde cero los resúmenes mensuales de gastos y sueldos"
+
+    def handle(self, *args, **options):
+        for modelo in resumenes.RESUMENES:
+            filas = resumenes.reconstruir(modelo)
+            self.stdout.write(self.style.SUCCESS(f"{modelo.__name__}: {filas} filas de resumen"))
@@ -0,0 +1,19 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:37
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_alter_factura_options_factura_pedido'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='ubicacion',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def poblar_ultimas_ubicaciones(apps, schema_editor):
+    """Carga la última ubicación de cada camión a partir del historial existente"""
+    Camion = apps.get_model("core", "Camion")
+    Ubicacion = apps.get_model("core", "Ubicacion")
+    UltimaUbicacion = apps.get_model("core", "UltimaUbicacion")
+
+    ultimas = []
+    for camion_id in Camion.objects.values_list("id", flat=True).iterator():
+        ubicacion = Ubicacion.objects.filter(camion_id=camion_id).order_by("-timestamp", "-id").first()
+        if ubicacion:
+            ultimas.append(UltimaUbicacion(
+                camion_id=camion_id, ubicacion_id=ubicacion.id, latitud=ubicacion.latitud,
+                longitud=ubicacion.longitud, timestamp=ubicacion.timestamp,
+            ))
+    UltimaUbicacion.objects.bulk_create(ultimas, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_ubicacion_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UltimaUbicacion',
+            fields=[
+                ('camion', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ultima_ubicacion', serialize=False, to='core.camion')),
+                ('latitud', models.FloatField()),
+                ('longitud', models.FloatField()),
+                ('timestamp', models.DateTimeField()),
+                ('ubicacion', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.ubicacion')),
+            ],
+        ),
+        migrations.RunPython(poblar_ultimas_ubicaciones, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:42
+
+import django.db.models.expressions
+import django.db.models.functions.comparison
+from django.db import migrations, models
+
+
+# Las columnas generadas almacenadas (STORED) se calculan para todas las filas existentes
+# al agregarlas: PostgreSQL reescribe la tabla durante el ALTER TABLE, así que el
+# backfill de las facturas históricas ocurre dentro de esta misma migración.
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_ultimaubicacion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='factura',
+            name='final_h',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('horas_espera', models.DecimalField(decimal_places=4, max_digits=12)), '*', models.F('precio_hora')), output_field=models.DecimalField(decimal_places=2, max_digits=14)),
+        ),
+        migrations.AddField(
+            model_name='factura',
+            name='importe_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.expressions.CombinedExpression(django.db.models.functions.comparison.Cast('horas_espera', models.DecimalField(decimal_places=4, max_digits=12)), '*', models.F('precio_hora')), '+', models.F('peajes')), '+', models.F('importe_lista')), output_field=models.DecimalField(decimal_places=2, max_digits=14)),
+        ),
+    ]
@@ -0,0 +1,63 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def poblar_resumenes(apps, schema_editor):
+    """Carga los resúmenes mensuales a partir de los gastos y sueldos existentes"""
+    fuentes = [
+        ("GastoCamion", "ResumenGastoMensual", "fecha", ("camion_id", "tipo_gasto"), "monto"),
+        ("SueldoEmpleado", "ResumenSueldoMensual", "fecha_pago", ("empleado_id", "metodo_pago"), "total_neto"),
+    ]
+    for modelo, resumen, fecha, dimensiones, monto in fuentes:
+        Modelo = apps.get_model("core", modelo)
+        Resumen = apps.get_model("core", resumen)
+        filas = (
+            Modelo.objects.annotate(mes=TruncMonth(fecha))
+            .values("mes", *dimensiones)
+            .annotate(total=Sum(monto), cantidad=Count("pk"))
+            .order_by()
+        )
+        Resumen.objects.bulk_create((Resumen(**fila) for fila in filas.iterator()), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_factura_totales_generados'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenGastoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('tipo_gasto', models.CharField(choices=[('combustible', 'Combustible'), ('reparacion', 'Reparación'), ('filtros', 'Filtros'), ('seguro', 'Seguro'), ('otros', 'Otros')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('camion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_gastos', to='core.camion')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'camion', 'tipo_gasto'), name='resumen_gasto_mes_camion_tipo')],
+            },
+        ),
+        migrations.CreateModel(
+            name='ResumenSueldoMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('metodo_pago', models.CharField(choices=[('efectivo', 'Efectivo'), ('transferencia', 'Transferencia Bancaria'), ('cheque', 'Cheque')], max_length=20)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('empleado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_sueldos', to='core.conductor')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('mes', 'empleado', 'metodo_pago'), name='resumen_sueldo_mes_empleado_metodo')],
+            },
+        ),
+        migrations.RunPython(poblar_resumenes, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.7 on 2026-10-18 16:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_resumenes_mensuales'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['cliente', 'fecha'], name='factura_cliente_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='factura',
+            index=models.Index(fields=['fecha'], name='factura_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gastocamion',
+            index=models.Index(fields=['camion', 'fecha'], name='gasto_camion_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pedido',
+            index=models.Index(fields=['estado', 'fecha_creacion'], name='pedido_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='sueldoempleado',
+            index=models.Index(fields=['fecha_pago'], name='sueldo_fecha_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ubicacion',
+            index=models.Index(fields=['camion', 'timestamp'], name='ubicacion_camion_ts_idx'),
+        ),
+    ]
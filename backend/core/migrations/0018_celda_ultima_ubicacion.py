@@ -0,0 +1,53 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:07
+
+from django.db import migrations, models
+
+# Copia congelada de la codificación de `core.espacial.celda` al crear esta migración
+# (orden Z / Morton, 20 bits por eje): si el módulo cambia, la migración sigue igual.
+BITS = 20
+_LADO = 1 << BITS
+
+
+def _separar_bits(valor):
+    valor &= 0xFFFFF
+    valor = (valor | (valor << 16)) & 0x0000FFFF0000FFFF
+    valor = (valor | (valor << 8)) & 0x00FF00FF00FF00FF
+    valor = (valor | (valor << 4)) & 0x0F0F0F0F0F0F0F0F
+    valor = (valor | (valor << 2)) & 0x3333333333333333
+    valor = (valor | (valor << 1)) & 0x5555555555555555
+    return valor
+
+
+def celda(latitud, longitud):
+    columna = min(max(int((longitud + 180.0) / 360.0 * _LADO), 0), _LADO - 1)
+    fila = min(max(int((latitud + 90.0) / 180.0 * _LADO), 0), _LADO - 1)
+    return _separar_bits(columna) | (_separar_bits(fila) << 1)
+
+
+def calcular_celdas(apps, schema_editor):
+    """Completa la celda de la grilla espacial de las últimas ubicaciones existentes"""
+    UltimaUbicacion = apps.get_model("core", "UltimaUbicacion")
+    ultimas = list(UltimaUbicacion.objects.all())
+    for ultima in ultimas:
+        ultima.celda = celda(ultima.latitud, ultima.longitud)
+    UltimaUbicacion.objects.bulk_update(ultimas, ["celda"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_cambio'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='ultimaubicacion',
+            name='celda',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.RunPython(calcular_celdas, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='ultimaubicacion',
+            index=models.Index(fields=['celda'], name='ultima_ubicacion_celda_idx'),
+        ),
+    ]
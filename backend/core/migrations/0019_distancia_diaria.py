@@ -0,0 +1,31 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_celda_ultima_ubicacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistanciaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('distancia_km', models.FloatField(default=0)),
+                ('viajes', models.PositiveIntegerField(default=0)),
+                ('segundos_en_movimiento', models.PositiveIntegerField(default=0)),
+                ('velocidad_maxima_kmh', models.FloatField(default=0)),
+                ('puntos', models.PositiveIntegerField(default=0)),
+                ('camion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='distancias_diarias', to='core.camion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='distancia_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('camion', 'fecha'), name='distancia_camion_fecha')],
+            },
+        ),
+    ]
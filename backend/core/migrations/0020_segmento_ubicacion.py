@@ -0,0 +1,30 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_distancia_diaria'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SegmentoUbicacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('inicio', models.DateTimeField()),
+                ('fin', models.DateTimeField()),
+                ('cantidad', models.PositiveIntegerField()),
+                ('datos', models.BinaryField()),
+                ('camion', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segmentos_ubicacion', to='core.camion')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='segmento_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('camion', 'fecha'), name='segmento_camion_fecha')],
+            },
+        ),
+    ]
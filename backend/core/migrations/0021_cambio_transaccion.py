@@ -0,0 +1,26 @@
+# Generated by Django 5.1.7 on 2026-10-18 17:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_segmento_ubicacion'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='cambio',
+            name='cambio_modelo_id_idx',
+        ),
+        migrations.AddField(
+            model_name='cambio',
+            name='transaccion',
+            field=models.BigIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='cambio',
+            index=models.Index(fields=['modelo', 'transaccion', 'id'], name='cambio_modelo_tx_id_idx'),
+        ),
+    ]
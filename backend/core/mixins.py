@@ -0,0 +1,369 @@
+from django.core.handlers.asgi import ASGIRequest
+from django.db import IntegrityError
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.decorators import action
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+from . import cambios, condicional, exportacion, lotes, replicas
+from .instrumentacion import medir
+from .lectura import extractor_para
+from .models import Cambio
+from .filtros import filtro_mes
+from .versiones import escritos_recientemente, versiones
+
+
+class CargaAnticipadaMixin:
+    """
+    Aplica al queryset de la vista las relaciones que necesita su serializador.
+
+    Cada ViewSet declara `select_related_fields` (ForeignKey / OneToOne) y
+    `prefetch_related_fields` (relaciones múltiples) que siempre necesita; a eso se suman
+    las relaciones pedidas con `?expand=` si el serializador es un `CamposDinamicosSerializer`.
+    Así listar N objetos cuesta un número fijo de consultas y solo se hacen los JOINs
+    que la respuesta usa. Las vistas que filtran deben partir de `super().get_queryset()`.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        relacionadas = [*self.select_related_fields, *self._relaciones_expandidas()]
+        if relacionadas:
+            queryset = queryset.select_related(*relacionadas)
+        if self.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*self.prefetch_related_fields)
+        return queryset
+
+    def _relaciones_expandidas(self):
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, "relaciones_expandidas"):
+            return []
+        _, expand = serializer_class.parametros(getattr(self, "request", None))
+        return serializer_class.relaciones_expandidas(expand)
+
+
+class CondicionalMixin:
+    """
+    GET condicionales (`If-None-Match` / `If-Modified-Since`) en `list` y `retrieve`.
+
+    Los validadores se calculan antes de leer los datos y, si el cliente ya tiene la
+    versión vigente, se responde 304 sin consultar las filas ni serializar nada:
+
+    - Listado: ETag a partir de la versión de escritura del modelo y de las relaciones
+      expandidas (ver `core.condicional`), sin consultas a la base.
+    - Detalle: ETag y Last-Modified a partir de `fecha_actualizacion` del objeto.
+
+    Va junto con `CargaAnticipadaMixin`, de quien toma las relaciones expandidas.
+    """
+
+    def _modelos_mostrados(self):
+        return condicional.modelos_involucrados(self.queryset.model, self._relaciones_expandidas())
+
+    def list(self, request, *args, **kwargs):
+        etag = condicional.etag_de_versiones(request, self._modelos_mostrados())
+        no_modificada = condicional.respuesta_no_modificada(request, etag=etag)
+        if no_modificada is not None:
+            return no_modificada
+        return condicional.agregar_validadores(super().list(request, *args, **kwargs), etag)
+
+    def retrieve(self, request, *args, **kwargs):
+        instance = self.get_object()
+        relacionados = self._modelos_mostrados()[1:]
+        actualizado = getattr(instance, "fecha_actualizacion", None)
+        etag = condicional.calcular_etag(request, instance.pk, actualizado, *versiones(*relacionados))
+        # Con relaciones expandidas la fecha del objeto no alcanza para validar, solo el ETag
+        ultima_modificacion = actualizado if not relacionados else None
+
+        no_modificada = condicional.respuesta_no_modificada(request, etag=etag, ultima_modificacion=ultima_modificacion)
+        if no_modificada is not None:
+            return no_modificada
+        with medir("serializacion"):
+            datos = self.get_serializer(instance).data
+        return condicional.agregar_validadores(Response(datos), etag, ultima_modificacion)
+
+
+class LecturaEnReplicaMixin:
+    """
+    Lee de una réplica (ver `core.replicas`) en las acciones GET de `acciones_en_replica`.
+
+    `acciones_en_replica = None` habilita todas las acciones GET. Si alguno de los
+    modelos que muestra la acción (`modelos_leidos`, por defecto el del queryset y
+    sus relaciones expandidas) se escribió hace instantes, se lee de la base principal.
+    """
+    acciones_en_replica = ("list",)
+    modelos_leidos = None
+
+    def _modelos_leidos(self):
+        if self.modelos_leidos is not None:
+            return self.modelos_leidos
+        relaciones = self._relaciones_expandidas() if hasattr(self, "_relaciones_expandidas") else ()
+        return condicional.modelos_involucrados(self.queryset.model, relaciones)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if request.method not in SAFE_METHODS:
+            return
+        if self.acciones_en_replica is not None and self.action not in self.acciones_en_replica:
+            return
+        if not escritos_recientemente(*self._modelos_leidos()):
+            replicas.leer_de_replica()
+
+
+class LecturaRapidaMixin:
+    """
+    Listados sin instanciar modelos ni serializadores por fila.
+
+    Si el serializador es un `CamposDinamicosSerializer` compilable (ver `core.lectura`),
+    `list` lee las filas con `values()` y las convierte con el extractor precompilado;
+    la salida es idéntica a la del serializador. Si no, se usa el listado normal de DRF.
+    En los dos casos, y en el detalle, la conversión suma a la etapa "serializacion".
+    """
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.get_serializer_class()
+        if not hasattr(serializer_class, "parametros"):
+            return self._listar_con_serializador()
+        fields, expand = serializer_class.parametros(request)
+        extractor = extractor_para(serializer_class, fields, expand)
+        if extractor is None:
+            return self._listar_con_serializador()
+
+        # El paginador por cursor lee de cada fila las columnas del orden
+        orden = [campo.lstrip("-") for campo in getattr(self, "ordering", None) or ()]
+        columnas = dict.fromkeys([*extractor.columnas, *orden, "id"])
+        queryset = self.filter_queryset(self.get_queryset()).values(*columnas)
+
+        pagina = self.paginate_queryset(queryset)
+        leidas = pagina if pagina is not None else list(queryset)  # La consulta fuera de la medición de serialización
+        with medir("serializacion"):
+            filas = extractor.filas(leidas)
+        if pagina is not None:
+            return self.get_paginated_response(filas)
+        return Response(filas)
+
+    def _listar_con_serializador(self):
+        # Como `ListModelMixin.list`, pero midiendo `serializer.data`
+        queryset = self.filter_queryset(self.get_queryset())
+        pagina = self.paginate_queryset(queryset)
+        leidas = pagina if pagina is not None else list(queryset)
+        with medir("serializacion"):
+            datos = self.get_serializer(leidas, many=True).data
+        if pagina is not None:
+            return self.get_paginated_response(datos)
+        return Response(datos)
+
+    def retrieve(self, request, *args, **kwargs):
+        instancia = self.get_object()
+        with medir("serializacion"):
+            datos = self.get_serializer(instancia).data
+        return Response(datos)
+
+
+class BusquedaMixin:
+    """
+    Filtra el listado (y la exportación) con `?q=texto` sobre `campos_busqueda`.
+
+    Cada palabra tiene que aparecer, sin distinguir mayúsculas, en alguno de los campos;
+    una palabra numérica también coincide con el id. Con `?q=...&page_size=20&fields=...`
+    el listado paginado sirve de autocompletado para los selectores de la interfaz.
+    """
+    campos_busqueda = ()
+    maximo_palabras = 5
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        texto = self.request.query_params.get("q", "").strip()
+        for palabra in texto.split()[:self.maximo_palabras]:
+            condicion = Q()
+            for campo in self.campos_busqueda:
+                condicion |= Q(**{f"{campo}__icontains": palabra})
+            if palabra.isdigit() and len(palabra) < 10:
+                condicion |= Q(pk=int(palabra))
+            if not condicion:
+                return queryset.none()
+            queryset = queryset.filter(condicion)
+        return queryset
+
+
+class ExportacionMixin:
+    """
+    Agrega `GET <recurso>/exportar/?formato=csv|xlsx` con los mismos filtros que el listado.
+
+    La vista declara `columnas_exportacion` como pares `(encabezado, campo ORM)` y,
+    opcionalmente, `campo_mes` para aceptar `?mes=YYYY-MM`.
+    """
+    columnas_exportacion = ()
+    campo_mes = None
+
+    @action(detail=False, methods=["get"])
+    def exportar(self, request):
+        """Descarga los registros filtrados en CSV (por defecto, en streaming) o XLSX"""
+        formato = request.query_params.get("formato", "csv")
+        if formato not in exportacion.FORMATOS:
+            return Response({"error": "Formato inválido (usar csv o xlsx)"}, status=400)
+        if formato == "xlsx" and not exportacion.xlsx_disponible():
+            return Response({"error": "La exportación a xlsx requiere openpyxl instalado"}, status=400)
+
+        queryset = self.filter_queryset(self.get_queryset())
+        mes = request.query_params.get("mes")
+        if mes and self.campo_mes:
+            try:
+                queryset = queryset.filter(**filtro_mes(self.campo_mes, mes))
+            except ValueError:
+                return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
+        queryset = queryset.order_by(*(getattr(self, "ordering", None) or ("pk",)))
+        # El CSV se genera después de que la vista devuelve la respuesta, cuando el estado de
+        # ruteo de la petición (`core.replicas`) ya no existe: se fija la base ahora
+        queryset = queryset.using(queryset.db)
+
+        nombre = f"{self.basename}-{timezone.now():%Y%m%d}"
+        if formato == "xlsx":
+            return exportacion.respuesta_xlsx(queryset, self.columnas_exportacion, nombre)
+        asincrono = isinstance(request._request, ASGIRequest)
+        return exportacion.respuesta_csv(queryset, self.columnas_exportacion, nombre, asincrono)
+
+
+class ImportacionMixin:
+    """
+    Agrega `POST <recurso>/importar/` para cargar un CSV (campo `archivo`) de una sola vez.
+
+    Las columnas son los campos de escritura del serializador de la vista (por ejemplo
+    `camion_id,tipo_gasto,monto,fecha`); `?separador=;` admite archivos exportados por Excel.
+    """
+    SEPARADORES = (",", ";", "\t")
+
+    @action(detail=False, methods=["post"])
+    def importar(self, request):
+        """Valida e inserta en bloque todas las filas del CSV, o ninguna si alguna tiene errores"""
+        archivo = request.FILES.get("archivo")
+        if archivo is None:
+            return Response({"error": "Se requiere un archivo CSV en el campo 'archivo'"}, status=400)
+        separador = request.query_params.get("separador", ",")
+        if separador not in self.SEPARADORES:
+            return Response({"error": "Separador inválido (usar ',', ';' o tabulación)"}, status=400)
+
+        try:
+            creadas, errores, cantidad_errores = lotes.importar_csv(archivo.file, self.get_serializer_class(), separador)
+        except UnicodeDecodeError:
+            return Response({"error": "El archivo debe estar codificado en UTF-8"}, status=400)
+
+        if cantidad_errores:
+            return Response({"creadas": 0, "rechazadas": cantidad_errores, "errores": errores}, status=400)
+        return Response({"creadas": creadas, "rechazadas": 0, "errores": []}, status=201)
+
+
+class LoteMixin:
+    """
+    Agrega `<recurso>/lote/` para crear, modificar o eliminar muchos objetos en una petición.
+
+    - `POST`: lista de objetos a crear (`bulk_create`).
+    - `PATCH`: lista de cambios parciales con su `id` (`bulk_update`), o
+      `{"ids": [...], "cambios": {...}}` para aplicar el mismo cambio a todos (`queryset.update`).
+    - `DELETE`: `{"ids": [...]}`.
+
+    Cada operación corre en una transacción y es todo o nada: si algún elemento falla
+    se responde 400 con los errores por índice y no se aplica ninguno.
+    """
+    maximo_lote = 1000
+
+    @action(detail=False, methods=["post", "patch", "delete"])
+    def lote(self, request):
+        """Operaciones masivas sobre el recurso (ver `LoteMixin`)"""
+        try:
+            return self._procesar_lote(request)
+        except IntegrityError:
+            # Por ejemplo un valor único que otra escritura concurrente tomó después de la validación
+            return Response({"error": "El lote viola una restricción de la base de datos; no se aplicó ningún cambio"}, status=400)
+
+    def _procesar_lote(self, request):
+        datos = request.data
+        contexto = self.get_serializer_context()
+        if request.method == "POST":
+            items = datos.get("objetos") if isinstance(datos, dict) else datos
+            if not self._lote_valido(items):
+                return self._error_lote("objetos")
+            procesados, errores = lotes.crear_en_lote(self.get_serializer_class(), items, contexto)
+            estado = 201
+        elif request.method == "PATCH" and isinstance(datos, dict):
+            if not self._lote_valido(datos.get("ids")) or not isinstance(datos.get("cambios"), dict):
+                return self._error_lote("ids", "y un objeto 'cambios'")
+            procesados, errores = lotes.actualizar_uniforme(
+                self.get_queryset(), self.get_serializer_class(), datos["ids"], datos["cambios"], contexto
+            )
+            estado = 200
+        elif request.method == "PATCH":
+            if not self._lote_valido(datos):
+                return self._error_lote("cambios")
+            procesados, errores = lotes.actualizar_en_lote(self.get_queryset(), self.get_serializer_class(), datos, contexto)
+            estado = 200
+        else:
+            ids = datos.get("ids") if isinstance(datos, dict) else None
+            if not self._lote_valido(ids):
+                return self._error_lote("ids")
+            procesados, errores = lotes.eliminar_en_lote(self.get_queryset(), ids)
+            estado = 200
+
+        if errores:
+            return Response({"procesados": 0, "errores": errores}, status=400)
+        return Response({
+            "procesados": len(procesados),
+            "resultados": [{"indice": indice, "id": objeto.pk} for indice, objeto in enumerate(procesados)],
+        }, status=estado)
+
+    def _lote_valido(self, items):
+        return isinstance(items, list) and 0 < len(items) <= self.maximo_lote
+
+    def _error_lote(self, nombre, extra=""):
+        mensaje = f"Se requiere una lista '{nombre}' de entre 1 y {self.maximo_lote} elementos {extra}".strip()
+        return Response({"error": mensaje}, status=400)
+
+
+class CambiosMixin:
+    """
+    Agrega `GET <recurso>/cambios/?desde=<cursor>` para sincronizar sin volver a descargar el listado.
+
+    Sin `desde` devuelve solo el cursor actual: el cliente lo guarda, descarga el listado
+    y desde ahí consulta únicamente los cambios. Cada respuesta trae:
+
+    - `cambios`: estado actual de los objetos creados o modificados (mismo formato que
+      el listado, admite `?fields=` y `?expand=`).
+    - `eliminados`: ids de los objetos borrados (lápidas).
+    - `cursor`: el valor de `desde` para la próxima consulta; si `hay_mas` es verdadero
+      conviene consultar de nuevo enseguida.
+
+    Si el cursor es anterior a los cambios conservados (ver `purgar_cambios`) se responde
+    410 y el cliente debe descargar el listado completo otra vez.
+    """
+    limite_cambios = 500
+
+    @action(detail=False, methods=["get"])
+    def cambios(self, request):
+        """Objetos creados, modificados y eliminados desde un cursor (ver `CambiosMixin`)"""
+        desde = request.query_params.get("desde")
+        if desde is None:
+            cursor = cambios.formatear_cursor(cambios.cursor_actual())
+            return Response({"cursor": cursor, "hay_mas": False, "cambios": [], "eliminados": []})
+        try:
+            desde = cambios.leer_cursor(desde)
+            limite = min(int(request.query_params.get("limite", self.limite_cambios)), self.limite_cambios)
+        except ValueError:
+            return Response({"error": "'desde' debe ser un cursor devuelto por el feed y 'limite' un número entero"}, status=400)
+        if limite < 1:
+            return Response({"error": "'limite' debe ser positivo"}, status=400)
+
+        try:
+            operaciones, cursor, hay_mas = cambios.leer(self.queryset.model, desde, limite)
+        except cambios.CursorVencido:
+            return Response({"error": "El cursor es demasiado viejo; volver a descargar el listado"}, status=410)
+
+        eliminados = [pk for pk, operacion in operaciones.items() if operacion == Cambio.ELIMINADO]
+        vigentes = [pk for pk, operacion in operaciones.items() if operacion != Cambio.ELIMINADO]
+        objetos = self.get_queryset().in_bulk(vigentes) if vigentes else {}
+        return Response({
+            "cursor": cambios.formatear_cursor(cursor),
+            "hay_mas": hay_mas,
+            "cambios": self.get_serializer([objetos[pk] for pk in vigentes if pk in objetos], many=True).data,
+            "eliminados": eliminados,
+        })
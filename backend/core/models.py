@@ -1,4 +1,9 @@
-from django.db import models
+from decimal import Decimal
+
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Cast
+from django.utils import timezone
 
 class Conductor(models.Model):
     nombre = models.CharField(max_length=100)
@@ -7,6 +12,12 @@ class Conductor(models.Model):
     telefono = models.CharField(max_length=20, blank=True, null=True)
     email = models.EmailField(unique=True, blank=True, null=True)
     fecha_contratacion = models.DateField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)  # Validador para GET condicionales (ETag / Last-Modified)
+
+    def save(self, *args, **kwargs):
+        # Atómico junto con el registro en el feed de cambios (señal post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.nombre} {self.apellido}"
@@ -19,6 +30,12 @@ class Camion(models.Model):
     año = models.IntegerField()
     informacion_adicional = models.TextField(blank=True, null=True)
     conductor = models.ForeignKey(Conductor, on_delete=models.SET_NULL, null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # Atómico junto con el registro en el feed de cambios (señal post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.marca} {self.modelo} ({self.placa})"
@@ -30,6 +47,12 @@ class Cliente(models.Model):
     telefono = models.CharField(max_length=20, blank=True, null=True)
     direccion = models.TextField(blank=True, null=True)
     fecha_registro = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # Atómico junto con el registro en el feed de cambios (señal post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return self.nombre
@@ -49,10 +72,21 @@ class Pedido(models.Model):
     estado = models.CharField(max_length=20, choices=ESTADOS, default="pendiente")
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_entrega = models.DateField(null=True, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # Atómico junto con el registro en el feed de cambios (señal post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Pedido {self.id} - {self.estado}"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado", "fecha_creacion"], name="pedido_estado_fecha_idx"),
+        ]
+
 # Gestión de Gastos para Camiones
 class GastoCamion(models.Model):
     TIPOS_GASTO = [
@@ -68,10 +102,21 @@ class GastoCamion(models.Model):
     monto = models.DecimalField(max_digits=10, decimal_places=2)
     fecha = models.DateField()
     comentarios = models.TextField(blank=True, null=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def save(self, *args, **kwargs):
+        # Atómico junto con el resumen mensual y el feed de cambios (señales post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"{self.get_tipo_gasto_display()} - ${self.monto} ({self.camion})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["camion", "fecha"], name="gasto_camion_fecha_idx"),
+        ]
+
 # Gestión de Sueldos de Empleados
 class SueldoEmpleado(models.Model):
     METODO_PAGO = [
@@ -83,33 +128,145 @@ class SueldoEmpleado(models.Model):
     empleado = models.ForeignKey(Conductor, on_delete=models.CASCADE, related_name="sueldos")
     periodo_sueldo = models.CharField(max_length=20, blank=True, null=True)
     salario_base = models.DecimalField(max_digits=10, decimal_places=2)
-    bonos = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    deducciones = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    horas_extras = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
-    adelanto = models.DecimalField(max_digits=10, decimal_places=2, default=0.00)
+    bonos = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    deducciones = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    horas_extras = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
+    adelanto = models.DecimalField(max_digits=10, decimal_places=2, default=Decimal("0.00"))
     total_neto = models.DecimalField(max_digits=10, decimal_places=2, editable=False)
     fecha_pago = models.DateField()
     metodo_pago = models.CharField(max_length=20, choices=METODO_PAGO, default="transferencia")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    # Campos que completa `calcular_campos_derivados` (las actualizaciones masivas los incluyen)
+    CAMPOS_DERIVADOS = ("total_neto",)
+
+    def calcular_campos_derivados(self):
+        """Calcula el total neto (también lo usan las inserciones masivas, que no pasan por save)"""
+        self.total_neto = (self.salario_base + self.bonos + self.horas_extras) - (self.deducciones + self.adelanto)
 
     def save(self, *args, **kwargs):
         """Calcula el total neto antes de guardar"""
-        self.total_neto = (self.salario_base + self.bonos + self.horas_extras) - (self.deducciones + self.adelanto)
-        super().save(*args, **kwargs)
+        self.calcular_campos_derivados()
+        # Atómico junto con el resumen mensual y el feed de cambios (señales post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Sueldo {self.empleado.nombre} {self.empleado.apellido} - ${self.total_neto} ({self.fecha_pago})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["fecha_pago"], name="sueldo_fecha_pago_idx"),
+        ]
+
+# Resúmenes mensuales de gastos y sueldos (mantenidos de forma incremental por core.resumenes)
+class ResumenGastoMensual(models.Model):
+    mes = models.DateField()  # Primer día del mes
+    camion = models.ForeignKey(Camion, on_delete=models.CASCADE, related_name="resumenes_gastos")
+    tipo_gasto = models.CharField(max_length=20, choices=GastoCamion.TIPOS_GASTO)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mes", "camion", "tipo_gasto"], name="resumen_gasto_mes_camion_tipo"),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} - {self.camion_id} - {self.tipo_gasto}: ${self.total}"
+
+class ResumenSueldoMensual(models.Model):
+    mes = models.DateField()  # Primer día del mes
+    empleado = models.ForeignKey(Conductor, on_delete=models.CASCADE, related_name="resumenes_sueldos")
+    metodo_pago = models.CharField(max_length=20, choices=SueldoEmpleado.METODO_PAGO)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    cantidad = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["mes", "empleado", "metodo_pago"], name="resumen_sueldo_mes_empleado_metodo"),
+        ]
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} - {self.empleado_id} - {self.metodo_pago}: ${self.total}"
+
 # Módulo de Rastreo GPS
 class Ubicacion(models.Model):
     camion = models.ForeignKey(Camion, on_delete=models.CASCADE, related_name="ubicaciones")
     latitud = models.FloatField()  # Latitud de la ubicación
     longitud = models.FloatField()  # Longitud de la ubicación
-    timestamp = models.DateTimeField(auto_now_add=True)  # Fecha y hora de la ubicación
+    timestamp = models.DateTimeField(default=timezone.now)  # Fecha y hora de la ubicación (informada por el GPS en lotes)
 
     def __str__(self):
         return f"{self.camion.placa} - ({self.latitud}, {self.longitud})"
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["camion", "timestamp"], name="ubicacion_camion_ts_idx"),
+        ]
+
+# Historial GPS archivado: los puntos de un camión en un día, empaquetados (ver core.archivo).
+# Reemplaza a las filas de `Ubicacion` más viejas que `UBICACIONES_ARCHIVO_DIAS`.
+class SegmentoUbicacion(models.Model):
+    camion = models.ForeignKey(Camion, on_delete=models.CASCADE, related_name="segmentos_ubicacion")
+    fecha = models.DateField()  # Día local de los puntos
+    inicio = models.DateTimeField()  # Primer punto del segmento
+    fin = models.DateTimeField()  # Último punto del segmento
+    cantidad = models.PositiveIntegerField()
+    datos = models.BinaryField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["camion", "fecha"], name="segmento_camion_fecha"),
+        ]
+        indexes = [
+            models.Index(fields=["fecha"], name="segmento_fecha_idx"),  # Lectura de toda la flota por período
+        ]
+
+    def __str__(self):
+        return f"{self.camion_id} - {self.fecha}: {self.cantidad} puntos"
+
+# Última posición conocida de cada camión (una fila por camión, actualizada en la ingesta GPS)
+class UltimaUbicacion(models.Model):
+    camion = models.OneToOneField(Camion, on_delete=models.CASCADE, primary_key=True, related_name="ultima_ubicacion")
+    ubicacion = models.ForeignKey(Ubicacion, on_delete=models.SET_NULL, null=True, blank=True, related_name="+")
+    latitud = models.FloatField()
+    longitud = models.FloatField()
+    timestamp = models.DateTimeField()
+    celda = models.BigIntegerField(default=0)  # Celda de la grilla espacial (ver core.espacial.celda)
+
+    def __str__(self):
+        return f"{self.camion_id} - ({self.latitud}, {self.longitud}) @ {self.timestamp}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["celda"], name="ultima_ubicacion_celda_idx"),  # Búsquedas por zona y cercanía
+        ]
+
+# Kilómetros recorridos por camión y día, derivados de `Ubicacion` (calculados por core.viajes)
+class DistanciaDiaria(models.Model):
+    camion = models.ForeignKey(Camion, on_delete=models.CASCADE, related_name="distancias_diarias")
+    fecha = models.DateField()  # Día local en que empieza cada tramo
+    distancia_km = models.FloatField(default=0)
+    viajes = models.PositiveIntegerField(default=0)
+    segundos_en_movimiento = models.PositiveIntegerField(default=0)
+    velocidad_maxima_kmh = models.FloatField(default=0)
+    puntos = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["camion", "fecha"], name="distancia_camion_fecha"),
+        ]
+        indexes = [
+            models.Index(fields=["fecha"], name="distancia_fecha_idx"),  # Totales de la flota por mes
+        ]
+
+    def __str__(self):
+        return f"{self.camion_id} - {self.fecha}: {self.distancia_km:.1f} km"
+
 # Módulo de Facturación
+_COSTO_HORAS_ESPERA = Cast("horas_espera", models.DecimalField(max_digits=12, decimal_places=4)) * F("precio_hora")
+
 class Factura(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name="facturas")
     pedido = models.ForeignKey(Pedido, on_delete=models.SET_NULL, null=True, blank=True, related_name="facturas")
@@ -121,21 +278,56 @@ class Factura(models.Model):
     precio_hora = models.DecimalField(max_digits=10, decimal_places=2)  # Precio por hora ($H)
     peajes = models.DecimalField(max_digits=10, decimal_places=2, default=0)  # Peajes
     importe_lista = models.DecimalField(max_digits=10, decimal_places=2)  # Importe de lista
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
 
-    # Campos calculados (opcional, si no necesitas almacenarlos en la base de datos)
-    @property
-    def final_h(self):
-        """Calcula el costo final por horas de espera."""
-        return self.horas_espera * self.precio_hora  # $Final H
+    # Campos calculados por la base de datos (columnas generadas y almacenadas), para poder
+    # filtrarlos y agregarlos con SQL (p. ej. Sum("importe_total") agrupado por mes)
+    final_h = models.GeneratedField(
+        expression=_COSTO_HORAS_ESPERA,
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
+    )  # $Final H
+    importe_total = models.GeneratedField(
+        expression=_COSTO_HORAS_ESPERA + F("peajes") + F("importe_lista"),
+        output_field=models.DecimalField(max_digits=14, decimal_places=2),
+        db_persist=True,
+    )  # Importe Total
 
-    @property
-    def importe_total(self):
-        """Calcula el importe total de la factura."""
-        return self.final_h + self.peajes + self.importe_lista  # Importe Total
+    def save(self, *args, **kwargs):
+        # Atómico junto con el registro en el feed de cambios (señal post_save)
+        with transaction.atomic():
+            super().save(*args, **kwargs)
 
     def __str__(self):
         return f"Factura {self.id} - {self.servicio}"
 
     class Meta:
         verbose_name = "Factura"
-        verbose_name_plural = "Facturas"
\ No newline at end of file
+        verbose_name_plural = "Facturas"
+        indexes = [
+            models.Index(fields=["cliente", "fecha"], name="factura_cliente_fecha_idx"),
+            models.Index(fields=["fecha"], name="factura_fecha_idx"),  # Reportes mensuales sin cliente
+        ]
+# Registro de cambios para sincronización incremental (`<recurso>/cambios/?desde=`).
+# El id es la secuencia global de cambios; las bajas quedan como "lápidas".
+class Cambio(models.Model):
+    CREADO = "creado"
+    ACTUALIZADO = "actualizado"
+    ELIMINADO = "eliminado"
+    OPERACIONES = [(CREADO, "Creado"), (ACTUALIZADO, "Actualizado"), (ELIMINADO, "Eliminado")]
+
+    id = models.BigAutoField(primary_key=True)
+    modelo = models.CharField(max_length=50)  # `_meta.label_lower`, p. ej. "core.camion"
+    objeto_id = models.BigIntegerField()
+    operacion = models.CharField(max_length=12, choices=OPERACIONES)
+    fecha = models.DateTimeField(default=timezone.now)
+    transaccion = models.BigIntegerField(default=0)  # `txid_current()` en PostgreSQL; el feed se ordena por (transaccion, id)
+
+    def __str__(self):
+        return f"{self.id}: {self.operacion} {self.modelo} {self.objeto_id}"
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["modelo", "transaccion", "id"], name="cambio_modelo_tx_id_idx"),  # Lectura del feed por recurso
+            models.Index(fields=["fecha"], name="cambio_fecha_idx"),  # Purga de cambios viejos
+        ]
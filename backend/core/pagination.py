@@ -0,0 +1,179 @@
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db import connections
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+def contar_estimado(queryset):
+    """
+    Cuenta aproximada de filas sin recorrer la tabla.
+
+    En PostgreSQL usa la estimación del planificador (`EXPLAIN`), que cuesta lo mismo
+    con mil o con cien millones de filas. En otros motores cae a un `COUNT(*)` exacto.
+    """
+    if connections[queryset.db].vendor != "postgresql":
+        return queryset.count()
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+def _valor(item, campo):
+    return item[campo] if isinstance(item, dict) else getattr(item, campo)
+
+
+# 🔹 Paginación por páginas para tablas chicas (camiones, conductores, clientes)
+class PaginacionPorPaginas(PageNumberPagination):
+    page_size = 50
+    page_size_query_param = "page_size"
+    max_page_size = 500
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if hasattr(queryset, "ordered") and not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        return super().paginate_queryset(queryset, request, view)
+
+
+# 🔹 Paginación por cursor (keyset) para tablas grandes
+class PaginacionKeyset(BasePagination):
+    """
+    Paginación por cursor sobre un orden compuesto, p. ej. `("-timestamp", "-id")`.
+
+    A diferencia de `CursorPagination` de DRF, el cursor guarda los valores de todas
+    las columnas del orden y la página se obtiene con una condición
+    `(fecha, id) < (x, y)`, así que cada página usa el índice y cuesta lo mismo sin
+    importar su profundidad. El orden se toma del atributo `ordering` de la vista.
+
+    El total es opcional: `?total=estimado` usa la estimación del planificador y
+    `?total=exacto` ejecuta un `COUNT(*)`.
+    """
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+    cursor_query_param = "cursor"
+    total_query_param = "total"
+    ordering = ("-id",)
+    invalid_cursor_message = "Cursor inválido"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.campos = [
+            (campo.lstrip("-"), campo.startswith("-"))
+            for campo in getattr(view, "ordering", None) or self.ordering
+        ]
+        if self.campos[-1][0] not in ("id", "pk"):
+            self.campos.append(("id", self.campos[0][1]))
+
+        self.total = None
+        tipo_total = request.query_params.get(self.total_query_param)
+        if tipo_total == "estimado":
+            self.total = contar_estimado(queryset)
+        elif tipo_total == "exacto":
+            self.total = queryset.count()
+        self.tipo_total = tipo_total
+
+        valores, reverso = self.decode_cursor(request, queryset.model)
+        campos = [(nombre, descendente != reverso) for nombre, descendente in self.campos]
+        queryset = queryset.order_by(*[f"-{nombre}" if desc else nombre for nombre, desc in campos])
+        if valores is not None:
+            queryset = queryset.filter(self._condicion(campos, valores))
+
+        resultados = list(queryset[:self.page_size + 1])
+        hay_mas = len(resultados) > self.page_size
+        resultados = resultados[:self.page_size]
+
+        if reverso:
+            resultados.reverse()
+            self.hay_siguiente, self.hay_anterior = valores is not None, hay_mas
+        else:
+            self.hay_siguiente, self.hay_anterior = hay_mas, valores is not None
+
+        self.primero = resultados[0] if resultados else None
+        self.ultimo = resultados[-1] if resultados else None
+        return resultados
+
+    def _condicion(self, campos, valores):
+        """Construye `(a, b) < (x, y)` como `a < x OR (a = x AND b < y)` respetando cada dirección"""
+        condicion = Q()
+        iguales = {}
+        for (nombre, descendente), valor in zip(campos, valores):
+            operador = "lt" if descendente else "gt"
+            condicion |= Q(**iguales, **{f"{nombre}__{operador}": valor})
+            iguales[nombre] = valor
+        return condicion
+
+    def get_page_size(self, request):
+        try:
+            tamano = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return max(1, min(tamano, self.max_page_size))
+
+    def decode_cursor(self, request, modelo):
+        cursor = request.query_params.get(self.cursor_query_param)
+        if not cursor:
+            return None, False
+        try:
+            datos = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8"))
+            if len(datos["v"]) != len(self.campos):
+                raise ValueError(cursor)
+            valores = [
+                modelo._meta.get_field(nombre).to_python(valor)
+                for (nombre, _), valor in zip(self.campos, datos["v"])
+            ]
+            return valores, bool(datos.get("r"))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, item, reverso):
+        valores = []
+        for nombre, _ in self.campos:
+            valor = _valor(item, nombre)
+            valores.append(valor.isoformat() if hasattr(valor, "isoformat") else valor)
+        datos = {"v": valores, "r": 1} if reverso else {"v": valores}
+        cursor = base64.urlsafe_b64encode(json.dumps(datos, default=str).encode("utf-8")).decode("ascii")
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        if not self.hay_siguiente or self.ultimo is None:
+            return None
+        return self.encode_cursor(self.ultimo, reverso=False)
+
+    def get_previous_link(self):
+        if not self.hay_anterior:
+            return None
+        if self.primero is None:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.primero, reverso=True)
+
+    def get_paginated_response(self, data):
+        respuesta = OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+        ])
+        if self.total is not None:
+            respuesta["count"] = self.total
+            respuesta["count_tipo"] = self.tipo_total
+        respuesta["results"] = data
+        return Response(respuesta)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {"type": "string", "nullable": True, "format": "uri"},
+                "count": {"type": "integer"},
+                "count_tipo": {"type": "string", "enum": ["estimado", "exacto"]},
+                "results": schema,
+            },
+        }
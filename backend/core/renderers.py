@@ -0,0 +1,43 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+from .instrumentacion import medir
+
+try:
+    import orjson
+except ImportError:  # orjson es opcional: sin él se usa el JSONRenderer de DRF
+    orjson = None
+
+_codificador = JSONEncoder()
+
+
+class JSONRapidoRenderer(JSONRenderer):
+    """
+    `JSONRenderer` que codifica con orjson, varias veces más rápido que el módulo `json`.
+
+    Los tipos que orjson no conoce (Decimal, datetime, lazy strings, ...) pasan por el
+    codificador de DRF, así que la salida es la misma que con el renderer estándar.
+    Con `indent` (API navegable) o sin orjson instalado se usa el renderer de DRF.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with medir("serializacion"):
+            return self._render(data, accepted_media_type, renderer_context)
+
+    def _render(self, data, accepted_media_type, renderer_context):
+        if orjson is None or self.get_indent(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b""
+        try:
+            contenido = orjson.dumps(
+                data,
+                default=_codificador.default,
+                option=orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS,
+            )
+        except TypeError:  # p. ej. enteros de más de 64 bits
+            return super().render(data, accepted_media_type, renderer_context)
+        # Igual que DRF: escapar separadores de línea Unicode, válidos en JSON pero no en JavaScript
+        if b"\xe2\x80\xa8" in contenido or b"\xe2\x80\xa9" in contenido:
+            contenido = contenido.replace(b"\xe2\x80\xa8", b"\\u2028").replace(b"\xe2\x80\xa9", b"\\u2029")
+        return contenido
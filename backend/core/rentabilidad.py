@@ -0,0 +1,102 @@
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Camion, Factura, GastoCamion, ResumenGastoMensual, ResumenSueldoMensual
+
+TIPOS_GASTO = [codigo for codigo, _ in GastoCamion.TIPOS_GASTO]
+
+_CERO = Decimal("0.00")
+
+
+def _filtro(campo, desde, hasta):
+    filtro = {}
+    if desde is not None:
+        filtro[f"{campo}__gte"] = desde
+    if hasta is not None:
+        filtro[f"{campo}__lt"] = hasta
+    return filtro
+
+
+def rentabilidad_por_camion(desde=None, hasta=None, camion_ids=None):
+    """
+    Matriz camión × mes de ingresos, gastos por tipo, sueldos y resultado.
+
+    `desde` y `hasta` son fechas (rango semiabierto `[desde, hasta)`, normalmente
+    primeros de mes). Son cuatro consultas, sin importar cuántos camiones o meses
+    abarque el período:
+
+    - gastos: resumen mensual de gastos (`ResumenGastoMensual`) con un `Sum` condicional por tipo;
+    - sueldos: resumen mensual de sueldos del conductor asignado al camión; si un
+      conductor tiene varios camiones su sueldo se reparte en partes iguales;
+    - ingresos: `Factura.importe_total` por mes, a través de `Pedido.camion`;
+    - los camiones (placa, conductor asignado y cuántos camiones tiene ese conductor).
+
+    Devuelve filas `{camion_id, placa, mes, ingresos, facturas, gastos, total_gastos,
+    sueldos, resultado}` ordenadas por camión y mes, solo para los meses con movimientos.
+    """
+    # Cuántos camiones tiene asignados cada conductor, contando los que quedan fuera del filtro
+    asignados = Camion.objects.filter(conductor_id=OuterRef("conductor_id")).values("conductor_id").annotate(
+        cantidad=Count("id")
+    ).values("cantidad")
+    camiones = Camion.objects.order_by("id")
+    if camion_ids is not None:
+        camiones = camiones.filter(id__in=camion_ids)
+    camiones = list(camiones.values("id", "placa", "conductor_id", asignados=Subquery(asignados)))
+
+    camiones_por_conductor = defaultdict(list)
+    cantidades = {}
+    for camion in camiones:
+        if camion["conductor_id"] is not None:
+            camiones_por_conductor[camion["conductor_id"]].append(camion["id"])
+            cantidades[camion["conductor_id"]] = camion["asignados"]
+
+    celdas = defaultdict(lambda: {
+        "ingresos": _CERO, "facturas": 0, "gastos": dict.fromkeys(TIPOS_GASTO, _CERO), "sueldos": _CERO,
+    })
+    # Sin filtro de camiones no se arma un IN con toda la flota
+    por_camion = {} if camion_ids is None else {"camion_id__in": [camion["id"] for camion in camiones]}
+
+    gastos = ResumenGastoMensual.objects.filter(**por_camion, **_filtro("mes", desde, hasta)).values(
+        "camion_id", "mes"
+    ).annotate(**{
+        tipo: Sum("total", filter=Q(tipo_gasto=tipo), default=_CERO) for tipo in TIPOS_GASTO
+    }).order_by()
+    for fila in gastos:
+        celdas[(fila["camion_id"], fila["mes"])]["gastos"] = {tipo: fila[tipo] for tipo in TIPOS_GASTO}
+
+    sueldos = ResumenSueldoMensual.objects.filter(
+        empleado_id__in=camiones_por_conductor, **_filtro("mes", desde, hasta)
+    ).values("empleado_id", "mes").annotate(total=Sum("total")).order_by()
+    for fila in sueldos:
+        parte = (fila["total"] / cantidades[fila["empleado_id"]]).quantize(_CERO)
+        for camion_id in camiones_por_conductor[fila["empleado_id"]]:
+            celdas[(camion_id, fila["mes"])]["sueldos"] += parte
+
+    ingresos = Factura.objects.filter(
+        pedido__camion__isnull=False, **{f"pedido__{campo}": valor for campo, valor in por_camion.items()},
+        **_filtro("fecha", desde, hasta)
+    ).annotate(
+        mes=TruncMonth("fecha")
+    ).values("mes", camion_id=F("pedido__camion_id")).annotate(
+        ingresos=Sum("importe_total"), facturas=Count("id")
+    ).order_by()
+    for fila in ingresos:
+        celda = celdas[(fila["camion_id"], fila["mes"])]
+        celda["ingresos"], celda["facturas"] = fila["ingresos"], fila["facturas"]
+
+    placas = {camion["id"]: camion["placa"] for camion in camiones}
+    filas = []
+    for (camion_id, mes), celda in sorted(celdas.items()):
+        total_gastos = sum(celda["gastos"].values(), _CERO)
+        filas.append({
+            "camion_id": camion_id,
+            "placa": placas[camion_id],
+            "mes": f"{mes:%Y-%m}",
+            **celda,
+            "total_gastos": total_gastos,
+            "resultado": celda["ingresos"] - total_gastos - celda["sueldos"],
+        })
+    return filas
@@ -0,0 +1,112 @@
+import random
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+# Segundos que una réplica que no respondió queda fuera de la rotación
+PAUSA_REPLICA_CAIDA = 30
+
+
+class _Estado:
+    """Decisiones de ruteo de una petición (un objeto mutable: lo comparten los hilos de `sync_to_async`)"""
+
+    def __init__(self):
+        self.lectura_en_replica = False
+        self.escribio = False
+        self.alias = None
+
+
+_estado = ContextVar("estado_replicas", default=None)
+
+# alias -> momento (time.monotonic) hasta el que no se usa
+_caidas = {}
+
+
+def replicas():
+    """Alias de las réplicas configuradas (`DATABASE_REPLICAS`)"""
+    return getattr(settings, "DATABASE_REPLICAS", [])
+
+
+@contextmanager
+def contexto():
+    """Estado de ruteo nuevo: una petición (ver `ReplicasMiddleware`) o una tarea de fondo"""
+    token = _estado.set(_Estado())
+    try:
+        yield
+    finally:
+        _estado.reset(token)
+
+
+def leer_de_replica():
+    """Manda a una réplica las lecturas que siguen en el contexto actual, hasta la primera escritura"""
+    estado = _estado.get()
+    if estado is not None:
+        estado.lectura_en_replica = True
+
+
+def _disponible(alias):
+    if _caidas.get(alias, 0) > time.monotonic():
+        return False
+    conexion = connections[alias]
+    try:
+        # Reutiliza la conexión persistente (CONN_MAX_AGE); CONN_HEALTH_CHECKS descarta las cortadas
+        conexion.close_if_health_check_failed()
+        conexion.ensure_connection()
+    except OperationalError:
+        _caidas[alias] = time.monotonic() + PAUSA_REPLICA_CAIDA
+        return False
+    return True
+
+
+def _elegir(estado):
+    # Una sola réplica por petición, para que todas sus lecturas vean el mismo estado
+    if estado.alias is None:
+        candidatas = replicas()[:]
+        random.shuffle(candidatas)
+        estado.alias = next((alias for alias in candidatas if _disponible(alias)), DEFAULT_DB_ALIAS)
+    return estado.alias
+
+
+class RouterReplicas:
+    """
+    Envía a una réplica las lecturas marcadas con `leer_de_replica` (reportes y listados).
+
+    Todo lo demás va a `default`. Después de la primera escritura (o `select_for_update`)
+    de la petición, y dentro de una transacción, las lecturas vuelven a `default`
+    para que la petición vea lo que acaba de escribir. Si ninguna réplica responde
+    se lee de `default`.
+    """
+
+    def db_for_read(self, model, **hints):
+        estado = _estado.get()
+        if estado is None or not estado.lectura_en_replica or estado.escribio or not replicas():
+            return None
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        return _elegir(estado)
+
+    def db_for_write(self, model, **hints):
+        estado = _estado.get()
+        if estado is not None:
+            estado.escribio = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # Las réplicas tienen los mismos datos que `default`
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicasMiddleware:
+    """Da a cada petición su propio estado de ruteo (ver `RouterReplicas`)"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with contexto():
+            return self.get_response(request)
@@ -0,0 +1,119 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import GastoCamion, SueldoEmpleado, ResumenGastoMensual, ResumenSueldoMensual
+
+# Cómo se resume cada modelo: tabla de resumen, campo de fecha, dimensiones y campo sumado
+DefinicionResumen = namedtuple("DefinicionResumen", ["resumen", "fecha", "dimensiones", "monto"])
+
+RESUMENES = {
+    GastoCamion: DefinicionResumen(ResumenGastoMensual, "fecha", ("camion_id", "tipo_gasto"), "monto"),
+    SueldoEmpleado: DefinicionResumen(ResumenSueldoMensual, "fecha_pago", ("empleado_id", "metodo_pago"), "total_neto"),
+}
+
+
+def _valor(objeto, campo):
+    return objeto[campo] if isinstance(objeto, dict) else getattr(objeto, campo)
+
+
+def _normalizado(modelo, objeto, campo):
+    # Un objeto recién creado conserva lo que se le asignó (p. ej. `fecha="2024-01-05"`)
+    return modelo._meta.get_field(campo).to_python(_valor(objeto, campo))
+
+
+def _clave(modelo, definicion, objeto):
+    mes = _normalizado(modelo, objeto, definicion.fecha).replace(day=1)
+    return (mes, *(_normalizado(modelo, objeto, dimension) for dimension in definicion.dimensiones))
+
+
+def _monto(definicion, objeto):
+    return Decimal(str(_valor(objeto, definicion.monto) or 0))
+
+
+def campos_resumidos(modelo):
+    """Campos del modelo que afectan a su resumen (para tomar una foto antes de modificarlo)"""
+    definicion = RESUMENES[modelo]
+    return ["pk", definicion.fecha, *definicion.dimensiones, definicion.monto]
+
+
+def registrar_cambios(modelo, creados=(), actualizados=(), eliminados=()):
+    """
+    Aplica al resumen mensual los cambios de un lote de objetos.
+
+    `creados` y `eliminados` son instancias (o dicts con los campos resumidos);
+    `actualizados` son pares `(anterior, actual)`. Los cambios se agrupan por clave
+    (mes + dimensiones) antes de tocar la base, así que el costo depende de la
+    cantidad de claves distintas y no de la cantidad de objetos.
+    """
+    definicion = RESUMENES[modelo]
+    deltas = defaultdict(lambda: [Decimal(0), 0])
+
+    def acumular(objeto, signo):
+        delta = deltas[_clave(modelo, definicion, objeto)]
+        delta[0] += signo * _monto(definicion, objeto)
+        delta[1] += signo
+
+    for objeto in creados:
+        acumular(objeto, 1)
+    for objeto in eliminados:
+        acumular(objeto, -1)
+    for anterior, actual in actualizados:
+        acumular(anterior, -1)
+        acumular(actual, 1)
+
+    deltas = {clave: delta for clave, delta in deltas.items() if delta[0] or delta[1]}
+    if deltas:
+        _aplicar(definicion, deltas)
+
+
+def _aplicar(definicion, deltas):
+    """
+    Suma los deltas a las filas del resumen con un número fijo de consultas.
+
+    Las filas se insertan y bloquean en el orden de la clave, igual en todas las
+    transacciones, para que dos escrituras concurrentes no se bloqueen mutuamente.
+    """
+    Resumen = definicion.resumen
+    campos = ("mes", *definicion.dimensiones)
+
+    with transaction.atomic():
+        # Crear (en cero) las filas que falten; las existentes se ignoran sin conflicto
+        Resumen.objects.bulk_create([
+            Resumen(**dict(zip(campos, clave)))
+            for clave, (_, cantidad) in sorted(deltas.items()) if cantidad >= 0
+        ], ignore_conflicts=True)
+
+        filtros = {f"{campo}__in": {clave[i] for clave in deltas} for i, campo in enumerate(campos)}
+        modificadas, vacias = [], []
+        for fila in Resumen.objects.select_for_update().filter(**filtros).order_by(*campos):
+            delta = deltas.get(tuple(getattr(fila, campo) for campo in campos))
+            if delta is None:
+                continue
+            fila.total += delta[0]
+            fila.cantidad += delta[1]
+            (vacias if fila.cantidad <= 0 else modificadas).append(fila)
+
+        if modificadas:
+            Resumen.objects.bulk_update(modificadas, ["total", "cantidad"])
+        if vacias:
+            Resumen.objects.filter(pk__in=[fila.pk for fila in vacias]).delete()
+
+
+def reconstruir(modelo):
+    """Recalcula desde cero el resumen mensual de un modelo con una consulta agrupada"""
+    definicion = RESUMENES[modelo]
+    Resumen = definicion.resumen
+    filas = (
+        modelo.objects.annotate(mes=TruncMonth(definicion.fecha))
+        .values("mes", *definicion.dimensiones)
+        .annotate(total=Sum(definicion.monto), cantidad=Count("pk"))
+        .order_by()
+    )
+    with transaction.atomic():
+        Resumen.objects.all().delete()
+        creadas = Resumen.objects.bulk_create((Resumen(**fila) for fila in filas.iterator()), batch_size=1000)
+    return len(creadas)
@@ -1,7 +1,91 @@
 from rest_framework import serializers
 from django.contrib.auth.models import User
 from .models import Camion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Ubicacion, Factura
-from decimal import Decimal  # Importar Decimal para manejar cálculos precisos
+
+
+def _lista_parametro(valor):
+    return [parte.strip() for parte in valor.split(",") if parte.strip()] if valor else []
+
+
+def _subrutas(rutas, nombre):
+    """De `["pedido.camion", "pedido.cliente", "cliente"]` y `"pedido"` devuelve `["camion", "cliente"]`"""
+    prefijo = f"{nombre}."
+    return [ruta[len(prefijo):] for ruta in rutas if ruta.startswith(prefijo)]
+
+
+class RelacionPrecargadaField(serializers.PrimaryKeyRelatedField):
+    """
+    `PrimaryKeyRelatedField` que, si el contexto trae `precargados`, busca el objeto ahí.
+
+    `precargados` es un dict `{modelo: {pk: instancia}}` (ver `core.lotes.precargar`), así
+    validar un lote de N filas cuesta una consulta por modelo relacionado en lugar de N.
+    Sin ese contexto se comporta como el campo original.
+    """
+
+    def to_internal_value(self, data):
+        precargados = self.context.get("precargados")
+        if precargados is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = int(data)
+        except (TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        objeto = precargados.get(self.queryset.model, {}).get(pk)
+        if objeto is None:
+            self.fail("does_not_exist", pk_value=data)
+        return objeto
+
+
+# 🔹 Serializador base con campos a pedido (?fields=) y relaciones expandibles (?expand=)
+class CamposDinamicosSerializer(serializers.ModelSerializer):
+    """
+    Las relaciones se devuelven como ids planos (`camion_id`) y se anidan solo si se piden.
+
+    `expandibles` indica qué serializador usar para cada relación; `?expand=pedido.camion`
+    anida también niveles internos. `?fields=id,fecha,pedido.estado` limita los campos
+    devueltos (las rutas con punto aplican a los anidados). Los parámetros se leen de la
+    petición solo en GET/HEAD; desde código se pasan como `fields=` y `expand=`.
+    """
+    expandibles = {}
+
+    def __init__(self, *args, fields=None, expand=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is None and expand is None:
+            fields, expand = self.parametros(self.context.get("request"))
+        expand = expand or []
+
+        pedidas = {ruta.split(".")[0] for ruta in expand}
+        for nombre, serializer_class in self.expandibles.items():
+            if nombre in pedidas:
+                self.fields[nombre] = serializer_class(
+                    read_only=True, expand=_subrutas(expand, nombre), fields=_subrutas(fields or [], nombre) or None
+                )
+
+        if fields:
+            permitidos = {ruta.split(".")[0] for ruta in fields}
+            for nombre in list(self.fields):
+                if nombre not in permitidos:
+                    self.fields.pop(nombre)
+
+    @staticmethod
+    def parametros(request):
+        """`(fields, expand)` pedidos en la query string, o `(None, [])` si no corresponde leerlos"""
+        if request is None or request.method not in ("GET", "HEAD"):
+            return None, []
+        return _lista_parametro(request.query_params.get("fields")) or None, _lista_parametro(request.query_params.get("expand"))
+
+    @classmethod
+    def relaciones_expandidas(cls, expand):
+        """Rutas de `select_related` que necesita la expansión pedida (una consulta, sin N+1)"""
+        rutas = []
+        pedidas = {ruta.split(".")[0] for ruta in expand}
+        for nombre, serializer_class in cls.expandibles.items():
+            if nombre in pedidas:
+                rutas.append(nombre)
+                rutas += [f"{nombre}__{ruta}" for ruta in serializer_class.relaciones_expandidas(_subrutas(expand, nombre))]
+        return rutas
 
 # 🔹 Serializador de Usuarios
 class UserSerializer(serializers.ModelSerializer):
@@ -10,103 +94,142 @@ class UserSerializer(serializers.ModelSerializer):
         fields = ["id", "username", "first_name", "last_name", "email"]
 
 # 🔹 Serializador de Conductores
-class ConductorSerializer(serializers.ModelSerializer):
+class ConductorSerializer(CamposDinamicosSerializer):
     class Meta:
         model = Conductor
         fields = ["id", "nombre", "apellido", "licencia", "telefono", "email", "fecha_contratacion"]
 
 # 🔹 Serializador de Camiones
-class CamionSerializer(serializers.ModelSerializer):
-    conductor = ConductorSerializer(read_only=True)
-    conductor_id = serializers.PrimaryKeyRelatedField(
-        queryset=Conductor.objects.all(), source="conductor", write_only=True, required=False
+class CamionSerializer(CamposDinamicosSerializer):
+    conductor_id = RelacionPrecargadaField(
+        queryset=Conductor.objects.all(), source="conductor", required=False
     )
+    expandibles = {"conductor": ConductorSerializer}
 
     class Meta:
         model = Camion
-        fields = ["id", "marca", "modelo", "placa", "capacidad", "año", "informacion_adicional", "conductor", "conductor_id"]
+        fields = ["id", "marca", "modelo", "placa", "capacidad", "año", "informacion_adicional", "conductor_id"]
 
 # 🔹 Serializador de Clientes
-class ClienteSerializer(serializers.ModelSerializer):
+class ClienteSerializer(CamposDinamicosSerializer):
     class Meta:
         model = Cliente
         fields = ["id", "nombre", "empresa", "email", "telefono", "direccion", "fecha_registro"]
         extra_kwargs = {"email": {"required": False}}
 
 # 🔹 Serializador de Pedidos
-class PedidoSerializer(serializers.ModelSerializer):
-    cliente = ClienteSerializer(read_only=True)
-    cliente_id = serializers.PrimaryKeyRelatedField(queryset=Cliente.objects.all(), source="cliente", write_only=True, required=False)
-
-    camion = CamionSerializer(read_only=True)
-    camion_id = serializers.PrimaryKeyRelatedField(queryset=Camion.objects.all(), source="camion", write_only=True, required=False)
-
-    conductor = ConductorSerializer(read_only=True)
-    conductor_id = serializers.PrimaryKeyRelatedField(queryset=Conductor.objects.all(), source="conductor", write_only=True, required=False)
+class PedidoSerializer(CamposDinamicosSerializer):
+    cliente_id = RelacionPrecargadaField(queryset=Cliente.objects.all(), source="cliente", required=False)
+    camion_id = RelacionPrecargadaField(queryset=Camion.objects.all(), source="camion", required=False)
+    conductor_id = RelacionPrecargadaField(queryset=Conductor.objects.all(), source="conductor", required=False)
+    expandibles = {"cliente": ClienteSerializer, "camion": CamionSerializer, "conductor": ConductorSerializer}
 
     class Meta:
         model = Pedido
         fields = [
-            "id", "cliente", "cliente_id", "camion", "camion_id", "conductor", "conductor_id",
+            "id", "cliente_id", "camion_id", "conductor_id",
             "descripcion", "estado", "fecha_creacion", "fecha_entrega"
         ]
 
 # 🔹 Serializador de Gastos de Camiones
-class GastoCamionSerializer(serializers.ModelSerializer):
-    camion = CamionSerializer(read_only=True)
-    camion_id = serializers.PrimaryKeyRelatedField(queryset=Camion.objects.all(), source="camion", write_only=True)
+class GastoCamionSerializer(CamposDinamicosSerializer):
+    camion_id = RelacionPrecargadaField(queryset=Camion.objects.all(), source="camion")
+    expandibles = {"camion": CamionSerializer}
 
     class Meta:
         model = GastoCamion
-        fields = ["id", "camion", "camion_id", "tipo_gasto", "monto", "fecha", "comentarios"]
+        fields = ["id", "camion_id", "tipo_gasto", "monto", "fecha", "comentarios"]
 
 # 🔹 Serializador de Sueldos de Empleados
-class SueldoEmpleadoSerializer(serializers.ModelSerializer):
-    empleado = ConductorSerializer(read_only=True)  # Muestra datos completos del empleado
-    empleado_id = serializers.PrimaryKeyRelatedField(queryset=Conductor.objects.all(), source="empleado", write_only=True)
+class SueldoEmpleadoSerializer(CamposDinamicosSerializer):
+    empleado_id = RelacionPrecargadaField(queryset=Conductor.objects.all(), source="empleado")
+    expandibles = {"empleado": ConductorSerializer}  # ?expand=empleado muestra los datos completos del empleado
 
     class Meta:
         model = SueldoEmpleado
         fields = [
-            "id", "empleado", "empleado_id", "periodo_sueldo", "salario_base", "bonos", "deducciones",
+            "id", "empleado_id", "periodo_sueldo", "salario_base", "bonos", "deducciones",
             "horas_extras", "adelanto", "total_neto", "fecha_pago", "metodo_pago"
         ]
         read_only_fields = ["total_neto"]  # No permitir modificación manual del total neto
 
 # 🔹 Serializador de Ubicaciones
-class UbicacionSerializer(serializers.ModelSerializer):
-    camion = CamionSerializer(read_only=True)  # Muestra datos completos del camión
-    camion_id = serializers.PrimaryKeyRelatedField(queryset=Camion.objects.all(), source="camion", write_only=True)
+class UbicacionSerializer(CamposDinamicosSerializer):
+    camion_id = RelacionPrecargadaField(queryset=Camion.objects.all(), source="camion")
+    expandibles = {"camion": CamionSerializer}  # ?expand=camion muestra los datos completos del camión
 
     class Meta:
         model = Ubicacion
-        fields = ["id", "camion", "camion_id", "latitud", "longitud", "timestamp"]
+        fields = ["id", "camion_id", "latitud", "longitud", "timestamp"]
+        read_only_fields = ["timestamp"]
+
+# 🔹 Serializador de un punto dentro de un lote de ubicaciones (ingesta GPS masiva)
+class UbicacionLoteSerializer(serializers.Serializer):
+    # El camión se valida por conjunto en `core.ingesta`, no con una consulta por punto
+    camion_id = serializers.IntegerField(min_value=1)
+    latitud = serializers.FloatField(min_value=-90, max_value=90)
+    longitud = serializers.FloatField(min_value=-180, max_value=180)
+    timestamp = serializers.DateTimeField(required=False)
+
+# 🔹 Serializador de la posición actual de cada camión (mapa de la flota)
+class PosicionFlotaSerializer(serializers.Serializer):
+    camion_id = serializers.IntegerField()
+    placa = serializers.CharField()
+    marca = serializers.CharField()
+    modelo = serializers.CharField()
+    latitud = serializers.FloatField(allow_null=True)
+    longitud = serializers.FloatField(allow_null=True)
+    timestamp = serializers.DateTimeField(allow_null=True)
+    conductor_id = serializers.IntegerField(allow_null=True)
+    conductor_nombre = serializers.CharField(allow_null=True)
+    conductor_apellido = serializers.CharField(allow_null=True)
+    pedido_activo_id = serializers.IntegerField(allow_null=True)
+    pedido_activo_descripcion = serializers.CharField(allow_null=True)
+
+# 🔹 Serializador de posiciones encontradas por zona o cercanía (de la tabla de últimas ubicaciones)
+class PosicionCercanaSerializer(serializers.Serializer):
+    camion_id = serializers.IntegerField()
+    placa = serializers.CharField()
+    latitud = serializers.FloatField()
+    longitud = serializers.FloatField()
+    timestamp = serializers.DateTimeField()
+    distancia_km = serializers.FloatField(required=False)  # Solo en búsquedas por cercanía
+
+# 🔹 Serializador de Distancias recorridas
+class DistanciaSerializer(serializers.Serializer):
+    periodo = serializers.DateField()  # Día, o primer día del mes al agrupar por mes
+    distancia_km = serializers.FloatField()
+    viajes = serializers.IntegerField()
+    segundos_en_movimiento = serializers.IntegerField()
+    velocidad_maxima_kmh = serializers.FloatField()
+
+class DistanciaFlotaSerializer(serializers.Serializer):
+    camion_id = serializers.IntegerField()
+    placa = serializers.CharField()
+    distancia_km = serializers.FloatField()
+    viajes = serializers.IntegerField()
+    segundos_en_movimiento = serializers.IntegerField()
+    velocidad_maxima_kmh = serializers.FloatField()
 
 # 🔹 Serializador de Facturas
-class FacturaSerializer(serializers.ModelSerializer):
+class FacturaSerializer(CamposDinamicosSerializer):
  
-    cliente = ClienteSerializer(read_only=True)
-    cliente_id = serializers.PrimaryKeyRelatedField(
-        queryset=Cliente.objects.all(), source="cliente", write_only=True
+    cliente_id = RelacionPrecargadaField(
+        queryset=Cliente.objects.all(), source="cliente"
     )
-
-    pedido = PedidoSerializer(read_only=True)
-    pedido_id = serializers.PrimaryKeyRelatedField(
-        queryset=Pedido.objects.all(), source="pedido", write_only=True, required=False
+    pedido_id = RelacionPrecargadaField(
+        queryset=Pedido.objects.all(), source="pedido", required=False
     )
-
-    # Campos calculados
-    final_h = serializers.SerializerMethodField()
-    importe_total = serializers.SerializerMethodField()
+    expandibles = {"cliente": ClienteSerializer, "pedido": PedidoSerializer}
 
     class Meta:
         model = Factura
         fields = [
-            'id', 'cliente', 'cliente_id', 'pedido', 'pedido_id', 'fecha', 'servicio',
+            'id', 'cliente_id', 'pedido_id', 'fecha', 'servicio',
             'origen', 'destino', 'horas_espera', 'precio_hora', 'peajes',
             'importe_lista', 'final_h', 'importe_total',
         ]
-        read_only_fields = ['final_h', 'importe_total']  # Evita que el backend intente guardarlos
+        read_only_fields = ['final_h', 'importe_total']  # Columnas generadas: las calcula la base de datos
 
     def validate(self, data):
         """Validaciones personalizadas."""
@@ -118,18 +241,11 @@ class FacturaSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El importe de lista no puede ser negativo.")
         return data
 
-    def get_final_h(self, obj):
-        """Calcula el costo final por horas de espera."""
-        horas = Decimal(obj.horas_espera) if obj.horas_espera else Decimal(0)
-        precio = Decimal(obj.precio_hora) if obj.precio_hora else Decimal(0)
-        return horas * precio
-
-    def get_importe_total(self, obj):
-        """Calcula el importe total de la factura."""
-        final_h = self.get_final_h(obj)
-        peajes = Decimal(obj.peajes) if obj.peajes else Decimal(0)
-        importe_lista = Decimal(obj.importe_lista) if obj.importe_lista else Decimal(0)
-        return final_h + peajes + importe_lista
+    def update(self, instance, validated_data):
+        instance = super().update(instance, validated_data)
+        # Las columnas generadas se recalculan en la base: recargarlas para la respuesta
+        instance.refresh_from_db(fields=["final_h", "importe_total"])
+        return instance
 
 # 🔹 Serializador estadisticas
 class ResumenGeneralSerializer(serializers.Serializer):
@@ -147,4 +263,17 @@ class GastosPorTipoSerializer(serializers.Serializer):
 
 class SueldosPorMesSerializer(serializers.Serializer):
     periodo_sueldo = serializers.CharField()
-    total_sueldos = serializers.DecimalField(max_digits=10, decimal_places=2)
\ No newline at end of file
+    total_sueldos = serializers.DecimalField(max_digits=10, decimal_places=2)
+
+
+# 🔹 Serializador rentabilidad
+class RentabilidadCamionSerializer(serializers.Serializer):
+    camion_id = serializers.IntegerField()
+    placa = serializers.CharField()
+    mes = serializers.CharField()
+    ingresos = serializers.DecimalField(max_digits=14, decimal_places=2)
+    facturas = serializers.IntegerField()
+    gastos = serializers.DictField(child=serializers.DecimalField(max_digits=14, decimal_places=2))
+    total_gastos = serializers.DecimalField(max_digits=14, decimal_places=2)
+    sueldos = serializers.DecimalField(max_digits=14, decimal_places=2)
+    resultado = serializers.DecimalField(max_digits=14, decimal_places=2)
@@ -0,0 +1,154 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import Signal, receiver
+from django.utils import timezone
+
+from . import autenticacion, cambios, resumenes
+from .models import Cambio, Camion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Factura
+from .versiones import incrementar_version
+
+# Se envía después de escrituras masivas (bulk_create, bulk_update, queryset.update, o borrados
+# hechos dentro de `en_lote`), que no disparan las señales por objeto. Argumentos: `creados` (instancias),
+# `actualizados` (pares anterior/actual) y `eliminados` (instancias o dicts con sus valores).
+cambios_en_lote = Signal()
+
+# Modelos cuyas señales por objeto se ignoran mientras se procesa un lote (ver `en_lote`)
+_modelos_en_lote = ContextVar("modelos_en_lote", default=frozenset())
+
+MODELOS_RESUMIDOS = (GastoCamion, SueldoEmpleado)
+
+# Modelos con versión de escritura: invalida el dashboard de métricas cacheado y los ETag de los listados
+MODELOS_VERSIONADOS = (Camion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Factura)
+
+# Modelos cuyas altas, cambios y bajas se registran en el feed de cambios (`Cambio`)
+MODELOS_SINCRONIZADOS = MODELOS_VERSIONADOS
+
+
+@contextmanager
+def en_lote(modelo):
+    """
+    Silencia las señales por objeto de `modelo` (p. ej. las que envía `queryset.delete()`).
+
+    Quien lo usa debe enviar `cambios_en_lote` al terminar, así los resúmenes y las
+    versiones se actualizan una sola vez por lote. Los modelos borrados en cascada
+    siguen procesándose por objeto.
+    """
+    token = _modelos_en_lote.set(_modelos_en_lote.get() | {modelo})
+    try:
+        yield
+    finally:
+        _modelos_en_lote.reset(token)
+
+
+def _por_objeto(sender, modelos):
+    return sender in modelos and sender not in _modelos_en_lote.get()
+
+
+@receiver(pre_save)
+def guardar_valores_anteriores(sender, instance, raw=False, **kwargs):
+    """Toma una foto de los campos resumidos antes de modificar un gasto o sueldo existente"""
+    if not _por_objeto(sender, MODELOS_RESUMIDOS) or raw or instance._state.adding or instance.pk is None:
+        return
+    instance._valores_resumen_anteriores = (
+        sender.objects.filter(pk=instance.pk).values(*resumenes.campos_resumidos(sender)).first()
+    )
+
+
+@receiver(post_save)
+def actualizar_resumen_al_guardar(sender, instance, created, raw=False, **kwargs):
+    if not _por_objeto(sender, MODELOS_RESUMIDOS) or raw:
+        return
+    anterior = getattr(instance, "_valores_resumen_anteriores", None)
+    instance._valores_resumen_anteriores = None
+    if created or anterior is None:
+        resumenes.registrar_cambios(sender, creados=[instance])
+    else:
+        resumenes.registrar_cambios(sender, actualizados=[(anterior, instance)])
+
+
+@receiver(post_delete)
+def actualizar_resumen_al_eliminar(sender, instance, **kwargs):
+    if _por_objeto(sender, MODELOS_RESUMIDOS):
+        resumenes.registrar_cambios(sender, eliminados=[instance])
+
+
+@receiver(cambios_en_lote)
+def actualizar_resumen_en_lote(sender, creados=(), actualizados=(), eliminados=(), **kwargs):
+    if sender in MODELOS_RESUMIDOS:
+        resumenes.registrar_cambios(sender, creados=creados, actualizados=actualizados, eliminados=eliminados)
+
+
+@receiver(post_save)
+@receiver(post_delete)
+def invalidar_caches(sender, raw=False, **kwargs):
+    """Incrementa la versión del modelo cuando la transacción que lo modificó se confirma"""
+    if _por_objeto(sender, MODELOS_VERSIONADOS) and not raw:
+        transaction.on_commit(lambda: incrementar_version(sender))
+
+
+@receiver(cambios_en_lote)
+def invalidar_caches_en_lote(sender, **kwargs):
+    if sender in MODELOS_VERSIONADOS:
+        transaction.on_commit(lambda: incrementar_version(sender))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidar_usuario_autenticado(sender, instance, **kwargs):
+    """Descarta el usuario cacheado por `JWTCacheadoAuthentication` (de nuevo al confirmar, por si otra petición lo recargó)"""
+    autenticacion.invalidar_usuario(instance)
+    transaction.on_commit(lambda: autenticacion.invalidar_usuario(instance))
+
+
+@receiver(post_save)
+def registrar_cambio(sender, instance, created, raw=False, **kwargs):
+    if _por_objeto(sender, MODELOS_SINCRONIZADOS) and not raw:
+        cambios.registrar(sender, Cambio.CREADO if created else Cambio.ACTUALIZADO, [instance.pk])
+
+
+@receiver(post_delete)
+def registrar_eliminacion(sender, instance, **kwargs):
+    if _por_objeto(sender, MODELOS_SINCRONIZADOS):
+        cambios.registrar(sender, Cambio.ELIMINADO, [instance.pk])
+
+
+@receiver(cambios_en_lote)
+def registrar_cambios_en_lote(sender, creados=(), actualizados=(), eliminados=(), **kwargs):
+    if sender not in MODELOS_SINCRONIZADOS:
+        return
+    cambios.registrar(sender, Cambio.CREADO, [objeto.pk for objeto in creados])
+    cambios.registrar(sender, Cambio.ACTUALIZADO, [objeto.pk for _, objeto in actualizados])
+    cambios.registrar(sender, Cambio.ELIMINADO, [
+        objeto.get("id") if isinstance(objeto, dict) else objeto.pk for objeto in eliminados
+    ])
+
+
+def registrar_anulaciones(modelo, pks):
+    """
+    Registra como actualizados los objetos cuya FK `SET_NULL` apunta a los `pks` a borrar.
+
+    Django anula esas FK con un `UPDATE` que no envía señales, así que sin esto el
+    feed, `fecha_actualizacion` y las versiones no reflejarían el cambio. Debe llamarse
+    antes del borrado; `pre_delete` lo hace por objeto y `eliminar_en_lote` por lote.
+    """
+    for relacion in modelo._meta.related_objects:
+        relacionado = relacion.related_model
+        if relacion.on_delete is not models.SET_NULL or relacionado not in MODELOS_SINCRONIZADOS:
+            continue
+        afectados = relacionado.objects.filter(**{f"{relacion.field.name}__in": pks})
+        ids = list(afectados.values_list("pk", flat=True))
+        if not ids:
+            continue
+        relacionado.objects.filter(pk__in=ids).update(fecha_actualizacion=timezone.now())
+        cambios.registrar(relacionado, Cambio.ACTUALIZADO, ids)
+        transaction.on_commit(lambda relacionado=relacionado: incrementar_version(relacionado))
+
+
+@receiver(pre_delete)
+def registrar_anulaciones_al_eliminar(sender, instance, **kwargs):
+    if _por_objeto(sender, MODELOS_SINCRONIZADOS):
+        registrar_anulaciones(sender, [instance.pk])
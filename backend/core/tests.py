@@ -1,3 +1,1770 @@
-from django.test import TestCase
+import asyncio
+import csv
+import io
+import json
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
 
-# Create your tests here.
+import numpy as np
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import DatabaseError, connection, connections
+from django.db.models import Sum
+from django.test import AsyncClient, Client, LiveServerTestCase, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import archivo, cambios, difusion, espacial, exportacion, lotes, replicas, resumenes, viajes
+from .filtros import filtro_mes, filtro_mes_con_hora, inicio_del_dia
+from .geo import cargar_puntos, douglas_peucker
+from .ingesta import ingestar_ubicaciones
+from .models import (
+    Cambio, Camion, DistanciaDiaria, SegmentoUbicacion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Ubicacion, Factura,
+    ResumenGastoMensual, UltimaUbicacion,
+)
+from .serializers import CamionSerializer
+
+
+class FilasDePrueba:
+    """Cliente autenticado y helper para crear filas de cada recurso"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="presupuesto"))
+        self.secuencia = 0
+
+    def crear_filas(self, cantidad):
+        """Crea `cantidad` filas de cada recurso, todas con sus relaciones completas"""
+        for _ in range(cantidad):
+            self.secuencia += 1
+            n = self.secuencia
+            conductor = Conductor.objects.create(nombre=f"Conductor {n}", apellido="Test", licencia=f"LIC-{n}")
+            camion = Camion.objects.create(
+                marca="Marca", modelo="Modelo", placa=f"PLACA-{n}", capacidad=10, año=2020, conductor=conductor
+            )
+            cliente = Cliente.objects.create(nombre=f"Cliente {n}", email=f"cliente{n}@test.com")
+            pedido = Pedido.objects.create(cliente=cliente, camion=camion, conductor=conductor, descripcion="Carga")
+            GastoCamion.objects.create(camion=camion, tipo_gasto="combustible", monto=Decimal("100.00"), fecha=date(2025, 1, 1))
+            SueldoEmpleado.objects.create(
+                empleado=conductor, salario_base=Decimal("1000.00"), bonos=Decimal("0"), deducciones=Decimal("0"),
+                horas_extras=Decimal("0"), adelanto=Decimal("0"), fecha_pago=date(2025, 1, 31),
+            )
+            Ubicacion.objects.create(camion=camion, latitud=-34.6, longitud=-58.4)
+            Factura.objects.create(
+                cliente=cliente, pedido=pedido, fecha=date(2025, 1, 15), servicio="Flete", origen="A", destino="B",
+                horas_espera=1.5, precio_hora=Decimal("10.00"), importe_lista=Decimal("500.00"),
+            )
+
+
+class PresupuestoConsultasTests(FilasDePrueba, TestCase):
+    """
+    Cada listado y detalle debe costar un número fijo de consultas, sin importar
+    cuántas filas (y relaciones anidadas) devuelva.
+    """
+
+    # Consultas esperadas: las tablas chicas paginan por páginas (COUNT + SELECT),
+    # las grandes por cursor (un solo SELECT) y el detalle es un SELECT con sus JOINs.
+    PRESUPUESTO_LISTA_PAGINAS = 2
+    PRESUPUESTO_LISTA_CURSOR = 1
+    PRESUPUESTO_DETALLE = 1
+
+    RECURSOS = {
+        "conductores": PRESUPUESTO_LISTA_PAGINAS,
+        "camiones": PRESUPUESTO_LISTA_PAGINAS,
+        "clientes": PRESUPUESTO_LISTA_PAGINAS,
+        "pedidos": PRESUPUESTO_LISTA_CURSOR,
+        "gastos": PRESUPUESTO_LISTA_CURSOR,
+        "sueldos": PRESUPUESTO_LISTA_CURSOR,
+        "ubicaciones": PRESUPUESTO_LISTA_CURSOR,
+        "facturas": PRESUPUESTO_LISTA_CURSOR,
+    }
+
+    def contar_consultas(self, url):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200, url)
+        return len(consultas)
+
+    def test_listados_con_consultas_constantes(self):
+        for filas in (1, 10):
+            self.crear_filas(filas)
+            for recurso, presupuesto in self.RECURSOS.items():
+                with self.subTest(recurso=recurso, filas=self.secuencia):
+                    self.assertEqual(self.contar_consultas(f"/api/{recurso}/"), presupuesto)
+
+    # Expansión completa de cada recurso: anidar relaciones no debe agregar consultas
+    EXPANSION_COMPLETA = {
+        "camiones": "conductor",
+        "pedidos": "cliente,camion.conductor,conductor",
+        "gastos": "camion.conductor",
+        "sueldos": "empleado",
+        "ubicaciones": "camion.conductor",
+        "facturas": "cliente,pedido.cliente,pedido.camion.conductor,pedido.conductor",
+    }
+
+    def test_listados_expandidos_con_consultas_constantes(self):
+        for filas in (1, 10):
+            self.crear_filas(filas)
+            for recurso, expand in self.EXPANSION_COMPLETA.items():
+                with self.subTest(recurso=recurso, filas=self.secuencia):
+                    url = f"/api/{recurso}/?expand={expand}"
+                    self.assertEqual(self.contar_consultas(url), self.RECURSOS[recurso])
+
+    def test_relaciones_planas_salvo_expand(self):
+        self.crear_filas(1)
+        factura = self.client.get("/api/facturas/").data["results"][0]
+        self.assertNotIn("pedido", factura)
+        self.assertIsInstance(factura["pedido_id"], int)
+
+        factura = self.client.get("/api/facturas/?expand=pedido.camion&fields=id,pedido.camion.placa").data["results"][0]
+        self.assertEqual(set(factura), {"id", "pedido"})
+        self.assertEqual(factura["pedido"], {"camion": {"placa": "PLACA-1"}})
+
+    def test_detalles_con_consultas_constantes(self):
+        self.crear_filas(3)
+        modelos = {
+            "conductores": Conductor, "camiones": Camion, "clientes": Cliente, "pedidos": Pedido,
+            "gastos": GastoCamion, "sueldos": SueldoEmpleado, "ubicaciones": Ubicacion, "facturas": Factura,
+        }
+        for recurso, modelo in modelos.items():
+            with self.subTest(recurso=recurso):
+                pk = modelo.objects.values_list("pk", flat=True).first()
+                self.assertEqual(self.contar_consultas(f"/api/{recurso}/{pk}/"), self.PRESUPUESTO_DETALLE)
+
+
+class LecturaRapidaTests(FilasDePrueba, TestCase):
+    """El listado por `values()` + extractor debe producir exactamente la misma salida que el serializador"""
+
+    URLS = [
+        "/api/facturas/",
+        "/api/facturas/?expand=cliente,pedido.camion.conductor,pedido.cliente",
+        "/api/pedidos/?expand=cliente,camion,conductor",
+        "/api/gastos/?expand=camion&fields=id,monto,fecha,camion.placa",
+        "/api/sueldos/?expand=empleado",
+        "/api/ubicaciones/?expand=camion",
+        "/api/camiones/?expand=conductor",
+    ]
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(3)
+        Pedido.objects.create(cliente=Cliente.objects.first(), descripcion="Sin camión")  # Relaciones nulas
+
+    def test_salida_identica_al_serializador(self):
+        from .mixins import LecturaRapidaMixin
+
+        rapidas = {url: self.client.get(url).content for url in self.URLS}
+        lista_normal = lambda vista, request, *args, **kwargs: super(LecturaRapidaMixin, vista).list(request, *args, **kwargs)
+        with mock.patch.object(LecturaRapidaMixin, "list", lista_normal):
+            for url in self.URLS:
+                with self.subTest(url=url):
+                    self.assertEqual(rapidas[url], self.client.get(url).content)
+
+
+class PaginacionTests(FilasDePrueba, TestCase):
+    """Paginación por cursor (con empates en el orden), totales y búsqueda en los listados"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(7)
+        # Empates en la primera columna del orden: el id tiene que desempatar
+        momentos = [timezone.now() - timedelta(days=dias) for dias in (1, 1, 1, 2, 2, 3, 3)]
+        for pedido, momento in zip(Pedido.objects.order_by("id"), momentos):
+            Pedido.objects.filter(pk=pedido.pk).update(fecha_creacion=momento)
+
+    def recorrer(self, url, enlace="next"):
+        ids, paginas = [], []
+        while url:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200, url)
+            paginas.append(respuesta.data)
+            ids.extend(fila["id"] for fila in respuesta.data["results"])
+            url = respuesta.data[enlace]
+        return ids, paginas
+
+    def test_recorrido_completo_con_empates(self):
+        esperados = {
+            "pedidos": list(Pedido.objects.order_by("-fecha_creacion", "-id").values_list("id", flat=True)),
+            "gastos": list(GastoCamion.objects.order_by("-fecha", "-id").values_list("id", flat=True)),
+        }
+        for recurso, orden in esperados.items():
+            with self.subTest(recurso=recurso):
+                ids, paginas = self.recorrer(f"/api/{recurso}/?page_size=2&fields=id")
+                self.assertEqual(ids, orden)
+                self.assertEqual(len(paginas), 4)
+                self.assertIsNone(paginas[0]["previous"])
+
+                # Desde la última página, `previous` vuelve por las mismas páginas al revés
+                atras = []
+                url = paginas[-1]["previous"]
+                while url:
+                    respuesta = self.client.get(url)
+                    atras = [fila["id"] for fila in respuesta.data["results"]] + atras
+                    url = respuesta.data["previous"]
+                self.assertEqual(atras + [fila["id"] for fila in paginas[-1]["results"]], orden)
+
+    def test_cursor_invalido(self):
+        for cursor in ("no-es-base64!", "eyJ4IjogMX0=", "eyJ2IjogWzFdfQ==", "eyJ2IjogWyJ4IiwgMV19"):
+            with self.subTest(cursor=cursor):
+                self.assertEqual(self.client.get(f"/api/pedidos/?cursor={cursor}").status_code, 404)
+
+    def test_totales(self):
+        from .pagination import contar_estimado
+
+        self.assertNotIn("count", self.client.get("/api/pedidos/").data)
+        for tipo in ("estimado", "exacto"):
+            datos = self.client.get(f"/api/pedidos/?total={tipo}&page_size=2").data
+            self.assertEqual((datos["count"], datos["count_tipo"]), (7, tipo))
+
+        # Fuera de PostgreSQL la estimación cae a un COUNT exacto; en PostgreSQL lee el plan
+        self.assertEqual(contar_estimado(Pedido.objects.all()), 7)
+        plan = json.dumps([{"Plan": {"Plan Rows": 6500}}])
+        with mock.patch.object(connection, "vendor", "postgresql"), \
+                mock.patch("django.db.models.query.QuerySet.explain", return_value=plan) as explain:
+            self.assertEqual(contar_estimado(Pedido.objects.all()), 6500)
+        explain.assert_called_once_with(format="json")
+
+    def test_busqueda(self):
+        Camion.objects.filter(placa="PLACA-3").update(marca="Scania", modelo="R450")
+        Conductor.objects.filter(licencia="LIC-5").update(apellido="Gómez")
+        casos = {
+            "/api/camiones/?q=scania": ["PLACA-3"],
+            "/api/camiones/?q=scania r450": ["PLACA-3"],
+            "/api/camiones/?q=scania volvo": [],
+            "/api/conductores/?q=gómez": ["LIC-5"],
+            "/api/clientes/?q=cliente4@": ["cliente4@test.com"],
+        }
+        campos = {"camiones": "placa", "conductores": "licencia", "clientes": "email"}
+        for url, esperados in casos.items():
+            with self.subTest(url=url):
+                campo = campos[url.split("/")[2]]
+                resultados = self.client.get(url).data["results"]
+                self.assertEqual([fila[campo] for fila in resultados], esperados)
+
+        pedido = Pedido.objects.order_by("id")[3]
+        resultados = self.client.get(f"/api/pedidos/?q={pedido.pk}").data["results"]
+        self.assertIn(pedido.pk, [fila["id"] for fila in resultados])
+        Pedido.objects.filter(pk=pedido.pk).update(estado="completado")
+        resultados = self.client.get("/api/pedidos/?estado=completado").data["results"]
+        self.assertEqual([fila["id"] for fila in resultados], [pedido.pk])
+
+
+class RentabilidadTests(FilasDePrueba, TestCase):
+    """La matriz camión × mes suma bien cada fuente y cuesta lo mismo con cualquier tamaño de flota"""
+
+    def obtener(self, **parametros):
+        cache.clear()
+        respuesta = self.client.get("/api/metricas/rentabilidad_camiones/", parametros)
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_montos(self):
+        self.crear_filas(2)
+        primero, segundo = Camion.objects.order_by("id")
+        # Un segundo camión del mismo conductor se lleva la mitad de su sueldo
+        extra = Camion.objects.create(marca="M", modelo="N", placa="EXTRA", capacidad=10, año=2020, conductor=primero.conductor)
+        GastoCamion.objects.create(camion=primero, tipo_gasto="reparacion", monto=Decimal("40.00"), fecha=date(2025, 2, 3))
+
+        filas = {(fila["placa"], fila["mes"]): fila for fila in self.obtener()}
+        self.assertEqual(sorted(filas), [("EXTRA", "2025-01"), (primero.placa, "2025-01"), (primero.placa, "2025-02"), (segundo.placa, "2025-01")])
+
+        enero = filas[(primero.placa, "2025-01")]
+        self.assertEqual(enero["ingresos"], "515.00")  # 1.5 h × $10 + $500 de lista
+        self.assertEqual(enero["facturas"], 1)
+        self.assertEqual(enero["gastos"]["combustible"], "100.00")
+        self.assertEqual(enero["sueldos"], "500.00")
+        self.assertEqual(enero["resultado"], "-85.00")
+        self.assertEqual(filas[("EXTRA", "2025-01")]["sueldos"], "500.00")
+        self.assertEqual(filas[(segundo.placa, "2025-01")]["sueldos"], "1000.00")
+        self.assertEqual(filas[(primero.placa, "2025-02")]["total_gastos"], "40.00")
+
+        filas = self.obtener(desde="2025-02", hasta="2025-12", camion_id=f"{primero.pk},{extra.pk}")
+        self.assertEqual([(fila["placa"], fila["mes"]) for fila in filas], [(primero.placa, "2025-02")])
+        self.assertEqual(self.client.get("/api/metricas/rentabilidad_camiones/", {"desde": "2025-13"}).status_code, 400)
+
+    def test_consultas_constantes(self):
+        self.crear_filas(2)
+        with CaptureQueriesContext(connection) as pocas:
+            self.obtener()
+        self.crear_filas(10)
+        with CaptureQueriesContext(connection) as muchas:
+            self.assertEqual(len(self.obtener()), 12)
+        self.assertEqual(len(pocas), len(muchas))
+
+
+class DashboardTests(FilasDePrueba, TestCase):
+    """El dashboard se sirve de la caché hasta que una escritura cambia la versión de sus modelos"""
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        self.crear_filas(2)
+
+    def obtener(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get("/api/metricas/dashboard/")
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json(), len(consultas)
+
+    def test_segunda_lectura_desde_la_cache(self):
+        primera, consultas = self.obtener()
+        self.assertEqual(primera["resumen_general"]["total_pedidos"], 2)
+        self.assertEqual(primera["resumen_general"]["total_gastos"], "200.00")
+        self.assertGreater(consultas, 0)
+
+        segunda, consultas = self.obtener()
+        self.assertEqual(segunda, primera)
+        self.assertEqual(consultas, 0)  # El usuario ya está autenticado: ni una consulta
+
+    def test_escritura_invalida(self):
+        self.obtener()
+        camion = Camion.objects.first()
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.post("/api/gastos/", {
+                "camion_id": camion.pk, "tipo_gasto": "reparacion", "monto": "50.00", "fecha": "2025-01-10",
+            }, format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        datos, consultas = self.obtener()
+        self.assertGreater(consultas, 0)
+        self.assertEqual(datos["resumen_general"]["total_gastos"], "250.00")
+        self.assertIn({"tipo_gasto": "reparacion", "total": "50.00"}, datos["gastos_por_tipo"])
+
+        # También las escrituras en lote y los cambios de otro modelo del tablero
+        with self.captureOnCommitCallbacks(execute=True):
+            respuesta = self.client.patch("/api/pedidos/lote/", {"ids": list(Pedido.objects.values_list("pk", flat=True)), "cambios": {"estado": "completado"}}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        datos, _ = self.obtener()
+        self.assertEqual(datos["pedidos_por_estado"], [{"estado": "completado", "total": 2}])
+
+    def test_escritura_de_otro_modelo_no_invalida(self):
+        self.obtener()
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.create(nombre="Sin efecto")
+        _, consultas = self.obtener()
+        self.assertEqual(consultas, 0)
+
+
+class CondicionalTests(FilasDePrueba, TestCase):
+    """Los GET con la versión vigente responden 304 sin leer filas ni serializar"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(2)
+
+    def modificar(self, url, datos):
+        # Las versiones se incrementan al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.client.patch(url, datos, format="json").status_code, 200)
+
+    def test_listado_no_modificado_sin_consultas(self):
+        etag = self.client.get("/api/gastos/")["ETag"]
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get("/api/gastos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(len(consultas), 0)
+
+        # Otra URL (filtros, expand, página) tiene su propio ETag
+        self.assertEqual(self.client.get("/api/gastos/?expand=camion", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        gasto = GastoCamion.objects.first()
+        self.modificar(f"/api/gastos/{gasto.pk}/", {"monto": "5.00"})
+        respuesta = self.client.get("/api/gastos/", HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertNotEqual(respuesta["ETag"], etag)
+
+    def test_listado_expandido_cambia_con_la_relacion(self):
+        etag = self.client.get("/api/camiones/?expand=conductor")["ETag"]
+        sin_expandir = self.client.get("/api/camiones/")["ETag"]
+        self.modificar(f"/api/conductores/{Conductor.objects.first().pk}/", {"nombre": "Otro"})
+
+        self.assertEqual(self.client.get("/api/camiones/?expand=conductor", HTTP_IF_NONE_MATCH=etag).status_code, 200)
+        self.assertEqual(self.client.get("/api/camiones/", HTTP_IF_NONE_MATCH=sin_expandir).status_code, 304)
+
+    def test_detalle_con_etag_y_last_modified(self):
+        cliente = Cliente.objects.first()
+        url = f"/api/clientes/{cliente.pk}/"
+        respuesta = self.client.get(url)
+        etag, ultima_modificacion = respuesta["ETag"], respuesta["Last-Modified"]
+
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(len(consultas), 1)  # Solo el SELECT del objeto
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=ultima_modificacion).status_code, 304)
+
+        self.modificar(url, {"telefono": "123"})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lote_actualiza_fecha_actualizacion(self):
+        gastos = list(GastoCamion.objects.order_by("pk"))
+        respuesta = self.client.patch(
+            "/api/gastos/lote/", {"ids": [gasto.pk for gasto in gastos], "cambios": {"comentarios": "x"}}, format="json"
+        )
+        self.assertEqual(respuesta.status_code, 200)
+        for gasto in gastos:
+            gasto_actual = GastoCamion.objects.get(pk=gasto.pk)
+            self.assertGreater(gasto_actual.fecha_actualizacion, gasto.fecha_actualizacion)
+
+
+class FacturaTotalesTests(FilasDePrueba, TestCase):
+    """`final_h` e `importe_total` los calcula la base al crear y al modificar, y la API los devuelve"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(1)
+        self.cliente = Cliente.objects.get()
+
+    def factura(self, **cambios):
+        return {
+            "cliente_id": self.cliente.pk, "fecha": "2025-02-01", "servicio": "Flete", "origen": "A", "destino": "B",
+            "horas_espera": 2.5, "precio_hora": "12.00", "peajes": "7.50", "importe_lista": "100.00", **cambios,
+        }
+
+    def test_al_crear(self):
+        # Los totales se publican como números (la pantalla de facturas los formatea con toLocaleString)
+        respuesta = self.client.post("/api/facturas/", self.factura(), format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.json()["final_h"], respuesta.json()["importe_total"]), (30.0, 137.5))
+        factura = Factura.objects.get(pk=respuesta.data["id"])
+        self.assertEqual((factura.final_h, factura.importe_total), (Decimal("30.00"), Decimal("137.50")))
+
+    def test_al_modificar(self):
+        pk = self.client.post("/api/facturas/", self.factura(), format="json").data["id"]
+        respuesta = self.client.patch(f"/api/facturas/{pk}/", {"horas_espera": 1, "peajes": "0"}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual((respuesta.json()["final_h"], respuesta.json()["importe_total"]), (12.0, 112.0))
+        self.assertEqual(self.client.get(f"/api/facturas/{pk}/").json()["importe_total"], 112.0)
+
+        respuesta = self.client.put(f"/api/facturas/{pk}/", self.factura(precio_hora="20.00"), format="json")
+        self.assertEqual((respuesta.json()["final_h"], respuesta.json()["importe_total"]), (50.0, 157.5))
+
+    def test_campos_calculados_no_se_escriben(self):
+        respuesta = self.client.post("/api/facturas/", self.factura(importe_total="1.00", final_h="1.00"), format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.json()["importe_total"], 137.5)
+
+    def test_en_lote(self):
+        respuesta = self.client.post("/api/facturas/lote/", [self.factura(), self.factura(horas_espera=0)], format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        ids = [resultado["id"] for resultado in respuesta.data["resultados"]]
+        self.assertEqual(list(Factura.objects.filter(pk__in=ids).order_by("pk").values_list("importe_total", flat=True)), [Decimal("137.50"), Decimal("107.50")])
+        self.client.patch("/api/facturas/lote/", {"ids": ids, "cambios": {"importe_lista": "200.00"}}, format="json")
+        self.assertEqual(list(Factura.objects.filter(pk__in=ids).order_by("pk").values_list("importe_total", flat=True)), [Decimal("237.50"), Decimal("207.50")])
+
+
+class ExportacionTests(FilasDePrueba, TestCase):
+    """Exportación en CSV y XLSX: encabezados, mismos filtros que el listado y streaming por lotes"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(3)
+        self.camion = Camion.objects.order_by("pk").first()
+        GastoCamion.objects.create(camion=self.camion, tipo_gasto="seguro", monto=Decimal("55.00"), fecha=date(2025, 2, 10), comentarios="Póliza, anual")
+
+    def filas_csv(self, respuesta):
+        self.assertEqual(respuesta.status_code, 200)
+        contenido = b"".join(respuesta.streaming_content).decode("utf-8")
+        self.assertTrue(contenido.startswith("\ufeff"))
+        return list(csv.reader(io.StringIO(contenido[1:])))
+
+    def test_csv(self):
+        respuesta = self.client.get("/api/gastos/exportar/")
+        self.assertTrue(respuesta.streaming)
+        self.assertEqual(respuesta["Content-Type"], "text/csv; charset=utf-8")
+        self.assertRegex(respuesta["Content-Disposition"], r'attachment; filename="gastos-\d{8}\.csv"')
+        filas = self.filas_csv(respuesta)
+        self.assertEqual(filas[0], ["id", "camion_id", "placa", "tipo_gasto", "monto", "fecha", "comentarios"])
+        esperados = list(GastoCamion.objects.order_by("-fecha", "-id").values_list("id", flat=True))
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], esperados)
+        self.assertEqual(filas[1][2:], [self.camion.placa, "seguro", "55.00", "2025-02-10", "Póliza, anual"])
+
+    def test_filtros(self):
+        filas = self.filas_csv(self.client.get("/api/gastos/exportar/", {"camion_id": self.camion.pk}))
+        self.assertEqual({fila[1] for fila in filas[1:]}, {str(self.camion.pk)})
+        self.assertEqual(len(filas), 3)
+
+        filas = self.filas_csv(self.client.get("/api/gastos/exportar/", {"mes": "2025-02"}))
+        self.assertEqual([fila[5] for fila in filas[1:]], ["2025-02-10"])
+        filas = self.filas_csv(self.client.get("/api/gastos/exportar/", {"q": "póliza"}))
+        self.assertEqual(len(filas), 2)
+
+        self.assertEqual(self.client.get("/api/gastos/exportar/", {"mes": "2025-13"}).status_code, 400)
+        self.assertEqual(self.client.get("/api/gastos/exportar/", {"formato": "pdf"}).status_code, 400)
+
+    def test_mas_filas_que_el_lote(self):
+        self.crear_filas(4)
+        with mock.patch.object(exportacion, "FILAS_POR_LOTE", 2):
+            filas = self.filas_csv(self.client.get("/api/facturas/exportar/"))
+        self.assertEqual(len(filas) - 1, Factura.objects.count())
+        self.assertEqual(len({fila[0] for fila in filas[1:]}), Factura.objects.count())
+
+    async def test_csv_asgi_por_lotes(self):
+        await sync_to_async(self.crear_filas)(4)
+        usuario = await User.objects.aget(username="presupuesto")
+        autorizacion = {"Authorization": f"Bearer {AccessToken.for_user(usuario)}"}
+        with mock.patch.object(exportacion, "FILAS_POR_LOTE", 2):
+            respuesta = await AsyncClient().get("/api/facturas/exportar/", headers=autorizacion)
+            self.assertEqual(respuesta.status_code, 200)
+            # Bajo ASGI el contenido debe ser asíncrono; si no, Django lo junta entero en memoria
+            self.assertTrue(respuesta.is_async)
+            partes = [parte async for parte in respuesta.streaming_content]
+        filas = list(csv.reader(io.StringIO(b"".join(partes).decode("utf-8")[1:])))
+        ids = await sync_to_async(list)(Factura.objects.order_by("-fecha", "-id").values_list("id", flat=True))
+        self.assertEqual([int(fila[0]) for fila in filas[1:]], ids)
+        self.assertGreater(len(partes), len(ids) // 2)
+
+    @skipUnless(exportacion.xlsx_disponible(), "openpyxl no está instalado")
+    def test_xlsx(self):
+        from openpyxl import load_workbook
+
+        respuesta = self.client.get("/api/gastos/exportar/", {"formato": "xlsx", "mes": "2025-02"})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta["Content-Type"], "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
+        self.assertIn(".xlsx", respuesta["Content-Disposition"])
+        hoja = load_workbook(io.BytesIO(b"".join(respuesta.streaming_content)), read_only=True).active
+        filas = list(hoja.values)
+        self.assertEqual(filas[0][:3], ("id", "camion_id", "placa"))
+        self.assertEqual(filas[1][2:5], (self.camion.placa, "seguro", 55))
+        self.assertEqual(len(filas), 2)
+
+
+class ResumenesTests(FilasDePrueba, TestCase):
+    """Los resúmenes mensuales incrementales deben coincidir siempre con un recálculo desde cero"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(2)
+        self.camion_a, self.camion_b = Camion.objects.order_by("id")
+        self.conductor = Conductor.objects.order_by("id").first()
+
+    def resumen(self, modelo):
+        Resumen = resumenes.RESUMENES[modelo].resumen
+        campos = ("mes", *resumenes.RESUMENES[modelo].dimensiones)
+        return {
+            tuple(fila[campo] for campo in campos): (fila["total"], fila["cantidad"])
+            for fila in Resumen.objects.values(*campos, "total", "cantidad")
+        }
+
+    def assertResumenCorrecto(self, modelo):
+        """El resumen incremental es idéntico al reconstruido y no deja filas vacías"""
+        incremental = self.resumen(modelo)
+        self.assertTrue(all(cantidad > 0 for _, cantidad in incremental.values()))
+        resumenes.reconstruir(modelo)
+        self.assertEqual(incremental, self.resumen(modelo))
+        return incremental
+
+    def test_por_objeto(self):
+        gasto = GastoCamion.objects.create(
+            camion=self.camion_a, tipo_gasto="reparacion", monto=Decimal("50.00"), fecha=date(2025, 2, 10)
+        )
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(resumen[(date(2025, 2, 1), self.camion_a.id, "reparacion")], (Decimal("50.00"), 1))
+
+        # Cada cambio mueve el gasto a otra clave (mes, camión, tipo): la anterior queda vacía y se elimina
+        for cambio in ({"fecha": date(2025, 3, 31)}, {"camion": self.camion_b}, {"tipo_gasto": "seguro"}, {"monto": Decimal("70.00")}):
+            with self.subTest(cambio=cambio):
+                for campo, valor in cambio.items():
+                    setattr(gasto, campo, valor)
+                gasto.save()
+                resumen = self.assertResumenCorrecto(GastoCamion)
+                clave = (gasto.fecha.replace(day=1), gasto.camion_id, gasto.tipo_gasto)
+                self.assertEqual(resumen[clave], (gasto.monto, 1))
+                self.assertEqual(len(resumen), 3)  # Los dos gastos de `crear_filas` más este
+
+        gasto.delete()
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(set(resumen), {(date(2025, 1, 1), camion.id, "combustible") for camion in (self.camion_a, self.camion_b)})
+
+    def test_valores_sin_convertir(self):
+        # Los valores asignados tal cual (como llegan de un formulario) se normalizan antes de agrupar
+        gasto = GastoCamion.objects.create(camion_id=str(self.camion_a.id), tipo_gasto="seguro", monto="12.50", fecha="2024-01-05")
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(resumen[(date(2024, 1, 1), self.camion_a.id, "seguro")], (Decimal("12.50"), 1))
+
+        gasto.fecha = "2024-02-29"
+        gasto.save()
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertNotIn((date(2024, 1, 1), self.camion_a.id, "seguro"), resumen)
+        self.assertEqual(resumen[(date(2024, 2, 1), self.camion_a.id, "seguro")], (Decimal("12.50"), 1))
+
+    def test_en_lote(self):
+        respuesta = self.client.post("/api/gastos/lote/", [
+            {"camion_id": self.camion_a.id, "tipo_gasto": "combustible", "monto": "10.00", "fecha": "2025-01-20"},
+            {"camion_id": self.camion_a.id, "tipo_gasto": "filtros", "monto": "20.00", "fecha": "2025-02-20"},
+            {"camion_id": self.camion_b.id, "tipo_gasto": "filtros", "monto": "30.00", "fecha": "2025-02-21"},
+        ], format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        ids = [fila["id"] for fila in respuesta.data["resultados"]]
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(resumen[(date(2025, 1, 1), self.camion_a.id, "combustible")], (Decimal("110.00"), 2))
+
+        respuesta = self.client.patch("/api/gastos/lote/", [
+            {"id": ids[0], "fecha": "2025-04-01"}, {"id": ids[1], "camion_id": self.camion_b.id, "monto": "25.00"},
+        ], format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(resumen[(date(2025, 2, 1), self.camion_b.id, "filtros")], (Decimal("55.00"), 2))
+        self.assertNotIn((date(2025, 2, 1), self.camion_a.id, "filtros"), resumen)
+
+        respuesta = self.client.patch("/api/gastos/lote/", {"ids": ids, "cambios": {"tipo_gasto": "otros"}}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(resumen[(date(2025, 2, 1), self.camion_b.id, "otros")], (Decimal("55.00"), 2))
+
+        respuesta = self.client.delete("/api/gastos/lote/", {"ids": ids}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        resumen = self.assertResumenCorrecto(GastoCamion)
+        self.assertEqual(len(resumen), 2)
+
+    def test_sueldos_y_reconstruccion(self):
+        comunes = {"empleado": self.conductor, "salario_base": Decimal("500.00"), "periodo_sueldo": "Enero 2025"}
+        SueldoEmpleado.objects.create(**comunes, fecha_pago=date(2025, 2, 3))
+        sueldo = SueldoEmpleado.objects.create(**comunes, bonos=Decimal("100.00"), fecha_pago=date(2025, 2, 5))
+        sueldo.metodo_pago = "cheque"
+        sueldo.save()
+        self.assertResumenCorrecto(SueldoEmpleado)
+
+        # Se agrupa por el mes de pago, no por el texto libre de `periodo_sueldo`
+        datos = self.client.get("/api/metricas/sueldos_por_mes/").data
+        self.assertEqual(
+            [(fila["periodo_sueldo"], Decimal(fila["total_sueldos"])) for fila in datos],
+            [("2025-01", Decimal("2000.00")), ("2025-02", Decimal("1100.00"))],
+        )
+
+        # El comando recalcula todo y el resultado coincide con el incremental
+        incremental = {modelo: self.resumen(modelo) for modelo in resumenes.RESUMENES}
+        ResumenGastoMensual.objects.all().delete()
+        call_command("reconstruir_resumenes", stdout=io.StringIO())
+        self.assertEqual(incremental, {modelo: self.resumen(modelo) for modelo in resumenes.RESUMENES})
+
+
+class LoteTests(FilasDePrueba, TestCase):
+    """Operaciones en lote: errores por índice (incluidos los campos únicos) y consultas constantes"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(2)
+        self.camion_a, self.camion_b = Camion.objects.order_by("pk")
+
+    def camiones(self, cantidad, desde=100):
+        return [
+            {"marca": "M", "modelo": "X", "placa": f"LOTE-{desde + i}", "capacidad": 10, "año": 2021}
+            for i in range(cantidad)
+        ]
+
+    def consultas_de_alta(self, cantidad, desde):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post("/api/camiones/lote/", self.camiones(cantidad, desde), format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        return len(consultas)
+
+    def test_crear(self):
+        respuesta = self.client.post("/api/camiones/lote/", self.camiones(3), format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual(respuesta.data["procesados"], 3)
+        ids = [resultado["id"] for resultado in respuesta.data["resultados"]]
+        self.assertEqual(list(Camion.objects.filter(pk__in=ids).order_by("pk").values_list("placa", flat=True)), ["LOTE-100", "LOTE-101", "LOTE-102"])
+
+    def test_crear_con_consultas_constantes(self):
+        self.assertEqual(self.consultas_de_alta(2, 100), self.consultas_de_alta(20, 200))
+
+    def test_crear_con_errores_por_indice(self):
+        items = self.camiones(4)
+        items[1]["placa"] = self.camion_a.placa  # Ya existe
+        items[3]["placa"] = items[2]["placa"]  # Repetida dentro del lote
+        items[0]["capacidad"] = "mucha"
+        antes = Camion.objects.count()
+        respuesta = self.client.post("/api/camiones/lote/", items, format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([error["indice"] for error in respuesta.data["errores"]], [0, 1, 3])
+        self.assertIn("capacidad", respuesta.data["errores"][0]["errores"])
+        self.assertIn("placa", respuesta.data["errores"][1]["errores"])
+        self.assertIn("repetido", str(respuesta.data["errores"][2]["errores"]["placa"][0]))
+        self.assertEqual(Camion.objects.count(), antes)
+
+    def test_actualizar_por_objeto(self):
+        respuesta = self.client.patch("/api/camiones/lote/", [
+            {"id": self.camion_a.pk, "placa": self.camion_a.placa, "capacidad": 30},  # Conserva su propia placa
+            {"id": self.camion_b.pk, "placa": "NUEVA"},
+        ], format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.camion_a.refresh_from_db()
+        self.camion_b.refresh_from_db()
+        self.assertEqual((self.camion_a.capacidad, self.camion_b.placa), (30, "NUEVA"))
+
+    def test_actualizar_con_placa_ajena_o_id_inexistente(self):
+        respuesta = self.client.patch("/api/camiones/lote/", [
+            {"id": self.camion_a.pk, "placa": self.camion_b.placa},
+            {"id": 999999, "capacidad": 1},
+        ], format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([(error["indice"], list(error["errores"])) for error in respuesta.data["errores"]], [(0, ["placa"]), (1, ["id"])])
+        self.camion_a.refresh_from_db()
+        self.assertNotEqual(self.camion_a.placa, self.camion_b.placa)
+
+    def test_actualizar_liberando_la_placa_en_el_mismo_lote(self):
+        # La restricción se verifica fila por fila: tomar una placa que otro libera en el mismo lote no se admite
+        placa_b = self.camion_b.placa
+        respuesta = self.client.patch("/api/camiones/lote/", [
+            {"id": self.camion_b.pk, "placa": "LIBERADA"},
+            {"id": self.camion_a.pk, "placa": placa_b},
+        ], format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([(error["indice"], list(error["errores"])) for error in respuesta.data["errores"]], [(1, ["placa"])])
+        self.assertEqual(Camion.objects.get(pk=self.camion_b.pk).placa, placa_b)
+
+    def test_actualizar_uniforme(self):
+        ids = [self.camion_a.pk, self.camion_b.pk]
+        respuesta = self.client.patch("/api/camiones/lote/", {"ids": ids, "cambios": {"capacidad": 55}}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(set(Camion.objects.filter(pk__in=ids).values_list("capacidad", flat=True)), {55})
+
+        # La misma placa para todos: solo el primero podría quedársela
+        respuesta = self.client.patch("/api/camiones/lote/", {"ids": ids, "cambios": {"placa": "UNICA"}}, format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual([error["indice"] for error in respuesta.data["errores"]], [1])
+        self.assertFalse(Camion.objects.filter(placa="UNICA").exists())
+
+    def test_eliminar(self):
+        creados = Conductor.objects.bulk_create([Conductor(nombre="N", apellido="A", licencia=f"BORRAR-{i}") for i in range(3)])
+        ids = [conductor.pk for conductor in creados]
+        respuesta = self.client.delete("/api/conductores/lote/", {"ids": ids + [999999]}, format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data["errores"][0]["indice"], 3)
+        self.assertEqual(Conductor.objects.filter(pk__in=ids).count(), 3)
+
+        respuesta = self.client.delete("/api/conductores/lote/", {"ids": ids}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data["procesados"], 3)
+        self.assertFalse(Conductor.objects.filter(pk__in=ids).exists())
+
+    def test_maximo_lote(self):
+        from .mixins import LoteMixin
+
+        with mock.patch.object(LoteMixin, "maximo_lote", 2):
+            respuesta = self.client.post("/api/camiones/lote/", self.camiones(3), format="json")
+            self.assertEqual(respuesta.status_code, 400)
+            self.assertIn("entre 1 y 2", respuesta.data["error"])
+            respuesta = self.client.delete("/api/camiones/lote/", {"ids": []}, format="json")
+            self.assertEqual(respuesta.status_code, 400)
+        self.assertFalse(Camion.objects.filter(placa__startswith="LOTE-").exists())
+
+
+class ImportacionTests(FilasDePrueba, TestCase):
+    """Importación de CSV: todo o nada, errores por línea y celdas vacías con los valores por defecto"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(2)
+        self.camion_a, self.camion_b = Camion.objects.order_by("pk")
+        self.conductor = Conductor.objects.order_by("pk").first()
+
+    def importar(self, recurso, texto, separador=None):
+        url = f"/api/{recurso}/importar/" + (f"?separador={separador}" if separador else "")
+        archivo = io.BytesIO(texto.encode("utf-8"))
+        archivo.name = "datos.csv"
+        return self.client.post(url, {"archivo": archivo}, format="multipart")
+
+    def test_importacion_valida(self):
+        antes = GastoCamion.objects.count()
+        respuesta = self.importar("gastos", (
+            "camion_id;tipo_gasto;monto;fecha\n"
+            f"{self.camion_a.pk};combustible;10.50;2025-02-01\n"
+            f"{self.camion_b.pk};seguro;3;2025-02-02\n"
+        ), separador=";")
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        self.assertEqual((respuesta.data["creadas"], respuesta.data["rechazadas"]), (2, 0))
+        self.assertEqual(GastoCamion.objects.count(), antes + 2)
+        self.assertEqual(GastoCamion.objects.get(tipo_gasto="seguro").camion_id, self.camion_b.pk)
+
+    def test_celdas_vacias_y_campos_derivados(self):
+        respuesta = self.importar("sueldos", (
+            "empleado_id,salario_base,bonos,deducciones,horas_extras,adelanto,fecha_pago\n"
+            f"{self.conductor.pk},1000,200,,50,,2025-03-31\n"
+        ))
+        self.assertEqual(respuesta.status_code, 201, respuesta.data)
+        sueldo = SueldoEmpleado.objects.get(fecha_pago=date(2025, 3, 31))
+        # Las celdas vacías toman el valor por defecto y `total_neto` se calcula aunque no pase por save()
+        self.assertEqual((sueldo.deducciones, sueldo.adelanto, sueldo.metodo_pago), (Decimal("0"), Decimal("0"), "transferencia"))
+        self.assertEqual(sueldo.total_neto, Decimal("1250.00"))
+
+    def test_errores_por_linea_y_todo_o_nada(self):
+        antes = GastoCamion.objects.count()
+        respuesta = self.importar("gastos", (
+            "camion_id,tipo_gasto,monto,fecha\n"
+            f"{self.camion_a.pk},combustible,10,2025-02-01\n"
+            "999999,combustible,10,2025-02-01\n"
+            f"{self.camion_b.pk},combustible,mucho,2025-02-01\n"
+            f"{self.camion_b.pk},combustible,10,2025-02-01\n"
+        ))
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual((respuesta.data["creadas"], respuesta.data["rechazadas"]), (0, 2))
+        self.assertEqual([(error["linea"], list(error["errores"])) for error in respuesta.data["errores"]], [(3, ["camion_id"]), (4, ["monto"])])
+        self.assertEqual(GastoCamion.objects.count(), antes)
+
+    def test_errores_en_otro_bloque_deshacen_todo(self):
+        antes = GastoCamion.objects.count()
+        filas = [f"{self.camion_a.pk},combustible,1,2025-02-01" for _ in range(5)] + ["x,combustible,1,2025-02-01"]
+        with mock.patch.object(lotes, "FILAS_POR_LOTE", 2):
+            respuesta = self.importar("gastos", "camion_id,tipo_gasto,monto,fecha\n" + "\n".join(filas) + "\n")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta.data["errores"][0]["linea"], 7)
+        self.assertEqual(GastoCamion.objects.count(), antes)
+
+    def test_campos_unicos_entre_bloques(self):
+        from .serializers import ConductorSerializer
+
+        texto = (
+            "nombre,apellido,licencia\n"
+            "A,A,NUEVA-1\n"
+            f"B,B,{self.conductor.licencia}\n"  # Ya existe
+            "C,C,NUEVA-2\n"
+            "D,D,NUEVA-1\n"  # Repetida en otro bloque del mismo archivo
+        )
+        with mock.patch.object(lotes, "FILAS_POR_LOTE", 2), CaptureQueriesContext(connection) as consultas:
+            creadas, errores, cantidad = lotes.importar_csv(io.BytesIO(texto.encode()), ConductorSerializer)
+        self.assertEqual((creadas, cantidad), (0, 2))
+        self.assertEqual([(error["linea"], list(error["errores"])) for error in errores], [(3, ["licencia"]), (5, ["licencia"])])
+        self.assertFalse(Conductor.objects.filter(licencia__startswith="NUEVA-").exists())
+        # Una consulta por campo único y bloque, no una por fila
+        self.assertEqual(sum("licencia" in consulta["sql"] for consulta in consultas), 2)
+
+
+class CambiosTests(FilasDePrueba, TestCase):
+    """El feed de cambios devuelve altas, modificaciones y lápidas desde un cursor"""
+
+    def setUp(self):
+        super().setUp()
+        self.crear_filas(3)
+        self.cursor = self.client.get("/api/camiones/cambios/").data["cursor"]
+
+    def cambios(self, recurso, cursor=None):
+        respuesta = self.client.get(f"/api/{recurso}/cambios/", {"desde": cursor or self.cursor})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.data
+
+    def test_altas_modificaciones_y_bajas(self):
+        primero, segundo, tercero = Camion.objects.order_by("pk")
+        pedido = Pedido.objects.get(camion=tercero)
+        self.client.patch(f"/api/camiones/{primero.pk}/", {"capacidad": 20}, format="json")
+        nuevo = self.client.post("/api/camiones/", {
+            "marca": "M", "modelo": "N", "placa": "NUEVA", "capacidad": 5, "año": 2024,
+        }, format="json").data
+        self.client.delete(f"/api/camiones/{tercero.pk}/")
+
+        datos = self.cambios("camiones")
+        self.assertEqual([camion["id"] for camion in datos["cambios"]], [primero.pk, nuevo["id"]])
+        self.assertEqual(datos["cambios"][0]["capacidad"], 20)
+        self.assertEqual(datos["eliminados"], [tercero.pk])
+        self.assertFalse(datos["hay_mas"])
+
+        # Los gastos borrados en cascada dejan lápida y el pedido anulado (SET_NULL) figura como modificado
+        self.assertEqual(len(self.cambios("gastos")["eliminados"]), 1)
+        pedidos = self.cambios("pedidos")["cambios"]
+        self.assertEqual([(p["id"], p["camion_id"]) for p in pedidos], [(pedido.pk, None)])
+
+        # Desde el cursor devuelto no hay nada nuevo
+        self.assertEqual(self.cambios("camiones", datos["cursor"])["cambios"], [])
+        self.assertEqual(self.cambios("camiones", datos["cursor"])["eliminados"], [])
+
+    def test_operaciones_en_lote(self):
+        ids = list(Cliente.objects.values_list("pk", flat=True))
+        self.client.patch("/api/clientes/lote/", {"ids": ids[:2], "cambios": {"empresa": "X"}}, format="json")
+        self.client.delete("/api/clientes/lote/", {"ids": ids[2:]}, format="json")
+
+        datos = self.cambios("clientes")
+        self.assertEqual([cliente["id"] for cliente in datos["cambios"]], ids[:2])
+        self.assertEqual(datos["eliminados"], ids[2:])
+
+    def test_paginado_y_consultas(self):
+        for conductor in Conductor.objects.all():
+            conductor.save()
+        with CaptureQueriesContext(connection) as consultas:
+            datos = self.client.get(
+                "/api/conductores/cambios/", {"desde": self.cursor, "limite": 2}
+            ).data
+        self.assertEqual(len(consultas), 3)  # Cursor vigente, cambios y objetos
+        self.assertTrue(datos["hay_mas"])
+        self.assertEqual(len(self.cambios("conductores", datos["cursor"])["cambios"]), 1)
+
+    def test_transaccion_confirmada_tarde(self):
+        # Simula dos transacciones intercaladas de PostgreSQL: la 10 empieza antes y se confirma
+        # después que la 11. Mientras la 10 sigue en curso no se publica nada de la 11.
+        conductor_a, conductor_b = Conductor.objects.order_by("pk")[:2]
+        etiqueta = Conductor._meta.label_lower
+        Cambio.objects.create(modelo=etiqueta, objeto_id=conductor_a.pk, operacion=Cambio.ACTUALIZADO, transaccion=10)
+        Cambio.objects.create(modelo=etiqueta, objeto_id=conductor_b.pk, operacion=Cambio.ACTUALIZADO, transaccion=11)
+
+        with mock.patch.object(cambios, "_horizonte", return_value=10):
+            datos = self.cambios("conductores")
+            self.assertEqual((datos["cambios"], datos["cursor"]), ([], self.cursor))
+            self.assertEqual(self.client.get("/api/conductores/cambios/").data["cursor"], self.cursor)
+
+        # La 10 se confirma (el id más bajo) y después llega otro cambio de la 11 con id mayor:
+        # ambos aparecen en orden de transacción, sin saltear ninguno
+        Cambio.objects.create(modelo=etiqueta, objeto_id=conductor_a.pk, operacion=Cambio.ELIMINADO, transaccion=10)
+        with mock.patch.object(cambios, "_horizonte", return_value=12):
+            datos = self.cambios("conductores")
+            self.assertEqual([c["id"] for c in datos["cambios"]], [conductor_b.pk])
+            self.assertEqual(datos["eliminados"], [conductor_a.pk])
+            ultimo = Cambio.objects.filter(transaccion=11).latest("id")
+            self.assertEqual(datos["cursor"], f"11.{ultimo.pk}")
+            self.assertEqual(self.cambios("conductores", datos["cursor"])["cambios"], [])
+
+        self.assertEqual(self.client.get("/api/conductores/cambios/", {"desde": "x.1"}).status_code, 400)
+
+    def test_cursor_purgado(self):
+        Conductor.objects.first().save()
+        Cambio.objects.update(fecha=timezone.now() - timedelta(days=365))
+        Conductor.objects.first().save()
+        call_command("purgar_cambios", stdout=io.StringIO())
+        respuesta = self.client.get("/api/conductores/cambios/", {"desde": self.cursor})
+        self.assertEqual(respuesta.status_code, 410)
+
+    def test_escritura_y_cambio_en_la_misma_transaccion(self):
+        # Si no se puede registrar el cambio, la escritura se revierte: el feed nunca la pierde
+        camion = Camion.objects.order_by("pk").first()
+        with mock.patch.object(cambios, "registrar", side_effect=DatabaseError("feed")):
+            with self.assertRaises(DatabaseError):
+                Camion.objects.create(marca="M", modelo="N", placa="SIN-FEED", capacidad=5, año=2024)
+            camion.capacidad = 99
+            with self.assertRaises(DatabaseError):
+                camion.save()
+            with self.assertRaises(DatabaseError):
+                self.client.patch(f"/api/facturas/{Factura.objects.first().pk}/", {"peajes": "1.00"}, format="json")
+        self.assertFalse(Camion.objects.filter(placa="SIN-FEED").exists())
+        camion.refresh_from_db()
+        self.assertNotEqual(camion.capacidad, 99)
+        self.assertFalse(Factura.objects.filter(peajes=Decimal("1.00")).exists())
+
+
+class AutenticacionCacheadaTests(TestCase):
+    """Las peticiones con JWT no consultan la tabla de usuarios mientras el usuario está en la caché"""
+
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(username="chofer")
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.usuario)}")
+
+    def consultas_de_usuario(self):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get("/api/protected/")
+        return respuesta, [consulta for consulta in consultas if "auth_user" in consulta["sql"]]
+
+    def test_sin_consultas_con_usuario_cacheado(self):
+        respuesta, consultas = self.consultas_de_usuario()
+        self.assertEqual((respuesta.status_code, len(consultas)), (200, 1))
+        respuesta, consultas = self.consultas_de_usuario()
+        self.assertEqual((respuesta.status_code, len(consultas)), (200, 0))
+        self.assertEqual(respuesta.data["user"], "chofer")
+
+    def test_cache_sin_datos_sensibles(self):
+        from .autenticacion import clave_usuario
+
+        self.consultas_de_usuario()
+        campos, revocacion = cache.get(clave_usuario(self.usuario.pk))
+        self.assertEqual(set(campos), {"id", "username", "is_active", "is_staff", "is_superuser"})
+        self.assertNotIn(self.usuario.password, revocacion or "")
+
+        # El perfil se lee completo aunque el usuario autenticado venga de la caché
+        User.objects.filter(pk=self.usuario.pk).update(email="chofer@test.com")
+        respuesta = self.client.get("/api/usuarios/me/")
+        self.assertEqual((respuesta.status_code, respuesta.data["email"]), (200, "chofer@test.com"))
+
+    def test_cambio_de_contrasena_revoca(self):
+        from rest_framework_simplejwt.settings import api_settings
+
+        # Se parchea el objeto compartido: SimpleJWT no ve `override_settings` en los módulos que ya lo importaron
+        with mock.patch.object(api_settings, "CHECK_REVOKE_TOKEN", True, create=True):
+            self.client.credentials(HTTP_AUTHORIZATION=f"Bearer {AccessToken.for_user(self.usuario)}")
+            self.consultas_de_usuario()
+            respuesta, consultas = self.consultas_de_usuario()
+            self.assertEqual((respuesta.status_code, len(consultas)), (200, 0))
+            with self.captureOnCommitCallbacks(execute=True):
+                self.usuario.set_password("otra")
+                self.usuario.save()
+            respuesta, _ = self.consultas_de_usuario()
+            self.assertEqual(respuesta.status_code, 401)
+
+    def test_desactivar_invalida(self):
+        self.consultas_de_usuario()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.is_active = False
+            self.usuario.save()
+        respuesta, consultas = self.consultas_de_usuario()
+        self.assertEqual((respuesta.status_code, len(consultas)), (401, 1))
+
+
+class UbicacionesEnVivoTests(TestCase):
+    """Las posiciones ingestadas llegan a los suscriptores del camión y de la flota"""
+
+    def setUp(self):
+        self.camion = Camion.objects.create(marca="M", modelo="N", placa="VIVO-1", capacidad=10, año=2020)
+        self.otro = Camion.objects.create(marca="M", modelo="N", placa="VIVO-2", capacidad=10, año=2020)
+        self.token = str(AccessToken.for_user(User.objects.create_user(username="mapa")))
+
+    async def leer(self, stream):
+        return await asyncio.wait_for(stream.__anext__(), timeout=5)
+
+    async def test_stream_por_camion_y_flota(self):
+        respuesta = await self.async_client.get(
+            "/api/ubicaciones/en_vivo/", {"camion_id": self.camion.pk, "token": self.token}
+        )
+        self.assertEqual(respuesta["Content-Type"], "text/event-stream")
+        stream = respuesta.streaming_content
+        self.assertEqual(await self.leer(stream), b"retry: 3000\n\n")
+
+        flota = difusion.hub().suscribir([difusion.CANAL_FLOTA])
+        try:
+            puntos = [
+                {"camion_id": self.otro.pk, "latitud": -30.0, "longitud": -60.0},
+                {"camion_id": self.camion.pk, "latitud": -34.0, "longitud": -58.0, "timestamp": "2025-01-01T10:00:00Z"},
+                {"camion_id": self.camion.pk, "latitud": -34.5, "longitud": -58.5, "timestamp": "2025-01-01T10:05:00Z"},
+            ]
+            await sync_to_async(self.ingestar)(puntos)
+
+            # Solo el punto más reciente del camión, y nada del otro camión
+            evento = await self.leer(stream)
+            self.assertIn(b"event: ubicacion", evento)
+            datos = json.loads(evento.split(b"data: ", 1)[1])
+            self.assertEqual((datos["camion_id"], datos["latitud"]), (self.camion.pk, -34.5))
+            self.assertEqual(datos["timestamp"], "2025-01-01T10:05:00Z")
+
+            recibidos = {json.loads((await flota.recibir(timeout=5)).split(b"data: ", 1)[1])["camion_id"] for _ in range(2)}
+            self.assertEqual(recibidos, {self.camion.pk, self.otro.pk})
+
+            # Al desconectarse el cliente el servidor cancela la tarea que lee el stream: se libera la suscripción
+            lectura = asyncio.ensure_future(self.leer(stream))
+            await asyncio.sleep(0.01)
+            lectura.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await lectura
+            self.assertEqual(difusion.hub().cantidad_suscriptores(difusion.canal_camion(self.camion.pk)), 0)
+        finally:
+            flota.cerrar()
+
+    def ingestar(self, puntos):
+        with self.captureOnCommitCallbacks(execute=True):
+            ingestar_ubicaciones(puntos)
+
+    async def test_requiere_token_valido(self):
+        respuesta = await self.async_client.get("/api/ubicaciones/en_vivo/")
+        self.assertEqual(respuesta.status_code, 401)
+        respuesta = await self.async_client.get("/api/ubicaciones/en_vivo/", {"token": "invalido"})
+        self.assertEqual(respuesta.status_code, 401)
+
+
+class IngestaTests(TestCase):
+    """Lotes de ubicaciones: errores por índice, límite del lote y consultas fijas por lote"""
+
+    URL = "/api/ubicaciones/lote/"
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="ingesta"))
+        self.camiones = Camion.objects.bulk_create([
+            Camion(marca="M", modelo="N", placa=f"ING-{i}", capacidad=10, año=2020) for i in range(4)
+        ])
+
+    def puntos(self, cantidad, camiones):
+        return [
+            {"camion_id": camiones[i % len(camiones)].pk, "latitud": -34.0 + i / 1000, "longitud": -58.0, "timestamp": f"2025-01-01T10:{i % 60:02d}:00Z"}
+            for i in range(cantidad)
+        ]
+
+    def test_lote_mixto(self):
+        camion = self.camiones[0]
+        respuesta = self.client.post(self.URL, {"ubicaciones": [
+            {"camion_id": camion.pk, "latitud": -34.0, "longitud": -58.0},
+            {"camion_id": camion.pk, "latitud": 95, "longitud": -58.0},  # Latitud fuera de rango
+            {"camion_id": 999999, "latitud": -34.0, "longitud": -58.0},  # Camión inexistente
+            {"camion_id": camion.pk, "longitud": -58.0},  # Falta la latitud
+            {"camion_id": camion.pk, "latitud": -34.1, "longitud": -58.1, "timestamp": "2025-01-01T10:00:00Z"},
+        ]}, format="json")
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertEqual((respuesta.data["creadas"], respuesta.data["rechazadas"]), (2, 3))
+        errores = [(error["indice"], list(error["errores"])) for error in respuesta.data["errores"]]
+        self.assertEqual(errores, [(1, ["latitud"]), (2, ["camion_id"]), (3, ["latitud"])])
+        self.assertEqual(Ubicacion.objects.filter(camion=camion).count(), 2)
+
+    def test_todo_rechazado(self):
+        respuesta = self.client.post(self.URL, [{"camion_id": 999999, "latitud": -34.0, "longitud": -58.0}], format="json")
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual((respuesta.data["creadas"], respuesta.data["rechazadas"]), (0, 1))
+        self.assertFalse(Ubicacion.objects.exists())
+
+    @override_settings(UBICACIONES_LOTE_MAXIMO=3)
+    def test_maximo_del_lote(self):
+        self.assertEqual(self.client.post(self.URL, self.puntos(4, self.camiones), format="json").status_code, 400)
+        self.assertEqual(self.client.post(self.URL, [], format="json").status_code, 400)
+        self.assertFalse(Ubicacion.objects.exists())
+        self.assertEqual(self.client.post(self.URL, self.puntos(3, self.camiones), format="json").status_code, 201)
+
+    def test_timestamp_por_defecto(self):
+        antes = timezone.now()
+        creadas, errores = ingestar_ubicaciones([{"camion_id": self.camiones[0].pk, "latitud": -34.0, "longitud": -58.0}])
+        self.assertEqual(errores, [])
+        self.assertTrue(antes <= Ubicacion.objects.get(pk=creadas[0].pk).timestamp <= timezone.now())
+
+    def test_consultas_constantes(self):
+        # Todos los camiones ya tienen última ubicación: los dos lotes la actualizan
+        ingestar_ubicaciones([{"camion_id": camion.pk, "latitud": 0, "longitud": 0, "timestamp": "2024-01-01T00:00:00Z"} for camion in self.camiones])
+        with CaptureQueriesContext(connection) as pocas:
+            ingestar_ubicaciones(self.puntos(2, self.camiones[:1]))
+        with CaptureQueriesContext(connection) as muchas:
+            creadas, _ = ingestar_ubicaciones(self.puntos(200, self.camiones) + [{"camion_id": 999999, "latitud": 0, "longitud": 0}])
+        self.assertEqual(len(creadas), 200)
+        self.assertEqual(len(pocas), len(muchas))
+
+
+class UltimaUbicacionTests(TestCase):
+    """`UltimaUbicacion` siempre refleja el punto más reciente de cada camión"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="gps"))
+        self.camion = Camion.objects.create(marca="M", modelo="N", placa="ULT-1", capacidad=10, año=2020)
+        self.otro = Camion.objects.create(marca="M", modelo="N", placa="ULT-2", capacidad=10, año=2020)
+
+    def punto(self, camion, minuto, latitud=-34.0):
+        return {"camion_id": camion.pk, "latitud": latitud, "longitud": -58.0, "timestamp": f"2025-01-01T10:{minuto:02d}:00Z"}
+
+    def ultima(self, camion):
+        return UltimaUbicacion.objects.filter(camion=camion).values_list("ubicacion_id", "latitud").first()
+
+    def test_punto_viejo_no_pisa_al_nuevo(self):
+        creadas, _ = ingestar_ubicaciones([self.punto(self.camion, 5, -34.5), self.punto(self.camion, 1, -34.1)])
+        self.assertEqual(self.ultima(self.camion), (creadas[0].pk, -34.5))
+
+        # Llega tarde (en otro lote) un punto anterior al último conocido
+        ingestar_ubicaciones([self.punto(self.camion, 3, -34.3)])
+        self.assertEqual(self.ultima(self.camion), (creadas[0].pk, -34.5))
+
+        nuevas, _ = ingestar_ubicaciones([self.punto(self.camion, 8, -34.8), self.punto(self.otro, 0)])
+        self.assertEqual(self.ultima(self.camion), (nuevas[0].pk, -34.8))
+        self.assertEqual(self.ultima(self.otro), (nuevas[1].pk, -34.0))
+
+    def test_editar_y_borrar_recalculan(self):
+        (vieja, reciente), _ = ingestar_ubicaciones([self.punto(self.camion, 1, -34.1), self.punto(self.camion, 5, -34.5)])
+
+        respuesta = self.client.patch(f"/api/ubicaciones/{reciente.pk}/", {"latitud": -35.0}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.ultima(self.camion), (reciente.pk, -35.0))
+
+        # Pasar el punto a otro camión recalcula los dos
+        respuesta = self.client.patch(f"/api/ubicaciones/{reciente.pk}/", {"camion_id": self.otro.pk}, format="json")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(self.ultima(self.camion), (vieja.pk, -34.1))
+        self.assertEqual(self.ultima(self.otro), (reciente.pk, -35.0))
+
+        self.assertEqual(self.client.delete(f"/api/ubicaciones/{vieja.pk}/").status_code, 204)
+        self.assertIsNone(self.ultima(self.camion))
+        self.assertEqual(self.ultima(self.otro), (reciente.pk, -35.0))
+
+    def test_edicion_atomica_y_difundida_al_confirmar(self):
+        (vieja, reciente), _ = ingestar_ubicaciones([self.punto(self.camion, 1, -34.1), self.punto(self.camion, 5, -34.5)])
+
+        with mock.patch.object(difusion, "publicar_ubicaciones") as publicar:
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.delete(f"/api/ubicaciones/{reciente.pk}/")
+            publicar.assert_not_called()
+            for callback in callbacks:
+                callback()
+        [(ubicaciones,), _] = publicar.call_args
+        self.assertEqual([ubicacion.pk for ubicacion in ubicaciones], [vieja.pk])
+
+        # Si falla el recálculo, la edición del punto se revierte con él
+        with mock.patch("core.views.recalcular_ultima_ubicacion", side_effect=DatabaseError("bloqueo")):
+            with self.assertRaises(DatabaseError):
+                self.client.patch(f"/api/ubicaciones/{vieja.pk}/", {"latitud": -40.0}, format="json")
+        vieja.refresh_from_db()
+        self.assertEqual(vieja.latitud, -34.1)
+
+    def test_flota_en_una_consulta(self):
+        for cantidad in (2, 10):
+            while Camion.objects.count() < cantidad:
+                n = Camion.objects.count()
+                Camion.objects.create(marca="M", modelo="N", placa=f"FLOTA-{n}", capacidad=10, año=2020)
+            ingestar_ubicaciones([self.punto(camion, 1) for camion in Camion.objects.order_by("pk")[1:]])
+            with CaptureQueriesContext(connection) as consultas:
+                respuesta = self.client.get("/api/ubicaciones/flota/")
+            self.assertEqual(len(respuesta.data), cantidad)
+            self.assertEqual(len(consultas), 1)
+            self.assertIsNone(respuesta.data[0]["latitud"])  # El primer camión no tiene posición
+
+
+class BusquedaEspacialTests(TestCase):
+    """Las búsquedas por zona y cercanía sobre la grilla coinciden con recorrer toda la flota"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="despacho"))
+        azar = random.Random(18)
+        camiones = Camion.objects.bulk_create([
+            Camion(marca="M", modelo="N", placa=f"GEO-{i}", capacidad=10, año=2020) for i in range(300)
+        ])
+        puntos = [
+            {"camion_id": camion.pk, "latitud": azar.uniform(-40, -30), "longitud": azar.uniform(-65, -55)}
+            for camion in camiones[:280]
+        ] + [  # Algunos a ambos lados del antimeridiano
+            {"camion_id": camion.pk, "latitud": azar.uniform(-20, -10), "longitud": azar.choice([-1, 1]) * azar.uniform(179, 180)}
+            for camion in camiones[280:]
+        ]
+        ingestar_ubicaciones(puntos)
+        self.posiciones = {punto["camion_id"]: (punto["latitud"], punto["longitud"]) for punto in puntos}
+
+    def test_en_area(self):
+        for sur, oeste, norte, este in [(-36, -60, -34, -57), (-40, -65, -30, -55), (-20, 179, -10, -179), (0, 0, 10, 10)]:
+            with self.subTest(caja=(sur, oeste, norte, este)):
+                respuesta = self.client.get("/api/ubicaciones/en_area/", {"sur": sur, "oeste": oeste, "norte": norte, "este": este})
+                esperados = sorted(
+                    camion_id for camion_id, (latitud, longitud) in self.posiciones.items()
+                    if sur <= latitud <= norte and (oeste <= longitud <= este if oeste <= este else longitud >= oeste or longitud <= este)
+                )
+                self.assertEqual([posicion["camion_id"] for posicion in respuesta.data], esperados)
+
+    def test_cercanos(self):
+        for latitud, longitud, k, radio_km in [(-35, -58, 5, None), (-35, -58, 300, None), (-32, -62, 10, 50), (-15, 180, 3, None)]:
+            with self.subTest(punto=(latitud, longitud), k=k, radio_km=radio_km):
+                parametros = {"latitud": latitud, "longitud": longitud, "k": min(k, 100)}
+                if radio_km:
+                    parametros["radio_km"] = radio_km
+                respuesta = self.client.get("/api/ubicaciones/cercanos/", parametros)
+                distancias = sorted(
+                    (espacial.distancia_km(latitud, longitud, *posicion), camion_id)
+                    for camion_id, posicion in self.posiciones.items()
+                )
+                esperados = [camion_id for distancia, camion_id in distancias if radio_km is None or distancia <= radio_km]
+                self.assertEqual([posicion["camion_id"] for posicion in respuesta.data], esperados[:min(k, 100)])
+
+
+class DistanciasTests(TestCase):
+    """El motor de viajes separa viajes y días y descarta saltos del GPS y el ruido de un camión detenido"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="flota"))
+        self.camion, self.nocturno = Camion.objects.bulk_create([
+            Camion(marca="M", modelo="N", placa=f"KM-{i}", capacidad=10, año=2020) for i in range(2)
+        ])
+        inicio = timezone.make_aware(timezone.datetime(2025, 3, 10, 8, 0))
+        puntos = []
+
+        def agregar(camion, minuto, latitud, longitud=-58.0):
+            puntos.append(Ubicacion(camion=camion, latitud=latitud, longitud=longitud, timestamp=inicio + timedelta(minutes=minuto)))
+
+        # Primer viaje: 10 minutos hacia el norte a ~67 km/h, con un salto del GPS en el medio
+        for minuto in range(11):
+            agregar(self.camion, minuto, -35.0 + 0.01 * minuto)
+        agregar(self.camion, 5.5, -30.0)
+        # 30 minutos detenido con ruido de ~1 m por lectura, y un segundo viaje de 5 minutos
+        for minuto in range(11, 41):
+            agregar(self.camion, minuto, -34.9 + 0.00001 * (minuto % 2))
+        for minuto in range(41, 46):
+            agregar(self.camion, minuto, -34.9 + 0.01 * (minuto - 40))
+        # Un viaje que cruza la medianoche: cada tramo cuenta en el día en que empieza
+        for minuto in range(950, 971, 5):
+            agregar(self.nocturno, minuto, -35.0, -58.0 + 0.01 * (minuto - 950) / 5)
+        Ubicacion.objects.bulk_create(puntos)
+        self.tramo_km = espacial.distancia_km(-35.0, -58.0, -34.99, -58.0)
+
+    def test_cargar_flota_por_bloques(self):
+        inicio = timezone.make_aware(timezone.datetime(2025, 3, 10))
+        fin = inicio + timedelta(days=2)
+        esperados = list(Ubicacion.objects.order_by("camion_id", "timestamp", "id").values_list("camion_id", "latitud", "timestamp"))
+        with mock.patch.object(viajes, "FILAS_POR_BLOQUE", 7):
+            camiones, latitudes, _, timestamps = viajes.cargar_flota(inicio, fin)
+        self.assertEqual(camiones.dtype, np.int64)
+        self.assertEqual(camiones.tolist(), [fila[0] for fila in esperados])
+        self.assertEqual(latitudes.tolist(), [fila[1] for fila in esperados])
+        self.assertEqual(timestamps.tolist(), [fila[2].timestamp() for fila in esperados])
+        self.assertEqual(len(viajes.cargar_flota(inicio, fin, camion_ids=[self.nocturno.pk])[0]), 5)
+        self.assertEqual(len(viajes.cargar_flota(fin, fin + timedelta(days=1))[0]), 0)
+
+    def test_calculo_por_dia(self):
+        call_command("calcular_distancias", "--desde=2025-03-10", "--hasta=2025-03-11", stdout=io.StringIO())
+        dias = {
+            (fila.camion_id, fila.fecha): fila
+            for fila in DistanciaDiaria.objects.all()
+        }
+        dia = dias[(self.camion.pk, date(2025, 3, 10))]
+        # 10 + 5 tramos, menos los dos hacia y desde el salto (el tramo 5 -> 5.5 -> 6 no suma)
+        self.assertAlmostEqual(dia.distancia_km, 14 * self.tramo_km, delta=0.05)
+        self.assertEqual(dia.viajes, 2)
+        self.assertEqual(dia.segundos_en_movimiento, 14 * 60)
+        self.assertLess(dia.velocidad_maxima_kmh, 70)
+        self.assertEqual(dia.puntos, 47)
+
+        tramo_km = espacial.distancia_km(-35.0, -58.0, -35.0, -57.99)
+        self.assertAlmostEqual(dias[(self.nocturno.pk, date(2025, 3, 10))].distancia_km, 2 * tramo_km, delta=0.01)
+        self.assertAlmostEqual(dias[(self.nocturno.pk, date(2025, 3, 11))].distancia_km, 2 * tramo_km, delta=0.01)
+        # El viaje se cuenta una sola vez, el día en que empezó
+        self.assertEqual(dias[(self.nocturno.pk, date(2025, 3, 10))].viajes, 1)
+        self.assertEqual(dias[(self.nocturno.pk, date(2025, 3, 11))].viajes, 0)
+
+        # Recalcular reemplaza las filas en lugar de duplicarlas
+        call_command("calcular_distancias", "--desde=2025-03-10", "--hasta=2025-03-11", stdout=io.StringIO())
+        self.assertEqual(DistanciaDiaria.objects.count(), 3)
+
+    def test_endpoints(self):
+        call_command("calcular_distancias", "--desde=2025-03-10", "--hasta=2025-03-11", stdout=io.StringIO())
+
+        respuesta = self.client.get(f"/api/camiones/{self.nocturno.pk}/distancias/", {"mes": "2025-03"})
+        self.assertEqual([fila["periodo"] for fila in respuesta.data["distancias"]], ["2025-03-10", "2025-03-11"])
+
+        respuesta = self.client.get(f"/api/camiones/{self.nocturno.pk}/distancias/", {"mes": "2025-03", "agrupar": "mes"})
+        self.assertEqual(len(respuesta.data["distancias"]), 1)
+        self.assertEqual(respuesta.data["distancias"][0]["periodo"], "2025-03-01")
+        self.assertEqual(respuesta.data["distancias"][0]["viajes"], 1)
+
+        respuesta = self.client.get("/api/camiones/distancias_flota/", {"desde": "2025-03-10", "hasta": "2025-03-10"})
+        self.assertEqual([fila["placa"] for fila in respuesta.data], ["KM-0", "KM-1"])
+
+        self.assertEqual(self.client.get("/api/camiones/distancias_flota/", {"mes": "2025-13"}).status_code, 400)
+        self.assertEqual(self.client.get(f"/api/camiones/{self.camion.pk}/distancias/", {"agrupar": "año"}).status_code, 400)
+
+
+class RecorridoTests(TestCase):
+    """Simplificación de Douglas-Peucker y ventana del recorrido (historial archivado más tabla viva)"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="recorrido"))
+        self.camion = Camion.objects.create(marca="M", modelo="N", placa="REC-1", capacidad=10, año=2020)
+        self.ahora = timezone.now().replace(microsecond=0)
+
+    def test_douglas_peucker(self):
+        # Una recta con un desvío de 0.01° en el medio
+        longitudes = np.linspace(-58.0, -57.9, 11)
+        latitudes = np.full(11, -34.0)
+        latitudes[5] += 0.01
+        self.assertEqual(douglas_peucker(latitudes, longitudes, 0.02).tolist(), [0, 10])
+        self.assertEqual(douglas_peucker(latitudes, longitudes, 0.005).tolist(), [0, 4, 5, 6, 10])
+        self.assertEqual(douglas_peucker(latitudes, longitudes, 0).tolist(), list(range(11)))
+        self.assertEqual(douglas_peucker(latitudes[:2], longitudes[:2], 1).tolist(), [0, 1])
+
+    def test_extremos_siempre_se_conservan(self):
+        azar = np.random.default_rng(3)
+        latitudes = -34 + np.cumsum(azar.uniform(-0.001, 0.001, 500))
+        longitudes = -58 + np.cumsum(azar.uniform(-0.001, 0.001, 500))
+        for tolerancia in (1e-5, 1e-3, 1.0):
+            indices = douglas_peucker(latitudes, longitudes, tolerancia)
+            self.assertEqual((indices[0], indices[-1]), (0, 499))
+            self.assertTrue(np.all(np.diff(indices) > 0))
+
+    def test_cargar_puntos_combina_archivo_y_tabla(self):
+        momentos = [self.ahora - timedelta(days=dias, hours=horas) for dias in (20, 15, 2) for horas in (3, 1)]
+        ingestar_ubicaciones([
+            {"camion_id": self.camion.pk, "latitud": -34.0 - i / 1000, "longitud": -58.0, "timestamp": momento}
+            for i, momento in enumerate(momentos)
+        ])
+        call_command("archivar_ubicaciones", "--dias=10", stdout=io.StringIO())
+        self.assertTrue(SegmentoUbicacion.objects.exists())
+
+        latitudes, _, timestamps = cargar_puntos(self.camion.pk, self.ahora - timedelta(days=16), self.ahora)
+        self.assertEqual(timestamps.tolist(), [momento.timestamp() for momento in momentos[2:]])
+        np.testing.assert_allclose(latitudes, [-34.002, -34.003, -34.004, -34.005])
+
+    def test_ventana(self):
+        Ubicacion.objects.bulk_create([
+            Ubicacion(camion=self.camion, latitud=-34.0, longitud=-58.0 + i / 100, timestamp=self.ahora - timedelta(hours=horas))
+            for i, horas in enumerate((72, 30, 5, 1))
+        ])
+        url = "/api/ubicaciones/recorrido/"
+        # Sin ventana: solo las últimas 24 horas
+        respuesta = self.client.get(url, {"camion_id": self.camion.pk, "tolerancia": 0})
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.data["puntos_originales"], 2)
+
+        desde = (self.ahora - timedelta(days=4)).isoformat()
+        respuesta = self.client.get(url, {"camion_id": self.camion.pk, "tolerancia": 0, "desde": desde})
+        self.assertEqual(respuesta.data["puntos_originales"], 4)
+        for zoom in (0, 22):
+            self.assertEqual(self.client.get(url, {"camion_id": self.camion.pk, "zoom": zoom}).status_code, 200)
+
+        for parametros in (
+            {"desde": (self.ahora - timedelta(days=40)).isoformat()},  # Supera el máximo
+            {"desde": self.ahora.isoformat(), "hasta": (self.ahora - timedelta(hours=1)).isoformat()},
+            {"desde": "ayer"},
+            {"zoom": 2000},  # 2 ** zoom desborda el float
+            {"zoom": -2000},  # 2 ** zoom se redondea a cero
+            {"zoom": 23},
+            {"tolerancia": "nan"},
+            {"tolerancia": "inf"},
+            {"tolerancia": -1},
+        ):
+            with self.subTest(parametros=parametros):
+                self.assertEqual(self.client.get(url, {"camion_id": self.camion.pk, **parametros}).status_code, 400)
+        self.assertEqual(self.client.get(url, {"camion_id": "x"}).status_code, 400)
+
+
+class ArchivoUbicacionesTests(TestCase):
+    """El historial archivado ocupa menos y se sigue leyendo igual que antes de archivarlo"""
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="archivo"))
+        self.camion, self.inactivo = Camion.objects.bulk_create([
+            Camion(marca="M", modelo="N", placa=f"ARC-{i}", capacidad=10, año=2020) for i in range(2)
+        ])
+        azar = random.Random(21)
+        ahora = timezone.now().replace(microsecond=123456)
+        puntos = []
+        for camion, dias in ((self.camion, 12), (self.inactivo, 30)):
+            latitud, longitud = -35.0, -58.0
+            for minuto in range(0, 60 * 24 * 5, 7):  # Cinco días, un punto cada 7 minutos
+                latitud += azar.uniform(-0.002, 0.002)
+                longitud += azar.uniform(-0.002, 0.002)
+                momento = ahora - timedelta(days=dias) + timedelta(minutes=minuto, seconds=azar.randint(0, 59))
+                puntos.append({"camion_id": camion.pk, "latitud": round(latitud, 6), "longitud": round(longitud, 6), "timestamp": momento})
+        ingestar_ubicaciones(puntos)
+        self.total = len(puntos)
+        self.ahora = ahora + timedelta(minutes=1)
+
+    def recorrido(self, camion):
+        respuesta = self.client.get("/api/ubicaciones/recorrido/", {
+            "camion_id": camion.pk, "tolerancia": 0, "desde": (self.ahora - timedelta(days=31)).isoformat(), "hasta": self.ahora.isoformat(),
+        })
+        return respuesta.data["recorrido"], respuesta.data["inicio"], respuesta.data["fin"]
+
+    def test_empaquetar(self):
+        latitudes = np.array([-34.6037221, -34.6037222, -34.61])
+        longitudes = np.array([-58.3815591, -58.3815591, 179.9999999])
+        microsegundos = np.array([1_700_000_000_123_456, 1_700_000_005_000_000, 1_700_000_060_000_001])
+        resultado = archivo.desempaquetar(archivo.empaquetar(latitudes, longitudes, microsegundos), 3)
+        np.testing.assert_allclose(resultado[0], latitudes, atol=1e-9)
+        np.testing.assert_allclose(resultado[1], longitudes, atol=1e-9)
+        np.testing.assert_array_equal(resultado[2], microsegundos)
+
+    def test_archivar(self):
+        antes = {camion.pk: self.recorrido(camion) for camion in (self.camion, self.inactivo)}
+        distancias_antes = viajes.analizar(*viajes.cargar_flota(timezone.now() - timedelta(days=40), timezone.now()))
+
+        limite = inicio_del_dia(timezone.localdate() - timedelta(days=10))
+        recientes = Ubicacion.objects.filter(timestamp__gte=limite).count()
+
+        call_command("archivar_ubicaciones", "--dias=10", stdout=io.StringIO())
+
+        # Quedan los puntos recientes y la última posición del camión inactivo
+        self.assertEqual(Ubicacion.objects.count(), recientes + 1)
+        self.assertEqual(SegmentoUbicacion.objects.aggregate(total=Sum("cantidad"))["total"], self.total - recientes - 1)
+        self.assertFalse(SegmentoUbicacion.objects.filter(fin__gte=limite).exists())
+        tamano = sum(len(segmento.datos) for segmento in SegmentoUbicacion.objects.all())
+        self.assertLess(tamano, self.total * 8)  # Una fila de `Ubicacion` ocupa más de 40 bytes
+
+        for camion in (self.camion, self.inactivo):
+            recorrido, inicio, fin = self.recorrido(camion)
+            self.assertEqual((inicio, fin), antes[camion.pk][1:])
+            np.testing.assert_allclose(recorrido, antes[camion.pk][0], atol=1e-7)
+        distancias = viajes.analizar(*viajes.cargar_flota(timezone.now() - timedelta(days=40), timezone.now()))
+        self.assertEqual([(fila["camion_id"], fila["fecha"], fila["viajes"]) for fila in distancias],
+                         [(fila["camion_id"], fila["fecha"], fila["viajes"]) for fila in distancias_antes])
+        self.assertEqual(self.client.get("/api/ubicaciones/ubicacion_actual/", {"camion_id": self.inactivo.pk}).status_code, 200)
+
+        # Un punto atrasado se une al segmento de su día en la próxima pasada
+        segmento = SegmentoUbicacion.objects.filter(camion=self.camion).order_by("fecha").first()
+        Ubicacion.objects.create(camion=self.camion, latitud=-35.0, longitud=-58.0, timestamp=segmento.inicio + timedelta(seconds=1))
+        call_command("archivar_ubicaciones", "--dias=10", stdout=io.StringIO())
+        actualizado = SegmentoUbicacion.objects.get(camion=self.camion, fecha=segmento.fecha)
+        self.assertEqual(actualizado.cantidad, segmento.cantidad + 1)
+        self.assertEqual(Ubicacion.objects.count(), recientes + 1)
+
+    def test_borra_solo_las_filas_empaquetadas(self):
+        # Un punto viejo que se confirma mientras se archiva, con un id menor que los leídos
+        hueco = Ubicacion.objects.filter(camion=self.camion).order_by("timestamp").first()
+        hueco_id, momento = hueco.pk, hueco.timestamp + timedelta(seconds=1)
+        hueco.delete()
+        borrar = archivo._borrar_ubicaciones
+
+        def con_intruso(ids):
+            if not Ubicacion.objects.filter(pk=hueco_id).exists():
+                Ubicacion.objects.create(id=hueco_id, camion=self.camion, latitud=-35.0, longitud=-58.0, timestamp=momento)
+            borrar(ids)
+
+        with mock.patch.object(archivo, "_borrar_ubicaciones", side_effect=con_intruso):
+            call_command("archivar_ubicaciones", "--dias=10", stdout=io.StringIO())
+        self.assertTrue(Ubicacion.objects.filter(pk=hueco_id).exists())
+        # Queda para la próxima pasada
+        call_command("archivar_ubicaciones", "--dias=10", stdout=io.StringIO())
+        self.assertFalse(Ubicacion.objects.filter(pk=hueco_id).exists())
+
+    def test_conserva_la_ultima_ubicacion_vigente(self):
+        # La última posición cambió (se borraron los puntos más nuevos) después de elegir el lote
+        ultima = UltimaUbicacion.objects.get(camion=self.inactivo)
+        vieja = Ubicacion.objects.filter(camion=self.inactivo).order_by("timestamp")[10]
+        UltimaUbicacion.objects.filter(pk=ultima.pk).update(ubicacion=vieja)
+
+        lote = Ubicacion.objects.filter(camion=self.inactivo, timestamp__lt=vieja.timestamp + timedelta(days=1))
+        cantidad = lote.count()
+        _, archivados = archivo._archivar_lote(lote, self.inactivo.pk, timezone.localdate(lote.order_by("timestamp").first().timestamp))
+        self.assertEqual(archivados, cantidad - 1)
+        self.assertEqual(UltimaUbicacion.objects.get(camion=self.inactivo).ubicacion_id, vieja.pk)
+        self.assertTrue(Ubicacion.objects.filter(pk=vieja.pk).exists())
+
+
+class ReplicasTests(SimpleTestCase):
+    """Decisiones del router: qué lecturas van a la réplica y cuándo vuelven a la base principal"""
+
+    def setUp(self):
+        self.router = replicas.RouterReplicas()
+        disponible = mock.patch.object(replicas, "_disponible", side_effect=lambda alias: alias != "replica_caida")
+        disponible.start()
+        self.addCleanup(disponible.stop)
+
+    @override_settings(DATABASE_REPLICAS=["replica_1"])
+    def test_lecturas_marcadas_hasta_la_primera_escritura(self):
+        with replicas.contexto():
+            self.assertIsNone(self.router.db_for_read(Camion))  # Sin marcar: base principal
+            replicas.leer_de_replica()
+            self.assertEqual(self.router.db_for_read(Camion), "replica_1")
+            self.assertEqual(self.router.db_for_write(Pedido), "default")
+            self.assertIsNone(self.router.db_for_read(Camion))  # Lee lo que acaba de escribir
+        with replicas.contexto():
+            replicas.leer_de_replica()
+            self.assertEqual(self.router.db_for_read(Camion), "replica_1")  # Cada petición empieza de nuevo
+        self.assertIsNone(self.router.db_for_read(Camion))  # Fuera de una petición
+
+    @override_settings(DATABASE_REPLICAS=["replica_caida"])
+    def test_replica_caida(self):
+        with replicas.contexto():
+            replicas.leer_de_replica()
+            self.assertEqual(self.router.db_for_read(Camion), "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_sin_replicas(self):
+        with replicas.contexto():
+            replicas.leer_de_replica()
+            self.assertIsNone(self.router.db_for_read(Camion))
+
+
+@skipUnless(settings.DATABASE_REPLICAS, "Sin réplicas configuradas (DB_REPLICA_HOSTS)")
+class ReplicasIntegracionTests(TransactionTestCase):
+    """Con una réplica configurada, los reportes la usan salvo justo después de una escritura"""
+
+    databases = {"default", *settings.DATABASE_REPLICAS}
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(User.objects.create_user(username="reportes"))
+
+    def consultas_en_replicas(self, url):
+        capturas = [CaptureQueriesContext(connections[alias]) for alias in settings.DATABASE_REPLICAS]
+        for captura in capturas:
+            captura.__enter__()
+        try:
+            respuesta = self.client.get(url)
+            self.assertEqual(respuesta.status_code, 200)
+            if respuesta.streaming:
+                # El contenido se genera al leerlo, fuera de la petición (y de su estado de ruteo)
+                self.contenido = b"".join(respuesta.streaming_content)
+        finally:
+            for captura in capturas:
+                captura.__exit__(None, None, None)
+        return sum(len(captura) for captura in capturas)
+
+    def test_reportes_en_replica(self):
+        self.assertGreater(self.consultas_en_replicas("/api/metricas/pedidos_por_estado/"), 0)
+        camion = Camion.objects.create(marca="M", modelo="N", placa="REP-1", capacidad=10, año=2020)
+        cache.clear()
+        self.assertEqual(self.consultas_en_replicas(f"/api/camiones/{camion.pk}/"), 0)  # El detalle no está habilitado
+
+        cliente = Cliente.objects.create(nombre="Cliente", email="replica@test.com")
+        Pedido.objects.create(cliente=cliente, descripcion="Carga")
+        self.assertEqual(self.consultas_en_replicas("/api/metricas/pedidos_por_estado/"), 0)
+
+    def test_exportacion_en_streaming(self):
+        camion = Camion.objects.create(marca="M", modelo="N", placa="REP-2", capacidad=10, año=2020)
+        GastoCamion.objects.create(camion=camion, tipo_gasto="seguro", monto=Decimal("80.00"), fecha=date(2025, 1, 5))
+        cache.clear()
+        self.assertGreater(self.consultas_en_replicas("/api/gastos/exportar/"), 0)
+        self.assertIn("REP-2", self.contenido.decode("utf-8"))
+
+
+class InstrumentacionTests(FilasDePrueba, TestCase):
+    """Cada petición medida informa sus consultas en Server-Timing y suma a los histogramas de /metrics"""
+
+    def test_server_timing_y_metricas(self):
+        self.crear_filas(3)
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.get("/api/camiones/")
+        self.assertIn(f'desc="{len(consultas)} consultas"', respuesta["Server-Timing"])
+        self.assertIn("serializacion;dur=", respuesta["Server-Timing"])
+
+        with self.settings(INSTRUMENTACION_METRICAS_PUBLICAS=True):
+            metricas = self.client.get("/metrics").content.decode()
+        serie = 'endpoint="camion-list",metodo="GET",estado="2xx"'
+        self.assertIn(f"http_peticion_db_consultas_bucket{{{serie},le=\"+Inf\"}}", metricas)
+        self.assertIn(f"http_respuesta_bytes_sum{{{serie}}}", metricas)
+
+    def test_serializador_lento(self):
+        # La etapa "serializacion" incluye `serializer.data`, no solo el render del JSON
+        self.crear_filas(1)
+        to_representation = CamionSerializer.to_representation
+
+        def lento(serializador, instancia):
+            time.sleep(0.05)
+            return to_representation(serializador, instancia)
+
+        with mock.patch.object(CamionSerializer, "to_representation", lento):
+            respuesta = self.client.get(f"/api/camiones/{Camion.objects.get().pk}/")
+        etapas = dict(parte.split(";dur=") for parte in respuesta["Server-Timing"].split(", ") if "desc=" not in parte)
+        self.assertGreaterEqual(float(etapas["serializacion"]), 50)
+
+    @override_settings(INSTRUMENTACION_MUESTREO=0)
+    def test_sin_muestreo(self):
+        self.assertNotIn("Server-Timing", self.client.get("/api/camiones/"))
+
+    @override_settings(INSTRUMENTACION_LENTA_SEGUNDOS=0)
+    def test_peticion_lenta(self):
+        with self.assertLogs("core.instrumentacion", "WARNING") as registro:
+            self.client.get("/api/camiones/")
+        self.assertIn("camion-list", registro.output[0])
+
+    @override_settings(INSTRUMENTACION_TOKEN="secreto")
+    def test_token_de_metricas(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer otro").status_code, 401)
+        self.assertEqual(self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer secreto").status_code, 200)
+
+    def test_metricas_cerradas_por_defecto(self):
+        cliente = Client()
+        self.assertEqual(cliente.get("/metrics").status_code, 401)
+        cliente.force_login(User.objects.create_user(username="operador"))
+        self.assertEqual(cliente.get("/metrics").status_code, 403)
+        cliente.force_login(User.objects.create_user(username="admin", is_staff=True))
+        self.assertEqual(cliente.get("/metrics").status_code, 200)
+        with self.settings(INSTRUMENTACION_METRICAS_PUBLICAS=True):
+            self.assertEqual(Client().get("/metrics").status_code, 200)
+
+
+class PlanConsultasTests(TestCase):
+    """
+    Verifica con `EXPLAIN` que las consultas de los reportes usan los índices de `Meta.indexes`.
+
+    Con tablas casi vacías el planificador de PostgreSQL prefiere recorrer la tabla,
+    así que se desactiva `enable_seqscan` dentro de la transacción del test: si aun así
+    el plan no usa el índice, el filtro no es indexable (p. ej. un `EXTRACT(...)`).
+    """
+
+    def plan(self, queryset):
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET LOCAL enable_seqscan = off")
+        return queryset.explain()
+
+    def assertUsaIndice(self, queryset, indice):
+        plan = self.plan(queryset)
+        self.assertIn(indice, plan, f"El plan no usa {indice}:\n{plan}")
+
+    def test_gastos_por_camion_y_mes(self):
+        consulta = GastoCamion.objects.filter(camion_id=1, **filtro_mes("fecha", "2025-03"))
+        self.assertUsaIndice(consulta, "gasto_camion_fecha_idx")
+
+    def test_sueldos_por_mes(self):
+        consulta = SueldoEmpleado.objects.filter(**filtro_mes("fecha_pago", "2025-03"))
+        self.assertUsaIndice(consulta, "sueldo_fecha_pago_idx")
+
+    def test_facturas_por_cliente_y_mes(self):
+        consulta = Factura.objects.filter(cliente_id=1, **filtro_mes("fecha", "2025-12"))
+        self.assertUsaIndice(consulta, "factura_cliente_fecha_idx")
+
+    def test_facturas_por_mes(self):
+        consulta = Factura.objects.filter(**filtro_mes("fecha", "2025-12"))
+        self.assertUsaIndice(consulta, "factura_fecha_idx")
+
+    def test_recorrido_de_camion(self):
+        consulta = Ubicacion.objects.filter(camion_id=1, **filtro_mes_con_hora("timestamp", "2025-03")).order_by("timestamp")
+        self.assertUsaIndice(consulta, "ubicacion_camion_ts_idx")
+
+    def test_pedidos_por_estado_y_mes(self):
+        consulta = Pedido.objects.filter(estado="pendiente", **filtro_mes_con_hora("fecha_creacion", "2025-03"))
+        self.assertUsaIndice(consulta, "pedido_estado_fecha_idx")
+
+    def test_rango_de_mes_semiabierto(self):
+        self.assertEqual(filtro_mes("fecha", "2024-12"), {"fecha__gte": date(2024, 12, 1), "fecha__lt": date(2025, 1, 1)})
+        with self.assertRaises(ValueError):
+            filtro_mes("fecha", "2024-13")
+
+
+class GeneradorDatosTests(TestCase):
+    """Los datos sintéticos quedan consistentes, como si se hubieran cargado por la API"""
+
+    def test_generar(self):
+        call_command(
+            "generar_datos", "--camiones=4", "--conductores=6", "--clientes=3", "--pedidos=60",
+            "--ubicaciones=400", "--dias=60", "--lote=25", "--semilla=7", stdout=io.StringIO(),
+        )
+        self.assertEqual(Camion.objects.count(), 4)
+        self.assertEqual(Pedido.objects.count(), 60)
+        self.assertEqual(Ubicacion.objects.count(), 400)
+        self.assertEqual(Factura.objects.count(), Pedido.objects.filter(estado="completado").count())
+        self.assertEqual(GastoCamion.objects.count(), 4 * 60 // 7)
+        self.assertFalse(Factura.objects.filter(fecha__gt=timezone.localdate()).exists())
+
+        # Los pedidos se reparten en el período, en orden cronológico
+        fechas = list(Pedido.objects.order_by("id").values_list("fecha_creacion", flat=True))
+        self.assertEqual(fechas, sorted(fechas))
+        self.assertLess(fechas[0], timezone.now() - timedelta(days=50))
+
+        # Lo que mantienen las señales en las altas por objeto
+        self.assertEqual(
+            ResumenGastoMensual.objects.aggregate(total=Sum("total"))["total"],
+            GastoCamion.objects.aggregate(total=Sum("monto"))["total"],
+        )
+        for ultima in UltimaUbicacion.objects.select_related("ubicacion"):
+            reciente = Ubicacion.objects.filter(camion_id=ultima.camion_id).order_by("-timestamp").first()
+            self.assertEqual(ultima.ubicacion, reciente)
+            self.assertEqual(ultima.timestamp, reciente.timestamp)
+        self.assertEqual(UltimaUbicacion.objects.count(), 4)
+
+
+class CargaTests(LiveServerTestCase):
+    """`benchmark_carga` mide contra un servidor de verdad y detecta regresiones"""
+
+    def setUp(self):
+        call_command(
+            "generar_datos", "--camiones=3", "--conductores=3", "--clientes=2", "--pedidos=20",
+            "--ubicaciones=60", "--dias=30", "--semilla=3", stdout=io.StringIO(),
+        )
+        self.directorio = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directorio.cleanup)
+
+    def correr(self, salida, *opciones):
+        call_command(
+            "benchmark_carga", f"--url={self.live_server_url}", "--peticiones=3", "--concurrencia=1",
+            "--escenario=camiones", "--escenario=ubicacion_actual", "--escenario=ingesta", "--puntos-lote=5",
+            f"--salida={salida}", *opciones, stdout=io.StringIO(),
+        )
+        with open(salida, encoding="utf-8") as archivo:
+            return json.load(archivo)
+
+    def test_benchmark(self):
+        primera = os.path.join(self.directorio.name, "primera.json")
+        resultado = self.correr(primera)
+
+        self.assertEqual(set(resultado["escenarios"]), {"camiones", "ubicacion_actual", "ingesta"})
+        for estadisticas in resultado["escenarios"].values():
+            self.assertEqual(estadisticas["peticiones"], 3)
+            self.assertEqual(estadisticas["errores"], 0)
+            latencia = estadisticas["latencia_ms"]
+            self.assertLessEqual(latencia["p50"], latencia["p95"])
+            self.assertLessEqual(latencia["p95"], latencia["p99"])
+        self.assertEqual(Ubicacion.objects.count(), 60 + 3 * 5)
+
+        # Una corrida anterior mucho más rápida hace fallar la comparación
+        resultado["escenarios"]["camiones"]["latencia_ms"]["p95"] = 0.001
+        with open(primera, "w", encoding="utf-8") as archivo:
+            json.dump(resultado, archivo)
+        with self.assertRaisesMessage(CommandError, "camiones"):
+            self.correr(os.path.join(self.directorio.name, "segunda.json"), f"--comparar={primera}")
@@ -3,7 +3,8 @@ from rest_framework.routers import DefaultRouter
 from .views import (
     CamionViewSet, ConductorViewSet, ClienteViewSet, PedidoViewSet, 
     UserViewSet, GastoCamionViewSet, SueldoEmpleadoViewSet, protected_view, 
-    MetricasViewSet, UbicacionViewSet, FacturaViewSet  # Agregar FacturaViewSet
+    MetricasViewSet, UbicacionViewSet, FacturaViewSet,  # Agregar FacturaViewSet
+    ubicaciones_en_vivo,
 )
 
 # 🔹 Configuración de rutas con DefaultRouter
@@ -20,6 +21,7 @@ router.register(r'ubicaciones', UbicacionViewSet, basename="ubicaciones")  # 
 router.register(r'facturas', FacturaViewSet, basename="facturas")  # 🆕 Nuevo endpoint para facturas
 
 urlpatterns = [
+    path('ubicaciones/en_vivo/', ubicaciones_en_vivo, name='ubicaciones_en_vivo'),  # Antes del router: no es un detalle
     path('', include(router.urls)),  # Incluye todas las rutas registradas en el router
     path('protected/', protected_view, name='protected_view'),  # Ruta protegida de prueba
     path('api/', include(router.urls)),
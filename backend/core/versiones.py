@@ -0,0 +1,55 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+
+def _clave(modelo):
+    return f"version:{modelo._meta.label_lower}"
+
+
+def versiones(*modelos):
+    """
+    Versión de escritura actual de cada modelo, en una sola lectura de la caché.
+
+    Si una versión no existe (caché vacía o desalojada) se inicializa con la hora
+    actual en nanosegundos, para no reutilizar nunca un número ya usado y servir
+    así un resultado cacheado con datos viejos.
+    """
+    claves = [_clave(modelo) for modelo in modelos]
+    actuales = cache.get_many(claves)
+    for clave in claves:
+        if clave not in actuales:
+            cache.add(clave, time.time_ns(), timeout=None)
+            actuales[clave] = cache.get(clave)
+    return tuple(actuales[clave] for clave in claves)
+
+
+def incrementar_version(modelo):
+    """Invalida todo lo cacheado a partir de los datos de `modelo`"""
+    clave = _clave(modelo)
+    try:
+        cache.incr(clave)
+    except ValueError:
+        cache.set(clave, time.time_ns(), timeout=None)
+    # Marca de escritura reciente, que vence sola (ver `escritos_recientemente`)
+    cache.set(_clave_escritura(modelo), True, timeout=getattr(settings, "REPLICAS_MARGEN_SEGUNDOS", 5))
+
+
+def _clave_escritura(modelo):
+    return f"escritura:{modelo._meta.label_lower}"
+
+
+def escritos_recientemente(*modelos):
+    """
+    Si alguno de los modelos se escribió hace menos de `REPLICAS_MARGEN_SEGUNDOS`.
+
+    Mientras tanto una réplica puede no tener esos datos todavía: leerlos de ahí y
+    guardarlos con la versión nueva (ETag, dashboard) dejaría cacheado un resultado viejo.
+    """
+    return bool(cache.get_many([_clave_escritura(modelo) for modelo in modelos]))
+
+
+def clave_versionada(prefijo, *modelos):
+    """Clave de caché que cambia cada vez que se escribe en alguno de los modelos"""
+    return ":".join([prefijo, *(str(version) for version in versiones(*modelos))])
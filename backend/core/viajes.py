@@ -0,0 +1,175 @@
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from itertools import islice
+
+import numpy as np
+from django.db import connections, transaction
+from django.db.models import FloatField
+from django.db.models.functions import Cast, Extract
+from django.utils import timezone
+
+from . import archivo
+from .espacial import RADIO_TIERRA_KM
+from .filtros import inicio_del_dia
+from .models import DistanciaDiaria, Ubicacion
+
+# Tramos más rápidos que esto son saltos del GPS y no suman distancia
+VELOCIDAD_MAXIMA_KMH = 200.0
+
+# Por debajo de esta velocidad el camión está detenido (el ruido del GPS no suma kilómetros)
+VELOCIDAD_DETENIDO_KMH = 3.0
+
+# Detenido (o sin señal) al menos este tiempo entre dos tramos en movimiento: empieza otro viaje
+PAUSA_VIAJE_SEGUNDOS = 15 * 60
+
+# Puntos posteriores al último día que se leen para cerrar su último tramo
+MARGEN_SEGUNDOS = 60 * 60
+
+# Filas que se traen de la base y se pasan a NumPy por vez al cargar la flota
+FILAS_POR_BLOQUE = 50_000
+
+_EPOCH = date(1970, 1, 1)
+
+
+def distancias_km(latitudes_1, longitudes_1, latitudes_2, longitudes_2):
+    """Distancia haversine entre pares de puntos, vectorizada sobre arreglos"""
+    fi_1, fi_2 = np.radians(latitudes_1), np.radians(latitudes_2)
+    a = (
+        np.sin((fi_2 - fi_1) / 2) ** 2
+        + np.cos(fi_1) * np.cos(fi_2) * np.sin(np.radians(longitudes_2 - longitudes_1) / 2) ** 2
+    )
+    return 2 * RADIO_TIERRA_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def cargar_flota(inicio, fin, camion_ids=None):
+    """
+    Puntos de toda la flota (o de `camion_ids`) entre `inicio` y `fin`, como arreglos NumPy.
+
+    Devuelve `(camiones, latitudes, longitudes, timestamps)` ordenados por camión y
+    tiempo, con los timestamps en segundos desde epoch. Es una sola consulta de cuatro
+    columnas que recorre el índice `(camion, timestamp)`, más la lectura de los
+    segmentos archivados del período (ver `core.archivo`).
+
+    Las filas se leen de a `FILAS_POR_BLOQUE` y cada bloque pasa a un arreglo de una vez,
+    sin tener en memoria la lista completa de tuplas. En PostgreSQL los segundos desde
+    epoch los calcula la base (`EXTRACT(EPOCH ...)`), sin crear un `datetime` por fila.
+    """
+    puntos = Ubicacion.objects.filter(timestamp__gte=inicio, timestamp__lt=fin)
+    if camion_ids is not None:
+        puntos = puntos.filter(camion_id__in=camion_ids)
+    puntos = puntos.order_by("camion_id", "timestamp", "id")
+    en_la_base = connections[puntos.db].vendor == "postgresql"
+    if en_la_base:
+        # En UTC: con la zona local, `AT TIME ZONE` correría los segundos por el desfase horario
+        filas = puntos.annotate(segundos=Cast(Extract("timestamp", "epoch", tzinfo=dt_timezone.utc), FloatField()))
+        filas = filas.values_list("camion_id", "latitud", "longitud", "segundos")
+    else:
+        filas = puntos.values_list("camion_id", "latitud", "longitud", "timestamp")
+
+    filas = filas.iterator(chunk_size=FILAS_POR_BLOQUE)
+    bloques = []
+    while bloque := list(islice(filas, FILAS_POR_BLOQUE)):
+        if not en_la_base:
+            bloque = [(camion, latitud, longitud, momento.timestamp()) for camion, latitud, longitud, momento in bloque]
+        bloques.append(np.array(bloque, dtype=np.float64))
+    columnas = np.concatenate(bloques) if bloques else np.empty((0, 4))
+
+    camiones, latitudes, longitudes, timestamps = np.ascontiguousarray(columnas.T)
+    actuales = (camiones.astype(np.int64), latitudes, longitudes, timestamps)
+    return archivo.combinar(archivo.cargar(camion_ids, inicio, fin), actuales)
+
+
+def _dias_locales(timestamps):
+    """Día local (días desde epoch) de cada timestamp, con el desfase horario calculado una vez por hora"""
+    horas = np.floor(timestamps / 3600).astype(np.int64)
+    unicas, inversa = np.unique(horas, return_inverse=True)
+    zona = timezone.get_default_timezone()
+    desfases = np.array([
+        datetime.fromtimestamp(int(hora) * 3600, zona).utcoffset().total_seconds() for hora in unicas
+    ])
+    return np.floor((timestamps + desfases[inversa.reshape(-1)]) / 86400).astype(np.int64)
+
+
+def analizar(camiones, latitudes, longitudes, timestamps):
+    """
+    Distancia, viajes y velocidades por camión y día, en una sola pasada vectorizada.
+
+    Cada tramo (par de puntos consecutivos del mismo camión) se asigna al día local en
+    que empieza. Solo suman distancia y tiempo los tramos en movimiento: más rápidos que
+    `VELOCIDAD_DETENIDO_KMH` y no más que `VELOCIDAD_MAXIMA_KMH`. Un viaje es una
+    secuencia de tramos en movimiento sin pausas de `PAUSA_VIAJE_SEGUNDOS` o más.
+
+    Devuelve una lista de dicts `{camion_id, fecha, distancia_km, viajes,
+    segundos_en_movimiento, velocidad_maxima_kmh, puntos}`.
+    """
+    if len(timestamps) == 0:
+        return []
+
+    mismo_camion = camiones[1:] == camiones[:-1]
+    distancia = distancias_km(latitudes[:-1], longitudes[:-1], latitudes[1:], longitudes[1:])
+    duracion = timestamps[1:] - timestamps[:-1]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        velocidad = np.where(duracion > 0, distancia / (duracion / 3600), np.inf)
+    en_movimiento = mismo_camion & (duracion > 0) & (velocidad >= VELOCIDAD_DETENIDO_KMH) & (velocidad <= VELOCIDAD_MAXIMA_KMH)
+
+    # Un tramo en movimiento abre un viaje si es el primero del camión o si hubo una pausa larga antes
+    tramos = np.flatnonzero(en_movimiento)
+    abre_viaje = np.ones(len(tramos), dtype=bool)
+    anterior, actual = tramos[:-1], tramos[1:]
+    abre_viaje[1:] = (camiones[actual] != camiones[anterior]) | (
+        timestamps[actual] - timestamps[anterior + 1] >= PAUSA_VIAJE_SEGUNDOS
+    )
+
+    # Grupo (camión, día) de cada punto; cada tramo pertenece al grupo de su primer punto
+    dias = _dias_locales(timestamps)
+    primer_dia = int(dias.min())
+    cantidad_dias = int(dias.max()) - primer_dia + 1
+    claves, grupo = np.unique(camiones * cantidad_dias + (dias - primer_dia), return_inverse=True)
+    grupo = grupo.reshape(-1)
+    grupos = len(claves)
+    grupo_tramo = grupo[:-1]
+
+    puntos = np.bincount(grupo, minlength=grupos)
+    kilometros = np.bincount(grupo_tramo, weights=np.where(en_movimiento, distancia, 0.0), minlength=grupos)
+    segundos = np.bincount(grupo_tramo, weights=np.where(en_movimiento, duracion, 0.0), minlength=grupos)
+    viajes = np.bincount(grupo_tramo[tramos[abre_viaje]], minlength=grupos)
+    velocidad_maxima = np.zeros(grupos)
+    np.maximum.at(velocidad_maxima, grupo_tramo[tramos], velocidad[tramos])
+
+    return [
+        {
+            "camion_id": int(clave // cantidad_dias),
+            "fecha": _EPOCH + timedelta(days=int(clave % cantidad_dias) + primer_dia),
+            "distancia_km": round(float(kilometros[i]), 3),
+            "viajes": int(viajes[i]),
+            "segundos_en_movimiento": int(segundos[i]),
+            "velocidad_maxima_kmh": round(float(velocidad_maxima[i]), 1),
+            "puntos": int(puntos[i]),
+        }
+        for i, clave in enumerate(claves)
+    ]
+
+
+def recalcular(desde, hasta, camion_ids=None):
+    """
+    Recalcula y guarda `DistanciaDiaria` de los días `desde`..`hasta` (inclusive).
+
+    Lee los puntos de todo el rango con una consulta, los analiza con `analizar` y
+    reemplaza las filas del rango en una transacción. Devuelve las filas guardadas.
+    """
+    inicio = inicio_del_dia(desde)
+    fin = inicio_del_dia(hasta + timedelta(days=1))
+    camiones, latitudes, longitudes, timestamps = cargar_flota(
+        inicio, fin + timedelta(seconds=MARGEN_SEGUNDOS), camion_ids
+    )
+    filas = [
+        DistanciaDiaria(**fila) for fila in analizar(camiones, latitudes, longitudes, timestamps)
+        if desde <= fila["fecha"] <= hasta
+    ]
+
+    existentes = DistanciaDiaria.objects.filter(fecha__gte=desde, fecha__lte=hasta)
+    if camion_ids is not None:
+        existentes = existentes.filter(camion_id__in=camion_ids)
+    with transaction.atomic():
+        existentes.delete()
+        DistanciaDiaria.objects.bulk_create(filas, batch_size=1000)
+    return filas
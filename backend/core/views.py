@@ -2,53 +2,171 @@ from rest_framework.response import Response
 from rest_framework.decorators import api_view, permission_classes, action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework import viewsets
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.exceptions import InvalidToken
+from asgiref.sync import sync_to_async
 from django.contrib.auth.models import User
-from django.db.models import Sum, Count
-from datetime import datetime
-from .models import Camion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Ubicacion, Factura
+from django.db import transaction
+from django.db.models import Sum, Count, Max, F, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.utils.dateparse import parse_datetime, parse_date
+from django.utils import timezone
+from .models import (
+    Camion, Conductor, Cliente, Pedido, GastoCamion, SueldoEmpleado, Ubicacion, UltimaUbicacion, Factura,
+    ResumenGastoMensual, ResumenSueldoMensual, DistanciaDiaria
+)
 from .serializers import (
     CamionSerializer, ConductorSerializer, ClienteSerializer, PedidoSerializer,
     UserSerializer, GastoCamionSerializer, SueldoEmpleadoSerializer, ResumenGeneralSerializer, PedidosPorEstadoSerializer, 
-    GastosPorTipoSerializer, SueldosPorMesSerializer, UbicacionSerializer, FacturaSerializer
+    GastosPorTipoSerializer, SueldosPorMesSerializer, UbicacionSerializer, FacturaSerializer, PosicionFlotaSerializer,
+    PosicionCercanaSerializer, DistanciaSerializer, DistanciaFlotaSerializer, RentabilidadCamionSerializer
+)
+from django.http import JsonResponse, StreamingHttpResponse
+from django.conf import settings
+from django.core.cache import cache
+import math
+import numpy as np
+import time
+from . import difusion, espacial
+from .mixins import (
+    BusquedaMixin, CambiosMixin, CargaAnticipadaMixin, CondicionalMixin, ExportacionMixin, ImportacionMixin,
+    LecturaEnReplicaMixin, LecturaRapidaMixin, LoteMixin,
 )
-from django.http import JsonResponse
+from .versiones import clave_versionada
+from .filtros import rango_mes, filtro_mes
+from .autenticacion import JWTCacheadoAuthentication
+from .pagination import PaginacionKeyset
+from .rentabilidad import rentabilidad_por_camion
+from .geo import ZOOM_MAXIMO, ZOOM_MINIMO, cargar_puntos, douglas_peucker, tolerancia_para_zoom
+from .ingesta import ingestar_ubicaciones, maximo_por_lote, actualizar_ultimas_ubicaciones, recalcular_ultima_ubicacion
 
 # Gestión de Conductores
-class ConductorViewSet(viewsets.ModelViewSet):
+class ConductorViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = Conductor.objects.all()
     serializer_class = ConductorSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("nombre", "apellido", "licencia")
 
 # Gestión de Camiones
-class CamionViewSet(viewsets.ModelViewSet):
+class CamionViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = Camion.objects.all()
     serializer_class = CamionSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("placa", "marca", "modelo")
+    acciones_en_replica = ("list", "distancias", "distancias_flota")
+
+    def _filtro_periodo(self):
+        """Filtro de `DistanciaDiaria` por `mes` (YYYY-MM) o por `desde`/`hasta` (YYYY-MM-DD); `ValueError` si es inválido"""
+        params = self.request.query_params
+        if params.get("mes"):
+            return filtro_mes("fecha", params["mes"])
+        filtro = {}
+        for parametro, lookup in (("desde", "fecha__gte"), ("hasta", "fecha__lte")):
+            if params.get(parametro):
+                fecha = parse_date(params[parametro])
+                if fecha is None:
+                    raise ValueError(parametro)
+                filtro[lookup] = fecha
+        return filtro
+
+    @action(detail=True, methods=["get"])
+    def distancias(self, request, pk=None):
+        """
+        Kilómetros, viajes y tiempo en movimiento del camión por día (o por mes con `agrupar=mes`).
+
+        Lee los resúmenes de `DistanciaDiaria` que arma `core.viajes` a partir del
+        historial GPS (comando `calcular_distancias`); filtra por `mes` o `desde`/`hasta`.
+        """
+        camion = self.get_object()
+        agrupar = request.query_params.get("agrupar", "dia")
+        if agrupar not in ("dia", "mes"):
+            return Response({"error": "agrupar debe ser 'dia' o 'mes'"}, status=400)
+        try:
+            filtro = self._filtro_periodo()
+        except ValueError:
+            return Response({"error": "Usar mes=YYYY-MM o desde/hasta=YYYY-MM-DD"}, status=400)
+
+        distancias = DistanciaDiaria.objects.filter(camion=camion, **filtro)
+        if agrupar == "mes":
+            distancias = distancias.annotate(periodo=TruncMonth("fecha")).values("periodo").annotate(
+                distancia_km=Sum("distancia_km"),
+                viajes=Sum("viajes"),
+                segundos_en_movimiento=Sum("segundos_en_movimiento"),
+                velocidad_maxima_kmh=Max("velocidad_maxima_kmh"),
+            )
+        else:
+            distancias = distancias.values(
+                "distancia_km", "viajes", "segundos_en_movimiento", "velocidad_maxima_kmh", periodo=F("fecha")
+            )
+        return Response({
+            "camion_id": camion.id,
+            "agrupar": agrupar,
+            "distancias": DistanciaSerializer(distancias.order_by("periodo"), many=True).data,
+        })
+
+    @action(detail=False, methods=["get"])
+    def distancias_flota(self, request):
+        """Totales de distancia por camión en un período (`mes` o `desde`/`hasta`), de mayor a menor"""
+        try:
+            filtro = self._filtro_periodo()
+        except ValueError:
+            return Response({"error": "Usar mes=YYYY-MM o desde/hasta=YYYY-MM-DD"}, status=400)
+
+        totales = DistanciaDiaria.objects.filter(**filtro).values("camion_id", placa=F("camion__placa")).annotate(
+            distancia_km=Sum("distancia_km"),
+            viajes=Sum("viajes"),
+            segundos_en_movimiento=Sum("segundos_en_movimiento"),
+            velocidad_maxima_kmh=Max("velocidad_maxima_kmh"),
+        ).order_by("-distancia_km", "camion_id")
+        return Response(DistanciaFlotaSerializer(totales, many=True).data)
 
 # Gestión de Clientes
-class ClienteViewSet(viewsets.ModelViewSet):
+class ClienteViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = Cliente.objects.all()
     serializer_class = ClienteSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("nombre", "empresa", "email")
 
 # Gestión de Pedidos
-class PedidoViewSet(viewsets.ModelViewSet):
+class PedidoViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = Pedido.objects.all()
     serializer_class = PedidoSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("descripcion",)
+    pagination_class = PaginacionKeyset
+    ordering = ("-fecha_creacion", "-id")
+
+    def get_queryset(self):
+        """Lista todos los pedidos o filtra por estado si se proporciona `estado`"""
+        estado = self.request.query_params.get("estado")
+        queryset = super().get_queryset()
+        if estado:
+            return queryset.filter(estado=estado)
+        return queryset
 
 # Gestión de Gastos de Camiones
-class GastoCamionViewSet(viewsets.ModelViewSet):
+class GastoCamionViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, ExportacionMixin, ImportacionMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = GastoCamion.objects.all()
     serializer_class = GastoCamionSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("tipo_gasto", "comentarios")
+    acciones_en_replica = ("list", "exportar", "gastos_por_mes", "gastos_totales")
+    pagination_class = PaginacionKeyset
+    ordering = ("-fecha", "-id")
+    columnas_exportacion = (
+        ("id", "id"), ("camion_id", "camion_id"), ("placa", "camion__placa"), ("tipo_gasto", "tipo_gasto"),
+        ("monto", "monto"), ("fecha", "fecha"), ("comentarios", "comentarios"),
+    )
+    campo_mes = "fecha"
 
     def get_queryset(self):
         """Lista todos los gastos o filtra por camión si se proporciona `camion_id`"""
         camion_id = self.request.query_params.get("camion_id")
+        queryset = super().get_queryset()
         if camion_id:
-            return GastoCamion.objects.filter(camion_id=camion_id)
-        return GastoCamion.objects.all()
+            return queryset.filter(camion_id=camion_id)
+        return queryset
 
     @action(detail=False, methods=["get"])
     def gastos_por_mes(self, request):
@@ -60,14 +178,13 @@ class GastoCamionViewSet(viewsets.ModelViewSet):
             return Response({"error": "camion_id y mes son requeridos"}, status=400)
 
         try:
-            año, mes = map(int, mes.split("-"))
-            total_gasto = GastoCamion.objects.filter(
+            inicio, _ = rango_mes(mes)
+            total_gasto = ResumenGastoMensual.objects.filter(
                 camion_id=camion_id,
-                fecha__year=año,
-                fecha__month=mes
-            ).aggregate(total=Sum("monto"))["total"] or 0
+                mes=inicio
+            ).aggregate(total=Sum("total"))["total"] or 0
 
-            return Response({"camion_id": camion_id, "mes": f"{año}-{mes:02d}", "total_gasto": total_gasto})
+            return Response({"camion_id": camion_id, "mes": f"{inicio:%Y-%m}", "total_gasto": total_gasto})
         except ValueError:
             return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
 
@@ -79,28 +196,37 @@ class GastoCamionViewSet(viewsets.ModelViewSet):
         filtro = {}
         if mes:
             try:
-                año, mes = map(int, mes.split("-"))
-                filtro["fecha__year"] = año
-                filtro["fecha__month"] = mes
+                filtro["mes"], _ = rango_mes(mes)
             except ValueError:
                 return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
 
-        total_gasto = GastoCamion.objects.filter(**filtro).aggregate(total=Sum("monto"))["total"] or 0
+        total_gasto = ResumenGastoMensual.objects.filter(**filtro).aggregate(total=Sum("total"))["total"] or 0
 
         return Response({"mes": mes if mes else "Todos los meses", "total_gasto": total_gasto})
 
 # Gestión de Sueldos de Empleados
-class SueldoEmpleadoViewSet(viewsets.ModelViewSet):
+class SueldoEmpleadoViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, LecturaRapidaMixin, ExportacionMixin, ImportacionMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = SueldoEmpleado.objects.all()
     serializer_class = SueldoEmpleadoSerializer
     permission_classes = [IsAuthenticated]
+    acciones_en_replica = ("list", "exportar", "sueldos_por_mes", "reporte_sueldos")
+    pagination_class = PaginacionKeyset
+    ordering = ("-fecha_pago", "-id")
+    columnas_exportacion = (
+        ("id", "id"), ("empleado_id", "empleado_id"), ("nombre", "empleado__nombre"), ("apellido", "empleado__apellido"),
+        ("periodo_sueldo", "periodo_sueldo"), ("salario_base", "salario_base"), ("bonos", "bonos"),
+        ("deducciones", "deducciones"), ("horas_extras", "horas_extras"), ("adelanto", "adelanto"),
+        ("total_neto", "total_neto"), ("fecha_pago", "fecha_pago"), ("metodo_pago", "metodo_pago"),
+    )
+    campo_mes = "fecha_pago"
 
     def get_queryset(self):
         """Lista todos los sueldos o filtra por empleado si se proporciona `empleado_id`"""
         empleado_id = self.request.query_params.get("empleado_id")
+        queryset = super().get_queryset()
         if empleado_id:
-            return SueldoEmpleado.objects.filter(empleado_id=empleado_id)
-        return SueldoEmpleado.objects.all()
+            return queryset.filter(empleado_id=empleado_id)
+        return queryset
 
     @action(detail=False, methods=["get"])
     def sueldos_por_mes(self, request):
@@ -111,13 +237,12 @@ class SueldoEmpleadoViewSet(viewsets.ModelViewSet):
             return Response({"error": "El mes es requerido (formato YYYY-MM)"}, status=400)
 
         try:
-            año, mes = map(int, mes.split("-"))
-            total_sueldos = SueldoEmpleado.objects.filter(
-                fecha_pago__year=año,
-                fecha_pago__month=mes
-            ).aggregate(total=Sum("total_neto"))["total"] or 0
+            inicio, _ = rango_mes(mes)
+            total_sueldos = ResumenSueldoMensual.objects.filter(
+                mes=inicio
+            ).aggregate(total=Sum("total"))["total"] or 0
 
-            return Response({"mes": f"{año}-{mes:02d}", "total_sueldos": total_sueldos})
+            return Response({"mes": f"{inicio:%Y-%m}", "total_sueldos": total_sueldos})
         except ValueError:
             return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
 
@@ -129,28 +254,47 @@ class SueldoEmpleadoViewSet(viewsets.ModelViewSet):
         filtro = {}
         if mes:
             try:
-                año, mes = map(int, mes.split("-"))
-                filtro["fecha_pago__year"] = año
-                filtro["fecha_pago__month"] = mes
+                filtro["mes"], _ = rango_mes(mes)
             except ValueError:
                 return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
 
-        total_sueldos = SueldoEmpleado.objects.filter(**filtro).aggregate(total=Sum("total_neto"))["total"] or 0
+        total_sueldos = ResumenSueldoMensual.objects.filter(**filtro).aggregate(total=Sum("total"))["total"] or 0
 
         return Response({"mes": mes if mes else "Todos los meses", "total_sueldos": total_sueldos})
 
 # Gestión de Ubicaciones
-class UbicacionViewSet(viewsets.ModelViewSet):
+class UbicacionViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, LecturaRapidaMixin, viewsets.ModelViewSet):
     queryset = Ubicacion.objects.all()
     serializer_class = UbicacionSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = PaginacionKeyset
+    ordering = ("-timestamp", "-id")
 
     def get_queryset(self):
         """Lista todas las ubicaciones o filtra por camión si se proporciona `camion_id`"""
         camion_id = self.request.query_params.get("camion_id")
+        queryset = super().get_queryset()
         if camion_id:
-            return Ubicacion.objects.filter(camion_id=camion_id)
-        return Ubicacion.objects.all()
+            return queryset.filter(camion_id=camion_id)
+        return queryset
+
+    def perform_create(self, serializer):
+        ubicacion = serializer.save()
+        actualizar_ultimas_ubicaciones([ubicacion])
+
+    def perform_update(self, serializer):
+        camion_anterior = serializer.instance.camion_id
+        with transaction.atomic():
+            ubicacion = serializer.save()
+            # En orden de camión, como la ingesta, para no bloquearse mutuamente
+            for camion_id in sorted({camion_anterior, ubicacion.camion_id}):
+                recalcular_ultima_ubicacion(camion_id)
+
+    def perform_destroy(self, instance):
+        camion_id = instance.camion_id
+        with transaction.atomic():
+            instance.delete()
+            recalcular_ultima_ubicacion(camion_id)
 
     @action(detail=False, methods=["get"])
     def ubicacion_actual(self, request):
@@ -159,24 +303,233 @@ class UbicacionViewSet(viewsets.ModelViewSet):
         if not camion_id:
             return Response({"error": "camion_id es requerido"}, status=400)
 
-        try:
-            ubicacion = Ubicacion.objects.filter(camion_id=camion_id).latest("timestamp")
-            serializer = UbicacionSerializer(ubicacion)
-            return Response(serializer.data)
-        except Ubicacion.DoesNotExist:
+        ultima = UltimaUbicacion.objects.select_related("ubicacion__camion__conductor").filter(camion_id=camion_id).first()
+        if ultima is None or ultima.ubicacion is None:
             return Response({"error": "No se encontraron ubicaciones para este camión"}, status=404)
+        serializer = self.get_serializer(ultima.ubicacion)
+        return Response(serializer.data)
+
+    @action(detail=False, methods=["get"])
+    def recorrido(self, request):
+        """
+        Devuelve el recorrido simplificado de un camión para dibujarlo en el mapa.
+
+        Parámetros: `camion_id` (requerido), `desde`/`hasta` (fecha o fecha-hora ISO) y
+        `zoom` (nivel del mapa, por defecto 13) o `tolerancia` en grados. Sin `hasta` se
+        usa el momento actual y sin `desde`, las `RECORRIDO_HORAS_POR_DEFECTO` anteriores;
+        la ventana no puede superar `RECORRIDO_MAXIMO_DIAS` para no cargar todo el historial.
+        """
+        camion_id = request.query_params.get("camion_id")
+        if not camion_id:
+            return Response({"error": "camion_id es requerido"}, status=400)
+
+        try:
+            camion_id = int(camion_id)
+            desde = _parsear_momento(request.query_params.get("desde"))
+            hasta = _parsear_momento(request.query_params.get("hasta"))
+            if "tolerancia" in request.query_params:
+                tolerancia = float(request.query_params["tolerancia"])
+                if not math.isfinite(tolerancia) or tolerancia < 0:
+                    raise ValueError(tolerancia)
+            else:
+                tolerancia = tolerancia_para_zoom(int(request.query_params.get("zoom", 13)))
+        except ValueError:
+            return Response({"error": f"Parámetros inválidos (camion_id entero, desde/hasta en ISO 8601, zoom entero de {ZOOM_MINIMO} a {ZOOM_MAXIMO}, tolerancia numérica no negativa)"}, status=400)
+
+        maximo_dias = getattr(settings, "RECORRIDO_MAXIMO_DIAS", 31)
+        hasta = hasta or timezone.now()
+        desde = desde or hasta - timedelta(hours=getattr(settings, "RECORRIDO_HORAS_POR_DEFECTO", 24))
+        if desde >= hasta or hasta - desde > timedelta(days=maximo_dias):
+            return Response({"error": f"desde debe ser anterior a hasta y la ventana no puede superar {maximo_dias} días"}, status=400)
+
+        latitudes, longitudes, timestamps = cargar_puntos(camion_id, desde, hasta)
+        indices = douglas_peucker(latitudes, longitudes, tolerancia)
+
+        return Response({
+            "camion_id": camion_id,
+            "desde": desde.isoformat(),
+            "hasta": hasta.isoformat(),
+            "tolerancia": tolerancia,
+            "puntos_originales": len(latitudes),
+            "puntos": len(indices),
+            "inicio": _momento_iso(timestamps[0]) if len(timestamps) else None,
+            "fin": _momento_iso(timestamps[-1]) if len(timestamps) else None,
+            "recorrido": np.column_stack((latitudes[indices], longitudes[indices])).tolist(),
+        })
+
+    @action(detail=False, methods=["get"])
+    def flota(self, request):
+        """Posición actual de todos los camiones con su conductor y pedido en proceso (una sola consulta)"""
+        pedido_activo = Pedido.objects.filter(camion=OuterRef("pk"), estado="en_proceso").order_by("-fecha_creacion")
+        posiciones = Camion.objects.annotate(
+            camion_id=F("id"),
+            latitud=F("ultima_ubicacion__latitud"),
+            longitud=F("ultima_ubicacion__longitud"),
+            timestamp=F("ultima_ubicacion__timestamp"),
+            conductor_nombre=F("conductor__nombre"),
+            conductor_apellido=F("conductor__apellido"),
+            pedido_activo_id=Subquery(pedido_activo.values("id")[:1]),
+            pedido_activo_descripcion=Subquery(pedido_activo.values("descripcion")[:1]),
+        ).values(
+            "camion_id", "placa", "marca", "modelo", "latitud", "longitud", "timestamp",
+            "conductor_id", "conductor_nombre", "conductor_apellido",
+            "pedido_activo_id", "pedido_activo_descripcion",
+        ).order_by("id")
+        return Response(PosicionFlotaSerializer(posiciones, many=True).data)
+
+    def _posiciones(self):
+        return UltimaUbicacion.objects.values("camion_id", "latitud", "longitud", "timestamp", placa=F("camion__placa"))
+
+    @action(detail=False, methods=["get"])
+    def en_area(self, request):
+        """
+        Camiones cuya posición actual está dentro de un rectángulo del mapa (`sur`, `oeste`, `norte`, `este`).
+
+        Usa la grilla espacial de `UltimaUbicacion` (ver `core.espacial`). Si `oeste` es
+        mayor que `este` el rectángulo cruza el antimeridiano.
+        """
+        try:
+            sur, oeste, norte, este = (float(request.query_params[clave]) for clave in ("sur", "oeste", "norte", "este"))
+        except (KeyError, ValueError):
+            return Response({"error": "sur, oeste, norte y este son requeridos (grados decimales)"}, status=400)
+        if not (-90 <= sur <= norte <= 90 and -180 <= oeste <= 180 and -180 <= este <= 180):
+            return Response({"error": "Rectángulo inválido"}, status=400)
+
+        posiciones = self._posiciones().filter(espacial.filtro_rectangulo(sur, oeste, norte, este)).order_by("camion_id")
+        return Response(PosicionCercanaSerializer(posiciones, many=True).data)
+
+    @action(detail=False, methods=["get"])
+    def cercanos(self, request):
+        """
+        Los `k` camiones más cercanos a un punto (`latitud`, `longitud`), ordenados por distancia.
+
+        `k` va de 1 a 100 (por defecto 10); `radio_km` limita la búsqueda a ese radio.
+        """
+        try:
+            latitud = float(request.query_params["latitud"])
+            longitud = float(request.query_params["longitud"])
+            k = int(request.query_params.get("k", 10))
+            radio_km = float(request.query_params["radio_km"]) if "radio_km" in request.query_params else None
+        except (KeyError, ValueError):
+            return Response({"error": "latitud y longitud son requeridas; k entero y radio_km numérico"}, status=400)
+        if not (-90 <= latitud <= 90 and -180 <= longitud <= 180) or not 1 <= k <= 100 or (radio_km is not None and radio_km <= 0):
+            return Response({"error": "Parámetros fuera de rango"}, status=400)
+
+        posiciones = espacial.mas_cercanos(self._posiciones(), latitud, longitud, k, radio_km)
+        return Response(PosicionCercanaSerializer(posiciones, many=True).data)
+
+    @action(detail=False, methods=["post"])
+    def lote(self, request):
+        """Registra un lote de ubicaciones GPS en una sola petición (inserción masiva)"""
+        puntos = request.data.get("ubicaciones") if isinstance(request.data, dict) else request.data
+        if not isinstance(puntos, list) or not puntos:
+            return Response({"error": "Se requiere una lista de ubicaciones"}, status=400)
+
+        maximo = maximo_por_lote()
+        if len(puntos) > maximo:
+            return Response({"error": f"El lote admite como máximo {maximo} ubicaciones"}, status=400)
+
+        creadas, errores = ingestar_ubicaciones(puntos)
+        estado = 201 if creadas else 400
+        return Response({"creadas": len(creadas), "rechazadas": len(errores), "errores": errores}, status=estado)
+
+def _parsear_momento(valor):
+    """Convierte una fecha o fecha-hora ISO en un datetime con zona horaria (o None)"""
+    if not valor:
+        return None
+    momento = parse_datetime(valor)
+    if momento is None:
+        fecha = parse_date(valor)
+        if fecha is None:
+            raise ValueError(valor)
+        momento = datetime.combine(fecha, datetime.min.time())
+    if timezone.is_naive(momento):
+        momento = timezone.make_aware(momento)
+    return momento
+
+
+def _momento_iso(segundos):
+    return datetime.fromtimestamp(segundos, tz=dt_timezone.utc).isoformat().replace("+00:00", "Z")
+
+# Posiciones en tiempo real (Server-Sent Events)
+LATIDO_SEGUNDOS = 15  # Comentario periódico para que proxies y navegador no corten la conexión
+
+
+def _token_validado(request):
+    """Access token de SimpleJWT recibido en `?token=` (EventSource no envía encabezados) o en `Authorization`"""
+    autenticacion = JWTCacheadoAuthentication()
+    crudo = request.GET.get("token")
+    if not crudo:
+        encabezado = autenticacion.get_header(request)
+        crudo = autenticacion.get_raw_token(encabezado) if encabezado else None
+    if not crudo:
+        raise AuthenticationFailed("Se requiere un token de acceso")
+    token = autenticacion.get_validated_token(crudo)
+    autenticacion.get_user(token)  # Rechaza usuarios inexistentes o inactivos
+    return token
+
+
+async def ubicaciones_en_vivo(request):
+    """
+    Stream SSE con las posiciones que se ingestan: `?camion_id=` para un camión, sin él toda la flota.
+
+    Requiere servidor ASGI. Cada evento `ubicacion` trae `id`, `camion_id`, `latitud`,
+    `longitud` y `timestamp`. La conexión se cierra al vencer el token y el navegador
+    reconecta solo; el cliente debe reabrirla con un token renovado.
+    """
+    if "wsgi.version" in request.META:
+        return JsonResponse({"error": "El stream en vivo requiere el servidor ASGI (backend.asgi)"}, status=501)
+    try:
+        token = await sync_to_async(_token_validado)(request)
+    except (AuthenticationFailed, InvalidToken) as exc:
+        return JsonResponse({"error": exc.detail}, status=401)
+
+    camion_id = request.GET.get("camion_id")
+    if camion_id is not None and not camion_id.isdigit():
+        return JsonResponse({"error": "camion_id debe ser un número entero"}, status=400)
+    canal = difusion.canal_camion(int(camion_id)) if camion_id else difusion.CANAL_FLOTA
+    vencimiento = token["exp"]
+
+    async def eventos():
+        suscripcion = difusion.hub().suscribir([canal])
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                restante = vencimiento - time.time()
+                if restante <= 0:
+                    return
+                mensaje = await suscripcion.recibir(timeout=min(LATIDO_SEGUNDOS, restante))
+                yield mensaje if mensaje is not None else b": latido\n\n"
+        finally:
+            suscripcion.cerrar()
+
+    respuesta = StreamingHttpResponse(eventos(), content_type="text/event-stream")
+    respuesta["Cache-Control"] = "no-cache"
+    respuesta["X-Accel-Buffering"] = "no"  # Que nginx no acumule los eventos
+    return respuesta
 
 # Gestión de Facturas
-class FacturaViewSet(viewsets.ModelViewSet):
+class FacturaViewSet(CargaAnticipadaMixin, LecturaEnReplicaMixin, CondicionalMixin, BusquedaMixin, LecturaRapidaMixin, ExportacionMixin, LoteMixin, CambiosMixin, viewsets.ModelViewSet):
     queryset = Factura.objects.all()
     serializer_class = FacturaSerializer
     permission_classes = [IsAuthenticated]
+    campos_busqueda = ("servicio", "origen", "destino")
+    acciones_en_replica = ("list", "exportar", "facturas_por_mes", "resumen_facturas")
+    pagination_class = PaginacionKeyset
+    ordering = ("-fecha", "-id")
+    columnas_exportacion = (
+        ("id", "id"), ("cliente_id", "cliente_id"), ("cliente", "cliente__nombre"), ("pedido_id", "pedido_id"),
+        ("fecha", "fecha"), ("servicio", "servicio"), ("origen", "origen"), ("destino", "destino"),
+        ("horas_espera", "horas_espera"), ("precio_hora", "precio_hora"), ("peajes", "peajes"),
+        ("importe_lista", "importe_lista"), ("final_h", "final_h"), ("importe_total", "importe_total"),
+    )
+    campo_mes = "fecha"
 
     def get_queryset(self):
         """
         Filtra las facturas por cliente, pedido o fecha si se proporcionan los parámetros.
         """
-        queryset = Factura.objects.all()
+        queryset = super().get_queryset()
         
         # Filtro por cliente
         cliente_id = self.request.query_params.get("cliente_id")
@@ -206,13 +559,10 @@ class FacturaViewSet(viewsets.ModelViewSet):
             return Response({"error": "El mes es requerido (formato YYYY-MM)"}, status=400)
 
         try:
-            año, mes = map(int, mes.split("-"))
-            total_facturas = Factura.objects.filter(
-                fecha__year=año,
-                fecha__month=mes
-            ).aggregate(total=Sum("importe_total"))["total"] or 0
+            filtro = filtro_mes("fecha", mes)
+            total_facturas = Factura.objects.filter(**filtro).aggregate(total=Sum("importe_total"))["total"] or 0
 
-            return Response({"mes": f"{año}-{mes:02d}", "total_facturas": total_facturas})
+            return Response({"mes": f"{filtro['fecha__gte']:%Y-%m}", "total_facturas": total_facturas})
         except ValueError:
             return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
 
@@ -228,8 +578,10 @@ class FacturaViewSet(viewsets.ModelViewSet):
         return Response(resumen)
 
 # Vista para obtener métricas y estadísticas generales
-class MetricasViewSet(viewsets.ViewSet):
+class MetricasViewSet(LecturaEnReplicaMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated]
+    acciones_en_replica = None
+    modelos_leidos = (Camion, Pedido, Factura, GastoCamion, SueldoEmpleado)
 
     @action(detail=False, methods=["get"])
     def pedidos_por_estado(self, request):
@@ -240,21 +592,24 @@ class MetricasViewSet(viewsets.ViewSet):
     @action(detail=False, methods=["get"])
     def gastos_por_tipo(self, request):
         """Suma los gastos agrupados por tipo (Combustible, Reparación, etc.)"""
-        datos = GastoCamion.objects.values("tipo_gasto").annotate(total=Sum("monto"))
+        datos = ResumenGastoMensual.objects.values("tipo_gasto").annotate(total=Sum("total")).order_by("tipo_gasto")
         return Response(GastosPorTipoSerializer(datos, many=True).data)
 
     @action(detail=False, methods=["get"])
     def sueldos_por_mes(self, request):
-        """Calcula el total de sueldos pagados por mes"""
-        datos = SueldoEmpleado.objects.values("periodo_sueldo").annotate(total_sueldos=Sum("total_neto"))
+        """Calcula el total de sueldos pagados por mes (según la fecha de pago)"""
+        datos = [
+            {"periodo_sueldo": f"{fila['mes']:%Y-%m}", "total_sueldos": fila["total_sueldos"]}
+            for fila in ResumenSueldoMensual.objects.values("mes").annotate(total_sueldos=Sum("total")).order_by("mes")
+        ]
         return Response(SueldosPorMesSerializer(datos, many=True).data)
 
     @action(detail=False, methods=["get"])
     def resumen_general(self, request):
         """Resumen general con total de pedidos, gastos y sueldos"""
         total_pedidos = Pedido.objects.count()
-        total_gastos = GastoCamion.objects.aggregate(total=Sum("monto"))["total"] or 0
-        total_sueldos = SueldoEmpleado.objects.aggregate(total=Sum("total_neto"))["total"] or 0
+        total_gastos = ResumenGastoMensual.objects.aggregate(total=Sum("total"))["total"] or 0
+        total_sueldos = ResumenSueldoMensual.objects.aggregate(total=Sum("total"))["total"] or 0
 
         data = {
             "total_pedidos": total_pedidos,
@@ -264,6 +619,69 @@ class MetricasViewSet(viewsets.ViewSet):
         serializer = ResumenGeneralSerializer(data)
         return Response(serializer.data)
 
+    @action(detail=False, methods=["get"])
+    def dashboard(self, request):
+        """
+        Todas las métricas del tablero en una respuesta (tres consultas agrupadas).
+
+        El resultado se cachea con una clave que incluye la versión de escritura de
+        pedidos, gastos y sueldos, así que se recalcula solo cuando esos datos cambian.
+        """
+        clave = clave_versionada("metricas:dashboard", Pedido, GastoCamion, SueldoEmpleado)
+        data = cache.get(clave)
+        if data is None:
+            data = self._calcular_dashboard()
+            cache.set(clave, data, getattr(settings, "METRICAS_CACHE_SEGUNDOS", 60 * 60 * 24))
+        return Response(data)
+
+    @action(detail=False, methods=["get"])
+    def rentabilidad_camiones(self, request):
+        """
+        Ingresos, gastos por tipo, sueldos y resultado de cada camión en cada mes.
+
+        Filtros opcionales: `desde` y `hasta` (YYYY-MM, inclusive) y `camion_id`
+        (lista separada por comas). Se calcula con cuatro consultas agrupadas (ver
+        `core.rentabilidad`) y se cachea hasta que cambian los datos que lo componen.
+        """
+        try:
+            desde = rango_mes(request.query_params["desde"])[0] if request.query_params.get("desde") else None
+            hasta = rango_mes(request.query_params["hasta"])[1] if request.query_params.get("hasta") else None
+        except ValueError:
+            return Response({"error": "Formato de mes inválido (usar YYYY-MM)"}, status=400)
+        try:
+            camion_ids = sorted({int(valor) for valor in request.query_params["camion_id"].split(",")}) if request.query_params.get("camion_id") else None
+        except ValueError:
+            return Response({"error": "camion_id debe ser una lista de enteros separados por comas"}, status=400)
+
+        clave = clave_versionada(
+            f"metricas:rentabilidad:{desde}:{hasta}:{','.join(map(str, camion_ids or ()))}", Camion, Pedido, Factura, GastoCamion, SueldoEmpleado
+        )
+        data = cache.get(clave)
+        if data is None:
+            filas = rentabilidad_por_camion(desde, hasta, camion_ids)
+            data = RentabilidadCamionSerializer(filas, many=True).data
+            cache.set(clave, data, getattr(settings, "METRICAS_CACHE_SEGUNDOS", 60 * 60 * 24))
+        return Response(data)
+
+    def _calcular_dashboard(self):
+        pedidos = list(Pedido.objects.values("estado").annotate(total=Count("id")).order_by("estado"))
+        gastos = list(ResumenGastoMensual.objects.values("tipo_gasto").annotate(total=Sum("total")).order_by("tipo_gasto"))
+        sueldos = [
+            {"periodo_sueldo": f"{fila['mes']:%Y-%m}", "total_sueldos": fila["total_sueldos"]}
+            for fila in ResumenSueldoMensual.objects.values("mes").annotate(total_sueldos=Sum("total")).order_by("mes")
+        ]
+        resumen = {
+            "total_pedidos": sum(fila["total"] for fila in pedidos),
+            "total_gastos": sum((fila["total"] for fila in gastos), 0),
+            "total_sueldos": sum((fila["total_sueldos"] for fila in sueldos), 0),
+        }
+        return {
+            "pedidos_por_estado": PedidosPorEstadoSerializer(pedidos, many=True).data,
+            "gastos_por_tipo": GastosPorTipoSerializer(gastos, many=True).data,
+            "sueldos_por_mes": SueldosPorMesSerializer(sueldos, many=True).data,
+            "resumen_general": ResumenGeneralSerializer(resumen).data,
+        }
+
 # Gestión del Usuario (Perfil)
 class UserViewSet(viewsets.ModelViewSet):
     serializer_class = UserSerializer
@@ -274,12 +692,13 @@ class UserViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"])
     def me(self, request):
-        serializer = UserSerializer(request.user)
+        # Completo desde la base: el usuario autenticado por JWT trae solo los campos cacheados
+        serializer = UserSerializer(self.get_queryset().get())
         return Response(serializer.data)
 
     @action(detail=False, methods=["put"])
     def update_profile(self, request):
-        user = request.user
+        user = self.get_queryset().get()
         serializer = UserSerializer(user, data=request.data, partial=True)
         if serializer.is_valid():
             serializer.save()
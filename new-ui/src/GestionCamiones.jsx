@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useState } from "react";
 import axios from "axios";
 import {
   Card,
@@ -20,10 +20,11 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import LocalShippingIcon from "@mui/icons-material/LocalShipping";
 import { useSnackbar } from "notistack";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
 
 function GestionCamiones() {
   const { enqueueSnackbar } = useSnackbar();
-  const [camiones, setCamiones] = useState([]);
   const [open, setOpen] = useState(false);
   const [editingCamion, setEditingCamion] = useState(null);
   const [formData, setFormData] = useState({
@@ -38,22 +39,11 @@ function GestionCamiones() {
   const [expandedCamionId, setExpandedCamionId] = useState(null);
   const [loading, setLoading] = useState(false);
 
-  const fetchCamiones = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/camiones/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setCamiones(response.data);
-    } catch (error) {
-      console.error("Error al obtener camiones:", error);
-      enqueueSnackbar("No se pudieron obtener los camiones", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  useEffect(() => {
-    fetchCamiones();
-  }, [fetchCamiones]);
+  const busqueda = useRetardado(searchTerm.trim());
+  const { items: camiones, cargando, hayMas, cargarMas, recargar: fetchCamiones } = usePaginacion(
+    `http://localhost:8000/api/camiones/?q=${encodeURIComponent(busqueda)}`,
+    () => enqueueSnackbar("No se pudieron obtener los camiones", { variant: "error" })
+  );
 
   const handleOpen = (camion = null) => {
     if (camion) {
@@ -120,12 +110,6 @@ function GestionCamiones() {
     setExpandedCamionId(expandedCamionId === camionId ? null : camionId);
   };
 
-  const filteredCamiones = camiones.filter((camion) =>
-    `${camion.marca} ${camion.modelo}`
-      .toLowerCase()
-      .includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Container sx={{ mt: 4, position: "relative", minHeight: "100vh", pb: 10 }}>
       <Box display="flex" alignItems="center" mb={4}>
@@ -137,7 +121,7 @@ function GestionCamiones() {
 
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
         <TextField
-          label="Buscar por marca o modelo"
+          label="Buscar por placa, marca o modelo"
           variant="outlined"
           fullWidth
           value={searchTerm}
@@ -148,7 +132,7 @@ function GestionCamiones() {
         </Button>
       </Box>
 
-      {filteredCamiones.map((camion) => (
+      {camiones.map((camion) => (
         <Card
           key={camion.id}
           sx={{
@@ -185,6 +169,8 @@ function GestionCamiones() {
         </Card>
       ))}
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       <Box sx={{ display: "flex", justifyContent: "flex-end", mt: 4 }}>
         <Button
           variant="contained"
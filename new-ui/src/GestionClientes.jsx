@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useState } from "react";
 import axios from "axios";
 import {
   Card,
@@ -19,10 +19,11 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import BusinessIcon from "@mui/icons-material/Business";
 import { useSnackbar } from "notistack";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
 
 function GestionClientes() {
   const { enqueueSnackbar } = useSnackbar();
-  const [clientes, setClientes] = useState([]);
   const [open, setOpen] = useState(false);
   const [editingCliente, setEditingCliente] = useState(null);
   const [formData, setFormData] = useState({
@@ -35,22 +36,11 @@ function GestionClientes() {
   const [searchTerm, setSearchTerm] = useState("");
   const [expandedClienteId, setExpandedClienteId] = useState(null);
 
-  const fetchClientes = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/clientes/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setClientes(response.data);
-    } catch (error) {
-      console.error("Error al obtener clientes:", error);
-      enqueueSnackbar("No se pudieron obtener los clientes", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  useEffect(() => {
-    fetchClientes();
-  }, [fetchClientes]);
+  const busqueda = useRetardado(searchTerm.trim());
+  const { items: clientes, cargando, hayMas, cargarMas, recargar: fetchClientes } = usePaginacion(
+    `http://localhost:8000/api/clientes/?q=${encodeURIComponent(busqueda)}`,
+    () => enqueueSnackbar("No se pudieron obtener los clientes", { variant: "error" })
+  );
 
   const handleOpen = (cliente = null) => {
     if (cliente) {
@@ -117,12 +107,6 @@ function GestionClientes() {
     setExpandedClienteId(expandedClienteId === clienteId ? null : clienteId);
   };
 
-  const filteredClientes = clientes.filter((cliente) =>
-    `${cliente.nombre} ${cliente.empresa}`
-      .toLowerCase()
-      .includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Container sx={{ mt: 4, position: "relative", minHeight: "100vh", pb: 10 }}>
       {/* Título con ícono */}
@@ -136,7 +120,7 @@ function GestionClientes() {
       {/* Campo de búsqueda y botón "Buscar" */}
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
         <TextField
-          label="Buscar por nombre o empresa"
+          label="Buscar por nombre, empresa o email"
           variant="outlined"
           fullWidth
           value={searchTerm}
@@ -148,7 +132,7 @@ function GestionClientes() {
       </Box>
 
       {/* Listado de clientes filtrados */}
-      {filteredClientes.map((cliente) => (
+      {clientes.map((cliente) => (
         <Card
           key={cliente.id}
           sx={{
@@ -185,6 +169,8 @@ function GestionClientes() {
         </Card>
       ))}
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       {/* Botón para agregar cliente */}
       <Box sx={{ display: "flex", justifyContent: "flex-end", mt: 4 }}>
         <Button
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useState } from "react";
 import axios from "axios";
 import {
   Card,
@@ -20,10 +20,11 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import DriveEtaIcon from "@mui/icons-material/DriveEta";
 import { useSnackbar } from "notistack";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
 
 function GestionConductores() {
   const { enqueueSnackbar } = useSnackbar();
-  const [conductores, setConductores] = useState([]);
   const [open, setOpen] = useState(false);
   const [editingConductor, setEditingConductor] = useState(null);
   const [formData, setFormData] = useState({
@@ -38,22 +39,11 @@ function GestionConductores() {
   const [expandedConductorId, setExpandedConductorId] = useState(null);
   const [loading, setLoading] = useState(false);
 
-  const fetchConductores = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/conductores/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setConductores(response.data);
-    } catch (error) {
-      console.error("Error al obtener conductores:", error);
-      enqueueSnackbar("No se pudieron obtener los conductores", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  useEffect(() => {
-    fetchConductores();
-  }, [fetchConductores]);
+  const busqueda = useRetardado(searchTerm.trim());
+  const { items: conductores, cargando, hayMas, cargarMas, recargar: fetchConductores } = usePaginacion(
+    `http://localhost:8000/api/conductores/?q=${encodeURIComponent(busqueda)}`,
+    () => enqueueSnackbar("No se pudieron obtener los conductores", { variant: "error" })
+  );
 
   const handleOpen = (conductor = null) => {
     if (conductor) {
@@ -120,12 +110,6 @@ function GestionConductores() {
     setExpandedConductorId(expandedConductorId === conductorId ? null : conductorId);
   };
 
-  const filteredConductores = conductores.filter((conductor) =>
-    `${conductor.nombre} ${conductor.apellido}`
-      .toLowerCase()
-      .includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Container sx={{ mt: 4, position: "relative", minHeight: "100vh", pb: 10 }}>
       <Box display="flex" alignItems="center" mb={4}>
@@ -137,7 +121,7 @@ function GestionConductores() {
 
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
         <TextField
-          label="Buscar por nombre o apellido"
+          label="Buscar por nombre, apellido o licencia"
           variant="outlined"
           fullWidth
           value={searchTerm}
@@ -148,7 +132,7 @@ function GestionConductores() {
         </Button>
       </Box>
 
-      {filteredConductores.map((conductor) => (
+      {conductores.map((conductor) => (
         <Card
           key={conductor.id}
           sx={{
@@ -185,6 +169,8 @@ function GestionConductores() {
         </Card>
       ))}
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       <Box sx={{ display: "flex", justifyContent: "flex-end", mt: 4 }}>
         <Button
           variant="contained"
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useState } from "react";
 import axios from "axios";
 import {
   Card,
@@ -13,10 +13,6 @@ import {
   TextField,
   IconButton,
   Box,
-  MenuItem,
-  Select,
-  InputLabel,
-  FormControl,
   Tooltip,
   Paper,
   Grid,
@@ -29,10 +25,12 @@ import ReceiptIcon from "@mui/icons-material/Receipt";
 import { useSnackbar } from "notistack";
 import jsPDF from "jspdf";
 import "jspdf-autotable";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
+import SelectorRemoto from "./components/SelectorRemoto";
 
 function GestionFacturas() {
   const { enqueueSnackbar } = useSnackbar();
-  const [facturas, setFacturas] = useState([]);
   const [open, setOpen] = useState(false);
   const [editingFactura, setEditingFactura] = useState(null);
   const [formData, setFormData] = useState({
@@ -44,65 +42,24 @@ function GestionFacturas() {
     precio_hora: 0,
     peajes: 0,
     importe_lista: 0,
-    cliente_id: "",
-    pedido_id: "",
+    cliente: null,
+    pedido: null,
   });
   const [searchTerm, setSearchTerm] = useState("");
-  const [clientes, setClientes] = useState([]);
-  const [pedidos, setPedidos] = useState([]);
 
-  const fetchFacturas = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/facturas/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setFacturas(response.data);
-    } catch (error) {
-      console.error("Error al obtener facturas:", error);
-      enqueueSnackbar("No se pudieron obtener las facturas", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  const fetchClientes = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/clientes/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setClientes(response.data);
-    } catch (error) {
-      console.error("Error al obtener clientes:", error);
-      enqueueSnackbar("No se pudieron obtener los clientes", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  const fetchPedidos = useCallback(async () => {
-    try {
-      const token = localStorage.getItem("access_token");
-      const response = await axios.get("http://localhost:8000/api/pedidos/", {
-        headers: { Authorization: `Bearer ${token}` },
-      });
-      setPedidos(response.data);
-    } catch (error) {
-      console.error("Error al obtener pedidos:", error);
-      enqueueSnackbar("No se pudieron obtener los pedidos", { variant: "error" });
-    }
-  }, [enqueueSnackbar]);
-
-  useEffect(() => {
-    fetchFacturas();
-    fetchClientes();
-    fetchPedidos();
-  }, [fetchFacturas, fetchClientes, fetchPedidos]);
+  const busqueda = useRetardado(searchTerm.trim());
+  const { items: facturas, cargando, hayMas, cargarMas, recargar: fetchFacturas } = usePaginacion(
+    `http://localhost:8000/api/facturas/?expand=cliente&q=${encodeURIComponent(busqueda)}`,
+    () => enqueueSnackbar("No se pudieron obtener las facturas", { variant: "error" })
+  );
 
   const handleOpen = (factura = null) => {
     if (factura) {
       setEditingFactura(factura);
       setFormData({
         ...factura,
-        cliente_id: factura.cliente?.id || "",
-        pedido_id: factura.pedido?.id || "",
+        cliente: factura.cliente || null,
+        pedido: factura.pedido_id ? { id: factura.pedido_id } : null,
       });
     } else {
       setEditingFactura(null);
@@ -115,8 +72,8 @@ function GestionFacturas() {
         precio_hora: 0,
         peajes: 0,
         importe_lista: 0,
-        cliente_id: "",
-        pedido_id: "",
+        cliente: null,
+        pedido: null,
       });
     }
     setOpen(true);
@@ -128,7 +85,7 @@ function GestionFacturas() {
 
   const handleSubmit = async () => {
     // Validar campos obligatorios
-    if (!formData.fecha || !formData.servicio || !formData.cliente_id || !formData.pedido_id) {
+    if (!formData.fecha || !formData.servicio || !formData.cliente || !formData.pedido) {
       enqueueSnackbar("Por favor, complete todos los campos obligatorios", { variant: "warning" });
       return;
     }
@@ -141,7 +98,10 @@ function GestionFacturas() {
 
       const method = editingFactura ? "put" : "post";
 
-      const response = await axios[method](url, formData, {
+      const { cliente, pedido, ...resto } = formData;
+      const datos = { ...resto, cliente_id: cliente.id, pedido_id: pedido.id };
+
+      const response = await axios[method](url, datos, {
         headers: { Authorization: `Bearer ${token}` },
       });
 
@@ -228,7 +188,7 @@ function GestionFacturas() {
       </Typography>
 
       <TextField
-        label="Buscar por servicio o cliente"
+        label="Buscar por servicio, origen o destino"
         variant="outlined"
         fullWidth
         value={searchTerm}
@@ -282,6 +242,8 @@ function GestionFacturas() {
   ))}
 </Grid>
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       <Button variant="contained" color="primary" onClick={() => handleOpen(null)} sx={{ mt: 2 }}>
         Agregar Factura
       </Button>
@@ -296,34 +258,24 @@ function GestionFacturas() {
         <DialogContent sx={{ mt: 2 }}>
           <Box display="flex" flexDirection="column" gap={3}>
             <Box display="flex" flexDirection="row" gap={3}>
-              <FormControl sx={{ flex: 1 }}>
-                <InputLabel>ID de Pedido</InputLabel>
-                <Select
-                  value={formData.pedido_id}
-                  onChange={(e) => setFormData({ ...formData, pedido_id: e.target.value })}
-                  label="ID de Pedido"
-                >
-                  {pedidos.map((pedido) => (
-                    <MenuItem key={pedido.id} value={pedido.id}>
-                      {pedido.id}
-                    </MenuItem>
-                  ))}
-                </Select>
-              </FormControl>
-              <FormControl sx={{ flex: 1 }}>
-                <InputLabel>Cliente</InputLabel>
-                <Select
-                  value={formData.cliente_id}
-                  onChange={(e) => setFormData({ ...formData, cliente_id: e.target.value })}
-                  label="Cliente"
-                >
-                  {clientes.map((cliente) => (
-                    <MenuItem key={cliente.id} value={cliente.id}>
-                      {cliente.nombre}
-                    </MenuItem>
-                  ))}
-                </Select>
-              </FormControl>
+              <SelectorRemoto
+                recurso="pedidos"
+                label="Pedido"
+                campos="id,descripcion"
+                value={formData.pedido}
+                onChange={(pedido) => setFormData({ ...formData, pedido })}
+                getOptionLabel={(pedido) => (pedido.descripcion ? `#${pedido.id} - ${pedido.descripcion}` : `#${pedido.id}`)}
+                sx={{ flex: 1 }}
+              />
+              <SelectorRemoto
+                recurso="clientes"
+                label="Cliente"
+                campos="id,nombre,empresa"
+                value={formData.cliente}
+                onChange={(cliente) => setFormData({ ...formData, cliente })}
+                getOptionLabel={(cliente) => cliente.nombre}
+                sx={{ flex: 1 }}
+              />
             </Box>
 
             <Box display="flex" flexDirection="row" gap={3}>
@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback } from "react";
+import React, { useState } from "react";
 import axios from "axios";
 import {
   Card,
@@ -14,31 +14,29 @@ import {
   MenuItem,
   IconButton,
   Box,
-  Select,
-  FormControl,
-  InputLabel,
   Collapse,
 } from "@mui/material";
 import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import AttachMoneyIcon from "@mui/icons-material/AttachMoney"; // Ícono para el módulo de gastos
 import { useSnackbar } from "notistack";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
+import SelectorRemoto from "./components/SelectorRemoto";
 
 function GestionGastos() {
   const { enqueueSnackbar } = useSnackbar();
 
   // Estados principales
-  const [camiones, setCamiones] = useState([]);
-  const [gastos, setGastos] = useState([]);
   const [open, setOpen] = useState(false);
   const [selectedGasto, setSelectedGasto] = useState(null);
-  const [selectedCamion, setSelectedCamion] = useState("");
+  const [selectedCamion, setSelectedCamion] = useState(null); // Filtra el listado y los cálculos
   const [searchTerm, setSearchTerm] = useState(""); // Estado para el término de búsqueda
   const [expandedGastoId, setExpandedGastoId] = useState(null); // Estado para expandir/colapsar detalles
 
   // Datos del formulario (Agregar/Editar)
   const [formData, setFormData] = useState({
-    camion_id: "",
+    camion: null,
     tipo_gasto: "combustible",
     monto: "",
     fecha: "",
@@ -48,34 +46,24 @@ function GestionGastos() {
   // Config de axios
   const headers = { Authorization: `Bearer ${localStorage.getItem("access_token")}` };
 
-  // Cargar camiones y gastos
-  const fetchData = useCallback(async () => {
-    try {
-      const [camionesRes, gastosRes] = await Promise.all([
-        axios.get("http://localhost:8000/api/camiones/", { headers }),
-        axios.get("http://localhost:8000/api/gastos/", { headers }),
-      ]);
-      setCamiones(camionesRes.data);
-      setGastos(gastosRes.data);
-    } catch (error) {
-      console.error("Error al obtener datos:", error);
-      enqueueSnackbar("No se pudieron obtener los datos", { variant: "error" });
-    }
-  }, [enqueueSnackbar, headers]);
-
-  useEffect(() => {
-    fetchData();
-  }, [fetchData]);
+  // Gastos paginados, filtrados en el servidor por camión y texto
+  const busqueda = useRetardado(searchTerm.trim());
+  const parametros = new URLSearchParams({ expand: "camion", q: busqueda });
+  if (selectedCamion) parametros.set("camion_id", selectedCamion.id);
+  const { items: gastos, cargando, hayMas, cargarMas, recargar: fetchData } = usePaginacion(
+    `http://localhost:8000/api/gastos/?${parametros}`,
+    () => enqueueSnackbar("No se pudieron obtener los gastos", { variant: "error" })
+  );
 
   // Abrir diálogo para Agregar/Editar gasto
-  const handleOpen = (gasto = null, camion = null) => {
+  const handleOpen = (gasto = null) => {
     setSelectedGasto(gasto || null);
 
     // Si es edición (gasto != null), cargamos sus datos
-    // Si es nuevo, cargamos el camión que se pasó (o ninguno)
+    // Si es nuevo, proponemos el camión seleccionado (o ninguno)
     if (gasto) {
       setFormData({
-        camion_id: gasto.camion ? gasto.camion.id : "",
+        camion: gasto.camion || null,
         tipo_gasto: gasto.tipo_gasto,
         monto: gasto.monto.toString(),
         fecha: gasto.fecha || "",
@@ -83,7 +71,7 @@ function GestionGastos() {
       });
     } else {
       setFormData({
-        camion_id: camion ? camion.id : "",
+        camion: selectedCamion,
         tipo_gasto: "combustible",
         monto: "",
         fecha: "",
@@ -103,13 +91,13 @@ function GestionGastos() {
   const handleSubmit = async () => {
     try {
       // Validación mínima
-      if (!formData.camion_id) {
+      if (!formData.camion) {
         enqueueSnackbar("Debes seleccionar un camión para asignar el gasto", { variant: "warning" });
         return;
       }
 
       const requestData = {
-        camion_id: formData.camion_id,
+        camion_id: formData.camion.id,
         tipo_gasto: formData.tipo_gasto,
         monto: parseFloat(formData.monto),
         fecha: formData.fecha,
@@ -161,7 +149,7 @@ function GestionGastos() {
     }
     try {
       const response = await axios.get(
-        `http://localhost:8000/api/gastos/gastos_por_mes/?camion_id=${selectedCamion}&mes=${mes}`,
+        `http://localhost:8000/api/gastos/gastos_por_mes/?camion_id=${selectedCamion.id}&mes=${mes}`,
         { headers }
       );
       enqueueSnackbar(`Total de gastos en ${mes}: $${response.data.total_gasto}`, { variant: "info" });
@@ -192,13 +180,6 @@ function GestionGastos() {
     setExpandedGastoId(expandedGastoId === gastoId ? null : gastoId);
   };
 
-  // Filtrar gastos por tipo de gasto o camión
-  const filteredGastos = gastos.filter((gasto) =>
-    `${gasto.tipo_gasto} ${gasto.camion ? gasto.camion.marca : ""}`
-      .toLowerCase()
-      .includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Container sx={{ mt: 4, position: "relative", minHeight: "100vh", pb: 10 }}>
       {/* Título con ícono */}
@@ -209,24 +190,30 @@ function GestionGastos() {
         </Typography>
       </Box>
 
-      {/* Campo de búsqueda y botón "Buscar" */}
+      {/* Camión (filtra el listado y los cálculos) y búsqueda */}
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
+        <SelectorRemoto
+          recurso="camiones"
+          label="Camión"
+          campos="id,marca,modelo,placa"
+          value={selectedCamion}
+          onChange={setSelectedCamion}
+          getOptionLabel={(c) => `${c.marca} ${c.modelo} (${c.placa})`}
+          sx={{ minWidth: 300 }}
+        />
         <TextField
-          label="Buscar por tipo de gasto o camión"
+          label="Buscar por tipo de gasto o comentarios"
           variant="outlined"
           fullWidth
           value={searchTerm}
           onChange={(e) => setSearchTerm(e.target.value)}
         />
-        <Button variant="contained" color="primary">
-          Buscar
-        </Button>
       </Box>
 
       {/* Listado de gastos filtrados */}
-      {camiones.map((camion) => (
+      {gastos.map((gasto) => (
         <Card
-          key={camion.id}
+          key={gasto.id}
           sx={{
             mb: 2,
             borderRadius: 3,
@@ -236,59 +223,37 @@ function GestionGastos() {
           }}
         >
           <CardContent>
-            <Typography variant="h6">
-              {camion.marca} {camion.modelo} ({camion.placa})
+            <Typography
+              variant="body1"
+              onClick={() => toggleExpand(gasto.id)}
+              style={{ cursor: "pointer" }}
+            >
+              {gasto.tipo_gasto} - ${gasto.monto} (Fecha: {gasto.fecha})
             </Typography>
-
-            {filteredGastos
-              .filter((g) => g.camion && g.camion.id === camion.id)
-              .map((gasto) => (
-                <Box key={gasto.id}>
-                  <Typography
-                    variant="body1"
-                    onClick={() => toggleExpand(gasto.id)}
-                    style={{ cursor: "pointer" }}
-                  >
-                    {gasto.tipo_gasto} - ${gasto.monto} (Fecha: {gasto.fecha})
-                  </Typography>
-                  <Collapse in={expandedGastoId === gasto.id}>
-                    <Typography variant="body2">Comentarios: {gasto.comentarios}</Typography>
-                    <Box display="flex" justifyContent="flex-end" mt={1}>
-                      <IconButton color="warning" onClick={() => handleOpen(gasto)}>
-                        <EditIcon />
-                      </IconButton>
-                      <IconButton color="error" onClick={() => handleDelete(gasto.id)}>
-                        <DeleteIcon />
-                      </IconButton>
-                    </Box>
-                  </Collapse>
-                </Box>
-              ))}
-
-            <Button variant="contained" sx={{ mt: 1 }} onClick={() => handleOpen(null, camion)}>
-              Agregar Gasto
-            </Button>
+            <Typography variant="body2" sx={{ color: "text.secondary" }}>
+              {gasto.camion ? `${gasto.camion.marca} ${gasto.camion.modelo} (${gasto.camion.placa})` : ""}
+            </Typography>
+            <Collapse in={expandedGastoId === gasto.id}>
+              <Typography variant="body2">Comentarios: {gasto.comentarios}</Typography>
+              <Box display="flex" justifyContent="flex-end" mt={1}>
+                <IconButton color="warning" onClick={() => handleOpen(gasto)}>
+                  <EditIcon />
+                </IconButton>
+                <IconButton color="error" onClick={() => handleDelete(gasto.id)}>
+                  <DeleteIcon />
+                </IconButton>
+              </Box>
+            </Collapse>
           </CardContent>
         </Card>
       ))}
 
-      {/* Selección de un camión para cálculo */}
-      <FormControl sx={{ minWidth: 200, mt: 2 }}>
-        <InputLabel>Selecciona un Camión</InputLabel>
-        <Select
-          value={selectedCamion}
-          label="Selecciona un Camión"
-          onChange={(e) => setSelectedCamion(e.target.value)}
-        >
-          {camiones.map((c) => (
-            <MenuItem key={c.id} value={c.id}>
-              {c.marca} {c.modelo} ({c.placa})
-            </MenuItem>
-          ))}
-        </Select>
-      </FormControl>
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
 
       <Box display="flex" gap={2} mt={2}>
+        <Button variant="contained" onClick={() => handleOpen(null)}>
+          Agregar Gasto
+        </Button>
         <Button variant="contained" color="primary" onClick={handleCalcularGastos}>
           Calcular Gastos del Mes
         </Button>
@@ -301,6 +266,16 @@ function GestionGastos() {
       <Dialog open={open} onClose={handleClose}>
         <DialogTitle>{selectedGasto ? "Editar Gasto" : "Agregar Gasto"}</DialogTitle>
         <DialogContent sx={{ display: "flex", flexDirection: "column", gap: 2, mt: 1, width: 400 }}>
+          <SelectorRemoto
+            recurso="camiones"
+            label="Camión"
+            campos="id,marca,modelo,placa"
+            value={formData.camion}
+            onChange={(camion) => setFormData({ ...formData, camion })}
+            getOptionLabel={(c) => `${c.marca} ${c.modelo} (${c.placa})`}
+            sx={{ mt: 1 }}
+          />
+
           <TextField
             select
             label="Tipo de Gasto"
@@ -26,13 +26,13 @@ import DeleteIcon from "@mui/icons-material/Delete";
 import LocalShippingIcon from "@mui/icons-material/LocalShipping";
 import SearchIcon from "@mui/icons-material/Search";
 import { useSnackbar } from "notistack";
+import usePaginacion, { useRetardado } from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
+import SelectorRemoto from "./components/SelectorRemoto";
 
 function GestionPedidos() {
   const { enqueueSnackbar } = useSnackbar();
-  const [pedidos, setPedidos] = useState([]);
-  const [clientes, setClientes] = useState([]);
-  const [camiones, setCamiones] = useState([]);
-  const [conductores, setConductores] = useState([]);
+  const [resumen, setResumen] = useState({});
   const [open, setOpen] = useState(false);
   const [selectedPedido, setSelectedPedido] = useState(null);
   const [searchTerm, setSearchTerm] = useState("");
@@ -40,9 +40,9 @@ function GestionPedidos() {
   const [filter, setFilter] = useState("all");
 
   const [formData, setFormData] = useState({
-    cliente_id: "",
-    camion_id: "",
-    conductor_id: "",
+    cliente: null,
+    camion: null,
+    conductor: null,
     descripcion: "",
     estado: "pendiente",
     fecha_entrega: "",
@@ -51,45 +51,53 @@ function GestionPedidos() {
   const token = localStorage.getItem("access_token");
   const headers = { Authorization: `Bearer ${token}` };
 
-  const fetchData = useCallback(async () => {
-    try {
-      const [clientesRes, camionesRes, conductoresRes, pedidosRes] = await Promise.all([
-        axios.get("http://localhost:8000/api/clientes/", { headers }),
-        axios.get("http://localhost:8000/api/camiones/", { headers }),
-        axios.get("http://localhost:8000/api/conductores/", { headers }),
-        axios.get("http://localhost:8000/api/pedidos/", { headers }),
-      ]);
+  // Listado paginado (búsqueda y estado se filtran en el servidor)
+  const busqueda = useRetardado(searchTerm.trim());
+  const parametros = new URLSearchParams({ expand: "cliente,camion,conductor", q: busqueda });
+  if (filter !== "all") parametros.set("estado", filter);
+  const { items: pedidos, cargando, hayMas, cargarMas, recargar } = usePaginacion(
+    `http://localhost:8000/api/pedidos/?${parametros}`,
+    () => enqueueSnackbar("No se pudieron obtener los pedidos", { variant: "error" })
+  );
 
-      setClientes(clientesRes.data);
-      setCamiones(camionesRes.data);
-      setConductores(conductoresRes.data);
-      setPedidos(pedidosRes.data);
+  // Totales por estado de todos los pedidos, no solo de las páginas cargadas
+  const fetchResumen = useCallback(async () => {
+    try {
+      const token = localStorage.getItem("access_token");
+      const response = await axios.get("http://localhost:8000/api/metricas/pedidos_por_estado/", {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      setResumen(Object.fromEntries(response.data.map((fila) => [fila.estado, fila.total])));
     } catch (error) {
-      console.error("Error al obtener datos:", error);
-      enqueueSnackbar("No se pudieron obtener los datos", { variant: "error" });
+      console.error("Error al obtener el resumen de pedidos:", error);
     }
-  }, [enqueueSnackbar]);
+  }, []);
 
   useEffect(() => {
-    fetchData();
-  }, [fetchData]);
+    fetchResumen();
+  }, [fetchResumen]);
+
+  const fetchData = () => {
+    recargar();
+    fetchResumen();
+  };
 
   const handleOpen = (pedido = null) => {
     setSelectedPedido(pedido);
     if (pedido) {
       setFormData({
-        cliente_id: pedido.cliente?.id || "",
-        camion_id: pedido.camion?.id || "",
-        conductor_id: pedido.conductor?.id || "",
+        cliente: pedido.cliente,
+        camion: pedido.camion,
+        conductor: pedido.conductor,
         descripcion: pedido.descripcion,
         estado: pedido.estado,
         fecha_entrega: pedido.fecha_entrega || "",
       });
     } else {
       setFormData({
-        cliente_id: "",
-        camion_id: "",
-        conductor_id: "",
+        cliente: null,
+        camion: null,
+        conductor: null,
         descripcion: "",
         estado: "pendiente",
         fecha_entrega: "",
@@ -104,7 +112,13 @@ function GestionPedidos() {
 
   const handleSubmit = async () => {
     try {
-      const requestData = { ...formData };
+      const { cliente, camion, conductor, ...resto } = formData;
+      const requestData = {
+        ...resto,
+        cliente_id: cliente ? cliente.id : null,
+        camion_id: camion ? camion.id : null,
+        conductor_id: conductor ? conductor.id : null,
+      };
       if (selectedPedido) {
         await axios.put(`http://localhost:8000/api/pedidos/${selectedPedido.id}/`, requestData, { headers });
         enqueueSnackbar("Pedido editado con éxito", { variant: "success" });
@@ -141,19 +155,11 @@ function GestionPedidos() {
     setFilter(newFilter);
   };
 
-  const filteredPedidos = pedidos.filter((pedido) => {
-    if (filter === "all") {
-      return pedido.id.toString().includes(searchTerm.toLowerCase());
-    } else {
-      return pedido.estado === filter && pedido.id.toString().includes(searchTerm.toLowerCase());
-    }
-  });
-
   // Resumen de pedidos
-  const totalPedidos = pedidos.length;
-  const pedidosPendientes = pedidos.filter((p) => p.estado === "pendiente").length;
-  const pedidosCompletados = pedidos.filter((p) => p.estado === "completado").length;
-  const pedidosCancelados = pedidos.filter((p) => p.estado === "cancelado").length;
+  const totalPedidos = Object.values(resumen).reduce((suma, total) => suma + total, 0);
+  const pedidosPendientes = resumen.pendiente || 0;
+  const pedidosCompletados = resumen.completado || 0;
+  const pedidosCancelados = resumen.cancelado || 0;
 
   return (
     <Container sx={{ mt: 4 }}>
@@ -200,7 +206,7 @@ function GestionPedidos() {
       {/* Campo de búsqueda y botón "Buscar" */}
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
         <TextField
-          label="Buscar por número de pedido"
+          label="Buscar por número o descripción"
           variant="outlined"
           fullWidth
           value={searchTerm}
@@ -215,7 +221,7 @@ function GestionPedidos() {
       </Box>
 
       {/* Listado de pedidos filtrados */}
-      {filteredPedidos.map((pedido) => (
+      {pedidos.map((pedido) => (
         <Card
           key={pedido.id}
           sx={{
@@ -283,6 +289,8 @@ function GestionPedidos() {
         </Card>
       ))}
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       {/* Botón tradicional para agregar pedido */}
       <Box sx={{ display: "flex", justifyContent: "flex-end", mt: 2 }}>
         <Button
@@ -305,52 +313,34 @@ function GestionPedidos() {
         </DialogTitle>
         <DialogContent sx={{ display: "flex", flexDirection: "column", gap: 2, mt: 1, width: 400 }}>
           {/* Cliente */}
-          <FormControl fullWidth>
-            <InputLabel>Cliente</InputLabel>
-            <Select
-              name="cliente_id"
-              value={formData.cliente_id}
-              onChange={(e) => setFormData({ ...formData, cliente_id: e.target.value })}
-            >
-              {clientes.map((c) => (
-                <MenuItem key={c.id} value={c.id}>
-                  {c.nombre}
-                </MenuItem>
-              ))}
-            </Select>
-          </FormControl>
+          <SelectorRemoto
+            recurso="clientes"
+            label="Cliente"
+            campos="id,nombre,empresa"
+            value={formData.cliente}
+            onChange={(cliente) => setFormData({ ...formData, cliente })}
+            getOptionLabel={(c) => c.nombre}
+          />
 
           {/* Camión */}
-          <FormControl fullWidth>
-            <InputLabel>Camión</InputLabel>
-            <Select
-              name="camion_id"
-              value={formData.camion_id}
-              onChange={(e) => setFormData({ ...formData, camion_id: e.target.value })}
-            >
-              {camiones.map((camion) => (
-                <MenuItem key={camion.id} value={camion.id}>
-                  {camion.marca} {camion.modelo} ({camion.placa})
-                </MenuItem>
-              ))}
-            </Select>
-          </FormControl>
+          <SelectorRemoto
+            recurso="camiones"
+            label="Camión"
+            campos="id,marca,modelo,placa"
+            value={formData.camion}
+            onChange={(camion) => setFormData({ ...formData, camion })}
+            getOptionLabel={(camion) => `${camion.marca} ${camion.modelo} (${camion.placa})`}
+          />
 
           {/* Conductor */}
-          <FormControl fullWidth>
-            <InputLabel>Conductor</InputLabel>
-            <Select
-              name="conductor_id"
-              value={formData.conductor_id}
-              onChange={(e) => setFormData({ ...formData, conductor_id: e.target.value })}
-            >
-              {conductores.map((conductor) => (
-                <MenuItem key={conductor.id} value={conductor.id}>
-                  {conductor.nombre} {conductor.apellido}
-                </MenuItem>
-              ))}
-            </Select>
-          </FormControl>
+          <SelectorRemoto
+            recurso="conductores"
+            label="Conductor"
+            campos="id,nombre,apellido"
+            value={formData.conductor}
+            onChange={(conductor) => setFormData({ ...formData, conductor })}
+            getOptionLabel={(conductor) => `${conductor.nombre} ${conductor.apellido}`}
+          />
 
           {/* Descripción */}
           <TextField
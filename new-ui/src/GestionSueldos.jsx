@@ -1,4 +1,4 @@
-import React, { useEffect, useState, useCallback, useMemo } from "react";
+import React, { useState, useMemo } from "react";
 import axios from "axios";
 import {
   Card,
@@ -11,10 +11,6 @@ import {
   DialogContent,
   DialogActions,
   TextField,
-  MenuItem,
-  Select,
-  FormControl,
-  InputLabel,
   Box,
   IconButton,
   Collapse,
@@ -23,40 +19,29 @@ import EditIcon from "@mui/icons-material/Edit";
 import DeleteIcon from "@mui/icons-material/Delete";
 import AttachMoneyIcon from "@mui/icons-material/AttachMoney"; // Ícono para el módulo de sueldos
 import { useSnackbar } from "notistack";
+import usePaginacion from "./usePaginacion";
+import CargarMas from "./components/CargarMas";
+import SelectorRemoto from "./components/SelectorRemoto";
 
 function GestionSueldos() {
   const { enqueueSnackbar } = useSnackbar();
-  const [sueldos, setSueldos] = useState([]);
-  const [empleados, setEmpleados] = useState([]);
   const [open, setOpen] = useState(false);
   const [selectedSueldo, setSelectedSueldo] = useState(null);
   const [expandedSueldoId, setExpandedSueldoId] = useState(null);
-  const [searchTerm, setSearchTerm] = useState(""); // Estado para el término de búsqueda
+  const [empleadoFiltro, setEmpleadoFiltro] = useState(null); // Conductor por el que se filtra el listado
 
   const headers = useMemo(() => ({
     Authorization: `Bearer ${localStorage.getItem("access_token")}`,
   }), []);
 
-  const fetchData = useCallback(async () => {
-    try {
-      const [empleadosRes, sueldosRes] = await Promise.all([
-        axios.get("http://localhost:8000/api/conductores/", { headers }),
-        axios.get("http://localhost:8000/api/sueldos/", { headers }),
-      ]);
-      setEmpleados(empleadosRes.data);
-      setSueldos(sueldosRes.data);
-    } catch (error) {
-      console.error("Error al obtener datos:", error);
-      enqueueSnackbar("No se pudieron obtener los datos", { variant: "error" });
-    }
-  }, [enqueueSnackbar, headers]);
-
-  useEffect(() => {
-    fetchData();
-  }, [fetchData]);
+  // Sueldos paginados, filtrados en el servidor por empleado
+  const { items: sueldos, cargando, hayMas, cargarMas, recargar: fetchData } = usePaginacion(
+    `http://localhost:8000/api/sueldos/?expand=empleado${empleadoFiltro ? `&empleado_id=${empleadoFiltro.id}` : ""}`,
+    () => enqueueSnackbar("No se pudieron obtener los sueldos", { variant: "error" })
+  );
 
   const [formData, setFormData] = useState({
-    empleado_id: "",
+    empleado: null,
     salario_base: "",
     bonos: "",
     deducciones: "",
@@ -75,7 +60,7 @@ function GestionSueldos() {
     setSelectedSueldo(sueldo);
     if (sueldo) {
       setFormData({
-        empleado_id: sueldo.empleado.id,
+        empleado: sueldo.empleado,
         salario_base: sueldo.salario_base,
         bonos: sueldo.bonos,
         deducciones: sueldo.deducciones,
@@ -87,7 +72,7 @@ function GestionSueldos() {
       });
     } else {
       setFormData({
-        empleado_id: "",
+        empleado: null,
         salario_base: "",
         bonos: "",
         deducciones: "",
@@ -122,7 +107,8 @@ function GestionSueldos() {
 
   const handleSubmit = async () => {
     try {
-      const requestData = { ...formData };
+      const { empleado, ...resto } = formData;
+      const requestData = { ...resto, empleado_id: empleado ? empleado.id : null };
       if (selectedSueldo) {
         await axios.put(`http://localhost:8000/api/sueldos/${selectedSueldo.id}/`, requestData, { headers });
         enqueueSnackbar("Sueldo editado con éxito", { variant: "success" });
@@ -142,13 +128,6 @@ function GestionSueldos() {
     setExpandedSueldoId(expandedSueldoId === sueldoId ? null : sueldoId);
   };
 
-  // Filtrar sueldos por nombre del conductor
-  const filteredSueldos = sueldos.filter((sueldo) =>
-    `${sueldo.empleado.nombre} ${sueldo.empleado.apellido}`
-      .toLowerCase()
-      .includes(searchTerm.toLowerCase())
-  );
-
   return (
     <Container sx={{ mt: 4, position: "relative", minHeight: "100vh", pb: 10 }}>
       {/* Título con ícono */}
@@ -159,22 +138,21 @@ function GestionSueldos() {
         </Typography>
       </Box>
 
-      {/* Campo de búsqueda y botón "Buscar" */}
+      {/* Filtro por conductor */}
       <Box sx={{ display: "flex", gap: 2, mb: 4 }}>
-        <TextField
-          label="Buscar por nombre"
-          variant="outlined"
+        <SelectorRemoto
+          recurso="conductores"
+          label="Buscar por conductor"
+          campos="id,nombre,apellido"
+          value={empleadoFiltro}
+          onChange={setEmpleadoFiltro}
+          getOptionLabel={(e) => `${e.nombre} ${e.apellido}`}
           fullWidth
-          value={searchTerm}
-          onChange={(e) => setSearchTerm(e.target.value)}
         />
-        <Button variant="contained" color="primary">
-          Buscar
-        </Button>
       </Box>
 
       {/* Listado de sueldos filtrados */}
-      {filteredSueldos.map((sueldo) => (
+      {sueldos.map((sueldo) => (
         <Card
           key={sueldo.id}
           sx={{
@@ -216,6 +194,8 @@ function GestionSueldos() {
         </Card>
       ))}
 
+      <CargarMas hayMas={hayMas} cargando={cargando} onClick={cargarMas} />
+
       {/* Botón para agregar sueldo */}
       <Box sx={{ display: "flex", justifyContent: "flex-end", mt: 4 }}>
         <Button
@@ -237,16 +217,15 @@ function GestionSueldos() {
       <Dialog open={open} onClose={handleClose}>
         <DialogTitle>{selectedSueldo ? "Editar Sueldo" : "Agregar Sueldo"}</DialogTitle>
         <DialogContent sx={{ display: "flex", flexDirection: "column", gap: 2, mt: 1, width: 400 }}>
-          <FormControl fullWidth>
-            <InputLabel>Empleado</InputLabel>
-            <Select name="empleado_id" value={formData.empleado_id} onChange={handleChange}>
-              {empleados.map((empleado) => (
-                <MenuItem key={empleado.id} value={empleado.id}>
-                  {empleado.nombre} {empleado.apellido}
-                </MenuItem>
-              ))}
-            </Select>
-          </FormControl>
+          <SelectorRemoto
+            recurso="conductores"
+            label="Empleado"
+            campos="id,nombre,apellido"
+            value={formData.empleado}
+            onChange={(empleado) => setFormData({ ...formData, empleado })}
+            getOptionLabel={(e) => `${e.nombre} ${e.apellido}`}
+            sx={{ mt: 1 }}
+          />
           <TextField label="Periodo de Sueldo (Ej: Marzo 2024)" name="periodo_sueldo" value={formData.periodo_sueldo} onChange={(e) => setFormData({ ...formData, periodo_sueldo: e.target.value })} />
           <TextField label="Salario Base ($)" type="number" name="salario_base" value={formData.salario_base} onChange={handleChange} />
           <TextField label="Bonos ($)" type="number" name="bonos" value={formData.bonos} onChange={handleChange} />
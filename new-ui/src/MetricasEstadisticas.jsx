@@ -30,29 +30,21 @@ function MetricasEstadisticas() {
 
     const fetchMetricas = async () => {
       try {
-        const [pedidosRes, gastosRes, sueldosRes, resumenRes] = await Promise.all([
-          axios.get("http://localhost:8000/api/metricas/pedidos_por_estado/", { headers }),
-          axios.get("http://localhost:8000/api/metricas/gastos_por_tipo/", { headers }),
-          axios.get("http://localhost:8000/api/metricas/sueldos_por_mes/", { headers }),
-          axios.get("http://localhost:8000/api/metricas/resumen_general/", { headers }),
-        ]);
-
-        console.log("Pedidos por estado:", pedidosRes.data);
-        console.log("Gastos por tipo:", gastosRes.data);
-        console.log("Sueldos por mes:", sueldosRes.data);
-        console.log("Resumen general:", resumenRes.data);
+        // Todas las métricas llegan en una sola respuesta cacheada por el backend
+        const response = await axios.get("http://localhost:8000/api/metricas/dashboard/", { headers });
+        const { pedidos_por_estado, gastos_por_tipo, sueldos_por_mes, resumen_general } = response.data;
 
         // Ordenar los pedidos por estado: cancelado -> pendiente -> completado
         const estadosOrdenados = ["cancelado", "pendiente", "completado"];
         const pedidosOrdenados = estadosOrdenados.map(estado => {
-          const pedido = pedidosRes.data.find(p => p.estado === estado);
+          const pedido = pedidos_por_estado.find(p => p.estado === estado);
           return pedido || { estado, total: 0 }; // Si no hay datos para un estado, se asigna 0
         });
 
         setPedidosEstado(pedidosOrdenados);
-        setGastosTipo(gastosRes.data);
-        setSueldosMes(sueldosRes.data);
-        setResumen(resumenRes.data);
+        setGastosTipo(gastos_por_tipo);
+        setSueldosMes(sueldos_por_mes);
+        setResumen(resumen_general);
       } catch (error) {
         if (error.response && error.response.status === 401) {
           enqueueSnackbar("No autorizado. Por favor, inicia sesión nuevamente.", { variant: "error" });
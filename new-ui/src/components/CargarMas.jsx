@@ -0,0 +1,16 @@
+import React from "react";
+import { Box, Button, CircularProgress } from "@mui/material";
+
+// Botón "Cargar más" para los listados de `usePaginacion`
+function CargarMas({ hayMas, cargando, onClick }) {
+  if (!hayMas && !cargando) return null;
+  return (
+    <Box sx={{ display: "flex", justifyContent: "center", my: 2 }}>
+      <Button variant="outlined" onClick={onClick} disabled={cargando || !hayMas}>
+        {cargando ? <CircularProgress size={24} /> : "Cargar más"}
+      </Button>
+    </Box>
+  );
+}
+
+export default CargarMas;
@@ -3,6 +3,8 @@ import { MapContainer, TileLayer, Marker, Popup, Polyline } from "react-leaflet"
 import "leaflet/dist/leaflet.css";
 import L from "leaflet";
 import axios from "axios";
+import { TextField } from "@mui/material";
+import SelectorRemoto from "./SelectorRemoto";
 
 // Configuración del ícono del marcador (necesario para Leaflet)
 const iconoCamion = new L.Icon({
@@ -12,50 +14,69 @@ const iconoCamion = new L.Icon({
   popupAnchor: [0, -40], // Punto de anclaje del popup
 });
 
+// Fecha local en formato YYYY-MM-DD (la del input de tipo fecha)
+const fechaLocal = (fecha) => {
+  const desplazada = new Date(fecha.getTime() - fecha.getTimezoneOffset() * 60000);
+  return desplazada.toISOString().slice(0, 10);
+};
+
+const diaSiguiente = (dia) => {
+  const fecha = new Date(`${dia}T00:00:00`);
+  fecha.setDate(fecha.getDate() + 1);
+  return fechaLocal(fecha);
+};
+
 function RastreoGPS() {
-  const [ubicaciones, setUbicaciones] = useState([]); // Todas las ubicaciones
-  const [camiones, setCamiones] = useState([]); // Lista de camiones
-  const [camionSeleccionado, setCamionSeleccionado] = useState(null); // Camión seleccionado
+  const [ubicaciones, setUbicaciones] = useState([]); // Última ubicación del camión seleccionado
+  const [camionSeleccionado, setCamionSeleccionado] = useState(null); // Camión seleccionado (objeto)
   const [rutaCamion, setRutaCamion] = useState([]); // Ruta del camión seleccionado
+  const [flota, setFlota] = useState([]); // Posición actual de todos los camiones
+  const [dia, setDia] = useState(() => fechaLocal(new Date())); // Día del recorrido (el backend no carga todo el historial)
+
+  const camionId = camionSeleccionado ? camionSeleccionado.id : null;
+  const esHoy = dia === fechaLocal(new Date());
 
-  // Obtener la lista de camiones desde el backend
+  // Obtener la posición actual de toda la flota cuando no hay un camión seleccionado
   useEffect(() => {
-    const fetchCamiones = async () => {
-      try {
-        const response = await axios.get("http://localhost:8000/api/camiones/", {
-          headers: {
-            Authorization: `Bearer ${localStorage.getItem("access_token")}`,
-          },
-        });
-        setCamiones(response.data);
-      } catch (error) {
-        console.error("Error obteniendo camiones:", error);
+    const fetchFlota = async () => {
+      if (!camionId) {
+        try {
+          const response = await axios.get("http://localhost:8000/api/ubicaciones/flota/", {
+            headers: {
+              Authorization: `Bearer ${localStorage.getItem("access_token")}`,
+            },
+          });
+          setFlota(response.data.filter((posicion) => posicion.latitud !== null));
+          setUbicaciones([]);
+          setRutaCamion([]);
+        } catch (error) {
+          console.error("Error obteniendo la flota:", error);
+        }
       }
     };
 
-    fetchCamiones();
-  }, []);
+    fetchFlota();
+  }, [camionId]);
 
-  // Obtener las ubicaciones del camión seleccionado
+  // Obtener la posición actual y el recorrido simplificado del camión seleccionado
   useEffect(() => {
     const fetchUbicaciones = async () => {
-      if (camionSeleccionado) {
+      if (camionId) {
+        const headers = {
+          Authorization: `Bearer ${localStorage.getItem("access_token")}`,
+        };
         try {
-          const response = await axios.get(
-            `http://localhost:8000/api/ubicaciones/?camion_id=${camionSeleccionado}`,
-            {
-              headers: {
-                Authorization: `Bearer ${localStorage.getItem("access_token")}`,
-              },
-            }
-          );
-          setUbicaciones(response.data);
-          // Extraer las coordenadas para dibujar la ruta
-          const coordenadas = response.data.map((ubicacion) => [
-            ubicacion.latitud,
-            ubicacion.longitud,
+          const [actualRes, recorridoRes] = await Promise.all([
+            axios.get(`http://localhost:8000/api/ubicaciones/ubicacion_actual/?camion_id=${camionId}&expand=camion`, { headers })
+              .catch((error) => (error.response && error.response.status === 404 ? { data: null } : Promise.reject(error))),
+            axios.get(
+              `http://localhost:8000/api/ubicaciones/recorrido/?camion_id=${camionId}&zoom=13&desde=${dia}&hasta=${diaSiguiente(dia)}`,
+              { headers }
+            ),
           ]);
-          setRutaCamion(coordenadas);
+          setUbicaciones(actualRes.data ? [actualRes.data] : []);
+          // La ruta llega ya simplificada por el backend según el zoom del mapa
+          setRutaCamion(recorridoRes.data.recorrido);
         } catch (error) {
           console.error("Error obteniendo ubicaciones:", error);
         }
@@ -63,26 +84,60 @@ function RastreoGPS() {
     };
 
     fetchUbicaciones();
-  }, [camionSeleccionado]);
+  }, [camionId, dia]);
+
+  // Posiciones en vivo (Server-Sent Events): del camión seleccionado o de toda la flota
+  useEffect(() => {
+    const token = encodeURIComponent(localStorage.getItem("access_token") || "");
+    const filtro = camionId ? `camion_id=${camionId}&` : "";
+    const fuente = new EventSource(`http://localhost:8000/api/ubicaciones/en_vivo/?${filtro}token=${token}`);
+
+    fuente.addEventListener("ubicacion", (evento) => {
+      const posicion = JSON.parse(evento.data);
+      if (camionId) {
+        setUbicaciones((actuales) => {
+          const camion = actuales.length ? actuales[0].camion : camionSeleccionado;
+          return [{ ...posicion, camion }];
+        });
+        // Solo el recorrido de hoy se extiende con las posiciones que llegan
+        if (esHoy) setRutaCamion((ruta) => [...ruta, [posicion.latitud, posicion.longitud]]);
+      } else {
+        setFlota((actual) => actual.map((item) => (
+          item.camion_id === posicion.camion_id
+            ? { ...item, latitud: posicion.latitud, longitud: posicion.longitud, timestamp: posicion.timestamp }
+            : item
+        )));
+      }
+    });
+
+    return () => fuente.close();
+  }, [camionId, camionSeleccionado, esHoy]);
 
   return (
     <div style={{ width: "100%", height: "600px", position: "relative" }}>
       {/* Selector de camión */}
       <div style={{ position: "absolute", top: "10px", left: "10px", zIndex: 1000, background: "white", padding: "10px", borderRadius: "5px" }}>
-        <label htmlFor="camion">Seleccionar camión: </label>
-        <select
-          id="camion"
-          value={camionSeleccionado || ""}
-          onChange={(e) => setCamionSeleccionado(e.target.value)}
-          style={{ padding: "5px" }}
-        >
-          <option value="">Todos los camiones</option>
-          {camiones.map((camion) => (
-            <option key={camion.id} value={camion.id}>
-              {camion.placa} - {camion.marca} {camion.modelo}
-            </option>
-          ))}
-        </select>
+        <SelectorRemoto
+          recurso="camiones"
+          label="Seleccionar camión (vacío: todos)"
+          campos="id,marca,modelo,placa"
+          value={camionSeleccionado}
+          onChange={setCamionSeleccionado}
+          getOptionLabel={(camion) => `${camion.placa} - ${camion.marca} ${camion.modelo}`}
+          size="small"
+          sx={{ width: 320 }}
+        />
+        {camionId && (
+          <TextField
+            type="date"
+            label="Día del recorrido"
+            value={dia}
+            onChange={(e) => e.target.value && setDia(e.target.value)}
+            size="small"
+            sx={{ width: 320, mt: 1 }}
+            InputLabelProps={{ shrink: true }}
+          />
+        )}
       </div>
 
       {/* Mapa */}
@@ -96,7 +151,7 @@ function RastreoGPS() {
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
 
-        {/* Marcadores de ubicaciones */}
+        {/* Marcador de la última ubicación */}
         {ubicaciones.map((ubicacion) => (
           <Marker
             key={ubicacion.id}
@@ -111,6 +166,22 @@ function RastreoGPS() {
           </Marker>
         ))}
 
+        {/* Posición actual de cada camión de la flota */}
+        {!camionId && flota.map((posicion) => (
+          <Marker
+            key={posicion.camion_id}
+            position={[posicion.latitud, posicion.longitud]}
+            icon={iconoCamion}
+          >
+            <Popup>
+              <strong>Camion:</strong> {posicion.placa} <br />
+              <strong>Conductor:</strong> {posicion.conductor_nombre ? `${posicion.conductor_nombre} ${posicion.conductor_apellido}` : "Sin asignar"} <br />
+              <strong>Pedido:</strong> {posicion.pedido_activo_descripcion || "Ninguno en proceso"} <br />
+              <strong>Hora:</strong> {new Date(posicion.timestamp).toLocaleTimeString()}
+            </Popup>
+          </Marker>
+        ))}
+
         {/* Línea de la ruta del camión */}
         {rutaCamion.length > 0 && (
           <Polyline
@@ -0,0 +1,87 @@
+import React, { useEffect, useState } from "react";
+import axios from "axios";
+import { Autocomplete, CircularProgress, TextField } from "@mui/material";
+
+const API = "http://localhost:8000/api";
+
+// Selector con autocompletado que busca en el servidor (`?q=`) en lugar de cargar
+// todo el recurso: muestra las primeras `limite` coincidencias de lo que se escribe.
+// `value` y `onChange` usan el objeto completo (o null); el objeto elegido se conserva
+// aunque ya no esté entre las opciones de la última búsqueda.
+function SelectorRemoto({
+  recurso,
+  label,
+  value,
+  onChange,
+  getOptionLabel,
+  campos,
+  filtros = "",
+  limite = 20,
+  ...props
+}) {
+  const [texto, setTexto] = useState("");
+  const [opciones, setOpciones] = useState([]);
+  const [cargando, setCargando] = useState(false);
+
+  useEffect(() => {
+    let vigente = true;
+    const espera = setTimeout(async () => {
+      setCargando(true);
+      try {
+        const token = localStorage.getItem("access_token");
+        const params = new URLSearchParams({ q: texto, page_size: limite });
+        if (campos) params.set("fields", campos);
+        const response = await axios.get(`${API}/${recurso}/?${params}${filtros}`, {
+          headers: { Authorization: `Bearer ${token}` },
+        });
+        if (vigente) setOpciones(response.data.results);
+      } catch (error) {
+        console.error(`Error al buscar ${recurso}:`, error);
+      } finally {
+        if (vigente) setCargando(false);
+      }
+    }, 300);
+    return () => {
+      vigente = false;
+      clearTimeout(espera);
+    };
+  }, [recurso, texto, campos, filtros, limite]);
+
+  return (
+    <Autocomplete
+      value={value}
+      onChange={(_, nuevo) => onChange(nuevo)}
+      onInputChange={(_, nuevoTexto, motivo) => {
+        // Al elegir una opción el texto pasa a ser su etiqueta: no es una búsqueda nueva
+        if (motivo !== "reset") setTexto(nuevoTexto);
+      }}
+      options={value && !opciones.some((o) => o.id === value.id) ? [value, ...opciones] : opciones}
+      filterOptions={(x) => x}
+      getOptionLabel={getOptionLabel}
+      isOptionEqualToValue={(opcion, elegido) => opcion.id === elegido.id}
+      loading={cargando}
+      noOptionsText="Sin resultados"
+      loadingText="Buscando..."
+      renderInput={(params) => (
+        <TextField
+          {...params}
+          label={label}
+          slotProps={{
+            input: {
+              ...params.InputProps,
+              endAdornment: (
+                <>
+                  {cargando ? <CircularProgress color="inherit" size={18} /> : null}
+                  {params.InputProps.endAdornment}
+                </>
+              ),
+            },
+          }}
+        />
+      )}
+      {...props}
+    />
+  );
+}
+
+export default SelectorRemoto;
@@ -0,0 +1,67 @@
+import { useCallback, useEffect, useRef, useState } from "react";
+import axios from "axios";
+
+// Listado paginado de la API: carga la primera página de `url` y sigue el enlace `next`
+// con `cargarMas`. Sirve para las dos paginaciones del backend (por páginas y por cursor).
+// Cuando cambia `url` (filtros, búsqueda) se vuelve a empezar desde la primera página.
+function usePaginacion(url, onError) {
+  const [items, setItems] = useState([]);
+  const [siguiente, setSiguiente] = useState(null);
+  const [total, setTotal] = useState(null);
+  const [cargando, setCargando] = useState(false);
+  const pedidoActual = useRef(0);
+  const onErrorRef = useRef(onError);
+  onErrorRef.current = onError;
+
+  const cargar = useCallback(async (pagina, agregar) => {
+    // Solo la última petición actualiza el estado; las respuestas viejas se descartan
+    const numero = ++pedidoActual.current;
+    setCargando(true);
+    try {
+      const token = localStorage.getItem("access_token");
+      const response = await axios.get(pagina, {
+        headers: { Authorization: `Bearer ${token}` },
+      });
+      if (numero !== pedidoActual.current) return;
+      const { results, next, count } = response.data;
+      setItems((anteriores) => (agregar ? [...anteriores, ...results] : results));
+      setSiguiente(next);
+      setTotal(count ?? null);
+    } catch (error) {
+      if (numero !== pedidoActual.current) return;
+      console.error("Error al obtener el listado:", error);
+      if (onErrorRef.current) onErrorRef.current(error);
+    } finally {
+      if (numero === pedidoActual.current) setCargando(false);
+    }
+  }, []);
+
+  const recargar = useCallback(() => {
+    if (url) return cargar(url, false);
+    setItems([]);
+    setSiguiente(null);
+    setTotal(null);
+  }, [url, cargar]);
+
+  const cargarMas = useCallback(() => {
+    if (siguiente && !cargando) cargar(siguiente, true);
+  }, [siguiente, cargando, cargar]);
+
+  useEffect(() => {
+    recargar();
+  }, [recargar]);
+
+  return { items, total, cargando, hayMas: Boolean(siguiente), cargarMas, recargar };
+}
+
+// Valor que sigue a `valor` después de `espera` ms sin cambios (para no buscar en cada tecla)
+export function useRetardado(valor, espera = 300) {
+  const [retardado, setRetardado] = useState(valor);
+  useEffect(() => {
+    const temporizador = setTimeout(() => setRetardado(valor), espera);
+    return () => clearTimeout(temporizador);
+  }, [valor, espera]);
+  return retardado;
+}
+
+export default usePaginacion;